@@ -25,6 +25,9 @@ class Settings:
         # Core API Keys
         self.OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY', '')
         self.GOOGLE_CREDENTIALS_JSON = os.environ.get('GOOGLE_CREDENTIALS_JSON', '')
+        # Firestore emulator (host:port) for local testing, used when no credentials are set
+        self.FIRESTORE_EMULATOR_HOST = os.environ.get('FIRESTORE_EMULATOR_HOST', '')
+        self.FIRESTORE_PROJECT_ID = os.environ.get('FIRESTORE_PROJECT_ID', 'cass-brothers-pim')
 
         # Flask Configuration
         self.FLASK_SECRET_KEY = os.environ.get('FLASK_SECRET_KEY', 'dev-key-change-in-production')
@@ -56,6 +59,39 @@ class Settings:
         self.AI_DELAY_BETWEEN_REQUESTS = float(os.environ.get('AI_DELAY_BETWEEN_REQUESTS', '0.5'))
         self.SHEETS_DELAY_BETWEEN_REQUESTS = float(os.environ.get('SHEETS_DELAY_BETWEEN_REQUESTS', '0.5'))
 
+        # Delta sync of every collection from Google Sheets (seconds, 0 = disabled)
+        self.SHEETS_AUTO_SYNC_INTERVAL = int(os.environ.get('SHEETS_AUTO_SYNC_INTERVAL', '0'))
+
+        # Write-behind queue for Google Sheets updates (cache is updated immediately,
+        # sheet writes are coalesced per spreadsheet and paced to the write quota)
+        self.SHEETS_WRITE_BEHIND = os.environ.get('SHEETS_WRITE_BEHIND', 'true').lower() == 'true'
+        self.SHEETS_WRITE_WINDOW_SECONDS = float(os.environ.get('SHEETS_WRITE_WINDOW_SECONDS', '2.0'))
+        self.SHEETS_WRITE_REQUESTS_PER_MINUTE = int(os.environ.get('SHEETS_WRITE_REQUESTS_PER_MINUTE', '60'))
+        self.SHEETS_WRITE_MAX_RETRIES = int(os.environ.get('SHEETS_WRITE_MAX_RETRIES', '5'))
+
+        # Shared fetch cache for supplier pages and spec sheets
+        self.FETCH_CACHE_DIR = os.environ.get('FETCH_CACHE_DIR', 'fetch_cache')
+        self.FETCH_CACHE_MAX_AGE = float(os.environ.get('FETCH_CACHE_MAX_AGE', '86400'))  # Serve without revalidating (seconds)
+        self.FETCH_MAX_PER_HOST = int(os.environ.get('FETCH_MAX_PER_HOST', '4'))
+        self.FETCH_CACHE_MAX_MB = int(os.environ.get('FETCH_CACHE_MAX_MB', '500'))
+
+        # Rendered spec-sheet pages for Vision extraction (sized to what Vision high-detail mode keeps)
+        self.PDF_PAGE_CACHE_DIR = os.environ.get('PDF_PAGE_CACHE_DIR', 'pdf_page_cache')
+        self.PDF_PAGE_CACHE_MAX_MB = int(os.environ.get('PDF_PAGE_CACHE_MAX_MB', '500'))
+        self.PDF_PAGE_MAX_LONG_SIDE = int(os.environ.get('PDF_PAGE_MAX_LONG_SIDE', '2048'))
+        self.PDF_PAGE_MAX_SHORT_SIDE = int(os.environ.get('PDF_PAGE_MAX_SHORT_SIDE', '768'))
+
+        # Local snapshot of the WELS reference workbook (refresh interval in seconds, 0 = manual only)
+        self.WELS_CACHE_DB = os.environ.get('WELS_CACHE_DB', 'wels_registry.db')
+        self.WELS_REFRESH_INTERVAL = int(os.environ.get('WELS_REFRESH_INTERVAL', '86400'))
+
+        # Pricing sheets are indexed in memory and revalidated in the background after this many seconds
+        self.PRICING_INDEX_TTL = int(os.environ.get('PRICING_INDEX_TTL', '300'))
+
+        # Serialized /products/all responses with precompressed variants, versioned by cache generation
+        self.RESPONSE_CACHE_DIR = os.environ.get('RESPONSE_CACHE_DIR', '/tmp/pim_cache')
+        self.RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', '300'))
+
         # ChatGPT-specific environment variables
         self.CHATGPT_MODEL = os.environ.get('CHATGPT_MODEL', 'gpt-4')
         self.CHATGPT_MAX_TOKENS = int(os.environ.get('CHATGPT_MAX_TOKENS', '1000'))
@@ -63,6 +99,46 @@ class Settings:
         self.CHATGPT_MIN_REQUEST_INTERVAL = float(os.environ.get('CHATGPT_MIN_REQUEST_INTERVAL', '1.0'))
         self.CHATGPT_ENABLED = os.environ.get('CHATGPT_ENABLED', 'true').lower() == 'true'
 
+        # Persistent cache of OpenAI responses (LLM_CACHE_ENABLED=false bypasses it everywhere)
+        self.LLM_CACHE_ENABLED = os.environ.get('LLM_CACHE_ENABLED', 'true').lower() == 'true'
+        self.LLM_CACHE_DB = os.environ.get('LLM_CACHE_DB', 'llm_cache.db')
+        self.LLM_CACHE_MAX_MB = int(os.environ.get('LLM_CACHE_MAX_MB', '200'))
+
+        # OpenAI quota shared by every thread and worker process (limits for the account tier)
+        self.OPENAI_TOKENS_PER_MINUTE = int(os.environ.get('OPENAI_TOKENS_PER_MINUTE', '200000'))
+        self.OPENAI_REQUESTS_PER_MINUTE = int(os.environ.get('OPENAI_REQUESTS_PER_MINUTE', '500'))
+        self.OPENAI_LIMITER_DB = os.environ.get('OPENAI_LIMITER_DB', 'openai_limiter.db')
+        # Shared OpenAI client: keep-alive connections, retries on 429/5xx, share of the quota bulk jobs leave free
+        self.OPENAI_POOL_SIZE = int(os.environ.get('OPENAI_POOL_SIZE', '10'))
+        self.OPENAI_MAX_RETRIES = int(os.environ.get('OPENAI_MAX_RETRIES', '5'))
+        self.OPENAI_BULK_RESERVE = float(os.environ.get('OPENAI_BULK_RESERVE', '0.2'))
+        # Concurrent products in bulk extraction (the shared limiter keeps them under the quota)
+        self.BULK_EXTRACTION_WORKERS = int(os.environ.get('BULK_EXTRACTION_WORKERS', '8'))
+
+        # OpenAI Batch API jobs (offline bulk extraction / content generation)
+        self.OPENAI_API_BASE = os.environ.get('OPENAI_API_BASE', 'https://api.openai.com/v1')
+        self.OPENAI_BATCH_DB = os.environ.get('OPENAI_BATCH_DB', 'openai_batches.db')
+        self.OPENAI_BATCH_DIR = os.environ.get('OPENAI_BATCH_DIR', 'batch_jobs')
+        self.OPENAI_BATCH_POLL_INTERVAL = float(os.environ.get('OPENAI_BATCH_POLL_INTERVAL', '60'))
+        self.OPENAI_BATCH_COMPLETION_WINDOW = os.environ.get('OPENAI_BATCH_COMPLETION_WINDOW', '24h')
+
+        # WIP processing pipeline - worker threads per stage
+        self.WIP_FETCH_WORKERS = int(os.environ.get('WIP_FETCH_WORKERS', '8'))
+        self.WIP_EXTRACT_WORKERS = int(os.environ.get('WIP_EXTRACT_WORKERS', '4'))
+        self.WIP_GENERATE_WORKERS = int(os.environ.get('WIP_GENERATE_WORKERS', '4'))
+        self.WIP_CLEAN_WORKERS = int(os.environ.get('WIP_CLEAN_WORKERS', '2'))
+
+        # Headless Chrome pool for page screenshots and JavaScript-rendered HTML
+        self.BROWSER_POOL_SIZE = int(os.environ.get('BROWSER_POOL_SIZE', '2'))
+        self.BROWSER_MAX_PAGES = int(os.environ.get('BROWSER_MAX_PAGES', '50'))  # Pages before a browser is replaced
+        self.BROWSER_PAGE_TIMEOUT = float(os.environ.get('BROWSER_PAGE_TIMEOUT', '20'))
+        self.BROWSER_NETWORK_IDLE_MS = int(os.environ.get('BROWSER_NETWORK_IDLE_MS', '500'))
+        self.BROWSER_IDLE_TIMEOUT = float(os.environ.get('BROWSER_IDLE_TIMEOUT', '300'))
+        self.BROWSER_BLOCK_RESOURCES = os.environ.get('BROWSER_BLOCK_RESOURCES', 'true').lower() == 'true'
+        self.BROWSER_PREWARM = int(os.environ.get('BROWSER_PREWARM', '0'))  # Browsers started with the app
+        # Render variant URLs (?finish=, ?colour=...) in the browser pool before extraction (needs Chrome)
+        self.RENDER_JS_VARIANTS = os.environ.get('RENDER_JS_VARIANTS', 'false').lower() == 'true'
+
     def setup_shopify_config(self):
         """Setup Shopify integration configuration"""
         self.SHOPIFY_CONFIG = {
@@ -186,6 +262,11 @@ class Settings:
             'OPENAI_DESCRIPTION_MAX_TOKENS': int(os.environ.get('OPENAI_DESCRIPTION_MAX_TOKENS', '200')),
             'OPENAI_DESCRIPTION_TEMPERATURE': float(os.environ.get('OPENAI_DESCRIPTION_TEMPERATURE', '0.7')),
             'HTML_MAX_LENGTH': int(os.environ.get('HTML_MAX_LENGTH', '50000')),
+            # Send extraction a compact product document (structured data, spec lines, main text) instead of raw HTML
+            'HTML_PREPROCESS': os.environ.get('HTML_PREPROCESS', 'true').lower() == 'true',
+            'PRODUCT_DOCUMENT_MAX_LENGTH': int(os.environ.get('PRODUCT_DOCUMENT_MAX_LENGTH', '24000')),
+            # Parsed pages kept for reuse by extraction, image analysis and og:image lookup
+            'PAGE_ANALYSIS_CACHE_SIZE': int(os.environ.get('PAGE_ANALYSIS_CACHE_SIZE', '16')),
             'USER_AGENT': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         }
 
@@ -4,7 +4,13 @@ Defines validation rules and quality scoring for different product collections
 """
 import re
 import json
-from typing import Dict, List, Any, Tuple, Optional
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Tuple, Optional, Hashable
+
+# String values treated as empty (compared stripped and lower-cased)
+EMPTY_VALUES = {'', 'none', 'null', '-', 'n/a'}
 
 class FieldValidator:
     """Base class for field validation"""
@@ -33,7 +39,7 @@ class FieldValidator:
             return True
         
         if isinstance(value, str):
-            return value.strip() == "" or value.strip().lower() in ['none', 'null', '-', 'n/a']
+            return value.strip().lower() in EMPTY_VALUES
         
         return False
     
@@ -348,12 +354,161 @@ class URLValidator(FieldValidator):
         
         return True, ""
 
+# Weight bands for the customer-focused quality categories: (name, min weight, max weight)
+QUALITY_CATEGORIES = [
+    ('purchase_decision', 6.0, None),
+    ('search_discovery', 4.0, 6.0),
+    ('trust_confidence', 2.0, 4.0),
+    ('seo_findability', None, 2.0),
+]
+
+# Per-row quality scores kept across refreshes, keyed by collection and row content
+SCORE_CACHE_SIZE = 100000
+
+
+class ScoringPlan:
+    """
+    A collection's validators flattened into parallel lists, built once
+
+    Holds each field's validator, weight and required flag, the total weight
+    and the category membership, so scoring a product is a single pass over
+    the fields. Scores are identical to CollectionValidator.validate_product.
+    """
+
+    def __init__(self, validators: Dict[str, FieldValidator]):
+        self.fields = list(validators)
+        self.validators = list(validators.values())
+        self.weights = [validator.weight for validator in self.validators]
+        self.required = [validator.required for validator in self.validators]
+        self.total_weight = sum(self.weights)
+        self.categories = {
+            name: [
+                field for field, weight in zip(self.fields, self.weights)
+                if (low is None or weight >= low) and (high is None or weight < high)
+            ]
+            for name, low, high in QUALITY_CATEGORIES
+        }
+        self.category_weights = {
+            name: sum(validators[field].weight for field in fields)
+            for name, fields in self.categories.items()
+        }
+        # Validators that keep the stock empty/validate/score flow can use the inlined fast path
+        self._standard = [
+            type(validator).validate is FieldValidator.validate
+            and type(validator).calculate_quality_score is FieldValidator.calculate_quality_score
+            and type(validator)._is_empty is FieldValidator._is_empty
+            for validator in self.validators
+        ]
+
+    def field_score(self, index: int, value: Any) -> float:
+        """Quality score (0.0 to 1.0) of one field value"""
+        validator = self.validators[index]
+        if not self._standard[index]:
+            return validator.calculate_quality_score(value)
+
+        if value is None or (isinstance(value, str) and value.strip().lower() in EMPTY_VALUES):
+            return 0.0 if self.required[index] else 0.5
+
+        is_valid, _ = validator._validate_value(value)
+        if not is_valid:
+            return 0.0
+        return validator._calculate_value_quality(value)
+
+    def content_key(self, product_data: Dict[str, Any]) -> Hashable:
+        """Cache key for a row: the values of just the fields that affect the score
+
+        Sheet rows are plain strings, so the tuple itself is the key (its hash
+        is cheap and exact). Rows holding other types fall back to a digest of
+        their repr, which keeps True and 1 apart.
+        """
+        values = tuple(map(product_data.get, self.fields))
+        if all(type(value) is str or value is None for value in values):
+            return values
+        return hashlib.blake2b(repr(values).encode('utf-8'), digest_size=16).hexdigest()
+
+    def score_many(self, products: List[Dict[str, Any]]) -> List[float]:
+        """
+        Overall quality scores for many products, scored a field at a time
+
+        Repeated values in a column (blanks, shared brands, materials...) are
+        scored once per batch.
+
+        Args:
+            products: Product dicts
+
+        Returns:
+            Quality scores (0-100, one decimal) in input order
+        """
+        weighted = [0.0] * len(products)
+        for index, field in enumerate(self.fields):
+            weight = self.weights[index]
+            seen = {}
+            for position, product in enumerate(products):
+                value = product.get(field)
+                try:
+                    # Keyed by type too so True and 1 aren't conflated
+                    key = (type(value), value)
+                    score = seen.get(key)
+                    if score is None:
+                        score = seen[key] = self.field_score(index, value)
+                except TypeError:
+                    # Unhashable values (lists, dicts) are scored directly
+                    score = self.field_score(index, value)
+                weighted[position] += score * weight
+
+        if self.total_weight <= 0:
+            return [0 for _ in products]
+        return [round(total / self.total_weight * 100, 1) for total in weighted]
+
+
+class QualityScoreCache:
+    """Bounded LRU of quality scores keyed by (collection, row content key)"""
+
+    def __init__(self, max_size: int = SCORE_CACHE_SIZE):
+        self.max_size = max_size
+        self._scores: 'OrderedDict[Tuple[str, Hashable], float]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def get_many(self, keys: List[Tuple[str, Hashable]]) -> List[Optional[float]]:
+        with self._lock:
+            scores = []
+            for key in keys:
+                score = self._scores.get(key)
+                if score is not None:
+                    self._scores.move_to_end(key)
+                scores.append(score)
+            hits = sum(1 for score in scores if score is not None)
+            self.stats['hits'] += hits
+            self.stats['misses'] += len(keys) - hits
+            return scores
+
+    def put_many(self, items: List[Tuple[Tuple[str, Hashable], float]]):
+        with self._lock:
+            for key, score in items:
+                self._scores[key] = score
+                self._scores.move_to_end(key)
+            while len(self._scores) > self.max_size:
+                self._scores.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._scores.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, entries=len(self._scores), max_size=self.max_size)
+
+
+_score_cache = QualityScoreCache()
+
 class CollectionValidator:
     """Validator for an entire product collection"""
     
     def __init__(self, collection_name: str):
         self.collection_name = collection_name
         self.validators: Dict[str, FieldValidator] = {}
+        self._plan: Optional[ScoringPlan] = None
         self.setup_validators()
     
     def setup_validators(self):
@@ -363,26 +518,63 @@ class CollectionValidator:
     def add_validator(self, validator: FieldValidator):
         """Add a field validator"""
         self.validators[validator.field_name] = validator
+        if self._plan is not None:
+            # Cached scores were computed with the old validator set
+            _score_cache.clear()
+        self._plan = None
+
+    @property
+    def plan(self) -> ScoringPlan:
+        """The compiled scoring plan (rebuilt only when validators change)"""
+        if self._plan is None:
+            self._plan = ScoringPlan(self.validators)
+        return self._plan
+
+    def score_products(self, products: List[Dict[str, Any]]) -> List[float]:
+        """
+        Quality scores for many products in one batch
+
+        Rows whose scored fields are unchanged since they were last scored
+        are served from the score cache.
+
+        Args:
+            products: Product dicts
+
+        Returns:
+            Quality scores (same values as validate_product's quality_score), in input order
+        """
+        plan = self.plan
+        keys = [(self.collection_name, plan.content_key(product)) for product in products]
+        scores = _score_cache.get_many(keys)
+
+        missing = [position for position, score in enumerate(scores) if score is None]
+        if missing:
+            fresh = plan.score_many([products[position] for position in missing])
+            for position, score in zip(missing, fresh):
+                scores[position] = score
+            _score_cache.put_many([(keys[position], score) for position, score in zip(missing, fresh)])
+        return scores
     
     def validate_product(self, product_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Validate an entire product with customer-focused category breakdown
         Returns validation results with errors and quality score
         """
+        plan = self.plan
         errors = {}
         field_scores = {}
 
-        for field_name, validator in self.validators.items():
+        for index, (field_name, validator) in enumerate(zip(plan.fields, plan.validators)):
             value = product_data.get(field_name)
             is_valid, error_message = validator.validate(value)
 
             if not is_valid:
                 errors[field_name] = error_message
 
-            field_scores[field_name] = validator.calculate_quality_score(value)
+            field_scores[field_name] = plan.field_score(index, value)
 
         # Calculate overall quality score
-        total_weight = sum(validator.weight for validator in self.validators.values())
+        total_weight = plan.total_weight
         weighted_score = sum(
             score * self.validators[field].weight
             for field, score in field_scores.items()
@@ -413,24 +605,22 @@ class CollectionValidator:
 
     def _calculate_category_scores(self, field_scores: Dict[str, float]) -> Dict[str, float]:
         """Calculate scores for customer-focused categories"""
-        # Define category weight ranges (based on our new weighting system)
-        purchase_decision_fields = [f for f, v in self.validators.items() if v.weight >= 6.0]
-        search_discovery_fields = [f for f, v in self.validators.items() if 4.0 <= v.weight < 6.0]
-        trust_confidence_fields = [f for f, v in self.validators.items() if 2.0 <= v.weight < 4.0]
-        seo_findability_fields = [f for f, v in self.validators.items() if v.weight < 2.0]
+        # Category membership and weights come from the plan (based on our weighting system)
+        plan = self.plan
 
-        def calculate_category_score(fields):
+        def calculate_category_score(name):
+            fields = plan.categories[name]
             if not fields:
                 return 0.0
-            total_weight = sum(self.validators[f].weight for f in fields)
+            total_weight = plan.category_weights[name]
             weighted_score = sum(field_scores.get(f, 0) * self.validators[f].weight for f in fields)
             return (weighted_score / total_weight * 100) if total_weight > 0 else 0
 
         return {
-            'purchase_decision': round(calculate_category_score(purchase_decision_fields), 1),
-            'search_discovery': round(calculate_category_score(search_discovery_fields), 1),
-            'trust_confidence': round(calculate_category_score(trust_confidence_fields), 1),
-            'seo_findability': round(calculate_category_score(seo_findability_fields), 1)
+            'purchase_decision': round(calculate_category_score('purchase_decision'), 1),
+            'search_discovery': round(calculate_category_score('search_discovery'), 1),
+            'trust_confidence': round(calculate_category_score('trust_confidence'), 1),
+            'seo_findability': round(calculate_category_score('seo_findability'), 1)
         }
 
     def _get_customer_readiness_summary(self, category_scores: Dict[str, float]) -> str:
@@ -840,5 +1030,12 @@ def validate_product_data(collection_name: str, product_data: Dict[str, Any]) ->
 
 def calculate_quality_score(collection_name: str, product_data: Dict[str, Any]) -> float:
     """Calculate quality score for a product"""
-    validation_result = validate_product_data(collection_name, product_data)
-    return validation_result['quality_score']
\ No newline at end of file
+    return get_validator(collection_name).score_products([product_data])[0]
+
+def calculate_quality_scores(collection_name: str, products: List[Dict[str, Any]]) -> List[float]:
+    """Calculate quality scores for many products in one batch (unchanged rows come from the cache)"""
+    return get_validator(collection_name).score_products(products)
+
+def get_quality_score_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters and size of the per-row quality score cache"""
+    return _score_cache.get_stats()
\ No newline at end of file
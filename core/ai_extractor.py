@@ -6,20 +6,26 @@ feature validation, and Google Apps Script integration for automated processing
 """
 import json
 import re
+import hashlib
 import logging
 import time
 import asyncio
 import aiohttp
 import os
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 import requests
-from bs4 import BeautifulSoup
 from googleapiclient.discovery import build
 from urllib.parse import urljoin, urlparse
 
 from config.settings import get_settings
 from config.collections import get_collection_config, CollectionConfig
 from core.google_apps_script_manager import google_apps_script_manager
+from core.http_fetcher import get_fetcher
+from core.llm_cache import get_llm_cache
+from core.llm_client import get_llm_client
+from core.html_preprocessor import get_html_preprocessor
+from core.page_analysis import analyze_page
+from core.browser_pool import get_browser_pool
 
 logger = logging.getLogger(__name__)
 
@@ -34,10 +40,6 @@ class AIExtractor:
         self.apps_script_url = getattr(self.settings, 'APPS_SCRIPT_WEB_APP_URL', None)
         self.apps_script_enabled = getattr(self.settings, 'ENABLE_APPS_SCRIPT_TRIGGER', True)
 
-        # Rate limiting for ChatGPT
-        self.last_chatgpt_request = 0
-        self.chatgpt_min_interval = getattr(self.settings, 'CHATGPT_MIN_REQUEST_INTERVAL', 0.1)
-
         # Collection-specific prompts (your existing ones)
         self.extraction_prompts = {
             'sinks': self._build_sinks_extraction_prompt,
@@ -526,10 +528,7 @@ class AIExtractor:
                     product_data = {'collection': collection_name}
                     logger.warning(f"⚠️ No products found, using basic collection context")
 
-            # Apply rate limiting
-            self._apply_chatgpt_rate_limit()
-
-            # Generate FAQs using ChatGPT
+            # Generate FAQs using ChatGPT (paced by the shared OpenAI client)
             faq_results = {}
 
             for faq_type in faq_types:
@@ -558,9 +557,6 @@ class AIExtractor:
                 else:
                     logger.error(f"❌ No response for {faq_type} FAQs")
 
-                # Rate limiting between requests (OPTIMIZED)
-                time.sleep(0.1)
-
             if faq_results:
                 result = {
                     'success': True,
@@ -895,7 +891,7 @@ Focus on providing genuinely useful information that addresses real customer con
         }
 
         try:
-            response = requests.get(url, headers=headers, timeout=30)
+            response = get_fetcher().get(url, headers=headers, timeout=30)
             response.raise_for_status()
 
             # Check if response is PDF
@@ -1020,33 +1016,27 @@ Focus on providing genuinely useful information that addresses real customer con
             return None
 
     def _extract_from_pdf_with_vision(self, pdf_content: bytes, url: str, collection_name: str = None) -> Optional[str]:
-        """Extract data from PDF using GPT-4 Vision API for image-based PDFs"""
+        """Extract data from PDF using GPT-4 Vision API for image-based PDFs
+
+        Pages are rendered one at a time through the shared page image cache,
+        so a spec sheet seen before (extraction, re-extraction, the spec sheet
+        route) is never rasterized twice.
+        """
         try:
-            import base64
-            import io
-            from pdf2image import convert_from_bytes
+            from core.pdf_page_cache import get_page_image_cache
 
             logger.info(f"🔍 Converting PDF to images for Vision API extraction (collection: {collection_name})")
 
-            # Convert PDF to images (one per page)
-            images = convert_from_bytes(pdf_content, dpi=200, fmt='PNG')
-
-            if not images:
-                logger.error(f"❌ No images generated from PDF")
-                return None
-
-            logger.info(f"✅ Converted PDF to {len(images)} image(s)")
+            page_cache = get_page_image_cache()
+            llm_cache = get_llm_cache()
+            pages_processed = 0
 
             # Process ALL pages to extract dimensions from technical drawings
             all_extracted_text = []
 
-            for page_num, page_image in enumerate(images, 1):
-                logger.info(f"🔍 Processing page {page_num}/{len(images)} with Vision API...")
-
-                # Convert PIL Image to base64
-                buffer = io.BytesIO()
-                page_image.save(buffer, format='PNG')
-                image_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+            for page_num, page_count, page_image in page_cache.iter_pages(pdf_content, dpi=200):
+                logger.info(f"🔍 Processing page {page_num}/{page_count} with Vision API...")
+                pages_processed += 1
 
                 # Build collection-specific Vision prompt
                 if collection_name and collection_name.lower() == 'sinks':
@@ -1199,14 +1189,19 @@ Also extract:
 
 Format the output as clear, structured text with all measurements and specifications clearly labeled."""
 
+                cache_key = llm_cache.make_key('gpt-4o', collection_name, vision_prompt, {
+                    'kind': 'pdf_vision',
+                    'image_sha256': hashlib.sha256(page_image['data']).hexdigest(),
+                    'max_tokens': 2000
+                })
+                page_text = llm_cache.get(cache_key)
+                if page_text is not None:
+                    all_extracted_text.append(f"=== Page {page_num} (Vision) ===\n{page_text}")
+                    continue
+
                 # Call GPT-4 Vision API for this page
-                response = requests.post(
-                    'https://api.openai.com/v1/chat/completions',
-                    headers={
-                        'Content-Type': 'application/json',
-                        'Authorization': f'Bearer {self.api_key}',
-                    },
-                    json={
+                response = get_llm_client().post(
+                    {
                         'model': 'gpt-4o',  # GPT-4 with vision
                         'messages': [
                             {
@@ -1219,7 +1214,7 @@ Format the output as clear, structured text with all measurements and specificat
                                     {
                                         'type': 'image_url',
                                         'image_url': {
-                                            'url': f'data:image/png;base64,{image_base64}'
+                                            'url': page_image['data_url']
                                         }
                                     }
                                 ]
@@ -1227,7 +1222,8 @@ Format the output as clear, structured text with all measurements and specificat
                         ],
                         'max_tokens': 2000
                     },
-                    timeout=self.settings.AI_REQUEST_TIMEOUT
+                    timeout=self.settings.AI_REQUEST_TIMEOUT,
+                    kind='pdf_vision'
                 )
 
                 response.raise_for_status()
@@ -1236,90 +1232,70 @@ Format the output as clear, structured text with all measurements and specificat
                 if 'choices' in result and result['choices']:
                     page_text = result['choices'][0]['message']['content'].strip()
                     logger.info(f"✅ Page {page_num} Vision API extracted {len(page_text)} chars")
+                    llm_cache.put(cache_key, page_text, result.get('usage'))
                     all_extracted_text.append(f"=== Page {page_num} (Vision) ===\n{page_text}")
                 else:
                     logger.warning(f"⚠️ No choices in Vision API response for page {page_num}")
 
             # Combine all pages
             combined_text = "\n\n".join(all_extracted_text)
-            logger.info(f"✅ Vision extraction complete: {len(combined_text)} total chars from {len(images)} pages")
+            if not pages_processed:
+                logger.error(f"❌ No images generated from PDF")
+                return None
+            logger.info(f"✅ Vision extraction complete: {len(combined_text)} total chars from {pages_processed} pages")
             return combined_text if combined_text else None
 
         except ImportError as e:
-            logger.error(f"❌ pdf2image not installed: {e}. Install with: pip install pdf2image")
+            logger.error(f"❌ No PDF renderer installed: {e}. Install with: pip install pdf2image (or PyMuPDF)")
             return None
         except Exception as e:
             logger.error(f"❌ Vision extraction error: {e}")
             return None
 
-    def extract_product_data(self, collection_name: str, html_content: str, url: str) -> Optional[Dict[str, Any]]:
-        """Extract product data using AI for a specific collection"""
+    def extract_product_data(self, collection_name: str, html_content: str, url: str,
+                             use_cache: bool = True) -> Optional[Dict[str, Any]]:
+        """Extract product data using AI for a specific collection
+
+        Responses are served from the persistent LLM cache when the same prompt
+        and content were sent before; pass use_cache=False to force a fresh call.
+        """
         if not self.api_key:
             logger.error("❌ No OpenAI API key configured")
             return None
 
-        # Check for variant/finish parameters in URL
-        from urllib.parse import urlparse, parse_qs
-        parsed_url = urlparse(url)
-        query_params = parse_qs(parsed_url.query)
+        request = self.resolve_extraction_request(collection_name, html_content, url, use_cache)
+        if not request:
+            return None
 
-        variant_params = ['finish', 'color', 'colour', 'variant', 'sku']
-        detected_variants = {k: v[0] for k, v in query_params.items() if k in variant_params}
+        html_content = request['content']
+        llm_cache = get_llm_cache()
+        cache_key = request['cache_key']
 
-        if detected_variants:
-            logger.warning(f"⚠️ VARIANT URL DETECTED: {url}")
-            logger.warning(f"⚠️ Parameters: {detected_variants}")
-            logger.warning(f"⚠️ Image extraction may not capture variant-specific images (JavaScript-rendered content limitation)")
-            logger.warning(f"⚠️ Verify extracted images match the variant finish/color after extraction")
-
-        # Get collection-specific prompt
-        prompt_builder = self.extraction_prompts.get(collection_name)
-        if not prompt_builder:
-            logger.error(f"❌ No extraction prompt defined for collection: {collection_name}")
-            return None
+        try:
+            text = request['response']
+            usage = None
+            from_api = False
+            if text is None:
+                response = get_llm_client().post(
+                    request['payload'],
+                    timeout=self.settings.AI_REQUEST_TIMEOUT,
+                    kind='extraction'
+                )
 
-        prompt = prompt_builder(url)
-        
-        # Truncate HTML content if too long
-        max_length = self.settings.API_CONFIG['HTML_MAX_LENGTH']
-        if len(html_content) > max_length:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            # Remove script and style tags
-            for script in soup(["script", "style"]):
-                script.decompose()
-            html_content = str(soup)[:max_length] + "...[truncated]"
+                response.raise_for_status()
+                result = response.json()
 
-        # Detect if content is from PDF or HTML
-        # PDF content will contain page markers like "=== Page X ==="
-        is_pdf = "=== Page" in html_content
-        content_label = "PDF Content:" if is_pdf else "HTML Content:"
+                if 'choices' in result and result['choices']:
+                    text = result['choices'][0]['message']['content'].strip()
+                    usage = result.get('usage')
+                    from_api = True
 
-        try:
-            response = requests.post(
-                'https://api.openai.com/v1/chat/completions',
-                headers={
-                    'Content-Type': 'application/json',
-                    'Authorization': f'Bearer {self.api_key}',
-                },
-                json={
-                    'model': self.settings.API_CONFIG['OPENAI_MODEL'],
-                    'messages': [
-                        {'role': 'user', 'content': prompt + "\n\n" + content_label + "\n" + html_content}
-                    ],
-                    'max_tokens': self.settings.API_CONFIG['OPENAI_MAX_TOKENS'],
-                    'temperature': self.settings.API_CONFIG['OPENAI_TEMPERATURE']
-                },
-                timeout=self.settings.AI_REQUEST_TIMEOUT
-            )
-            
-            response.raise_for_status()
-            result = response.json()
-            
-            if 'choices' in result and result['choices']:
-                text = result['choices'][0]['message']['content'].strip()
-                
+            if text is not None:
                 try:
                     extracted_data = json.loads(text)
+                    # Only cache fresh responses that parsed (a cache hit is already stored, with its usage)
+                    if from_api:
+                        llm_cache.put(cache_key, text, usage)
                     # Filter to only include allowed AI extraction fields
                     filtered_data = self._filter_extracted_fields(collection_name, extracted_data)
                     
@@ -1357,6 +1333,8 @@ Format the output as clear, structured text with all measurements and specificat
                     if json_match:
                         try:
                             extracted_data = json.loads(json_match.group())
+                            if from_api:
+                                llm_cache.put(cache_key, text, usage)
                             filtered_data = self._filter_extracted_fields(collection_name, extracted_data)
 
                             logger.info(f"✅ AI extraction successful (recovered JSON) for {collection_name}: {len(filtered_data)} fields")
@@ -1376,6 +1354,158 @@ Format the output as clear, structured text with all measurements and specificat
             logger.error(f"❌ AI extraction error for {collection_name}: {e}")
             return None
     
+    def resolve_extraction_request(self, collection_name: str, html_content: str, url: str,
+                                   use_cache: bool = True) -> Optional[Dict[str, Any]]:
+        """The extraction request for a page, plus its cached response if there is one
+
+        A variant page that would be rendered is looked up under its rendered
+        cache key first (computed from the fetched HTML), so a cached answer
+        never starts a browser. The page is rendered only on a miss. Live
+        extraction and the offline batch builder both resolve requests here.
+
+        Returns:
+            build_extraction_request() dict with 'response' added (cached text
+            or None), or None if the collection has no prompt
+        """
+        llm_cache = get_llm_cache()
+        rendered_html = None
+        if self._detect_variant(url) and self._renders_variants(html_content):
+            cache_key = self._rendered_cache_key(collection_name, html_content, url)
+            if not cache_key:
+                return None
+            text = llm_cache.get(cache_key, bypass=not use_cache)
+            if text is not None:
+                # Nothing will be sent, so there is no payload to build
+                return {'payload': None, 'cache_key': cache_key, 'content': html_content, 'response': text}
+            rendered_html = self.render_variant_html(html_content, url)
+
+        request = self.build_extraction_request(collection_name, html_content, url, rendered_html)
+        if not request:
+            return None
+        # The rendered key has just missed; only a page that ended up unrendered needs a lookup
+        request['response'] = None if rendered_html else llm_cache.get(request['cache_key'], bypass=not use_cache)
+        return request
+
+    @staticmethod
+    def _detect_variant(url: str) -> Dict[str, str]:
+        """Variant query parameters (?finish=, ?colour=...) in a product URL"""
+        from urllib.parse import urlparse, parse_qs
+        query_params = parse_qs(urlparse(url).query)
+
+        variant_params = ['finish', 'color', 'colour', 'variant', 'sku']
+        return {k: v[0] for k, v in query_params.items() if k in variant_params}
+
+    def _renders_variants(self, html_content: str) -> bool:
+        """Whether variant pages are rendered in a browser (web pages only, with RENDER_JS_VARIANTS on)"""
+        return bool(self.settings.RENDER_JS_VARIANTS) and "=== Page" not in html_content
+
+    def render_variant_html(self, html_content: str, url: str) -> Optional[str]:
+        """Browser-rendered HTML for a variant URL (?finish=, ?colour=...), or None to use the page as fetched
+
+        Variant pages pick the finish/color with JavaScript, so with
+        RENDER_JS_VARIANTS on they are extracted from the rendered DOM.
+        """
+        detected_variants = self._detect_variant(url)
+        if not detected_variants:
+            return None
+
+        logger.warning(f"⚠️ VARIANT URL DETECTED: {url}")
+        logger.warning(f"⚠️ Parameters: {detected_variants}")
+        rendered_html = None
+        if self._renders_variants(html_content):
+            rendered_html = self.render_page_html(url)
+        if rendered_html:
+            logger.info(f"🖥️ Using browser-rendered HTML for variant URL ({len(rendered_html)} chars)")
+        else:
+            logger.warning(f"⚠️ Image extraction may not capture variant-specific images (JavaScript-rendered content limitation)")
+            logger.warning(f"⚠️ Verify extracted images match the variant finish/color after extraction")
+        return rendered_html
+
+    def build_extraction_request(self, collection_name: str, html_content: str, url: str,
+                                 rendered_html: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Build the chat request extract_product_data() sends for a page
+
+        The offline batch mode sends the same request, so its results land
+        under the cache key extract_product_data() looks up.
+
+        Web pages are sent as a compact product document (structured data,
+        spec lines and main text) rather than raw HTML when HTML_PREPROCESS is on.
+
+        A page rendered by render_variant_html() is sent in place of the
+        fetched one but keyed on the fetched HTML: the rendered DOM changes
+        from run to run, so keying on it would never hit the cache.
+
+        Returns:
+            Dict with 'payload' (request body), 'cache_key' (LLM cache key) and
+            'content' (the page, for image extraction), or None if the collection has no prompt
+        """
+        # Get collection-specific prompt
+        prompt_builder = self.extraction_prompts.get(collection_name)
+        if not prompt_builder:
+            logger.error(f"❌ No extraction prompt defined for collection: {collection_name}")
+            return None
+
+        prompt = prompt_builder(url)
+        content_label, page_content = self._extraction_content(rendered_html or html_content, url)
+
+        model = self.settings.API_CONFIG['OPENAI_MODEL']
+        message = prompt + "\n\n" + content_label + "\n" + page_content
+        params = self._extraction_params()
+        if rendered_html:
+            cache_key = self._rendered_cache_key(collection_name, html_content, url)
+            html_content = rendered_html
+        else:
+            cache_key = get_llm_cache().make_key(model, collection_name, message, params)
+        return {
+            'payload': {
+                'model': model,
+                'messages': [
+                    {'role': 'user', 'content': message}
+                ],
+                **params
+            },
+            'cache_key': cache_key,
+            'content': html_content
+        }
+
+    def _extraction_params(self) -> Dict[str, Any]:
+        return {
+            'max_tokens': self.settings.API_CONFIG['OPENAI_MAX_TOKENS'],
+            'temperature': self.settings.API_CONFIG['OPENAI_TEMPERATURE']
+        }
+
+    def _rendered_cache_key(self, collection_name: str, html_content: str, url: str) -> Optional[Dict[str, Any]]:
+        """Cache key for the rendered version of a fetched page, computed without rendering it"""
+        prompt_builder = self.extraction_prompts.get(collection_name)
+        if not prompt_builder:
+            logger.error(f"❌ No extraction prompt defined for collection: {collection_name}")
+            return None
+        fetched_label, fetched_content = self._extraction_content(html_content, url)
+        return get_llm_cache().make_key(self.settings.API_CONFIG['OPENAI_MODEL'], collection_name,
+                                        prompt_builder(url) + "\n\n" + fetched_label + "\n" + fetched_content,
+                                        {**self._extraction_params(), 'rendered': True})
+
+    def _extraction_content(self, html_content: str, url: str) -> Tuple[str, str]:
+        """(label, content) of a page as it goes into the extraction prompt"""
+        # Detect if content is from PDF or HTML
+        # PDF content will contain page markers like "=== Page X ==="
+        is_pdf = "=== Page" in html_content
+        document = None
+        if not is_pdf and self.settings.API_CONFIG['HTML_PREPROCESS']:
+            document = get_html_preprocessor().build(html_content, url)
+
+        if document:
+            return "Product Document (structured data, specifications and main text from the page):", document.text
+
+        content_label = "PDF Content:" if is_pdf else "HTML Content:"
+        page_content = html_content
+        # Truncate HTML content if too long
+        max_length = self.settings.API_CONFIG['HTML_MAX_LENGTH']
+        if len(page_content) > max_length:
+            # Remove script and style tags
+            page_content = analyze_page(page_content, url).html_without(['script', 'style'])[:max_length] + "...[truncated]"
+        return content_label, page_content
+
     def _build_product_context_for_images(self, extracted_data: Dict[str, Any]) -> str:
         """Build product context string for AI image analysis"""
         context_parts = []
@@ -1470,6 +1600,9 @@ Collection: {collection_name}"""
     def _take_screenshot_from_html(self, html_content: str, url: str) -> Optional[str]:
         """
         Take a screenshot of HTML content and return as base64
+
+        The page is loaded from its URL in a pooled headless browser, which
+        waits for the network to go idle and scrolls once for lazy images.
         
         Args:
             html_content: HTML content to render
@@ -1478,70 +1611,27 @@ Collection: {collection_name}"""
         Returns:
             Base64 encoded screenshot or None if failed
         """
-        try:
-            from selenium import webdriver
-            from selenium.webdriver.chrome.options import Options
-            from selenium.webdriver.chrome.service import Service
-            from webdriver_manager.chrome import ChromeDriverManager
-            import base64
-            import time
-            
-            # Configure Chrome options for headless operation
-            chrome_options = Options()
-            chrome_options.add_argument('--headless')
-            chrome_options.add_argument('--no-sandbox')
-            chrome_options.add_argument('--disable-dev-shm-usage')
-            chrome_options.add_argument('--disable-gpu')
-            chrome_options.add_argument('--window-size=1920,1080')
-            chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
-            chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-            chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-            chrome_options.add_experimental_option('useAutomationExtension', False)
-            
-            # Initialize webdriver
-            service = Service(ChromeDriverManager().install())
-            driver = webdriver.Chrome(service=service, options=chrome_options)
-            
-            try:
-                # Navigate to the URL directly (better than loading HTML content)
-                driver.get(url)
-                
-                # Wait for page to load and images to render (OPTIMIZED)
-                time.sleep(2)
-                
-                # Scroll to load lazy images
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight/2);")
-                time.sleep(0.5)
-                driver.execute_script("window.scrollTo(0, 0);")
-                time.sleep(0.5)
-                
-                # Take screenshot
-                screenshot_png = driver.get_screenshot_as_png()
-                
-                # Convert to base64
-                screenshot_base64 = base64.b64encode(screenshot_png).decode('utf-8')
-                
-                logger.info(f"Successfully captured screenshot for {url}")
-                return screenshot_base64
-                
-            finally:
-                driver.quit()
-                
-        except ImportError as e:
-            logger.error(f"Missing required packages for screenshot: {e}")
-            logger.error("Install with: pip install selenium webdriver-manager")
-            return None
-        except Exception as e:
-            logger.error(f"Failed to take screenshot for {url}: {e}")
+        # Navigate to the URL directly (better than loading HTML content)
+        page = get_browser_pool().render(url, screenshot=True)
+        if not page or not page.screenshot:
             return None
 
-    def _call_chatgpt_vision_api(self, prompt: str, image_base64: str) -> Optional[str]:
+        logger.info(f"Successfully captured screenshot for {url} in {page.seconds:.2f}s")
+        return page.screenshot
+
+    def render_page_html(self, url: str) -> Optional[str]:
+        """HTML of a page after its JavaScript has run (None if the browser pool can't render it)"""
+        page = get_browser_pool().render(url, screenshot=False, html=True, scroll=False)
+        return page.html if page else None
+
+    def _call_chatgpt_vision_api(self, prompt: str, image_base64: str, use_cache: bool = True) -> Optional[str]:
         """
         Call ChatGPT Vision API with text prompt and image
         
         Args:
             prompt: Text prompt for ChatGPT
             image_base64: Base64 encoded image
+            use_cache: Serve an identical earlier request from the LLM cache
             
         Returns:
             Response text or None if failed
@@ -1550,13 +1640,21 @@ Collection: {collection_name}"""
             if not self.api_key:
                 logger.error("No OpenAI API key configured")
                 return None
-            
-            # Apply rate limiting for image analysis requests
-            self._apply_chatgpt_rate_limit()
+
+            vision_model = getattr(self.settings, 'OPENAI_VISION_MODEL', 'gpt-4-vision-preview')
+            llm_cache = get_llm_cache()
+            cache_key = llm_cache.make_key(vision_model, None, prompt, {
+                'kind': 'vision',
+                'image_sha256': hashlib.sha256(image_base64.encode('ascii')).hexdigest(),
+                'max_tokens': getattr(self.settings, 'OPENAI_VISION_MAX_TOKENS', 1500)
+            })
+            cached = llm_cache.get(cache_key, bypass=not use_cache)
+            if cached is not None:
+                return cached
             
             # Prepare the request payload
             payload = {
-                'model': getattr(self.settings, 'OPENAI_VISION_MODEL', 'gpt-4-vision-preview'),
+                'model': vision_model,
                 'messages': [
                     {
                         'role': 'system',
@@ -1584,14 +1682,10 @@ Collection: {collection_name}"""
             }
             
             # Make the request
-            response = requests.post(
-                'https://api.openai.com/v1/chat/completions',
-                headers={
-                    'Content-Type': 'application/json',
-                    'Authorization': f'Bearer {self.api_key}',
-                },
-                json=payload,
-                timeout=getattr(self.settings, 'OPENAI_VISION_TIMEOUT', 60)
+            response = get_llm_client().post(
+                payload,
+                timeout=getattr(self.settings, 'OPENAI_VISION_TIMEOUT', 60),
+                kind='vision'
             )
             
             response.raise_for_status()
@@ -1600,19 +1694,16 @@ Collection: {collection_name}"""
             if 'choices' in result and result['choices']:
                 content = result['choices'][0]['message']['content'].strip()
                 logger.info(f"Successfully analyzed screenshot with ChatGPT Vision")
+                llm_cache.put(cache_key, content, result.get('usage'))
                 return content
             else:
                 logger.error("No valid response from ChatGPT Vision API")
                 return None
                 
         except requests.exceptions.RequestException as e:
-            if "rate_limit" in str(e).lower():
-                logger.warning("ChatGPT Vision rate limit hit, waiting...")
-                time.sleep(5)  # Wait 5 seconds (OPTIMIZED)
-                return self._call_chatgpt_vision_api(prompt, image_base64)  # Retry once
-            else:
-                logger.error(f"ChatGPT Vision API error: {e}")
-                return None
+            # Rate limits and transient errors were already retried by the shared client
+            logger.error(f"ChatGPT Vision API error: {e}")
+            return None
         except Exception as e:
             logger.error(f"Unexpected error calling ChatGPT Vision: {e}")
             return None
@@ -1632,7 +1723,7 @@ Collection: {collection_name}"""
             List of product image URLs ranked by AI confidence
         """
         try:
-            # Step 1: Extract all images with context using BeautifulSoup
+            # Step 1: Extract all images with context from the shared page analysis
             image_candidates = self._extract_images_with_context(html_content, url)
             
             if not image_candidates:
@@ -1660,13 +1751,11 @@ Collection: {collection_name}"""
 
     def _extract_images_with_context(self, html_content: str, base_url: str) -> List[Dict[str, Any]]:
         """Extract all images with rich context for AI analysis"""
-        soup = BeautifulSoup(html_content, 'html.parser')
+        page = analyze_page(html_content, base_url)
         image_candidates = []
         
         # Find all img tags
-        img_tags = soup.find_all('img')
-        
-        for i, img in enumerate(img_tags):
+        for i, img in enumerate(page.images):
             # Get image source (handle different loading patterns)
             src = (img.get('src') or 
                    img.get('data-src') or 
@@ -1694,13 +1783,13 @@ Collection: {collection_name}"""
                 'src': src,
                 'alt_text': img.get('alt', '').strip(),
                 'title': img.get('title', '').strip(),
-                'css_classes': ' '.join(img.get('class', [])),
+                'css_classes': ' '.join(img.get('class', '').split()),
                 'width': img.get('width'),
                 'height': img.get('height'),
                 'loading': img.get('loading', ''),
                 'position_index': i,
-                'parent_context': self._get_parent_context(img),
-                'surrounding_text': self._get_surrounding_text(img),
+                'parent_context': self._get_parent_context(page, img),
+                'surrounding_text': self._get_surrounding_text(page, img),
                 'url_indicators': self._analyze_url_patterns(src),
                 'file_size_indicators': self._get_size_indicators(src)
             }
@@ -1708,81 +1797,21 @@ Collection: {collection_name}"""
             image_candidates.append(context)
         
         # Also check for CSS background images in likely product containers
-        bg_images = self._extract_background_images(soup, base_url)
+        bg_images = self._extract_background_images(page, base_url)
         image_candidates.extend(bg_images)
         
         return image_candidates
 
-    def _get_parent_context(self, img_tag) -> Dict[str, str]:
+    def _get_parent_context(self, page, img_tag) -> Dict[str, str]:
         """Analyze parent elements for product image indicators"""
-        parent_info = {}
-        
-        # Check immediate parent
-        parent = img_tag.parent
-        if parent:
-            parent_info['parent_tag'] = parent.name
-            parent_info['parent_classes'] = ' '.join(parent.get('class', []))
-            parent_info['parent_id'] = parent.get('id', '')
-        
-        # Look for product-related containers up the tree
-        current = img_tag
-        for level in range(5):  # Check up to 5 levels up
-            current = current.parent
-            if not current:
-                break
-                
-            classes = ' '.join(current.get('class', []))
-            element_id = current.get('id', '')
-            
-            # Look for product-related keywords
-            product_keywords = ['product', 'gallery', 'image', 'photo', 'main', 'hero', 'detail']
-            if any(keyword in (classes + element_id).lower() for keyword in product_keywords):
-                parent_info[f'container_level_{level}'] = {
-                    'tag': current.name,
-                    'classes': classes,
-                    'id': element_id
-                }
-        
-        return parent_info
+        # Parent tag/classes/id plus product-related containers up to 5 levels up
+        return page.parent_context(img_tag, levels=5)
 
-    def _get_surrounding_text(self, img_tag, radius: int = 100) -> str:
+    def _get_surrounding_text(self, page, img_tag, radius: int = 100) -> str:
         """Extract text around the image for context"""
         try:
-            # Get text from siblings and nearby elements
-            surrounding_elements = []
-            
-            # Previous siblings
-            for sibling in img_tag.previous_siblings:
-                if hasattr(sibling, 'get_text'):
-                    text = sibling.get_text(strip=True)
-                    if text:
-                        surrounding_elements.append(text)
-                elif isinstance(sibling, str):
-                    text = sibling.strip()
-                    if text:
-                        surrounding_elements.append(text)
-            
-            # Next siblings  
-            for sibling in img_tag.next_siblings:
-                if hasattr(sibling, 'get_text'):
-                    text = sibling.get_text(strip=True)
-                    if text:
-                        surrounding_elements.append(text)
-                elif isinstance(sibling, str):
-                    text = sibling.strip()
-                    if text:
-                        surrounding_elements.append(text)
-            
-            # Parent text content
-            if img_tag.parent:
-                parent_text = img_tag.parent.get_text(strip=True)
-                if parent_text:
-                    surrounding_elements.append(parent_text[:200])  # Limit parent text
-            
-            # Join and limit total length
-            surrounding_text = ' '.join(surrounding_elements)
-            return surrounding_text[:radius] if len(surrounding_text) > radius else surrounding_text
-            
+            # Sliced from the page's precomputed text offsets
+            return page.surrounding_text(img_tag, radius)
         except Exception:
             return ""
 
@@ -1814,21 +1843,13 @@ Collection: {collection_name}"""
             'likely_large': any(int(size) > 600 for size in single_sizes) if single_sizes else False
         }
 
-    def _extract_background_images(self, soup, base_url: str) -> List[Dict[str, Any]]:
+    def _extract_background_images(self, page, base_url: str) -> List[Dict[str, Any]]:
         """Extract CSS background images that might be product images"""
         bg_images = []
         
         # Look for inline styles with background images
-        elements_with_bg = soup.find_all(attrs={'style': re.compile(r'background.*image')})
-        
-        for element in elements_with_bg:
-            style = element.get('style', '')
-            
-            # Extract URL from background-image CSS
-            url_match = re.search(r'background-image:\s*url\(["\']?([^"\']+)["\']?\)', style)
-            if url_match:
-                bg_url = url_match.group(1)
-                
+        for element, bg_url in page.background_images():
+            if bg_url:
                 # Convert to absolute URL
                 if bg_url.startswith('/'):
                     bg_url = urljoin(base_url, bg_url)
@@ -1839,13 +1860,13 @@ Collection: {collection_name}"""
                     'src': bg_url,
                     'alt_text': '',
                     'title': '',
-                    'css_classes': ' '.join(element.get('class', [])),
+                    'css_classes': ' '.join(element.get('class', '').split()),
                     'width': None,
                     'height': None,
                     'loading': '',
                     'position_index': -1,  # Mark as background image
                     'parent_context': {'is_background_image': True},
-                    'surrounding_text': element.get_text(strip=True)[:100],
+                    'surrounding_text': page.text_of(element)[:100],
                     'url_indicators': self._analyze_url_patterns(bg_url),
                     'file_size_indicators': self._get_size_indicators(bg_url)
                 }
@@ -1999,17 +2020,22 @@ RESPONSE FORMAT (valid JSON only):
         
         return prompt
 
-    def _make_ai_request_for_images(self, prompt: str) -> Optional[str]:
+    def _make_ai_request_for_images(self, prompt: str, use_cache: bool = True) -> Optional[str]:
         """Make AI request specifically for image analysis"""
         try:
-            response = requests.post(
-                'https://api.openai.com/v1/chat/completions',
-                headers={
-                    'Content-Type': 'application/json',
-                    'Authorization': f'Bearer {self.api_key}',
-                },
-                json={
-                    'model': getattr(self.settings, 'OPENAI_IMAGE_ANALYSIS_MODEL', 'gpt-4'),
+            image_model = getattr(self.settings, 'OPENAI_IMAGE_ANALYSIS_MODEL', 'gpt-4')
+            llm_cache = get_llm_cache()
+            cache_key = llm_cache.make_key(image_model, None, prompt, {
+                'kind': 'image_analysis',
+                'max_tokens': getattr(self.settings, 'OPENAI_IMAGE_MAX_TOKENS', 800)
+            })
+            cached = llm_cache.get(cache_key, bypass=not use_cache)
+            if cached is not None:
+                return cached
+
+            response = get_llm_client().post(
+                {
+                    'model': image_model,
                     'messages': [
                         {
                             'role': 'system',
@@ -2023,14 +2049,17 @@ RESPONSE FORMAT (valid JSON only):
                     'max_tokens': getattr(self.settings, 'OPENAI_IMAGE_MAX_TOKENS', 800),
                     'temperature': 0.3  # Lower temperature for more consistent analysis
                 },
-                timeout=self.settings.AI_REQUEST_TIMEOUT
+                timeout=self.settings.AI_REQUEST_TIMEOUT,
+                kind='image_analysis'
             )
             
             response.raise_for_status()
             result = response.json()
             
             if 'choices' in result and result['choices']:
-                return result['choices'][0]['message']['content'].strip()
+                content = result['choices'][0]['message']['content'].strip()
+                llm_cache.put(cache_key, content, result.get('usage'))
+                return content
                 
             return None
             
@@ -2224,66 +2253,83 @@ RESPONSE FORMAT (valid JSON only):
         
         return filtered_data
     
-    def generate_description(self, collection_name: str, product_data: Dict[str, Any], 
-                           url: Optional[str] = None, use_url_content: bool = False) -> Optional[str]:
-        """Generate product description using AI for a specific collection"""
-        if not self.api_key:
-            logger.error("❌ No OpenAI API key configured")
-            return None
-        
+    def build_description_request(self, collection_name: str, product_data: Dict[str, Any],
+                                  url: Optional[str] = None, use_url_content: bool = False) -> Optional[Dict[str, Any]]:
+        """Build the chat request generate_description() sends
+
+        Returns:
+            Dict with 'payload' and 'cache_key', or None if the collection has no description prompt
+        """
         # Get collection-specific description prompt
         prompt_builder = self.description_prompts.get(collection_name)
         if not prompt_builder:
             logger.error(f"❌ No description prompt defined for collection: {collection_name}")
             return None
+
+        # Build description prompt based on product data
+        prompt = prompt_builder(product_data)
+
+        # Optionally add URL content for richer context
+        additional_context = ""
+        if use_url_content and url:
+            logger.debug(f"🌐 Fetching URL content for richer description context: {url}")
+            html_content = self.fetch_html(url)
+            if html_content:
+                # Extract key product info from HTML (visible text, scripts and styles excluded)
+                text_content = analyze_page(html_content, url).text[:600]
+                additional_context = f"\n\nAdditional context from product page:\n{text_content}"
+
+        model = self.settings.API_CONFIG['OPENAI_DESCRIPTION_MODEL']
+        message = prompt + additional_context
+        params = {
+            'max_tokens': self.settings.API_CONFIG.get('OPENAI_DESCRIPTION_MAX_TOKENS', 800),  # Increased for JSON output
+            'temperature': self.settings.API_CONFIG['OPENAI_DESCRIPTION_TEMPERATURE']
+        }
+        return {
+            'payload': {
+                'model': model,
+                'messages': [
+                    {
+                        'role': 'user',
+                        'content': message
+                    }
+                ],
+                **params
+            },
+            'cache_key': get_llm_cache().make_key(model, collection_name, message, {'kind': 'description', **params})
+        }
+
+    def generate_description(self, collection_name: str, product_data: Dict[str, Any], 
+                           url: Optional[str] = None, use_url_content: bool = False,
+                           use_cache: bool = True) -> Optional[str]:
+        """Generate product description using AI for a specific collection"""
+        if not self.api_key:
+            logger.error("❌ No OpenAI API key configured")
+            return None
         
         try:
-            # Build description prompt based on product data
-            prompt = prompt_builder(product_data)
-            
-            # Optionally add URL content for richer context
-            additional_context = ""
-            if use_url_content and url:
-                logger.debug(f"🌐 Fetching URL content for richer description context: {url}")
-                html_content = self.fetch_html(url)
-                if html_content:
-                    # Extract key product info from HTML
-                    soup = BeautifulSoup(html_content, 'html.parser')
-                    # Remove scripts and styles
-                    for script in soup(["script", "style"]):
-                        script.decompose()
-                    
-                    # Get relevant text content (first 2000 chars)
-                    text_content = soup.get_text()[:600]
-                    additional_context = f"\n\nAdditional context from product page:\n{text_content}"
-            
-            # Make API call
-            response = requests.post(
-                'https://api.openai.com/v1/chat/completions',
-                headers={
-                    'Content-Type': 'application/json',
-                    'Authorization': f'Bearer {self.api_key}',
-                },
-                json={
-                    'model': self.settings.API_CONFIG['OPENAI_DESCRIPTION_MODEL'],
-                    'messages': [
-                        {
-                            'role': 'user',
-                            'content': prompt + additional_context
-                        }
-                    ],
-                    'max_tokens': self.settings.API_CONFIG.get('OPENAI_DESCRIPTION_MAX_TOKENS', 800),  # Increased for JSON output
-                    'temperature': self.settings.API_CONFIG['OPENAI_DESCRIPTION_TEMPERATURE']
-                },
-                timeout=self.settings.AI_REQUEST_TIMEOUT
-            )
+            request = self.build_description_request(collection_name, product_data, url, use_url_content)
+            if not request:
+                return None
 
-            response.raise_for_status()
-            result = response.json()
+            llm_cache = get_llm_cache()
+            raw_content = llm_cache.get(request['cache_key'], bypass=not use_cache)
+            if raw_content is None:
+                # Make API call
+                response = get_llm_client().post(
+                    request['payload'],
+                    timeout=self.settings.AI_REQUEST_TIMEOUT,
+                    kind='description'
+                )
 
-            if 'choices' in result and result['choices']:
-                raw_content = result['choices'][0]['message']['content'].strip()
+                response.raise_for_status()
+                result = response.json()
+
+                if 'choices' in result and result['choices']:
+                    raw_content = result['choices'][0]['message']['content'].strip()
+                    llm_cache.put(request['cache_key'], raw_content, result.get('usage'))
 
+            if raw_content:
                 # Try to parse as JSON for new structured format
                 try:
                     # Remove markdown code fences if present
@@ -2380,9 +2426,6 @@ RESPONSE FORMAT (valid JSON only):
         """Generate content using ChatGPT for features and care instructions"""
         
         try:
-            # Apply rate limiting
-            self._apply_chatgpt_rate_limit()
-            
             # Prepare context
             context = self._prepare_product_context(product_data, url, use_url_content)
             
@@ -2421,33 +2464,75 @@ RESPONSE FORMAT (valid JSON only):
             logger.error(f"Error generating with ChatGPT: {e}")
             return {}
     
-    def _make_chatgpt_request(self, prompt: str) -> Optional[str]:
+    def build_content_requests(self, collection_name: str, product_data: Dict[str, Any],
+                               url: Optional[str] = None, use_url_content: bool = False,
+                               fields_to_generate: List[str] = None) -> List[Dict[str, Any]]:
+        """Build the chat requests generate_product_content() sends for a product
+
+        Returns:
+            List of dicts with 'payload' and 'cache_key'
+        """
+        if not fields_to_generate:
+            fields_to_generate = ['description', 'features', 'care_instructions']
+
+        requests_to_send = []
+        chatgpt_fields = [field for field in fields_to_generate if field in ['features', 'care_instructions']]
+        if chatgpt_fields:
+            context = self._prepare_product_context(product_data, url, use_url_content)
+            prompt = self._build_chatgpt_prompt(collection_name, context, chatgpt_fields)
+            requests_to_send.append(self.build_chatgpt_request(prompt))
+
+        if 'description' in fields_to_generate:
+            request = self.build_description_request(collection_name, product_data, url, use_url_content)
+            if request:
+                requests_to_send.append(request)
+
+        return requests_to_send
+
+    def build_chatgpt_request(self, prompt: str) -> Dict[str, Any]:
+        """Build the chat request _make_chatgpt_request() sends
+
+        Returns:
+            Dict with 'payload' and 'cache_key'
+        """
+        chatgpt_model = getattr(self.settings, 'CHATGPT_MODEL', 'gpt-4o-mini')
+        params = {
+            'max_tokens': getattr(self.settings, 'CHATGPT_MAX_TOKENS', 1000),
+            'temperature': getattr(self.settings, 'CHATGPT_TEMPERATURE', 0.7)
+        }
+        return {
+            'payload': {
+                'model': chatgpt_model,
+                'messages': [
+                    {
+                        "role": "system", 
+                        "content": "You are an expert product content writer specializing in creating compelling product features and detailed care instructions for sinks, taps, and lighting fixtures. Always respond in the exact JSON format requested. For features, keep each feature to 5 words or less while maintaining clarity and impact."
+                    },
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ],
+                **params
+            },
+            'cache_key': get_llm_cache().make_key(chatgpt_model, None, prompt, {'kind': 'content_generation', **params})
+        }
+
+    def _make_chatgpt_request(self, prompt: str, use_cache: bool = True) -> Optional[str]:
         """Make a request to ChatGPT API using your existing request structure"""
         try:
-            chatgpt_model = getattr(self.settings, 'CHATGPT_MODEL', 'gpt-4o-mini')
-            
-            response = requests.post(
-                'https://api.openai.com/v1/chat/completions',
-                headers={
-                    'Content-Type': 'application/json',
-                    'Authorization': f'Bearer {self.api_key}',
-                },
-                json={
-                    'model': chatgpt_model,
-                    'messages': [
-                        {
-                            "role": "system", 
-                            "content": "You are an expert product content writer specializing in creating compelling product features and detailed care instructions for sinks, taps, and lighting fixtures. Always respond in the exact JSON format requested. For features, keep each feature to 5 words or less while maintaining clarity and impact."
-                        },
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    'max_tokens': getattr(self.settings, 'CHATGPT_MAX_TOKENS', 1000),
-                    'temperature': getattr(self.settings, 'CHATGPT_TEMPERATURE', 0.7)
-                },
-                timeout=self.settings.AI_REQUEST_TIMEOUT
+            request = self.build_chatgpt_request(prompt)
+            cache_key = request['cache_key']
+
+            llm_cache = get_llm_cache()
+            cached = llm_cache.get(cache_key, bypass=not use_cache)
+            if cached is not None:
+                return cached
+
+            response = get_llm_client().post(
+                request['payload'],
+                timeout=self.settings.AI_REQUEST_TIMEOUT,
+                kind='content_generation'
             )
             
             response.raise_for_status()
@@ -2456,19 +2541,16 @@ RESPONSE FORMAT (valid JSON only):
             if 'choices' in result and result['choices']:
                 content = result['choices'][0]['message']['content'].strip()
                 logger.debug(f"ChatGPT response: {content[:200]}...")
+                llm_cache.put(cache_key, content, result.get('usage'))
                 return content
             else:
                 logger.error("Empty response from ChatGPT")
                 return None
                 
         except requests.exceptions.RequestException as e:
-            if "rate_limit" in str(e).lower():
-                logger.warning("ChatGPT rate limit hit, waiting...")
-                time.sleep(5)  # Wait 5 seconds (OPTIMIZED)
-                return self._make_chatgpt_request(prompt)  # Retry once
-            else:
-                logger.error(f"ChatGPT API error: {e}")
-                return None
+            # Rate limits and transient errors were already retried by the shared client
+            logger.error(f"ChatGPT API error: {e}")
+            return None
             
         except Exception as e:
             logger.error(f"Unexpected error calling ChatGPT: {e}")
@@ -2621,17 +2703,8 @@ FOCUS: {collection_name.title()}
             if not html_content:
                 return None
             
-            soup = BeautifulSoup(html_content, 'html.parser')
-            # Remove scripts and styles
-            for script in soup(["script", "style"]):
-                script.decompose()
-            
-            # Get clean text content
-            text_content = soup.get_text()
-            # Clean up whitespace
-            text_content = re.sub(r'\s+', ' ', text_content).strip()
-            
-            return text_content
+            # Visible text with scripts and styles excluded and whitespace collapsed
+            return analyze_page(html_content, url).text
             
         except Exception as e:
             logger.error(f"Error fetching URL content for ChatGPT: {e}")
@@ -2711,17 +2784,6 @@ FOCUS: {collection_name.title()}
         
         return results
     
-    def _apply_chatgpt_rate_limit(self):
-        """Apply rate limiting between ChatGPT requests"""
-        current_time = time.time()
-        time_since_last = current_time - self.last_chatgpt_request
-        
-        if time_since_last < self.chatgpt_min_interval:
-            sleep_time = self.chatgpt_min_interval - time_since_last
-            time.sleep(sleep_time)
-        
-        self.last_chatgpt_request = time.time()
-    
     def _clean_description(self, description: str) -> str:
         """Clean and format the generated description"""
         # Remove quotes if the AI wrapped the description
@@ -4634,11 +4696,6 @@ Return **only** valid JSON. Do not include markdown code fences or any other tex
             prompt = self._build_title_generation_prompt(formatted_data, collection_name)
 
             # Make ChatGPT API request
-            headers = {
-                'Authorization': f'Bearer {self.api_key}',
-                'Content-Type': 'application/json'
-            }
-
             payload = {
                 'model': 'gpt-4',
                 'messages': [
@@ -4656,12 +4713,7 @@ Return **only** valid JSON. Do not include markdown code fences or any other tex
                 'top_p': 0.9
             }
 
-            response = requests.post(
-                'https://api.openai.com/v1/chat/completions',
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
+            response = get_llm_client().post(payload, timeout=30, kind='title_generation')
 
             if response.status_code == 200:
                 result = response.json()
@@ -5583,11 +5635,6 @@ IMPORTANT: Only provide actual titles if you have specific knowledge about these
                 }
 
             # Make ChatGPT API request with competitor insights
-            headers = {
-                'Authorization': f'Bearer {self.api_key}',
-                'Content-Type': 'application/json'
-            }
-
             payload = {
                 'model': 'gpt-4',
                 'messages': [
@@ -5605,12 +5652,7 @@ IMPORTANT: Only provide actual titles if you have specific knowledge about these
                 'top_p': 0.9
             }
 
-            response = requests.post(
-                'https://api.openai.com/v1/chat/completions',
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
+            response = get_llm_client().post(payload, timeout=30, kind='title_generation')
 
             if response.status_code == 200:
                 result = response.json()
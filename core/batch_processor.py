@@ -0,0 +1,852 @@
+"""
+OpenAI Batch Jobs
+Offline mode for bulk extraction and content generation. The chat requests
+the live path would send are built with the same prompt builders, written to
+JSONL files and run through the OpenAI Batch API, which costs half as much
+per token and puts no load on the live quota or the web workers. Finished
+responses go into the LLM response cache under the keys the live path looks
+up, then the rows are run through DataProcessor as usual, so cleaning, WELS
+enrichment and sheet writes are unchanged. Job state lives in SQLite, so a
+restarted process picks up where the last one stopped.
+"""
+import os
+import re
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from typing import Dict, Any, List, Optional, Iterator, Tuple
+
+import requests
+
+from config.settings import get_settings
+from config.collections import get_collection_config
+from core.sqlite_pool import get_pool
+from core.llm_cache import get_llm_cache
+from core.llm_client import llm_priority, PRIORITY_BULK
+from core.streaming import batched
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = '/v1/chat/completions'
+
+# Batch API limits on one input file
+MAX_REQUESTS_PER_FILE = 50000
+MAX_FILE_BYTES = 190 * 1024 * 1024
+
+# Batch statuses after which OpenAI won't change the batch again
+TERMINAL_BATCH_STATUSES = {'completed', 'failed', 'expired', 'cancelled'}
+
+# A job whose runner hasn't written to it for this long may be taken over by another process
+STALE_CLAIM_SECONDS = 600
+
+# How often a running job refreshes its claim (well inside STALE_CLAIM_SECONDS)
+HEARTBEAT_SECONDS = 60
+
+JOB_KINDS = ('extraction', 'generation')
+
+_JSON_OBJECT_RE = re.compile(r'\{.*\}', re.DOTALL)
+
+
+class BatchJobStatus(Enum):
+    """Batch job status enumeration"""
+    BUILDING = 'building'      # Fetching pages and writing request files
+    SUBMITTED = 'submitted'    # Batches running at OpenAI
+    APPLYING = 'applying'      # Responses cached, rows being processed and written
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+
+
+ACTIVE_STATUSES = (BatchJobStatus.BUILDING.value, BatchJobStatus.SUBMITTED.value, BatchJobStatus.APPLYING.value)
+
+
+class BatchClaimLost(Exception):
+    """Another process took the job over; this runner must stop touching it"""
+
+
+def _is_transient(error: Exception) -> bool:
+    """Network errors, timeouts, 429s and 5xx responses are worth retrying; anything else isn't"""
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                          requests.exceptions.ChunkedEncodingError)):
+        return True
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return False
+
+
+class OpenAIBatchAPI:
+    """Client for the Files and Batches endpoints (base_url can point at a local stub)"""
+
+    def __init__(self, api_key: str, base_url: str = 'https://api.openai.com/v1', timeout: float = 300):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self._session = requests.Session()
+        self._session.headers['Authorization'] = f'Bearer {api_key}'
+
+    def upload_file(self, path: str) -> str:
+        """Upload a JSONL request file; returns its file ID"""
+        with open(path, 'rb') as f:
+            response = self._session.post(
+                f'{self.base_url}/files',
+                data={'purpose': 'batch'},
+                files={'file': (os.path.basename(path), f, 'application/jsonl')},
+                timeout=self.timeout
+            )
+        response.raise_for_status()
+        return response.json()['id']
+
+    def create_batch(self, input_file_id: str, completion_window: str = '24h',
+                     metadata: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        response = self._session.post(f'{self.base_url}/batches', json={
+            'input_file_id': input_file_id,
+            'endpoint': BATCH_ENDPOINT,
+            'completion_window': completion_window,
+            'metadata': metadata or {}
+        }, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def get_batch(self, batch_id: str) -> Dict[str, Any]:
+        response = self._session.get(f'{self.base_url}/batches/{batch_id}', timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def cancel_batch(self, batch_id: str) -> Dict[str, Any]:
+        response = self._session.post(f'{self.base_url}/batches/{batch_id}/cancel', timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def iter_file_lines(self, file_id: str) -> Iterator[Dict[str, Any]]:
+        """Stream a result file, one decoded JSONL line at a time"""
+        with self._session.get(f'{self.base_url}/files/{file_id}/content', stream=True,
+                               timeout=self.timeout) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+
+
+def _response_text(line: Dict[str, Any]) -> Tuple[Optional[str], Optional[Dict[str, Any]], Optional[str]]:
+    """Pull (text, usage, error) out of one batch output/error line"""
+    if line.get('error'):
+        error = line['error']
+        return None, None, error.get('message') if isinstance(error, dict) else str(error)
+
+    response = line.get('response') or {}
+    body = response.get('body') or {}
+    if response.get('status_code') != 200:
+        message = (body.get('error') or {}).get('message') if isinstance(body, dict) else None
+        return None, None, message or f"HTTP {response.get('status_code')}"
+
+    choices = body.get('choices')
+    if not choices:
+        return None, None, 'Empty response'
+    return choices[0]['message']['content'].strip(), body.get('usage'), None
+
+
+class _BatchFileWriter:
+    """Writes request lines to numbered JSONL files, starting a new one at the Batch API limits"""
+
+    def __init__(self, batch_dir: str, job_id: str):
+        self.batch_dir = batch_dir
+        self.job_id = job_id
+        self.parts: List[Dict[str, Any]] = []
+        self._file = None
+        self._bytes = 0
+
+    def write(self, custom_id: str, payload: Dict[str, Any]) -> int:
+        """Write one request; returns the index of the file it went to"""
+        line = (json.dumps({
+            'custom_id': custom_id,
+            'method': 'POST',
+            'url': BATCH_ENDPOINT,
+            'body': payload
+        }) + '\n').encode('utf-8')
+
+        if self._file is None or self.parts[-1]['request_count'] >= MAX_REQUESTS_PER_FILE or \
+                self._bytes + len(line) > MAX_FILE_BYTES:
+            self._open_next()
+        self._file.write(line)
+        self._bytes += len(line)
+        self.parts[-1]['request_count'] += 1
+        return len(self.parts) - 1
+
+    def _open_next(self):
+        self.close()
+        path = os.path.join(self.batch_dir, f'{self.job_id}-{len(self.parts)}.jsonl')
+        self._file = open(path, 'wb')
+        self._bytes = 0
+        self.parts.append({'path': path, 'request_count': 0})
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class BatchJobManager:
+    """Builds, submits, polls and applies OpenAI batch jobs"""
+
+    def __init__(self, db_path: str, batch_dir: str, api: OpenAIBatchAPI, poll_interval: float = 60,
+                 completion_window: str = '24h', fetch_workers: int = 8):
+        """
+        Args:
+            db_path: SQLite file holding job and request state
+            batch_dir: Directory for the JSONL request files
+            api: Files/Batches API client
+            poll_interval: Seconds between batch status checks
+            completion_window: Batch API completion window
+            fetch_workers: Concurrent page fetches while building a job
+        """
+        self.db_path = db_path
+        self.batch_dir = batch_dir
+        self.api = api
+        self.poll_interval = poll_interval
+        self.completion_window = completion_window
+        self.fetch_workers = fetch_workers
+        self._pool = get_pool(db_path)
+        self._runner_id = f'{socket.gethostname()}:{os.getpid()}'
+        self._threads: Dict[str, threading.Thread] = {}
+        self._lock = threading.Lock()
+        os.makedirs(batch_dir, exist_ok=True)
+        self._init_database()
+
+    def _init_database(self):
+        conn = self._pool.connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS llm_batch_jobs (
+                job_id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                collection_name TEXT NOT NULL,
+                selected_rows TEXT,
+                options TEXT NOT NULL,
+                status TEXT NOT NULL,
+                batches TEXT,
+                request_count INTEGER DEFAULT 0,
+                cached_count INTEGER DEFAULT 0,
+                succeeded_count INTEGER DEFAULT 0,
+                failed_count INTEGER DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                claimed_by TEXT,
+                heartbeat_at REAL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                completed_at REAL
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS llm_batch_requests (
+                job_id TEXT NOT NULL,
+                custom_id TEXT NOT NULL,
+                row_num INTEGER NOT NULL,
+                part INTEGER,
+                cache_key TEXT NOT NULL,
+                require_json INTEGER DEFAULT 0,
+                status TEXT NOT NULL,
+                error TEXT,
+                PRIMARY KEY (job_id, custom_id)
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_llm_batch_jobs_status ON llm_batch_jobs(status)')
+        conn.commit()
+        conn.close()
+
+    # ------------------------------------------------------------------
+    # Job records
+    # ------------------------------------------------------------------
+
+    def create_job(self, kind: str, collection_name: str, selected_rows: Optional[List[int]] = None,
+                   options: Optional[Dict[str, Any]] = None) -> str:
+        """Record a new job (start it with start_job())
+
+        Args:
+            kind: 'extraction' or 'generation'
+            collection_name: Collection to process
+            selected_rows: Rows to process (None = whole collection)
+            options: extract_from_urls()/generate_product_content() options
+                     (overwrite_mode; use_url_content, fields_to_generate, max_feature_words)
+        """
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown batch job kind: {kind}")
+        # Batch results only reach the rows through the response cache
+        if not get_llm_cache().enabled:
+            raise ValueError("Batch jobs need the LLM response cache (LLM_CACHE_ENABLED is false)")
+        get_collection_config(collection_name)
+
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        conn = self._pool.connect()
+        conn.execute('''
+            INSERT INTO llm_batch_jobs (job_id, kind, collection_name, selected_rows, options, status, batches,
+                                        created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, '[]', ?, ?)
+        ''', (job_id, kind, collection_name, json.dumps(selected_rows) if selected_rows else None,
+              json.dumps(options or {}), BatchJobStatus.BUILDING.value, now, now))
+        conn.commit()
+        conn.close()
+
+        logger.info(f"📦 Created batch {kind} job {job_id} for {collection_name} "
+                    f"({len(selected_rows) if selected_rows else 'all'} rows)")
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        conn = self._pool.connect()
+        conn.row_factory = sqlite3.Row
+        row = conn.execute('SELECT * FROM llm_batch_jobs WHERE job_id = ?', (job_id,)).fetchone()
+        conn.close()
+        if not row:
+            return None
+
+        job = dict(row)
+        job['selected_rows'] = json.loads(job['selected_rows']) if job['selected_rows'] else None
+        job['options'] = json.loads(job['options'])
+        job['batches'] = json.loads(job['batches'] or '[]')
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def list_jobs(self, collection_name: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        conn = self._pool.connect()
+        if collection_name:
+            cursor = conn.execute('''
+                SELECT job_id FROM llm_batch_jobs WHERE collection_name = ? ORDER BY created_at DESC LIMIT ?
+            ''', (collection_name, limit))
+        else:
+            cursor = conn.execute('SELECT job_id FROM llm_batch_jobs ORDER BY created_at DESC LIMIT ?', (limit,))
+        job_ids = [row[0] for row in cursor.fetchall()]
+        conn.close()
+        return [job for job in (self.get_job(job_id) for job_id in job_ids) if job]
+
+    def _update(self, job_id: str, expected_status: Optional[str] = None, **fields) -> bool:
+        """Write job fields (lists/dicts as JSON); with expected_status, only if the job is still in it"""
+        now = time.time()
+        fields['updated_at'] = now
+        fields['heartbeat_at'] = now
+        assignments = ', '.join(f'{name} = ?' for name in fields)
+        values = [json.dumps(v) if isinstance(v, (list, dict)) else v for v in fields.values()]
+        sql = f'UPDATE llm_batch_jobs SET {assignments} WHERE job_id = ?'
+        values.append(job_id)
+        if expected_status:
+            sql += ' AND status = ?'
+            values.append(expected_status)
+
+        conn = self._pool.connect()
+        cursor = conn.execute(sql, values)
+        conn.commit()
+        conn.close()
+        return cursor.rowcount == 1
+
+    def _claim(self, job_id: str) -> bool:
+        """Take the job for this process unless a live runner elsewhere already has it"""
+        now = time.time()
+        conn = self._pool.connect()
+        cursor = conn.execute(f'''
+            UPDATE llm_batch_jobs SET claimed_by = ?, heartbeat_at = ?
+            WHERE job_id = ? AND status IN ({', '.join('?' * len(ACTIVE_STATUSES))})
+              AND (claimed_by IS NULL OR claimed_by = ? OR heartbeat_at < ?)
+        ''', (self._runner_id, now, job_id, *ACTIVE_STATUSES, self._runner_id, now - STALE_CLAIM_SECONDS))
+        conn.commit()
+        conn.close()
+        return cursor.rowcount == 1
+
+    def _touch(self, job_id: str) -> bool:
+        """Refresh this process's claim on the job; False if another runner has taken it"""
+        conn = self._pool.connect()
+        cursor = conn.execute('UPDATE llm_batch_jobs SET heartbeat_at = ? WHERE job_id = ? AND claimed_by = ?',
+                              (time.time(), job_id, self._runner_id))
+        conn.commit()
+        conn.close()
+        return cursor.rowcount == 1
+
+    def _check_claim(self, job_id: str):
+        """Raise BatchClaimLost unless this process still holds the job"""
+        if not self._touch(job_id):
+            raise BatchClaimLost(f"Batch job {job_id} was taken over by another runner")
+
+    def _heartbeat(self, job_id: str, stop: threading.Event):
+        """Keep the claim fresh while a long build or apply runs"""
+        while not stop.wait(HEARTBEAT_SECONDS):
+            if not self._touch(job_id):
+                logger.warning(f"⚠️ Lost the claim on batch job {job_id}")
+                return
+
+    def _release(self, job_id: str):
+        conn = self._pool.connect()
+        conn.execute('UPDATE llm_batch_jobs SET claimed_by = NULL WHERE job_id = ? AND claimed_by = ?',
+                     (job_id, self._runner_id))
+        conn.commit()
+        conn.close()
+
+    # ------------------------------------------------------------------
+    # Running jobs
+    # ------------------------------------------------------------------
+
+    def start_job(self, job_id: str) -> bool:
+        """Run (or resume) a job on a background thread; False if it is already running here"""
+        with self._lock:
+            thread = self._threads.get(job_id)
+            if thread and thread.is_alive():
+                return False
+            thread = threading.Thread(target=self._run, args=(job_id,), name=f'batch-job-{job_id[:8]}', daemon=True)
+            self._threads[job_id] = thread
+        thread.start()
+        return True
+
+    def resume_jobs(self) -> int:
+        """Resume every unfinished job (jobs a live runner elsewhere holds are left to it)"""
+        conn = self._pool.connect()
+        cursor = conn.execute(f'''
+            SELECT job_id FROM llm_batch_jobs WHERE status IN ({', '.join('?' * len(ACTIVE_STATUSES))})
+        ''', ACTIVE_STATUSES)
+        job_ids = [row[0] for row in cursor.fetchall()]
+        conn.close()
+
+        for job_id in job_ids:
+            self.start_job(job_id)
+        if job_ids:
+            logger.info(f"📦 Resuming {len(job_ids)} unfinished batch jobs")
+        return len(job_ids)
+
+    def resume_job(self, job_id: str) -> Tuple[bool, str]:
+        """Resume one job in this process, re-opening it if it failed after its batches were submitted
+
+        Returns:
+            (whether the job is now running here, message)
+        """
+        job = self.get_job(job_id)
+        if not job:
+            return False, 'Job not found'
+
+        if job['status'] == BatchJobStatus.FAILED.value:
+            if not any(batch.get('batch_id') for batch in job['batches']):
+                return False, 'Job failed before any batches were submitted; start a new job'
+            # Batches OpenAI still holds results for are collected; fully collected jobs are applied again
+            collected = all(batch.get('collected') for batch in job['batches'])
+            next_status = BatchJobStatus.APPLYING if collected else BatchJobStatus.SUBMITTED
+            if not self._update(job_id, expected_status=BatchJobStatus.FAILED.value, status=next_status.value,
+                                error=None, completed_at=None):
+                return False, 'Job changed while re-opening it'
+            logger.info(f"📦 Re-opened failed batch job {job_id} as {next_status.value}")
+        elif job['status'] not in ACTIVE_STATUSES:
+            return False, f"Job is {job['status']}"
+
+        if not self._claim(job_id):
+            return False, 'Job is being run by another process'
+        if not self.start_job(job_id):
+            return True, 'Job is already running in this process'
+        return True, 'Job resumed'
+
+    def cancel_job(self, job_id: str) -> bool:
+        job = self.get_job(job_id)
+        if not job or job['status'] not in ACTIVE_STATUSES:
+            return False
+
+        for batch in job['batches']:
+            if batch.get('batch_id') and batch.get('status') not in TERMINAL_BATCH_STATUSES:
+                try:
+                    self.api.cancel_batch(batch['batch_id'])
+                except requests.exceptions.RequestException as e:
+                    logger.warning(f"⚠️ Could not cancel batch {batch['batch_id']}: {e}")
+
+        cancelled = self._update(job_id, expected_status=job['status'], status=BatchJobStatus.CANCELLED.value,
+                                 completed_at=time.time())
+        if cancelled:
+            logger.info(f"🛑 Cancelled batch job {job_id}")
+        return cancelled
+
+    def _run(self, job_id: str):
+        if not self._claim(job_id):
+            logger.info(f"📦 Batch job {job_id} is finished or running elsewhere")
+            return
+
+        stop_heartbeat = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job_id, stop_heartbeat),
+                                     name=f'batch-heartbeat-{job_id[:8]}', daemon=True)
+        heartbeat.start()
+        try:
+            # Page fetches while building can make PDF vision calls; keep them out of the interactive lane
+            with llm_priority(PRIORITY_BULK):
+                job = self.get_job(job_id)
+                if job['status'] == BatchJobStatus.BUILDING.value:
+                    self._build(job)
+                    job = self.get_job(job_id)
+                if job['status'] == BatchJobStatus.SUBMITTED.value:
+                    self._wait_for_batches(job_id)
+                    job = self.get_job(job_id)
+                if job['status'] == BatchJobStatus.APPLYING.value:
+                    self._apply(job)
+        except BatchClaimLost as e:
+            logger.warning(f"⚠️ {e}; leaving it to that runner")
+        except Exception as e:
+            logger.error(f"❌ Batch job {job_id} failed: {e}", exc_info=True)
+            self._update(job_id, status=BatchJobStatus.FAILED.value, error=str(e), completed_at=time.time())
+        finally:
+            stop_heartbeat.set()
+            heartbeat.join()
+            self._release(job_id)
+            with self._lock:
+                self._threads.pop(job_id, None)
+
+    # ------------------------------------------------------------------
+    # Building and submitting
+    # ------------------------------------------------------------------
+
+    def _build(self, job: Dict[str, Any]):
+        """Write the job's requests to JSONL files and submit them"""
+        from core.data_processor import get_data_processor
+
+        job_id = job['job_id']
+        processor = get_data_processor()
+        builder = self._extraction_requests if job['kind'] == 'extraction' else self._generation_requests
+        llm_cache = get_llm_cache()
+
+        # A build interrupted by a restart starts over
+        conn = self._pool.connect()
+        conn.execute('DELETE FROM llm_batch_requests WHERE job_id = ?', (job_id,))
+        conn.commit()
+        conn.close()
+
+        writer = _BatchFileWriter(self.batch_dir, job_id)
+        records = []
+        seen = set()
+        cached = 0
+        try:
+            for row_num, request, require_json in builder(processor, job):
+                key = request['cache_key']
+                if key['cache_key'] in seen:
+                    continue
+                seen.add(key['cache_key'])
+                custom_id = f'{row_num}-{len(records)}'
+
+                # Answered before (live or by an earlier batch): nothing to send
+                response = request['response'] if 'response' in request else llm_cache.get(key)
+                if response is not None:
+                    cached += 1
+                    records.append((job_id, custom_id, row_num, None, json.dumps(key), int(require_json), 'cached'))
+                    continue
+
+                part = writer.write(custom_id, request['payload'])
+                records.append((job_id, custom_id, row_num, part, json.dumps(key), int(require_json), 'pending'))
+        finally:
+            writer.close()
+
+        # Fetching pages can take a long time; make sure no one else has started this job over meanwhile
+        # (its files are now that runner's, so they're left alone)
+        self._check_claim(job_id)
+
+        conn = self._pool.connect()
+        conn.executemany('''
+            INSERT INTO llm_batch_requests (job_id, custom_id, row_num, part, cache_key, require_json, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', records)
+        conn.commit()
+        conn.close()
+
+        if self.get_job(job_id)['status'] != BatchJobStatus.BUILDING.value:
+            self._remove_files(writer.parts)
+            return
+
+        logger.info(f"📦 Batch job {job_id}: {len(records) - cached} requests in {len(writer.parts)} files, "
+                    f"{cached} already cached")
+
+        batches = []
+        for part in writer.parts:
+            self._check_claim(job_id)
+            input_file_id = self.api.upload_file(part['path'])
+            batch = self.api.create_batch(input_file_id, self.completion_window, metadata={
+                'job_id': job_id,
+                'collection': job['collection_name'],
+                'kind': job['kind']
+            })
+            batches.append({
+                'batch_id': batch['id'],
+                'input_file_id': input_file_id,
+                'path': part['path'],
+                'request_count': part['request_count'],
+                'status': batch.get('status')
+            })
+            logger.info(f"📤 Submitted batch {batch['id']} ({part['request_count']} requests) for job {job_id}")
+            # Record each paid batch as soon as it exists, so a later failure leaves it resumable
+            self._update(job_id, expected_status=BatchJobStatus.BUILDING.value, batches=batches,
+                         request_count=len(records), cached_count=cached)
+
+        next_status = BatchJobStatus.SUBMITTED if batches else BatchJobStatus.APPLYING
+        self._update(job_id, expected_status=BatchJobStatus.BUILDING.value, status=next_status.value,
+                     batches=batches, request_count=len(records), cached_count=cached)
+
+    def _extraction_requests(self, processor, job: Dict[str, Any]) -> Iterator[Tuple[int, Dict[str, Any], bool]]:
+        """Requests _process_single_url() would send, as (row, request, response must be JSON)"""
+        from core.data_processor import DUAL_SOURCE_COLLECTIONS, get_spec_sheet_url
+
+        collection_name = job['collection_name']
+        overwrite_mode = job['options'].get('overwrite_mode', True)
+        sheets_manager = processor.sheets_manager
+        ai_extractor = processor.ai_extractor
+
+        urls_with_source = sheets_manager.get_urls_from_collection(collection_name, force_refresh=True) or []
+        if job['selected_rows']:
+            selected = set(job['selected_rows'])
+            urls_with_source = [entry for entry in urls_with_source if entry[0] in selected]
+        dual_source = collection_name.lower() in DUAL_SOURCE_COLLECTIONS
+
+        def fetch_sources(entry):
+            row_num, url, _ = entry
+            if not sheets_manager.row_needs_processing(collection_name, row_num, force_overwrite=overwrite_mode):
+                return row_num, url, []
+            contents = []
+            if dual_source:
+                spec_sheet_url = get_spec_sheet_url(sheets_manager.get_single_product(collection_name, row_num))
+                if spec_sheet_url:
+                    contents.append(ai_extractor.fetch_html(spec_sheet_url))
+            contents.append(ai_extractor.fetch_html(url))
+            # Resolved as extract_product_data() resolves them, so the requests match and
+            # variant pages whose answer is already cached are never rendered
+            resolved = [ai_extractor.resolve_extraction_request(collection_name, content, url)
+                        for content in contents if content]
+            return row_num, url, [request for request in resolved if request]
+
+        with ThreadPoolExecutor(max_workers=self.fetch_workers) as executor:
+            # Fetch a few rounds ahead at a time rather than holding every page in memory
+            for chunk in batched(urls_with_source, self.fetch_workers * 4):
+                for row_num, url, resolved in executor.map(fetch_sources, chunk):
+                    for request in resolved:
+                        yield row_num, request, True
+
+    def _generation_requests(self, processor, job: Dict[str, Any]) -> Iterator[Tuple[int, Dict[str, Any], bool]]:
+        """Requests _generate_product_content_single() would send, as (row, request, response must be JSON)"""
+        collection_name = job['collection_name']
+        options = job['options']
+        use_url_content = options.get('use_url_content', False)
+        sheets_manager = processor.sheets_manager
+        ai_extractor = processor.ai_extractor
+
+        config = get_collection_config(collection_name)
+        fields_to_generate = options.get('fields_to_generate') or ['description', 'care_instructions']
+        supported_fields, _, field_warnings = processor._map_content_fields(collection_name, config, fields_to_generate)
+        if not supported_fields:
+            raise ValueError(f"No supported content fields found for {collection_name}: {field_warnings}")
+
+        rows = job['selected_rows'] or list(sheets_manager.get_all_products(collection_name).keys())
+
+        def build_requests(row_num):
+            product_data = sheets_manager.get_single_product(collection_name, row_num)
+            if not product_data:
+                return row_num, []
+            url = product_data.get('url', '') if use_url_content else None
+            return row_num, ai_extractor.build_content_requests(collection_name, product_data, url,
+                                                                use_url_content, supported_fields)
+
+        with ThreadPoolExecutor(max_workers=self.fetch_workers) as executor:
+            for chunk in batched(rows, self.fetch_workers * 4):
+                for row_num, content_requests in executor.map(build_requests, chunk):
+                    for request in content_requests:
+                        yield row_num, request, False
+
+    # ------------------------------------------------------------------
+    # Polling and collecting results
+    # ------------------------------------------------------------------
+
+    def _wait_for_batches(self, job_id: str):
+        """Poll the job's batches until all have finished, caching each one's results as it does
+
+        Network errors, 429s and 5xx responses from the Files/Batches API are
+        retried at the next poll; the job stays SUBMITTED, since the batches
+        are paid for whether or not this process can reach them right now.
+        """
+        while True:
+            self._check_claim(job_id)
+            job = self.get_job(job_id)
+            if job['status'] != BatchJobStatus.SUBMITTED.value:
+                return
+
+            running = False
+            for index, batch in enumerate(job['batches']):
+                if batch.get('collected'):
+                    continue
+                try:
+                    info = self.api.get_batch(batch['batch_id'])
+                    batch['status'] = info.get('status')
+                    batch['request_counts'] = info.get('request_counts')
+                    if batch['status'] not in TERMINAL_BATCH_STATUSES:
+                        running = True
+                        continue
+
+                    batch['output_file_id'] = info.get('output_file_id')
+                    batch['error_file_id'] = info.get('error_file_id')
+                    self._collect(job_id, index, batch)
+                except requests.exceptions.RequestException as e:
+                    if not _is_transient(e):
+                        raise
+                    logger.warning(f"⚠️ Batch {batch['batch_id']} for job {job_id} unreachable, "
+                                   f"retrying in {self.poll_interval}s: {e}")
+                    running = True
+                    continue
+                batch['collected'] = True
+                logger.info(f"📥 Batch {batch['batch_id']} for job {job_id} {batch['status']}")
+
+            if not running:
+                self._fail_unsubmitted(job_id, len(job['batches']))
+                self._update(job_id, expected_status=BatchJobStatus.SUBMITTED.value,
+                             status=BatchJobStatus.APPLYING.value, batches=job['batches'])
+                self._remove_files(job['batches'])
+                return
+
+            self._update(job_id, batches=job['batches'])
+            time.sleep(self.poll_interval)
+
+    def _collect(self, job_id: str, part: int, batch: Dict[str, Any]):
+        """Cache the responses of one finished batch and record which requests failed"""
+        conn = self._pool.connect()
+        cursor = conn.execute('''
+            SELECT custom_id, cache_key, require_json FROM llm_batch_requests
+            WHERE job_id = ? AND part = ? AND status = 'pending'
+        ''', (job_id, part))
+        pending = {custom_id: (json.loads(cache_key), bool(require_json))
+                   for custom_id, cache_key, require_json in cursor.fetchall()}
+        conn.close()
+
+        llm_cache = get_llm_cache()
+        updates = []
+        succeeded = 0
+        for file_id in (batch.get('output_file_id'), batch.get('error_file_id')):
+            if not file_id:
+                continue
+            for line in self.api.iter_file_lines(file_id):
+                entry = pending.pop(line.get('custom_id'), None)
+                if entry is None:
+                    continue
+                key, require_json = entry
+                text, usage, error = _response_text(line)
+                # Like the live path, don't cache extraction output that won't parse
+                if text is not None and require_json and not _JSON_OBJECT_RE.search(text):
+                    text, error = None, 'Response is not JSON'
+                if text is None:
+                    updates.append(('failed', error, job_id, line['custom_id']))
+                    continue
+                # The row only picks the response up from the cache, so an unstored one is lost
+                if not llm_cache.put(key, text, usage):
+                    updates.append(('failed', 'Response could not be cached', job_id, line['custom_id']))
+                    continue
+                updates.append(('done', None, job_id, line['custom_id']))
+                succeeded += 1
+
+        # Requests an expired or cancelled batch never got to
+        for custom_id in pending:
+            updates.append(('failed', f"No result (batch {batch['status']})", job_id, custom_id))
+
+        conn = self._pool.connect()
+        conn.executemany('UPDATE llm_batch_requests SET status = ?, error = ? WHERE job_id = ? AND custom_id = ?',
+                         updates)
+        conn.execute('''
+            UPDATE llm_batch_jobs SET succeeded_count = succeeded_count + ?, failed_count = failed_count + ?
+            WHERE job_id = ?
+        ''', (succeeded, len(updates) - succeeded, job_id))
+        conn.commit()
+        conn.close()
+
+    def _fail_unsubmitted(self, job_id: str, submitted_parts: int):
+        """Mark requests from files that never became batches (submission failed part way) as failed"""
+        conn = self._pool.connect()
+        cursor = conn.execute('''
+            UPDATE llm_batch_requests SET status = 'failed', error = 'Not submitted'
+            WHERE job_id = ? AND status = 'pending' AND part >= ?
+        ''', (job_id, submitted_parts))
+        if cursor.rowcount:
+            conn.execute('UPDATE llm_batch_jobs SET failed_count = failed_count + ? WHERE job_id = ?',
+                         (cursor.rowcount, job_id))
+        conn.commit()
+        conn.close()
+
+    # ------------------------------------------------------------------
+    # Applying results
+    # ------------------------------------------------------------------
+
+    def _apply(self, job: Dict[str, Any]):
+        """Run the answered rows through DataProcessor, which now finds their responses in the cache"""
+        from core.data_processor import get_data_processor
+
+        job_id = job['job_id']
+        conn = self._pool.connect()
+        cursor = conn.execute('''
+            SELECT DISTINCT row_num FROM llm_batch_requests
+            WHERE job_id = ? AND status IN ('done', 'cached') ORDER BY row_num
+        ''', (job_id,))
+        rows = [row[0] for row in cursor.fetchall()]
+        cursor = conn.execute('''
+            SELECT DISTINCT row_num FROM llm_batch_requests WHERE job_id = ? AND status = 'failed' ORDER BY row_num
+        ''', (job_id,))
+        failed_rows = [row[0] for row in cursor.fetchall()]
+        conn.close()
+
+        result = {'success': True, 'rows_applied': rows, 'rows_with_failed_requests': failed_rows}
+        if rows:
+            self._check_claim(job_id)
+            processor = get_data_processor()
+            options = job['options']
+            logger.info(f"✍️ Applying batch job {job_id} results to {len(rows)} rows of {job['collection_name']}")
+            if job['kind'] == 'extraction':
+                outcome = processor.extract_from_urls(
+                    collection_name=job['collection_name'],
+                    selected_rows=rows,
+                    overwrite_mode=options.get('overwrite_mode', True)
+                )
+            else:
+                outcome = processor.generate_product_content(
+                    collection_name=job['collection_name'],
+                    selected_rows=rows,
+                    use_url_content=options.get('use_url_content', False),
+                    fields_to_generate=options.get('fields_to_generate'),
+                    max_feature_words=options.get('max_feature_words', 5)
+                )
+            result['success'] = outcome.get('success', False)
+            result['message'] = outcome.get('message')
+            result['summary'] = outcome.get('summary')
+            result['failed'] = [{'row_num': r.get('row_num'), 'error': r.get('error')}
+                                for r in outcome.get('results', []) if not r.get('success')]
+
+        status = BatchJobStatus.COMPLETED if result['success'] else BatchJobStatus.FAILED
+        self._update(job_id, expected_status=BatchJobStatus.APPLYING.value, status=status.value,
+                     result=result, error=None if result['success'] else result.get('message'),
+                     completed_at=time.time())
+        logger.info(f"✅ Batch job {job_id} {status.value}: {len(rows)} rows applied, "
+                    f"{len(failed_rows)} rows with failed requests")
+
+    @staticmethod
+    def _remove_files(parts: List[Dict[str, Any]]):
+        """Delete local request files once OpenAI has them (or they won't be sent)"""
+        for part in parts:
+            try:
+                if part.get('path') and os.path.exists(part['path']):
+                    os.remove(part['path'])
+            except OSError as e:
+                logger.warning(f"⚠️ Could not remove batch file {part['path']}: {e}")
+
+
+# Global instance
+_batch_job_manager = None
+_batch_job_manager_lock = threading.Lock()
+
+
+def get_batch_job_manager() -> BatchJobManager:
+    """Get the global batch job manager instance"""
+    global _batch_job_manager
+    if _batch_job_manager is None:
+        with _batch_job_manager_lock:
+            if _batch_job_manager is None:
+                settings = get_settings()
+                _batch_job_manager = BatchJobManager(
+                    settings.OPENAI_BATCH_DB,
+                    settings.OPENAI_BATCH_DIR,
+                    OpenAIBatchAPI(settings.OPENAI_API_KEY, settings.OPENAI_API_BASE),
+                    poll_interval=settings.OPENAI_BATCH_POLL_INTERVAL,
+                    completion_window=settings.OPENAI_BATCH_COMPLETION_WINDOW,
+                    fetch_workers=settings.BULK_EXTRACTION_WORKERS
+                )
+    return _batch_job_manager
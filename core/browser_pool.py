@@ -0,0 +1,437 @@
+"""
+Headless Browser Pool
+Keeps warm headless Chrome instances for page screenshots and JavaScript-
+rendered HTML. Each browser reuses its tab across pages, waits for the network
+to go quiet instead of sleeping, blocks fonts and ad/analytics requests, and is
+recycled after a set number of pages or shut down by a timer once it has sat
+idle too long
+"""
+import time
+import atexit
+import base64
+import logging
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional
+
+from config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Requests blocked in every browser (Chrome DevTools URL patterns)
+FONT_PATTERNS = ['*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot', '*fonts.googleapis.com*', '*fonts.gstatic.com*',
+                 '*use.typekit.net*']
+AD_PATTERNS = ['*doubleclick.net*', '*googlesyndication.com*', '*googleadservices.com*', '*google-analytics.com*',
+               '*googletagmanager.com*', '*connect.facebook.net*', '*hotjar.com*', '*clarity.ms*', '*tiktok.com*',
+               '*bat.bing.com*', '*snap.licdn.com*', '*adnxs.com*', '*criteo.com*', '*taboola.com*']
+
+# Seconds before Chrome is tried again after it failed to start
+LAUNCH_RETRY_SECONDS = 300
+
+# document.readyState, resources finished so far, and images still loading
+_PAGE_STATE_SCRIPT = """
+return [
+    document.readyState,
+    performance.getEntriesByType('resource').length,
+    Array.prototype.filter.call(document.images, function (img) { return !img.complete; }).length
+];
+"""
+
+
+@dataclass
+class RenderedPage:
+    """What a browser captured for one URL"""
+    url: str
+    html: Optional[str]
+    screenshot: Optional[str]  # Base64 PNG
+    seconds: float
+    network_idle: bool  # False when the readiness wait timed out
+
+
+class _Browser:
+    """One Chrome process and the tab it reuses"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+        self.started = time.monotonic()
+        self.last_used = self.started
+
+
+class BrowserPool:
+    """Thread-safe pool of headless Chrome instances; a browser serves one page at a time"""
+
+    def __init__(self, size: int = 2, max_pages: int = 50, page_timeout: float = 20,
+                 network_idle_ms: int = 500, idle_timeout: float = 300, block_resources: bool = True,
+                 user_agent: Optional[str] = None):
+        """
+        Args:
+            size: Most Chrome processes running at once
+            max_pages: Pages a browser serves before it is replaced (Chrome leaks memory)
+            page_timeout: Seconds allowed for loading a page and for it to go idle
+            network_idle_ms: Quiet period (no new requests finishing) that counts as loaded
+            idle_timeout: Seconds an unused browser is kept before it is shut down
+            block_resources: Block font and ad/analytics requests
+            user_agent: User agent the browsers send
+        """
+        self.size = size
+        self.max_pages = max_pages
+        self.page_timeout = page_timeout
+        self.network_idle_ms = network_idle_ms
+        self.idle_timeout = idle_timeout
+        self.blocked_urls = FONT_PATTERNS + AD_PATTERNS if block_resources else []
+        self.user_agent = user_agent
+
+        self._idle: List[_Browser] = []
+        self._running = 0
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._driver_lock = threading.Lock()
+        self._driver_path = None
+        self._driver_path_resolved = False
+        self._unavailable_reason: Optional[str] = None
+        self._unavailable_until = 0.0
+        self._reaper: Optional[threading.Timer] = None
+        self.stats = {
+            'launched': 0,
+            'launch_seconds': 0.0,
+            'launch_failures': 0,
+            'recycled': 0,
+            'pages': 0,
+            'page_seconds': 0.0,
+            'idle_timeouts': 0,
+            'errors': 0
+        }
+
+    # ------------------------------------------------------------------
+    # Browser lifecycle
+    # ------------------------------------------------------------------
+
+    def _resolve_driver_path(self) -> Optional[str]:
+        """chromedriver from webdriver-manager, resolved once per process (Selenium Manager otherwise)"""
+        with self._driver_lock:
+            if not self._driver_path_resolved:
+                try:
+                    from webdriver_manager.chrome import ChromeDriverManager
+                    self._driver_path = ChromeDriverManager().install()
+                except ImportError:
+                    self._driver_path = None
+                self._driver_path_resolved = True
+        return self._driver_path
+
+    def _launch(self) -> _Browser:
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.chrome.service import Service
+
+        options = Options()
+        options.add_argument('--headless=new')
+        options.add_argument('--no-sandbox')
+        options.add_argument('--disable-dev-shm-usage')
+        options.add_argument('--disable-gpu')
+        options.add_argument('--disable-extensions')
+        options.add_argument('--window-size=1920,1080')
+        if self.user_agent:
+            options.add_argument(f'--user-agent={self.user_agent}')
+        options.add_argument('--disable-blink-features=AutomationControlled')
+        options.add_experimental_option("excludeSwitches", ["enable-automation"])
+        options.add_experimental_option('useAutomationExtension', False)
+        # driver.get() returns at DOMContentLoaded; the network-idle wait does the rest
+        options.page_load_strategy = 'eager'
+
+        start = time.monotonic()
+        driver_path = self._resolve_driver_path()
+        service = Service(driver_path) if driver_path else Service()
+        driver = webdriver.Chrome(service=service, options=options)
+        try:
+            driver.set_page_load_timeout(self.page_timeout)
+            if self.blocked_urls:
+                driver.execute_cdp_cmd('Network.enable', {})
+                driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.blocked_urls})
+        except Exception:
+            driver.quit()
+            raise
+
+        elapsed = time.monotonic() - start
+        with self._lock:
+            self.stats['launched'] += 1
+            self.stats['launch_seconds'] += elapsed
+        logger.info(f"🖥️ Started headless Chrome in {elapsed:.1f}s")
+        return _Browser(driver)
+
+    def _launch_failed(self, error: Exception):
+        """Stop trying to start Chrome for a while (for good if selenium isn't installed). Call with the lock held."""
+        self.stats['launch_failures'] += 1
+        self._unavailable_reason = str(error).strip() or error.__class__.__name__
+        self._unavailable_until = float('inf') if isinstance(error, ImportError) \
+            else time.monotonic() + LAUNCH_RETRY_SECONDS
+
+    def _is_available(self) -> bool:
+        return self._unavailable_reason is None or time.monotonic() >= self._unavailable_until
+
+    @staticmethod
+    def _quit(browser: _Browser):
+        try:
+            browser.driver.quit()
+        except Exception as e:
+            logger.debug(f"Error closing browser: {e}")
+
+    def _reap_idle(self):
+        """Shut down browsers idle past idle_timeout. Call with the lock held."""
+        now = time.monotonic()
+        expired = [browser for browser in self._idle if now - browser.last_used > self.idle_timeout]
+        for browser in expired:
+            self._idle.remove(browser)
+            self._running -= 1
+            self.stats['idle_timeouts'] += 1
+            threading.Thread(target=self._quit, args=(browser,), daemon=True).start()
+
+    def _schedule_reap(self):
+        """Reap once the oldest idle browser expires, even if no page comes along. Call with the lock held."""
+        if self._reaper is not None or not self._idle:
+            return
+        oldest = min(browser.last_used for browser in self._idle)
+        delay = max(0.0, oldest + self.idle_timeout - time.monotonic()) + 1
+        self._reaper = threading.Timer(delay, self._reap_on_timer)
+        self._reaper.daemon = True
+        self._reaper.start()
+
+    def _reap_on_timer(self):
+        with self._lock:
+            self._reaper = None
+            self._reap_idle()
+            self._schedule_reap()
+
+    def _take_idle_browser(self) -> Optional[_Browser]:
+        """Most recently used idle browser, after shutting down expired ones. Call with the lock held."""
+        self._reap_idle()
+        return self._idle.pop() if self._idle else None
+
+    @contextmanager
+    def browser(self):
+        """Borrow a browser for the duration of the block
+
+        Raises:
+            TimeoutError: If no browser frees up within the page timeout
+            ImportError / WebDriverException: If Chrome can't be started
+        """
+        deadline = time.monotonic() + self.page_timeout * 3
+        browser = None
+        with self._lock:
+            while True:
+                browser = self._take_idle_browser()
+                if browser is not None or self._running < self.size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError('No headless browser became free')
+                self._available.wait(timeout=remaining)
+            if browser is None:
+                self._running += 1
+
+        if browser is None:
+            try:
+                browser = self._launch()
+            except Exception as e:
+                with self._lock:
+                    self._running -= 1
+                    self._launch_failed(e)
+                    self._available.notify()
+                raise
+            self._unavailable_reason = None
+
+        healthy = False
+        try:
+            yield browser
+            healthy = True
+        finally:
+            browser.pages += 1
+            browser.last_used = time.monotonic()
+            self._release(browser, healthy)
+
+    def _release(self, browser: _Browser, healthy: bool):
+        if healthy and browser.pages < self.max_pages:
+            try:
+                # Free the page's memory and stop its scripts before the tab is reused
+                browser.driver.get('about:blank')
+            except Exception:
+                healthy = False
+
+        if healthy and browser.pages < self.max_pages:
+            with self._lock:
+                self._idle.append(browser)
+                self._reap_idle()
+                self._schedule_reap()
+                self._available.notify()
+            return
+
+        self._quit(browser)
+        with self._lock:
+            self._running -= 1
+            self.stats['recycled'] += 1
+            self._available.notify()
+        logger.debug(f"♻️ Recycled headless Chrome after {browser.pages} pages")
+
+    def warm(self, count: int = 1):
+        """Start up to `count` browsers in the background so the first pages don't pay for the launch"""
+        def start():
+            for _ in range(min(count, self.size)):
+                with self._lock:
+                    if self._running >= self.size:
+                        return
+                    self._running += 1
+                try:
+                    browser = self._launch()
+                except Exception as e:
+                    with self._lock:
+                        self._running -= 1
+                        self._launch_failed(e)
+                    logger.warning(f"⚠️ Could not pre-start headless Chrome: {e}")
+                    return
+                with self._lock:
+                    self._idle.append(browser)
+                    self._schedule_reap()
+                    self._available.notify()
+
+        threading.Thread(target=start, name='browser-pool-warm', daemon=True).start()
+
+    def shutdown(self):
+        """Close every idle browser (borrowed ones close when they are returned)"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._running -= len(idle)
+            if self._reaper is not None:
+                self._reaper.cancel()
+                self._reaper = None
+        for browser in idle:
+            self._quit(browser)
+
+    # ------------------------------------------------------------------
+    # Pages
+    # ------------------------------------------------------------------
+
+    def _wait_for_network_idle(self, driver, timeout: float) -> bool:
+        """Wait until the document has loaded, no request has finished for network_idle_ms
+        and every image is complete
+
+        Returns:
+            True when the page went idle, False when the timeout ran out first
+        """
+        deadline = time.monotonic() + timeout
+        quiet_for = self.network_idle_ms / 1000.0
+        last_count = -1
+        last_change = time.monotonic()
+        while True:
+            now = time.monotonic()
+            try:
+                ready_state, resources, pending_images = driver.execute_script(_PAGE_STATE_SCRIPT)
+            except Exception:
+                ready_state, resources, pending_images = 'loading', last_count, 1
+
+            if resources != last_count:
+                last_count = resources
+                last_change = now
+            elif ready_state == 'complete' and not pending_images and now - last_change >= quiet_for:
+                return True
+
+            if now >= deadline:
+                return False
+            time.sleep(0.1)
+
+    def render(self, url: str, screenshot: bool = True, html: bool = False,
+               scroll: bool = True) -> Optional[RenderedPage]:
+        """Load a URL in a pooled browser and capture it
+
+        Args:
+            url: Page to load
+            screenshot: Capture a PNG of the viewport
+            html: Capture the DOM after scripts have run
+            scroll: Scroll half a page down and back first so lazy images load
+
+        Returns:
+            RenderedPage, or None if the browser couldn't be started or the page failed
+        """
+        if not self._is_available():
+            logger.debug(f"Headless browser unavailable ({self._unavailable_reason}), not rendering {url}")
+            return None
+
+        start = time.monotonic()
+        try:
+            with self.browser() as browser:
+                driver = browser.driver
+                try:
+                    driver.get(url)
+                except Exception as e:
+                    # A page still loading at the timeout is captured as it stands
+                    if e.__class__.__name__ != 'TimeoutException':
+                        raise
+                    driver.execute_script('window.stop();')
+
+                remaining = max(1.0, self.page_timeout - (time.monotonic() - start))
+                idle = self._wait_for_network_idle(driver, remaining)
+                if scroll:
+                    driver.execute_script("window.scrollTo(0, document.body.scrollHeight/2);")
+                    self._wait_for_network_idle(driver, min(2.0, remaining))
+                    driver.execute_script("window.scrollTo(0, 0);")
+
+                page_html = driver.page_source if html else None
+                page_screenshot = base64.b64encode(driver.get_screenshot_as_png()).decode('utf-8') \
+                    if screenshot else None
+
+        except ImportError as e:
+            logger.error(f"Missing required packages for headless browser: {e}")
+            logger.error("Install with: pip install selenium webdriver-manager")
+            return None
+        except Exception as e:
+            with self._lock:
+                self.stats['errors'] += 1
+            logger.error(f"Failed to render {url} in headless browser: {e}")
+            return None
+
+        elapsed = time.monotonic() - start
+        with self._lock:
+            self.stats['pages'] += 1
+            self.stats['page_seconds'] += elapsed
+        logger.info(f"🖥️ Rendered {url} in {elapsed:.2f}s{'' if idle else ' (network never went idle)'}")
+        return RenderedPage(url=url, html=page_html, screenshot=page_screenshot, seconds=elapsed, network_idle=idle)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._reap_idle()
+            stats = dict(self.stats)
+            stats['running'] = self._running
+            stats['idle'] = len(self._idle)
+        stats['size'] = self.size
+        stats['max_pages'] = self.max_pages
+        stats['available'] = self._is_available()
+        stats['unavailable_reason'] = self._unavailable_reason
+        stats['avg_page_ms'] = round(stats['page_seconds'] / stats['pages'] * 1000, 1) if stats['pages'] else 0.0
+        stats['avg_launch_ms'] = round(stats['launch_seconds'] / stats['launched'] * 1000, 1) \
+            if stats['launched'] else 0.0
+        return stats
+
+
+# Global instance
+_browser_pool = None
+_browser_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    """Get the global headless browser pool instance"""
+    global _browser_pool
+    if _browser_pool is None:
+        with _browser_pool_lock:
+            if _browser_pool is None:
+                settings = get_settings()
+                _browser_pool = BrowserPool(
+                    size=settings.BROWSER_POOL_SIZE,
+                    max_pages=settings.BROWSER_MAX_PAGES,
+                    page_timeout=settings.BROWSER_PAGE_TIMEOUT,
+                    network_idle_ms=settings.BROWSER_NETWORK_IDLE_MS,
+                    idle_timeout=settings.BROWSER_IDLE_TIMEOUT,
+                    block_resources=settings.BROWSER_BLOCK_RESOURCES,
+                    user_agent=settings.API_CONFIG['USER_AGENT']
+                )
+                atexit.register(_browser_pool.shutdown)
+    return _browser_pool
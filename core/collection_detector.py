@@ -4,16 +4,22 @@ Detects which collection a product belongs to based on keywords and patterns
 """
 
 import re
-from typing import Tuple, Optional, Dict
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Tuple, Optional, Dict, List
 import logging
-from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
-# Simple in-memory cache for detection results (title+url -> result)
-_detection_result_cache: Dict[str, Tuple[Optional[str], float]] = {}
-_MAX_DETECTION_CACHE_SIZE = 5000
+# Bounded LRU cache for detection results (title+url -> result)
+_detection_result_cache: 'OrderedDict[str, Tuple[Optional[str], float]]' = OrderedDict()
+_detection_cache_lock = threading.Lock()
+_MAX_DETECTION_CACHE_SIZE = 60000
 
+# Batches with at least this many uncached products are split across worker processes (when asked for)
+_PARALLEL_BATCH_THRESHOLD = 5000
 
 # Collection keywords with weighted patterns
 # Format: collection_name: [(pattern, weight, required_words)]
@@ -239,46 +245,114 @@ COLLECTION_PATTERNS = {
     ],
 }
 
-# Pre-compile all patterns for faster matching
-_COMPILED_PATTERNS = {}
-_COMPILED_EXCLUSIONS = []
-_BASIN_PATTERN = re.compile(r'\bbasin\b', re.IGNORECASE)
+# Patterns that mark a product as an accessory/part rather than a collection item
+EXCLUSION_PATTERNS = [
+    r'\baccessor(y|ies)\b',
+    r'\bspare\s*part\b',
+    r'\breplacement\s*part\b',
+    r'\bwaste\s*(kit|fitting)\b',
+    r'\bplug\s*(kit|fitting)\b',
+    r'\bconnector\s*kit\b',
+    r'\binstallation\s*kit\b',
+    r'\brepair\s*kit\b',
+    r'\bservice\s*kit\b',
+    r'\bdispenser\b',
+    r'\bsoap\s*(dish|holder)\b',
+    r'\bpaper\s*towel\b',
+    r'\bexhaust\s*fan\b',
+    r'\bventilation\b',
+    r'\b3\s*in\s*1\b(?!.*tap)',
+    r'\bheat.*light.*exhaust\b',
+]
+
+_BASIN_PATTERN = r'\bbasin\b'
+
+
+class _CombinedMatcher:
+    """
+    Every detection pattern merged into one regex that is scanned once per input
+
+    Each pattern becomes an optional lookahead with its own named group, so a
+    single finditer() pass reports every pattern that matches anywhere in the
+    text - the same answer as calling search() on each pattern separately,
+    including patterns whose matches overlap. Patterns are dispatched on their
+    first literal character, so each word boundary only tries the patterns that
+    can start there.
+    """
+
+    def __init__(self, patterns: List[str]):
+        self.pattern_count = len(patterns)
+
+        # All patterns start at a word boundary, which is hoisted out front
+        boundary = r'\b' if all(p.startswith(r'\b') for p in patterns) else ''
+        by_char: Dict[str, List[Tuple[int, str]]] = {}
+        undispatched: List[Tuple[int, str]] = []
+        for i, pattern in enumerate(patterns):
+            body = pattern[len(boundary):]
+            if len(body) > 1 and body[0].isalnum() and body[1] not in '?*+{':
+                by_char.setdefault(body[0].lower(), []).append((i, body[1:]))
+            else:
+                undispatched.append((i, body))
+
+        def lookaheads(entries):
+            return ''.join(f'(?=(?P<p{i}>{body}))?' for i, body in entries)
+
+        branches = '|'.join(f'{re.escape(char)}(?:{lookaheads(entries)})' for char, entries in by_char.items())
+        self.regex = re.compile(f'{boundary}{lookaheads(undispatched)}(?:{branches}|)', re.IGNORECASE)
+
+        def groups(entries):
+            return [(self.regex.groupindex[f'p{i}'], i) for i, _ in entries]
+
+        self._undispatched = groups(undispatched)
+        self._by_char = {char: groups(entries) + self._undispatched for char, entries in by_char.items()}
+        self._all = groups(undispatched) + [group for entries in by_char.values() for group in groups(entries)]
+
+    def matches(self, text: str) -> set:
+        """Indexes of every pattern that matches somewhere in text"""
+        found = set()
+        for match in self.regex.finditer(text):
+            if match.lastindex is None:
+                continue
+            # Characters that only case-fold onto a dispatch character fall back to checking everything
+            groups = self._by_char.get(text[match.start()], self._all) if match.end() > match.start() \
+                else self._undispatched
+            for group, i in groups:
+                if match.start(group) != -1:
+                    found.add(i)
+        return found
+
+
+_MATCHER: Optional[_CombinedMatcher] = None
+# collection -> [(pattern index, weight, required_words)]
+_PATTERN_INDEX: Dict[str, List[Tuple[int, float, list]]] = {}
+_EXCLUSION_INDEXES: range = range(0)
+_BASIN_INDEX = -1
 
 
 def _compile_patterns():
-    """Pre-compile all regex patterns for faster matching."""
-    global _COMPILED_PATTERNS, _COMPILED_EXCLUSIONS
+    """Compile all collection, exclusion and basin patterns into the combined matcher."""
+    global _MATCHER, _PATTERN_INDEX, _EXCLUSION_INDEXES, _BASIN_INDEX
 
-    if _COMPILED_PATTERNS:
+    if _MATCHER is not None:
         return  # Already compiled
 
-    # Compile collection patterns
-    for collection, patterns in COLLECTION_PATTERNS.items():
-        _COMPILED_PATTERNS[collection] = [
-            (re.compile(pattern, re.IGNORECASE), weight, required_words)
-            for pattern, weight, required_words in patterns
-        ]
-
-    # Compile exclusion patterns
-    exclusion_patterns = [
-        r'\baccessor(y|ies)\b',
-        r'\bspare\s*part\b',
-        r'\breplacement\s*part\b',
-        r'\bwaste\s*(kit|fitting)\b',
-        r'\bplug\s*(kit|fitting)\b',
-        r'\bconnector\s*kit\b',
-        r'\binstallation\s*kit\b',
-        r'\brepair\s*kit\b',
-        r'\bservice\s*kit\b',
-        r'\bdispenser\b',
-        r'\bsoap\s*(dish|holder)\b',
-        r'\bpaper\s*towel\b',
-        r'\bexhaust\s*fan\b',
-        r'\bventilation\b',
-        r'\b3\s*in\s*1\b(?!.*tap)',
-        r'\bheat.*light.*exhaust\b',
-    ]
-    _COMPILED_EXCLUSIONS = [re.compile(p, re.IGNORECASE) for p in exclusion_patterns]
+    patterns = []
+    pattern_index = {}
+    for collection, collection_patterns in COLLECTION_PATTERNS.items():
+        pattern_index[collection] = []
+        for pattern, weight, required_words in collection_patterns:
+            pattern_index[collection].append((len(patterns), weight, required_words))
+            patterns.append(pattern)
+
+    exclusion_start = len(patterns)
+    patterns.extend(EXCLUSION_PATTERNS)
+    _EXCLUSION_INDEXES = range(exclusion_start, len(patterns))
+
+    _BASIN_INDEX = len(patterns)
+    patterns.append(_BASIN_PATTERN)
+
+    _PATTERN_INDEX = pattern_index
+    _MATCHER = _CombinedMatcher(patterns)
 
 
 # Compile patterns on module load
@@ -297,34 +371,43 @@ def detect_collection(product_name: str, product_url: str = '') -> Tuple[Optiona
         Tuple of (collection_name, confidence_score)
         Returns (None, 0.0) if no confident match found
     """
-    global _detection_result_cache
-
     # Allow detection with URL only if product_name is empty
     if not product_name and not product_url:
         return None, 0.0
 
     # Check cache first
     cache_key = f"{product_name}|{product_url}"
-    if cache_key in _detection_result_cache:
-        return _detection_result_cache[cache_key]
+    with _detection_cache_lock:
+        result = _detection_result_cache.get(cache_key)
+        if result is not None:
+            _detection_result_cache.move_to_end(cache_key)
+            return result
+
+    result = _detect_uncached(product_name, product_url)
+    _cache_result(cache_key, result)
+    return result
+
+
+def _detect_uncached(product_name: str, product_url: str) -> Tuple[Optional[str], float]:
+    """Score one product against every collection with a single scan of its text."""
+    if not product_name and not product_url:
+        return None, 0.0
 
     # Combine name and URL for better matching
     search_text = f"{product_name} {product_url}".lower()
+    matched = _MATCHER.matches(search_text)
 
-    # Check exclusions using pre-compiled patterns
-    for exclusion_pattern in _COMPILED_EXCLUSIONS:
-        if exclusion_pattern.search(search_text):
-            result = (None, 0.0)
-            _cache_result(cache_key, result)
-            return result
+    # Check exclusions
+    if any(i in matched for i in _EXCLUSION_INDEXES):
+        return None, 0.0
 
     # Check if contains basin (for sinks exclusion)
-    has_basin = _BASIN_PATTERN.search(search_text) is not None
+    has_basin = _BASIN_INDEX in matched
 
-    # Calculate scores for each collection using pre-compiled patterns
+    # Calculate scores for each collection
     collection_scores = {}
 
-    for collection, compiled_patterns in _COMPILED_PATTERNS.items():
+    for collection, indexed_patterns in _PATTERN_INDEX.items():
         score = 0.0
         matches = 0
 
@@ -332,9 +415,9 @@ def detect_collection(product_name: str, product_url: str = '') -> Tuple[Optiona
         if collection == 'sinks' and has_basin:
             continue
 
-        for compiled_pattern, weight, required_words in compiled_patterns:
+        for i, weight, required_words in indexed_patterns:
             # Check if pattern matches
-            if compiled_pattern.search(search_text):
+            if i in matched:
                 # If required words specified, check they exist
                 if required_words:
                     if any(word in search_text for word in required_words):
@@ -353,9 +436,7 @@ def detect_collection(product_name: str, product_url: str = '') -> Tuple[Optiona
 
     # Get best match
     if not collection_scores:
-        result = (None, 0.0)
-        _cache_result(cache_key, result)
-        return result
+        return None, 0.0
 
     best_collection = max(collection_scores, key=collection_scores.get)
     best_score = collection_scores[best_collection]
@@ -364,46 +445,113 @@ def detect_collection(product_name: str, product_url: str = '') -> Tuple[Optiona
     threshold = 0.4
 
     if best_score >= threshold:
-        result = (best_collection, best_score)
-    else:
-        result = (None, best_score)
-
-    _cache_result(cache_key, result)
-    return result
+        return best_collection, best_score
+    return None, best_score
 
 
 def _cache_result(cache_key: str, result: Tuple[Optional[str], float]):
-    """Cache a detection result, maintaining max cache size."""
-    global _detection_result_cache
+    """Cache a detection result, evicting the least recently used entries past the max size."""
+    with _detection_cache_lock:
+        _detection_result_cache[cache_key] = result
+        _detection_result_cache.move_to_end(cache_key)
+        while len(_detection_result_cache) > _MAX_DETECTION_CACHE_SIZE:
+            _detection_result_cache.popitem(last=False)
+
+
+def _detect_shard(items: List[Tuple[str, str]]) -> List[Tuple[Optional[str], float]]:
+    """Worker-process entry point for detect_collections"""
+    return [_detect_uncached(name, url) for name, url in items]
+
+
+def _parallel_workers(max_workers: Optional[int]) -> int:
+    """Worker processes to use: only ever more than one when the caller asks for them
+
+    Inside the multithreaded web app detection stays in-process (about 0.1ms a
+    product); scripts re-scoring a whole catalogue can pass max_workers.
+    """
+    return max(1, max_workers or 1)
+
+
+def detect_collections(items: List[Tuple[str, str]],
+                       max_workers: Optional[int] = None) -> List[Tuple[Optional[str], float]]:
+    """
+    Detect collections for many (product_name, product_url) pairs
 
-    # Simple size limit - clear half the cache if too large
-    if len(_detection_result_cache) >= _MAX_DETECTION_CACHE_SIZE:
-        # Clear oldest half (simple approach)
-        keys_to_remove = list(_detection_result_cache.keys())[:_MAX_DETECTION_CACHE_SIZE // 2]
-        for key in keys_to_remove:
-            del _detection_result_cache[key]
+    Cached results are reused; when the uncached remainder is large and
+    max_workers > 1 it is sharded across a process pool, otherwise it is
+    detected in-process.
 
-    _detection_result_cache[cache_key] = result
+    Args:
+        items: List of (product_name, product_url) tuples
+        max_workers: Worker processes for large batches (default: in-process)
+
+    Returns:
+        List of (collection_name, confidence_score), in input order
+    """
+    results: List[Optional[Tuple[Optional[str], float]]] = [None] * len(items)
+    pending = {}
+    with _detection_cache_lock:
+        for position, (product_name, product_url) in enumerate(items):
+            if not product_name and not product_url:
+                results[position] = (None, 0.0)
+                continue
+            cache_key = f"{product_name}|{product_url}"
+            cached = _detection_result_cache.get(cache_key)
+            if cached is not None:
+                _detection_result_cache.move_to_end(cache_key)
+                results[position] = cached
+            else:
+                pending.setdefault(cache_key, []).append(position)
+
+    if not pending:
+        return results
+
+    keys = list(pending)
+    work = [items[pending[key][0]] for key in keys]
+    detected = None
+
+    workers = _parallel_workers(max_workers)
+    if len(work) >= _PARALLEL_BATCH_THRESHOLD and workers > 1:
+        try:
+            shard_size = -(-len(work) // (workers * 4))
+            shards = [work[i:i + shard_size] for i in range(0, len(work), shard_size)]
+            # Spawned, not forked: forking copies whatever locks other threads hold at that moment
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                detected = [result for shard in pool.map(_detect_shard, shards) for result in shard]
+            logger.info(f"🔍 Detected collections for {len(work)} products across {workers} processes")
+        except Exception as e:
+            logger.warning(f"⚠️ Parallel collection detection failed, running in-process: {e}")
+            detected = None
+
+    if detected is None:
+        detected = _detect_shard(work)
+
+    for key, result in zip(keys, detected):
+        _cache_result(key, result)
+        for position in pending[key]:
+            results[position] = result
+
+    return results
 
 
-def detect_collection_batch(products: list) -> list:
+def detect_collection_batch(products: list, max_workers: Optional[int] = None) -> list:
     """
     Detect collections for multiple products
 
     Args:
         products: List of dicts with 'product_name' and optionally 'product_url'
+        max_workers: Worker processes for large batches (default: in-process)
 
     Returns:
         List of dicts with added 'detected_collection' and 'confidence_score'
     """
-    results = []
-
-    for product in products:
-        product_name = product.get('product_name', '')
-        product_url = product.get('product_url', '')
-
-        collection, confidence = detect_collection(product_name, product_url)
+    detections = detect_collections(
+        [(product.get('product_name', ''), product.get('product_url', '')) for product in products],
+        max_workers=max_workers
+    )
 
+    results = []
+    for product, (collection, confidence) in zip(products, detections):
         result = product.copy()
         result['detected_collection'] = collection
         result['confidence_score'] = confidence
@@ -0,0 +1,112 @@
+"""
+Collection Statistics
+Running per-collection aggregates (product count, quality sum, complete
+count and per-field fill counts) that storage layers adjust by the
+difference each write makes, so stats reads never scan a collection
+"""
+from collections import Counter
+from typing import Dict, Any, Iterable, Optional
+
+# Products at or above this quality score count as complete
+COMPLETE_QUALITY_THRESHOLD = 80
+
+
+def product_quality(product: Dict[str, Any]) -> float:
+    """Stored quality score of a product as a number ('85%', 85 and '85' all give 85.0)"""
+    value = product.get('quality_score')
+    if value is None or value == '':
+        return 0.0
+    try:
+        return float(str(value).strip().replace('%', ''))
+    except ValueError:
+        return 0.0
+
+
+def is_filled(value: Any) -> bool:
+    """Whether a field value counts towards its fill rate"""
+    if value is None:
+        return False
+    if isinstance(value, str):
+        return bool(value.strip())
+    if isinstance(value, (list, tuple, dict)):
+        return bool(value)
+    return True
+
+
+class StatsDelta:
+    """Change to a collection's aggregates, built up from the products a write removes and adds"""
+
+    def __init__(self):
+        self.total = 0
+        self.quality_sum = 0.0
+        self.complete = 0
+        self.filled = Counter()
+
+    def add(self, product: Dict[str, Any], fields: Iterable[str], sign: int = 1, count_product: bool = True):
+        """
+        Account for a product (or, with count_product=False, some of its fields)
+
+        Args:
+            product: Product data, or just the fields a partial update touches
+            fields: Fields whose fill rate is tracked
+            sign: 1 to add the product's contribution, -1 to remove it
+            count_product: False for partial updates, which don't change the product count
+        """
+        if count_product:
+            self.total += sign
+        quality = product_quality(product)
+        self.quality_sum += sign * quality
+        if quality >= COMPLETE_QUALITY_THRESHOLD:
+            self.complete += sign
+        for field in fields:
+            if is_filled(product.get(field)):
+                self.filled[field] += sign
+
+    def remove(self, product: Dict[str, Any], fields: Iterable[str], count_product: bool = True):
+        """Take a product's previous contribution back out"""
+        self.add(product, fields, sign=-1, count_product=count_product)
+
+    def merge(self, other: 'StatsDelta'):
+        """Fold another delta into this one"""
+        self.total += other.total
+        self.quality_sum += other.quality_sum
+        self.complete += other.complete
+        self.filled.update(other.filled)
+
+    def changed_fields(self) -> Dict[str, int]:
+        """Fill count changes that are not zero"""
+        return {field: change for field, change in self.filled.items() if change}
+
+    def __bool__(self) -> bool:
+        return bool(self.total or self.quality_sum or self.complete or self.changed_fields())
+
+
+def summarize(total: int, quality_sum: float, complete: int,
+              field_counts: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """
+    Turn raw aggregates into the stats shape the dashboard and APIs use
+
+    Args:
+        total: Number of products
+        quality_sum: Sum of their quality scores
+        complete: Number of products at or above the complete threshold
+        field_counts: Field -> number of products with it filled
+
+    Returns:
+        Dict with counts, average quality and per-field fill rates
+    """
+    field_counts = field_counts or {}
+    average = quality_sum / total if total > 0 else 0
+    return {
+        'total_products': total,
+        'complete_products': complete,
+        'missing_info_products': total - complete,
+        'avg_quality_percent': round(average),
+        'data_quality_percent': int(average),
+        'quality_sum': quality_sum,
+        'field_fill_counts': dict(field_counts),
+        'field_fill_rates': {
+            field: round(count / total, 3) if total > 0 else 0.0
+            for field, count in sorted(field_counts.items())
+        }
+    }
@@ -15,10 +15,89 @@ Rules are loaded from Google Sheets rule sheets:
 
 import logging
 import math
-from typing import Dict, Any, Optional
+from collections import deque
+from typing import Dict, Any, List, Optional
 
 logger = logging.getLogger(__name__)
 
+# Rule index larger than any real one, used as "no match"
+_NO_MATCH = float('inf')
+
+
+class RuleMatcher:
+    """A rule sheet compiled into an Aho-Corasick automaton
+
+    Finds every search term that occurs in the inputs in one pass over the
+    text and reports the earliest rule in sheet order, which is the rule the
+    per-term `search_term in text` scan returned first.
+    """
+
+    def __init__(self, rules: Dict[str, str]):
+        self.rules = rules
+        self._values = list(rules.values())
+
+        # Upper-cased standard value -> value as written (first one wins, like the old scan)
+        self.standard_values: Dict[str, str] = {}
+        for value in self._values:
+            if value:
+                self.standard_values.setdefault(value.upper(), value)
+
+        self._build(list(rules.keys()))
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def _build(self, terms: List[str]):
+        goto = [{}]
+        best = [_NO_MATCH]  # Lowest rule index ending at (or via fail links from) each state
+
+        for index, term in enumerate(terms):
+            state = 0
+            for char in term:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto.append({})
+                    best.append(_NO_MATCH)
+                    goto[state][char] = next_state
+                state = next_state
+            best[state] = min(best[state], index)
+
+        fail = [0] * len(goto)
+        pending = deque(goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for char, next_state in goto[state].items():
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(char, 0)
+                best[next_state] = min(best[next_state], best[fail[next_state]])
+                pending.append(next_state)
+
+        self._goto = goto
+        self._fail = fail
+        self._best = best
+
+    def first_match(self, *texts: str) -> Optional[int]:
+        """Index of the earliest rule whose search term occurs in any of the texts"""
+        goto, fail, best = self._goto, self._fail, self._best
+        found = _NO_MATCH
+        for text in texts:
+            state = 0
+            for char in text:
+                while state and char not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(char, 0)
+                if best[state] < found:
+                    found = best[state]
+                    if found == 0:
+                        return 0
+        return None if found == _NO_MATCH else found
+
+    def standard_value_at(self, index: int) -> str:
+        return self._values[index]
+
 
 class DataCleaner:
     """Applies rule-based standardization to extracted product data"""
@@ -26,6 +105,7 @@ class DataCleaner:
     def __init__(self, sheets_manager):
         self.sheets_manager = sheets_manager
         self._rules_cache = {}
+        self._matchers: Dict[str, RuleMatcher] = {}
         self._cache_loaded = False
 
     def load_rules(self, spreadsheet_id: str, force_refresh: bool = False) -> bool:
@@ -60,6 +140,7 @@ class DataCleaner:
                 rules = self._load_single_rule_sheet(spreadsheet_id, sheet_name)
                 rule_key = sheet_name.replace('_Rules', '').lower()
                 self._rules_cache[rule_key] = rules
+                self._matchers[rule_key] = RuleMatcher(rules)
                 logger.info(f"  ✅ Loaded {len(rules)} rules from {sheet_name}")
 
             self._cache_loaded = True
@@ -134,7 +215,39 @@ class DataCleaner:
         vendor = vendor or cleaned.get('vendor', '') or cleaned.get('brand_name', '')
 
         logger.info(f"🧹 Cleaning extracted data for {collection_name}...")
+        cleaned = self._clean(cleaned, title, vendor)
+        logger.info(f"✅ Data cleaning complete for {collection_name}")
+        return cleaned
+
+    def clean_many(self, collection_name: str, products: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Apply all cleaning rules to a batch of products, e.g. re-cleaning a
+        whole collection after the rule sheets change.
+
+        Args:
+            collection_name: Name of the collection (e.g., 'sinks')
+            products: Product dicts; each one's title and vendor/brand_name drive matching
 
+        Returns:
+            Cleaned products, in the same order
+        """
+        logger.info(f"🧹 Cleaning {len(products)} products for {collection_name}...")
+
+        results = []
+        for product in products:
+            if not product:
+                results.append({})
+                continue
+            cleaned = product.copy()
+            title = cleaned.get('title', '')
+            vendor = cleaned.get('vendor', '') or cleaned.get('brand_name', '')
+            results.append(self._clean(cleaned, title, vendor))
+
+        logger.info(f"✅ Cleaned {len(results)} products for {collection_name}")
+        return results
+
+    def _clean(self, cleaned: Dict[str, Any], title: str, vendor: str) -> Dict[str, Any]:
+        """Run every cleaning step on a copy of the product data"""
         # 1. Apply field-specific rules
         cleaned = self._apply_installation_rules(cleaned, title)
         cleaned = self._apply_material_rules(cleaned, title)
@@ -156,10 +269,9 @@ class DataCleaner:
         # 5. Extract bowls number from title if not set
         cleaned = self._extract_bowls_number(cleaned, title)
 
-        logger.info(f"✅ Data cleaning complete for {collection_name}")
         return cleaned
 
-    def _find_standard_value(self, value: str, title: str, rules: Dict[str, str]) -> Optional[str]:
+    def _find_standard_value(self, value: str, title: str, rules: Optional[RuleMatcher]) -> Optional[str]:
         """
         Find the standard value for a given input using rules.
 
@@ -176,32 +288,21 @@ class DataCleaner:
         title_upper = title.strip().upper() if title else ''
 
         # First, check if current value is already a standard value
-        standard_values = [v for v in rules.values() if v]
-        for std_val in standard_values:
-            if std_val.upper() == value_upper:
-                return std_val  # Already standard, return as-is
-
-        # Search in rules
-        for search_term, standard_value in rules.items():
-            # Check if search term matches the value
-            if search_term in value_upper:
-                if standard_value:
-                    return standard_value
-                else:
-                    return 'DELETE_VALUE'
-
-            # Check if search term matches the title
-            if search_term in title_upper:
-                if standard_value:
-                    return standard_value
-                else:
-                    return 'DELETE_VALUE'
-
-        return None
+        std_val = rules.standard_values.get(value_upper)
+        if std_val:
+            return std_val  # Already standard, return as-is
+
+        # Earliest rule whose search term appears in the value or the title
+        index = rules.first_match(value_upper, title_upper)
+        if index is None:
+            return None
+
+        standard_value = rules.standard_value_at(index)
+        return standard_value if standard_value else 'DELETE_VALUE'
 
     def _apply_installation_rules(self, data: Dict[str, Any], title: str) -> Dict[str, Any]:
         """Apply installation type standardization rules"""
-        rules = self._rules_cache.get('installation', {})
+        rules = self._matchers.get('installation')
         current_value = data.get('installation_type', '')
 
         if current_value or title:
@@ -217,7 +318,7 @@ class DataCleaner:
 
     def _apply_material_rules(self, data: Dict[str, Any], title: str) -> Dict[str, Any]:
         """Apply material standardization rules"""
-        rules = self._rules_cache.get('material', {})
+        rules = self._matchers.get('material')
         current_value = data.get('product_material', '')
 
         if current_value or title:
@@ -232,7 +333,7 @@ class DataCleaner:
 
     def _apply_grade_rules(self, data: Dict[str, Any], title: str) -> Dict[str, Any]:
         """Apply material grade standardization rules"""
-        rules = self._rules_cache.get('grade', {})
+        rules = self._matchers.get('grade')
         current_value = data.get('grade_of_material', '')
 
         if current_value or title:
@@ -247,7 +348,7 @@ class DataCleaner:
 
     def _apply_style_rules(self, data: Dict[str, Any], title: str) -> Dict[str, Any]:
         """Apply style standardization rules"""
-        rules = self._rules_cache.get('style', {})
+        rules = self._matchers.get('style')
         current_value = data.get('style', '')
 
         if current_value or title:
@@ -262,7 +363,7 @@ class DataCleaner:
 
     def _apply_location_rules(self, data: Dict[str, Any], title: str) -> Dict[str, Any]:
         """Apply application location standardization rules"""
-        rules = self._rules_cache.get('location', {})
+        rules = self._matchers.get('location')
         current_value = data.get('application_location', '')
 
         if current_value or title:
@@ -277,7 +378,7 @@ class DataCleaner:
 
     def _apply_drain_rules(self, data: Dict[str, Any], title: str) -> Dict[str, Any]:
         """Apply drain position standardization rules"""
-        rules = self._rules_cache.get('drain', {})
+        rules = self._matchers.get('drain')
         current_value = data.get('drain_position', '')
 
         if current_value or title:
@@ -295,21 +396,21 @@ class DataCleaner:
         Apply warranty rules based on vendor/brand.
         Warranty rules are different - they map vendor names to warranty years.
         """
-        rules = self._rules_cache.get('warranty', {})
+        rules = self._matchers.get('warranty')
 
         if not vendor or not rules:
             return data
 
         vendor_upper = vendor.strip().upper()
 
-        for search_term, warranty_value in rules.items():
-            if search_term in vendor_upper:
-                if warranty_value:
-                    data['warranty_years'] = warranty_value
-                    logger.debug(f"🧹 Set warranty_years to {warranty_value} based on vendor {vendor}")
-                else:
-                    data['warranty_years'] = ''
-                break
+        index = rules.first_match(vendor_upper)
+        if index is not None:
+            warranty_value = rules.standard_value_at(index)
+            if warranty_value:
+                data['warranty_years'] = warranty_value
+                logger.debug(f"🧹 Set warranty_years to {warranty_value} based on vendor {vendor}")
+            else:
+                data['warranty_years'] = ''
 
         return data
 
@@ -16,9 +16,21 @@ from config.validation import validate_product_data
 from core.sheets_manager import get_sheets_manager
 from core.ai_extractor import get_ai_extractor
 from core.data_cleaner import get_data_cleaner
+from core.llm_client import llm_priority, current_priority, PRIORITY_BULK
 
 logger = logging.getLogger(__name__)
 
+# Collections extracted from both the PDF spec sheet (dimensions) and the product URL
+DUAL_SOURCE_COLLECTIONS = ['sinks', 'basins', 'filter_taps', 'taps']
+
+
+def get_spec_sheet_url(row_data: Optional[Dict[str, Any]]) -> str:
+    """Spec sheet URL of a sheet row, or '' when the cell is empty or a placeholder"""
+    spec_sheet_url = row_data.get('shopify_spec_sheet', '').strip() if row_data else ''
+    if spec_sheet_url.lower() in ['', 'none', 'null', 'n/a', '-']:
+        return ''
+    return spec_sheet_url
+
 @dataclass
 class ProcessingResult:
     """Result of a processing operation"""
@@ -406,7 +418,8 @@ class DataProcessor:
     # ==========================================
     
     def extract_from_urls(self, collection_name: str, selected_rows: Optional[List[int]] = None,
-                         overwrite_mode: bool = True, progress_callback: Optional[Callable] = None) -> Dict[str, Any]:
+                         overwrite_mode: bool = True, progress_callback: Optional[Callable] = None,
+                         use_cache: bool = True) -> Dict[str, Any]:
         """
         Extract data from URLs for a specific collection
 
@@ -415,6 +428,7 @@ class DataProcessor:
             selected_rows: List of specific rows to process (None = all rows)
             overwrite_mode: Whether to overwrite existing data
             progress_callback: Optional callback function for progress updates
+            use_cache: Serve extractions from the LLM response cache (False re-asks the model)
         """
         logger.info(f"Starting AI extraction for {collection_name} collection")
 
@@ -449,15 +463,18 @@ class DataProcessor:
         total_urls = len(urls_with_source)
         start_time = time.time()
 
-        # Determine optimal number of workers (max 5 to avoid rate limiting)
-        max_workers = min(5, len(urls_with_source))
+        # OpenAI pacing is left to the shared client, so the pool only bounds concurrency
+        max_workers = min(self.settings.BULK_EXTRACTION_WORKERS, len(urls_with_source))
+        # Multi-row runs are bulk work and queue behind interactive calls
+        lane = PRIORITY_BULK if total_urls > 1 else current_priority()
 
         logger.info(f"Processing {total_urls} URLs with {max_workers} parallel workers")
 
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             # Submit all tasks with source type info
             future_to_url = {
-                executor.submit(self._process_single_url, collection_name, row_num, url, overwrite_mode, source_type): (row_num, url)
+                executor.submit(self._process_single_url_in_lane, lane, collection_name, row_num, url, overwrite_mode, source_type,
+                                use_cache=use_cache): (row_num, url)
                 for row_num, url, source_type in urls_with_source
             }
 
@@ -507,8 +524,14 @@ class DataProcessor:
             }
         }
     
+    def _process_single_url_in_lane(self, lane: str, *args, **kwargs) -> ProcessingResult:
+        """_process_single_url() on a pool thread, with its OpenAI calls in the given priority lane"""
+        with llm_priority(lane):
+            return self._process_single_url(*args, **kwargs)
+
     def _process_single_url(self, collection_name: str, row_num: int, url: str, overwrite_mode: bool,
-                             source_type: str = 'web') -> ProcessingResult:
+                             source_type: str = 'web', prefetched_content: Optional[str] = None,
+                             use_cache: bool = True) -> ProcessingResult:
         """Process a single URL for AI extraction
 
         Args:
@@ -517,6 +540,8 @@ class DataProcessor:
             url: URL to extract from (web page or PDF)
             overwrite_mode: Whether to overwrite existing data
             source_type: 'web' for supplier URLs, 'pdf' for PDF spec sheets
+            prefetched_content: Content of `url` already fetched by the caller (skips the fetch)
+            use_cache: Serve extractions from the LLM response cache (False re-asks the model)
         """
         start_time = time.time()
 
@@ -535,24 +560,24 @@ class DataProcessor:
             # 1. Extract from PDF spec sheet first (for precise dimensions)
             # 2. Then extract from URL to fill in missing fields (brand, style, etc.)
             # 3. Merge results - PDF data takes priority for dimensions, URL fills gaps
-            dual_source_collections = ['sinks', 'basins', 'filter_taps', 'taps']
             extracted_data = {}
 
-            if collection_name.lower() in dual_source_collections:
+            if collection_name.lower() in DUAL_SOURCE_COLLECTIONS:
                 # Get row data to check for spec sheet URL
                 row_data = self.sheets_manager.get_single_product(collection_name, row_num)
-                spec_sheet_url = row_data.get('shopify_spec_sheet', '').strip() if row_data else ''
+                spec_sheet_url = get_spec_sheet_url(row_data)
 
                 # STEP 1: Try PDF extraction first (for dimensions)
                 pdf_extracted_data = None
-                if spec_sheet_url and spec_sheet_url.lower() not in ['', 'none', 'null', 'n/a', '-']:
+                if spec_sheet_url:
                     logger.info(f"📄 DUAL-SOURCE: Found spec sheet for row {row_num}: {spec_sheet_url[:80]}...")
 
                     try:
                         pdf_content = self.ai_extractor.fetch_html(spec_sheet_url)
                         if pdf_content:
                             logger.info(f"✅ DUAL-SOURCE: Successfully fetched PDF spec sheet for row {row_num}")
-                            pdf_extracted_data = self.ai_extractor.extract_product_data(collection_name, pdf_content, url)
+                            pdf_extracted_data = self.ai_extractor.extract_product_data(collection_name, pdf_content, url,
+                                                                                                 use_cache=use_cache)
                             if pdf_extracted_data:
                                 logger.info(f"✅ DUAL-SOURCE: PDF extraction got {len(pdf_extracted_data)} fields: {list(pdf_extracted_data.keys())}")
                             else:
@@ -567,10 +592,11 @@ class DataProcessor:
                 # STEP 2: Extract from product URL (for brand, style, other details)
                 url_extracted_data = None
                 try:
-                    url_content = self.ai_extractor.fetch_html(url)
+                    url_content = prefetched_content or self.ai_extractor.fetch_html(url)
                     if url_content:
                         logger.info(f"🌐 DUAL-SOURCE: Extracting from product URL for row {row_num}")
-                        url_extracted_data = self.ai_extractor.extract_product_data(collection_name, url_content, url)
+                        url_extracted_data = self.ai_extractor.extract_product_data(collection_name, url_content, url,
+                                                                                                 use_cache=use_cache)
                         if url_extracted_data:
                             logger.info(f"✅ DUAL-SOURCE: URL extraction got {len(url_extracted_data)} fields: {list(url_extracted_data.keys())}")
                         else:
@@ -620,7 +646,7 @@ class DataProcessor:
 
             else:
                 # Standard URL-only extraction for other collections
-                url_content = self.ai_extractor.fetch_html(url)
+                url_content = prefetched_content or self.ai_extractor.fetch_html(url)
                 if not url_content:
                     return ProcessingResult(
                         row_num=row_num,
@@ -631,7 +657,8 @@ class DataProcessor:
                     )
 
                 logger.info(f"🤖 AI extraction from URL for row {row_num}")
-                extracted_data = self.ai_extractor.extract_product_data(collection_name, url_content, url)
+                extracted_data = self.ai_extractor.extract_product_data(collection_name, url_content, url,
+                                                                        use_cache=use_cache)
 
                 if not extracted_data:
                     return ProcessingResult(
@@ -974,61 +1001,7 @@ class DataProcessor:
         
         logger.info(f"REQUESTED FIELDS: {fields_to_generate}")
         
-        # ENHANCED: More robust field validation and mapping
-        supported_fields = []
-        field_mapping = {}
-        field_warnings = []
-        
-        for field in fields_to_generate:
-            field_mapped = False
-            
-            # Handle description fields (multiple aliases)
-            if field in ['body_html', 'description', 'desc']:
-                description_field = self._find_collection_field(config, ['ai_description_field', 'description_field'])
-                if description_field:
-                    supported_fields.append('description')  # Normalize to 'description' for AI extractor
-                    field_mapping['description'] = description_field
-                    logger.info(f"✅ DESCRIPTION: {field} -> {description_field}")
-                    field_mapped = True
-                else:
-                    field_warnings.append(f"Description field not configured for collection {collection_name}")
-            
-            # Handle care instructions (multiple aliases)
-            elif field in ['care_instructions', 'care', 'washing_instructions']:
-                care_field = self._find_collection_field(config, ['ai_care_field', 'care_field', 'care_instructions_field'])
-                if care_field:
-                    supported_fields.append('care_instructions')
-                    field_mapping['care_instructions'] = care_field
-                    logger.info(f"✅ CARE INSTRUCTIONS: {field} -> {care_field}")
-                    field_mapped = True
-                else:
-                    # FALLBACK: Try to find any field with "care" in the name
-                    care_fallback = self._find_care_field_fallback(config)
-                    if care_fallback:
-                        supported_fields.append('care_instructions')
-                        field_mapping['care_instructions'] = care_fallback
-                        logger.info(f"✅ CARE INSTRUCTIONS (FALLBACK): {field} -> {care_fallback}")
-                        field_mapped = True
-                    else:
-                        field_warnings.append(f"Care instructions field not configured for collection {collection_name}")
-            
-            # Handle features
-            elif field in ['features', 'product_features']:
-                features_field = self._find_collection_field(config, ['ai_features_field', 'features_field'])
-                if features_field:
-                    supported_fields.append('features')
-                    field_mapping['features'] = features_field
-                    logger.info(f"✅ FEATURES: {field} -> {features_field}")
-                    field_mapped = True
-                else:
-                    field_warnings.append(f"Features field not configured for collection {collection_name}")
-            
-            # Unknown field
-            else:
-                field_warnings.append(f"Unknown field '{field}' requested for {collection_name}")
-            
-            if not field_mapped:
-                logger.warning(f"❌ FIELD MAPPING FAILED: {field}")
+        supported_fields, field_mapping, field_warnings = self._map_content_fields(collection_name, config, fields_to_generate)
         
         # Log all warnings
         for warning in field_warnings:
@@ -1063,18 +1036,17 @@ class DataProcessor:
         total_products = len(products_to_process)
         start_time = time.time()
         
+        # Pacing is left to the shared OpenAI client; multi-row runs go in the bulk lane
+        lane = PRIORITY_BULK if total_products > 1 else current_priority()
         for i, row_num in enumerate(products_to_process):
             if progress_callback:
                 progress_callback(i + 1, total_products, f"Generating content for row {row_num}")
             
-            result = self._generate_product_content_single(
-                collection_name, row_num, use_url_content, supported_fields, field_mapping, max_feature_words
-            )
+            with llm_priority(lane):
+                result = self._generate_product_content_single(
+                    collection_name, row_num, use_url_content, supported_fields, field_mapping, max_feature_words
+                )
             results.append(result)
-            
-            # Add delay between requests to avoid rate limiting
-            if i < total_products - 1:  # Don't delay after the last request
-                time.sleep(self.settings.AI_DELAY_BETWEEN_REQUESTS)
         
         # Calculate summary
         processing_time = time.time() - start_time
@@ -1135,6 +1107,69 @@ class DataProcessor:
         
         return None
     
+    def _map_content_fields(self, collection_name: str, config, fields_to_generate: List[str]) -> Tuple[List[str], Dict[str, str], List[str]]:
+        """Resolve requested content fields (and their aliases) to AI extractor fields and sheet columns
+
+        Returns:
+            (fields for the AI extractor, {field: sheet column}, warnings for fields that can't be generated)
+        """
+        supported_fields = []
+        field_mapping = {}
+        field_warnings = []
+        
+        for field in fields_to_generate:
+            field_mapped = False
+            
+            # Handle description fields (multiple aliases)
+            if field in ['body_html', 'description', 'desc']:
+                description_field = self._find_collection_field(config, ['ai_description_field', 'description_field'])
+                if description_field:
+                    supported_fields.append('description')  # Normalize to 'description' for AI extractor
+                    field_mapping['description'] = description_field
+                    logger.info(f"✅ DESCRIPTION: {field} -> {description_field}")
+                    field_mapped = True
+                else:
+                    field_warnings.append(f"Description field not configured for collection {collection_name}")
+            
+            # Handle care instructions (multiple aliases)
+            elif field in ['care_instructions', 'care', 'washing_instructions']:
+                care_field = self._find_collection_field(config, ['ai_care_field', 'care_field', 'care_instructions_field'])
+                if care_field:
+                    supported_fields.append('care_instructions')
+                    field_mapping['care_instructions'] = care_field
+                    logger.info(f"✅ CARE INSTRUCTIONS: {field} -> {care_field}")
+                    field_mapped = True
+                else:
+                    # FALLBACK: Try to find any field with "care" in the name
+                    care_fallback = self._find_care_field_fallback(config)
+                    if care_fallback:
+                        supported_fields.append('care_instructions')
+                        field_mapping['care_instructions'] = care_fallback
+                        logger.info(f"✅ CARE INSTRUCTIONS (FALLBACK): {field} -> {care_fallback}")
+                        field_mapped = True
+                    else:
+                        field_warnings.append(f"Care instructions field not configured for collection {collection_name}")
+            
+            # Handle features
+            elif field in ['features', 'product_features']:
+                features_field = self._find_collection_field(config, ['ai_features_field', 'features_field'])
+                if features_field:
+                    supported_fields.append('features')
+                    field_mapping['features'] = features_field
+                    logger.info(f"✅ FEATURES: {field} -> {features_field}")
+                    field_mapped = True
+                else:
+                    field_warnings.append(f"Features field not configured for collection {collection_name}")
+            
+            # Unknown field
+            else:
+                field_warnings.append(f"Unknown field '{field}' requested for {collection_name}")
+            
+            if not field_mapped:
+                logger.warning(f"❌ FIELD MAPPING FAILED: {field}")
+
+        return supported_fields, field_mapping, field_warnings
+
     def _generate_product_content_single(self, collection_name: str, row_num: int, use_url_content: bool,
                                        fields_to_generate: List[str], field_mapping: Dict[str, str], 
                                        max_feature_words: int = 5) -> ProcessingResult:
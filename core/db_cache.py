@@ -1,16 +1,222 @@
 """
 SQLite Database Cache for Product Data
 Provides fast local caching of Google Sheets data
+
+Products are stored in one table per collection with one column per field,
+generated from the collection's column_mapping. Each row carries a content
+hash so a re-sync only rewrites the rows that actually changed. Every write
+also adjusts the collection's running statistics in the same transaction.
 """
 import sqlite3
 import json
+import re
+import hashlib
 import logging
 from datetime import datetime
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple, Iterator
 from pathlib import Path
 
+from core.sqlite_pool import get_pool, PooledConnection, PooledCursor
+from core.collection_stats import StatsDelta, summarize
+
 logger = logging.getLogger(__name__)
 
+# Internal columns are prefixed so they never clash with column_mapping fields
+ROW_COLUMN = '_row_number'
+HASH_COLUMN = '_content_hash'
+EXTRA_COLUMN = '_extra'
+SOURCE_HASH_COLUMN = '_source_hash'  # Hash of the raw sheet row, used by delta sync
+SYNCED_COLUMN = '_last_synced'
+
+# Derived fields that are not in every column_mapping but are always stored
+# as real columns (quality_score is computed when products are fetched)
+DERIVED_FIELDS = ['quality_score']
+
+# Fields matched by the paginated product search, in the order they are joined
+SEARCH_FIELDS = ['title', 'variant_sku', 'sku', 'brand_name', 'vendor', 'features']
+
+# Fields indexed by the FTS5 product search, with their BM25 weights.
+# sku_compact is the SKU with separators removed so 'ABC123' finds 'ABC-123'.
+SEARCH_INDEX_WEIGHTS = {
+    'title': 5.0,
+    'variant_sku': 10.0,
+    'brand_name': 3.0,
+    'vendor': 2.0,
+    'features': 1.0,
+    'sku_compact': 10.0,
+}
+SEARCH_TABLE = 'product_search'
+
+# Quality ordering and keyset cursors sort unscored products (NULL) after every real score
+QUALITY_SORT_EXPRESSION = 'COALESCE(quality_score, -1)'
+UNSCORED_QUALITY = -1.0
+
+# quality_filter name -> SQL condition on the quality_score column
+QUALITY_FILTERS = {
+    'excellent': 'COALESCE(quality_score, 0) >= 90',
+    'good': 'COALESCE(quality_score, 0) >= 70 AND COALESCE(quality_score, 0) < 90',
+    'needs-work': 'COALESCE(quality_score, 0) < 70',
+}
+
+
+def _quote(identifier: str) -> str:
+    """Quote an SQL identifier (field names may contain dots)"""
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def compute_content_hash(product: Dict[str, Any]) -> str:
+    """Stable hash of a product's content, used to skip unchanged rows on sync"""
+    payload = json.dumps(product, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _search_rowid(collection_id: int, row_number: int) -> int:
+    """FTS rowid combining the collection's registry id and the sheet row number"""
+    return (collection_id << 32) | row_number
+
+
+def _compact_sku(value: str) -> str:
+    return re.sub(r'[^0-9a-z]', '', value.lower())
+
+
+def build_search_document(product: Dict[str, Any]) -> Tuple[str, ...]:
+    """Text for each indexed search column, in SEARCH_INDEX_WEIGHTS order"""
+    def text(value):
+        if value is None:
+            return ''
+        if isinstance(value, list):
+            return ' '.join(str(item) for item in value)
+        return str(value)
+
+    skus = ' '.join(text(product.get(field)) for field in ('variant_sku', 'sku'))
+    return (
+        text(product.get('title')),
+        text(product.get('variant_sku')),
+        text(product.get('brand_name')),
+        text(product.get('vendor')),
+        text(product.get('features')),
+        ' '.join(_compact_sku(sku) for sku in skus.split()),
+    )
+
+
+def build_match_query(query: str) -> str:
+    """Turn free text into an FTS5 query: every term must prefix-match a token,
+    and terms that look like SKUs also match the separator-free SKU column"""
+    clauses = []
+    for term in query.lower().replace('"', ' ').split():
+        if not re.search(r'\w', term):
+            continue
+        clause = '"' + term.replace('"', '""') + '"*'
+        compact = _compact_sku(term)
+        if compact and compact != term:
+            clause = f'({clause} OR sku_compact : "{compact}"*)'
+        clauses.append(clause)
+    return ' AND '.join(clauses)
+
+
+class ProductTable:
+    """Columnar layout of one collection's products table
+
+    Scalar values (str/int/float) live in their own column. Anything else -
+    lists, dicts, booleans, None and fields outside the column mapping - is
+    kept in a small JSON overflow column so products round-trip unchanged.
+    """
+
+    def __init__(self, collection_name: str, fields: List[str]):
+        self.collection_name = collection_name
+        self.table_name = 'products_' + re.sub(r'[^A-Za-z0-9_]', '_', collection_name)
+        self.fields = list(fields)
+        self._field_set = set(self.fields)
+        self.collection_id = None  # rowid in the product_tables registry
+
+    @classmethod
+    def for_collection(cls, collection_name: str) -> 'ProductTable':
+        """Build the table layout from the collection's column_mapping"""
+        try:
+            from config.collections import get_collection_config
+            mapping = get_collection_config(collection_name).column_mapping
+            fields = sorted(mapping, key=lambda f: mapping[f])
+        except ValueError:
+            # Unknown collection - everything goes in the overflow column
+            fields = []
+
+        for field in DERIVED_FIELDS:
+            if field not in fields:
+                fields.append(field)
+        return cls(collection_name, fields)
+
+    @property
+    def quoted_table(self) -> str:
+        return _quote(self.table_name)
+
+    def column_list(self) -> str:
+        """All stored columns, in insert order"""
+        columns = [ROW_COLUMN, HASH_COLUMN, EXTRA_COLUMN, SOURCE_HASH_COLUMN] + self.fields
+        return ', '.join(_quote(c) for c in columns)
+
+    def create_sql(self) -> str:
+        # Field columns are declared without a type so SQLite keeps each
+        # value's own storage class (ints stay ints, text stays text)
+        field_columns = ''.join(f',\n                {_quote(f)}' for f in self.fields)
+        return f'''
+            CREATE TABLE IF NOT EXISTS {self.quoted_table} (
+                {ROW_COLUMN} INTEGER PRIMARY KEY,
+                {HASH_COLUMN} TEXT NOT NULL,
+                {EXTRA_COLUMN} TEXT,
+                {SOURCE_HASH_COLUMN} TEXT,
+                {SYNCED_COLUMN} TIMESTAMP DEFAULT CURRENT_TIMESTAMP{field_columns}
+            )
+        '''
+
+    def upsert_sql(self) -> str:
+        placeholders = ', '.join(['?'] * (4 + len(self.fields)))
+        return (f'INSERT OR REPLACE INTO {self.quoted_table} ({self.column_list()}) '
+                f'VALUES ({placeholders})')
+
+    def select_sql(self) -> str:
+        return f'SELECT {self.column_list()} FROM {self.quoted_table}'
+
+    def field_expression(self, field: str) -> str:
+        """SQL expression for a field, whether it has a column or lives in the overflow JSON"""
+        if field in self._field_set:
+            return _quote(field)
+        json_path = '$."' + field.replace('"', '\\"') + '"'
+        return f"json_extract({EXTRA_COLUMN}, '{json_path}')"
+
+    def encode(self, row_number: int, product: Dict[str, Any], source_hash: Optional[str] = None) -> Tuple:
+        """Convert a product dict into a row tuple for upsert_sql()"""
+        extra = {}
+        values = []
+        for field in self.fields:
+            if field not in product:
+                values.append(None)
+                continue
+            value = product[field]
+            if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+                values.append(value)
+            else:
+                values.append(None)
+                extra[field] = value
+
+        for field, value in product.items():
+            if field not in self._field_set:
+                extra[field] = value
+
+        extra_json = json.dumps(extra) if extra else None
+        return (row_number, compute_content_hash(product), extra_json, source_hash, *values)
+
+    def decode(self, row: Tuple) -> Tuple[int, Dict[str, Any]]:
+        """Convert a row from select_sql() back into (row_number, product)"""
+        row_number, _content_hash, extra_json = row[0], row[1], row[2]
+        product = {}
+        for field, value in zip(self.fields, row[4:]):
+            if value is not None:
+                product[field] = value
+        if extra_json:
+            product.update(json.loads(extra_json))
+        return row_number, product
+
+
 class DatabaseCache:
     """SQLite-based cache for product data"""
 
@@ -26,22 +232,23 @@ class DatabaseCache:
             db_path: Path to SQLite database file
         """
         self.db_path = db_path
+        self._pool = get_pool(db_path)
+        self._tables = {}  # collection_name -> ProductTable (schema already ensured)
+        self._search_enabled = False
         self._init_database()
 
     def _init_database(self):
         """Initialize database schema"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._pool.connect()
             cursor = conn.cursor()
 
-            # Products table - stores all product data as JSON
+            # Registry of per-collection product tables
             cursor.execute('''
-                CREATE TABLE IF NOT EXISTS products (
-                    collection TEXT NOT NULL,
-                    row_number INTEGER NOT NULL,
-                    data TEXT NOT NULL,
-                    last_synced TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    PRIMARY KEY (collection, row_number)
+                CREATE TABLE IF NOT EXISTS product_tables (
+                    collection TEXT PRIMARY KEY,
+                    table_name TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             ''')
 
@@ -57,19 +264,352 @@ class DatabaseCache:
                 )
             ''')
 
-            # Index for faster lookups
+            # Spreadsheet modifiedTime seen at the last delta sync
             cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_collection
-                ON products(collection)
+                CREATE TABLE IF NOT EXISTS sheet_sync_state (
+                    collection TEXT PRIMARY KEY,
+                    modified_time TEXT,
+                    checked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+
+            # Running per-collection aggregates, adjusted on every write
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS collection_stats (
+                    collection TEXT PRIMARY KEY,
+                    total_products INTEGER NOT NULL DEFAULT 0,
+                    quality_sum REAL NOT NULL DEFAULT 0,
+                    complete_products INTEGER NOT NULL DEFAULT 0,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS collection_field_stats (
+                    collection TEXT NOT NULL,
+                    field TEXT NOT NULL,
+                    filled INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (collection, field)
+                )
             ''')
 
+            # Bumped on every write that changes a collection, so derived caches can tell they are stale
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS cache_generations (
+                    collection TEXT PRIMARY KEY,
+                    generation INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+
+            # Full-text search index over every collection
+            columns = ', '.join(SEARCH_INDEX_WEIGHTS)
+            try:
+                cursor.execute(f'''
+                    CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE}
+                    USING fts5(collection UNINDEXED, {columns}, tokenize = 'unicode61')
+                ''')
+                self._search_enabled = True
+            except sqlite3.OperationalError as e:
+                logger.warning(f"⚠️ SQLite FTS5 not available, product search index disabled: {e}")
+                self._search_enabled = False
+
             conn.commit()
+            self._migrate_legacy_products(conn)
+
+            # Load every cached collection's table so the search index is backfilled
+            for collection_name in self._registered_tables(conn.cursor()):
+                self._get_table(conn, collection_name)
             conn.close()
             logger.info(f"✅ Database initialized at {self.db_path}")
         except Exception as e:
             logger.error(f"❌ Failed to initialize database: {e}")
             raise
 
+    def _migrate_legacy_products(self, conn: PooledConnection):
+        """Move rows from the old JSON-blob `products` table into columnar tables"""
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'products'")
+        if not cursor.fetchone():
+            return
+
+        cursor.execute('SELECT DISTINCT collection FROM products')
+        collections = [row[0] for row in cursor.fetchall()]
+
+        for collection_name in collections:
+            cursor.execute('''
+                SELECT row_number, data FROM products
+                WHERE collection = ?
+            ''', (collection_name,))
+            products = {row_number: json.loads(data) for row_number, data in cursor.fetchall()}
+            table = self._get_table(conn, collection_name)
+            cursor.executemany(table.upsert_sql(),
+                               [table.encode(row_number, product) for row_number, product in products.items()])
+            self._index_products(cursor, table, products)
+            logger.info(f"📦 Migrated {len(products)} cached products for {collection_name} to columnar store")
+
+        cursor.execute('DROP TABLE products')
+        conn.commit()
+
+    def _get_table(self, conn: PooledConnection, collection_name: str) -> ProductTable:
+        """Get the product table for a collection, creating or widening it as needed"""
+        table = self._tables.get(collection_name)
+        if table is not None:
+            return table
+
+        table = ProductTable.for_collection(collection_name)
+        cursor = conn.cursor()
+        cursor.execute(table.create_sql())
+
+        # Add columns for fields added to the column_mapping since the table was created
+        cursor.execute(f'PRAGMA table_info({table.quoted_table})')
+        existing_columns = {row[1] for row in cursor.fetchall()}
+        if SOURCE_HASH_COLUMN not in existing_columns:
+            cursor.execute(f'ALTER TABLE {table.quoted_table} ADD COLUMN {SOURCE_HASH_COLUMN} TEXT')
+        for field in table.fields:
+            if field not in existing_columns:
+                cursor.execute(f'ALTER TABLE {table.quoted_table} ADD COLUMN {_quote(field)}')
+                logger.info(f"➕ Added column '{field}' to {table.table_name}")
+
+        # Covers quality-ordered pagination (replaces the plain quality_score index, which NULL-safe
+        # ordering can't use)
+        cursor.execute(f"DROP INDEX IF EXISTS {_quote('idx_' + table.table_name + '_quality')}")
+        cursor.execute(f'''
+            CREATE INDEX IF NOT EXISTS {_quote('idx_' + table.table_name + '_quality_sort')}
+            ON {table.quoted_table} ({QUALITY_SORT_EXPRESSION} DESC, {ROW_COLUMN})
+        ''')
+
+        cursor.execute('''
+            INSERT OR IGNORE INTO product_tables (collection, table_name)
+            VALUES (?, ?)
+        ''', (collection_name, table.table_name))
+        cursor.execute('SELECT rowid FROM product_tables WHERE collection = ?', (collection_name,))
+        table.collection_id = cursor.fetchone()[0]
+
+        self._backfill_search_index(cursor, table)
+        conn.commit()
+
+        self._tables[collection_name] = table
+        return table
+
+    def _backfill_search_index(self, cursor: PooledCursor, table: ProductTable):
+        """Index a collection cached before the search index existed"""
+        if not self._search_enabled:
+            return
+
+        cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {table.quoted_table})')
+        has_products = cursor.fetchone()[0]
+        cursor.execute(f'''
+            SELECT EXISTS (SELECT 1 FROM {SEARCH_TABLE} WHERE rowid BETWEEN ? AND ?)
+        ''', (_search_rowid(table.collection_id, 0), _search_rowid(table.collection_id, 0xFFFFFFFF)))
+        has_index = cursor.fetchone()[0]
+
+        if has_products and not has_index:
+            cursor.execute(table.select_sql())
+            products = dict(table.decode(row) for row in cursor.fetchall())
+            self._index_products(cursor, table, products)
+            logger.info(f"🔎 Built search index for {len(products)} cached {table.collection_name} products")
+
+    def _index_products(self, cursor: PooledCursor, table: ProductTable, products: Dict[int, Dict[str, Any]]):
+        """Replace the search index entries for the given products"""
+        if not self._search_enabled or not products:
+            return
+
+        placeholders = ', '.join(['?'] * (2 + len(SEARCH_INDEX_WEIGHTS)))
+        cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = ?',
+                           [(_search_rowid(table.collection_id, row_number),) for row_number in products])
+        cursor.executemany(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, collection, {", ".join(SEARCH_INDEX_WEIGHTS)}) VALUES ({placeholders})',
+            [(_search_rowid(table.collection_id, row_number), table.collection_name, *build_search_document(product))
+             for row_number, product in products.items()]
+        )
+
+    def _unindex_products(self, cursor: PooledCursor, table: ProductTable, row_numbers: Optional[List[int]] = None):
+        """Remove search index entries for some rows, or the whole collection when row_numbers is None"""
+        if not self._search_enabled:
+            return
+
+        if row_numbers is None:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid BETWEEN ? AND ?',
+                           (_search_rowid(table.collection_id, 0), _search_rowid(table.collection_id, 0xFFFFFFFF)))
+        else:
+            cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = ?',
+                               [(_search_rowid(table.collection_id, row_number),) for row_number in row_numbers])
+
+    def _stats_fields(self, table: ProductTable) -> List[str]:
+        """Fields whose fill rate is tracked (everything in the column mapping)"""
+        return [field for field in table.fields if field not in DERIVED_FIELDS]
+
+    def _fetch_products(self, cursor: PooledCursor, table: ProductTable,
+                        row_numbers: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Load the cached versions of some rows (those not cached are left out)"""
+        products = {}
+        row_numbers = list(row_numbers)
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(row_numbers), 500):
+            chunk = row_numbers[start:start + 500]
+            placeholders = ', '.join(['?'] * len(chunk))
+            cursor.execute(f'{table.select_sql()} WHERE {ROW_COLUMN} IN ({placeholders})', chunk)
+            products.update(table.decode(row) for row in cursor.fetchall())
+        return products
+
+    def _stats_delta(self, table: ProductTable, removed: Dict[int, Dict[str, Any]],
+                     added: Dict[int, Dict[str, Any]]) -> StatsDelta:
+        """Aggregate change from replacing/deleting the `removed` rows and writing the `added` ones"""
+        fields = self._stats_fields(table)
+        delta = StatsDelta()
+        for product in removed.values():
+            delta.remove(product, fields)
+        for product in added.values():
+            delta.add(product, fields)
+        return delta
+
+    def _apply_stats(self, cursor: PooledCursor, table: ProductTable, delta: StatsDelta):
+        """Adjust a collection's running statistics (skipped until they have been built once)"""
+        if not delta:
+            return
+
+        cursor.execute('''
+            UPDATE collection_stats
+            SET total_products = total_products + ?, quality_sum = quality_sum + ?,
+                complete_products = complete_products + ?, updated_at = CURRENT_TIMESTAMP
+            WHERE collection = ?
+        ''', (delta.total, delta.quality_sum, delta.complete, table.collection_name))
+        if cursor.rowcount == 0:
+            return
+
+        cursor.executemany('''
+            INSERT INTO collection_field_stats (collection, field, filled) VALUES (?, ?, ?)
+            ON CONFLICT(collection, field) DO UPDATE SET filled = filled + excluded.filled
+        ''', [(table.collection_name, field, change) for field, change in delta.changed_fields().items()])
+
+    def _reset_stats(self, cursor: PooledCursor, collection_name: str):
+        """Zero a collection's statistics after its products are cleared"""
+        cursor.execute('''
+            UPDATE collection_stats
+            SET total_products = 0, quality_sum = 0, complete_products = 0, updated_at = CURRENT_TIMESTAMP
+            WHERE collection = ?
+        ''', (collection_name,))
+        cursor.execute('DELETE FROM collection_field_stats WHERE collection = ?', (collection_name,))
+
+    def _bump_generation(self, cursor: PooledCursor, collection_name: str):
+        """Mark a collection's cached data as changed"""
+        cursor.execute('''
+            INSERT INTO cache_generations (collection, generation) VALUES (?, 1)
+            ON CONFLICT(collection) DO UPDATE SET generation = generation + 1
+        ''', (collection_name,))
+
+    def get_cache_generation(self, collection_name: str) -> int:
+        """Counter that changes whenever a collection's cached products change (0 if never written)"""
+        try:
+            conn = self._pool.connect()
+            cursor = conn.cursor()
+            cursor.execute('SELECT generation FROM cache_generations WHERE collection = ?', (collection_name,))
+            row = cursor.fetchone()
+            conn.close()
+            return row[0] if row else 0
+        except Exception as e:
+            logger.error(f"❌ Failed to get cache generation: {e}")
+            return 0
+
+    def _rebuild_stats(self, cursor: PooledCursor, table: ProductTable):
+        """Compute a collection's statistics from its rows (only needed once per collection)
+
+        Call inside a BEGIN IMMEDIATE transaction: a write landing between the
+        read and the stats row being stored would otherwise be missing from
+        both the rebuilt totals and its own delta, which is skipped until the
+        stats row exists.
+        """
+        cursor.execute(table.select_sql())
+        products = dict(table.decode(row) for row in cursor.fetchall())
+        delta = self._stats_delta(table, {}, products)
+
+        cursor.execute('''
+            INSERT OR REPLACE INTO collection_stats
+            (collection, total_products, quality_sum, complete_products, updated_at)
+            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ''', (table.collection_name, delta.total, delta.quality_sum, delta.complete))
+        cursor.execute('DELETE FROM collection_field_stats WHERE collection = ?', (table.collection_name,))
+        cursor.executemany('''
+            INSERT INTO collection_field_stats (collection, field, filled) VALUES (?, ?, ?)
+        ''', [(table.collection_name, field, count) for field, count in delta.changed_fields().items()])
+        logger.info(f"📊 Built statistics for {len(products)} cached {table.collection_name} products")
+
+    def get_collection_stats(self, collection_name: str) -> Optional[Dict[str, Any]]:
+        """Get a collection's running statistics without scanning its products
+
+        The first call for a collection builds them from the cached rows;
+        after that every cache write keeps them current.
+
+        Args:
+            collection_name: Name of the collection
+
+        Returns:
+            Counts, average quality and per-field fill rates, or None on failure
+        """
+        try:
+            conn = self._pool.connect()
+            table = self._get_table(conn, collection_name)
+            cursor = conn.cursor()
+
+            cursor.execute('''
+                SELECT total_products, quality_sum, complete_products, updated_at
+                FROM collection_stats WHERE collection = ?
+            ''', (collection_name,))
+            row = cursor.fetchone()
+            if row is None:
+                cursor.execute('BEGIN IMMEDIATE')
+                # Another connection may have built them while this one waited for the lock
+                cursor.execute('SELECT 1 FROM collection_stats WHERE collection = ?', (collection_name,))
+                if cursor.fetchone() is None:
+                    self._rebuild_stats(cursor, table)
+                conn.commit()
+                cursor.execute('''
+                    SELECT total_products, quality_sum, complete_products, updated_at
+                    FROM collection_stats WHERE collection = ?
+                ''', (collection_name,))
+                row = cursor.fetchone()
+
+            cursor.execute('''
+                SELECT field, filled FROM collection_field_stats WHERE collection = ? AND filled != 0
+            ''', (collection_name,))
+            field_counts = dict(cursor.fetchall())
+            conn.close()
+
+            stats = summarize(row[0], row[1], row[2], field_counts)
+            stats['updated_at'] = row[3]
+            return stats
+
+        except Exception as e:
+            logger.error(f"❌ Failed to get collection stats from cache: {e}")
+            return None
+
+    def rebuild_collection_stats(self, collection_name: str) -> bool:
+        """Recompute a collection's statistics from scratch
+
+        Args:
+            collection_name: Name of the collection
+
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            conn = self._pool.connect()
+            table = self._get_table(conn, collection_name)
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            self._rebuild_stats(cursor, table)
+            conn.commit()
+            conn.close()
+            return True
+
+        except Exception as e:
+            logger.error(f"❌ Failed to rebuild collection stats: {e}")
+            return False
+
+    def _registered_tables(self, cursor: PooledCursor) -> Dict[str, str]:
+        """Map of collection name -> table name for every cached collection"""
+        cursor.execute('SELECT collection, table_name FROM product_tables')
+        return dict(cursor.fetchall())
+
     def get_all_products(self, collection_name: str) -> Optional[Dict[int, Dict[str, Any]]]:
         """Get all products for a collection from cache
 
@@ -80,15 +620,11 @@ class DatabaseCache:
             Dictionary of products keyed by row_number, or None if not cached
         """
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._pool.connect()
+            table = self._get_table(conn, collection_name)
             cursor = conn.cursor()
 
-            cursor.execute('''
-                SELECT row_number, data
-                FROM products
-                WHERE collection = ?
-                ORDER BY row_number
-            ''', (collection_name,))
+            cursor.execute(f'{table.select_sql()} ORDER BY {ROW_COLUMN}')
 
             rows = cursor.fetchall()
             conn.close()
@@ -98,9 +634,7 @@ class DatabaseCache:
                 return None
 
             # Convert to dictionary format
-            products = {}
-            for row_number, data_json in rows:
-                products[row_number] = json.loads(data_json)
+            products = dict(table.decode(row) for row in rows)
 
             logger.info(f"✅ Loaded {len(products)} products from cache for {collection_name}")
             return products
@@ -109,10 +643,338 @@ class DatabaseCache:
             logger.error(f"❌ Failed to get products from cache: {e}")
             return None
 
+    def iter_products(self, collection_name: str, batch_size: int = 500) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Yield cached products in row order without loading the whole collection
+
+        Rows are read in keyset batches, each its own short query, so no
+        cursor or read snapshot is held open between yields and memory stays
+        at one batch however large the collection is.
+
+        Args:
+            collection_name: Name of the collection
+            batch_size: Rows read per query
+
+        Yields:
+            (row_number, product) tuples; nothing if the collection is not cached
+        """
+        last_row = None
+        while True:
+            conn = self._pool.connect()
+            table = self._get_table(conn, collection_name)
+            cursor = conn.cursor()
+            if last_row is None:
+                cursor.execute(f'{table.select_sql()} ORDER BY {ROW_COLUMN} LIMIT ?', (batch_size,))
+            else:
+                cursor.execute(f'{table.select_sql()} WHERE {ROW_COLUMN} > ? ORDER BY {ROW_COLUMN} LIMIT ?',
+                               (last_row, batch_size))
+            rows = cursor.fetchall()
+            conn.close()
+
+            for row in rows:
+                yield table.decode(row)
+            if len(rows) < batch_size:
+                return
+            last_row = rows[-1][0]
+
+    def get_product_fields(self, collection_name: str) -> Optional[List[str]]:
+        """Fields that hold a value in at least one cached product
+
+        Lets exports write their header before streaming rows. Column fields
+        come in column_mapping order, then overflow fields alphabetically.
+
+        Args:
+            collection_name: Name of the collection
+
+        Returns:
+            List of field names, or None if the collection is not cached
+        """
+        try:
+            conn = self._pool.connect()
+            table = self._get_table(conn, collection_name)
+            cursor = conn.cursor()
+
+            used = ', '.join(f'MAX({_quote(field)} IS NOT NULL)' for field in table.fields)
+            cursor.execute(f'SELECT COUNT(*){", " + used if used else ""} FROM {table.quoted_table}')
+            counts = cursor.fetchone()
+            if not counts[0]:
+                conn.close()
+                return None
+            fields = [field for field, has_value in zip(table.fields, counts[1:]) if has_value]
+
+            cursor.execute(f'SELECT DISTINCT j.key FROM {table.quoted_table}, json_each({EXTRA_COLUMN}) AS j '
+                           f'WHERE {EXTRA_COLUMN} IS NOT NULL ORDER BY j.key')
+            known = set(fields)
+            fields.extend(key for (key,) in cursor.fetchall() if key not in known)
+            conn.close()
+            return fields
+
+        except Exception as e:
+            logger.error(f"❌ Failed to get product fields from cache: {e}")
+            return None
+
+    def get_product(self, collection_name: str, row_number: int) -> Optional[Dict[str, Any]]:
+        """Get a single cached product
+
+        Args:
+            collection_name: Name of the collection
+            row_number: Row number of the product
+
+        Returns:
+            Product data, or None if not cached
+        """
+        try:
+            conn = self._pool.connect()
+            table = self._get_table(conn, collection_name)
+            cursor = conn.cursor()
+
+            cursor.execute(f'{table.select_sql()} WHERE {ROW_COLUMN} = ?', (row_number,))
+            row = cursor.fetchone()
+            conn.close()
+
+            return table.decode(row)[1] if row else None
+
+        except Exception as e:
+            logger.error(f"❌ Failed to get product {row_number} from cache: {e}")
+            return None
+
+    def query_products(self, collection_name: str, page: int = 1, limit: int = 50,
+                       search: str = '', quality_filter: str = '', sort_by: str = 'sheet_order',
+                       after: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Filter, sort and paginate cached products inside SQLite
+
+        Only the requested page is loaded into Python; total_count comes from
+        a COUNT(*) over the same filters.
+
+        Args:
+            collection_name: Name of the collection
+            page: Page number (1-based), ignored when `after` is given
+            limit: Products per page
+            search: Free text; every term must prefix-match a token in the search
+                index (case-insensitive substring match on SEARCH_FIELDS without FTS5)
+            quality_filter: 'excellent', 'good' or 'needs-work'
+            sort_by: 'sheet_order' (default) or 'quality_score'
+            after: Keyset cursor returned as `next_cursor` by the previous page
+
+        Returns:
+            Same shape as SheetsManager.get_products_paginated plus `next_cursor`,
+            or None if the collection is not cached
+        """
+        try:
+            conn = self._pool.connect()
+            table = self._get_table(conn, collection_name)
+            cursor = conn.cursor()
+
+            cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {table.quoted_table})')
+            if not cursor.fetchone()[0]:
+                conn.close()
+                return None
+
+            conditions = []
+            params = []
+
+            match_query = build_match_query(search) if search and self._search_enabled else ''
+            if match_query:
+                # Matched through the FTS index rather than scanning every row's text
+                conditions.append(f'''{ROW_COLUMN} IN (
+                    SELECT rowid & 0xFFFFFFFF FROM {SEARCH_TABLE}
+                    WHERE {SEARCH_TABLE} MATCH ? AND rowid BETWEEN ? AND ?
+                )''')
+                params.extend([match_query, _search_rowid(table.collection_id, 0),
+                               _search_rowid(table.collection_id, 0xFFFFFFFF)])
+            elif search:
+                searchable = " || ' ' || ".join(
+                    f"COALESCE({table.field_expression(field)}, '')" for field in SEARCH_FIELDS
+                )
+                escaped = search.lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+                conditions.append(f"LOWER({searchable}) LIKE ? ESCAPE '\\'")
+                params.append(f'%{escaped}%')
+
+            if quality_filter in QUALITY_FILTERS:
+                conditions.append(QUALITY_FILTERS[quality_filter])
+
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+            cursor.execute(f'SELECT COUNT(*) FROM {table.quoted_table} {where}', params)
+            total_count = cursor.fetchone()[0]
+            total_pages = (total_count + limit - 1) // limit
+
+            # Validate page number
+            if page < 1:
+                page = 1
+            elif page > total_pages and total_pages > 0:
+                page = total_pages
+
+            if sort_by == 'quality_score':
+                order_by = f'{QUALITY_SORT_EXPRESSION} DESC, {ROW_COLUMN}'
+            else:
+                order_by = ROW_COLUMN
+
+            page_conditions = list(conditions)
+            page_params = list(params)
+            offset = (page - 1) * limit
+            if after:
+                # Keyset pagination: continue after the last row of the previous page
+                offset = 0
+                cursor_row, _, cursor_quality = after.partition(':')
+                if sort_by == 'quality_score':
+                    # Cursors without a score came from an unscored row
+                    quality = float(cursor_quality) if cursor_quality else UNSCORED_QUALITY
+                    page_conditions.append(
+                        f'({QUALITY_SORT_EXPRESSION} < ? OR ({QUALITY_SORT_EXPRESSION} = ? AND {ROW_COLUMN} > ?))'
+                    )
+                    page_params.extend([quality, quality, int(cursor_row)])
+                else:
+                    page_conditions.append(f'{ROW_COLUMN} > ?')
+                    page_params.append(int(cursor_row))
+
+            page_where = f"WHERE {' AND '.join(page_conditions)}" if page_conditions else ''
+            # Fetch one extra row to know whether another page follows
+            cursor.execute(
+                f'{table.select_sql()} {page_where} ORDER BY {order_by} LIMIT ? OFFSET ?',
+                page_params + [limit + 1, offset]
+            )
+            rows = cursor.fetchall()
+            conn.close()
+
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+
+            products = {}
+            for row in rows:
+                row_number, product = table.decode(row)
+                product['row_number'] = row_number
+                products[row_number] = product
+
+            next_cursor = None
+            if rows and has_more:
+                last_row, last_product = rows[-1][0], products[rows[-1][0]]
+                next_cursor = str(last_row)
+                if sort_by == 'quality_score':
+                    quality = last_product.get('quality_score')
+                    next_cursor += f":{quality if quality is not None else UNSCORED_QUALITY}"
+
+            return {
+                'products': products,
+                'total_count': total_count,
+                'total_pages': total_pages,
+                'current_page': page,
+                'has_next': has_more,
+                'has_prev': bool(after) or page > 1,
+                'per_page': limit,
+                'next_cursor': next_cursor
+            }
+
+        except Exception as e:
+            logger.error(f"❌ Failed to query products from cache: {e}")
+            return None
+
+    def search_products(self, query: str, collection_name: Optional[str] = None,
+                        limit: int = 50, offset: int = 0) -> Optional[Dict[str, Any]]:
+        """Ranked full-text product search (BM25) with prefix and SKU-token matching
+
+        Args:
+            query: Free-text query; every term must prefix-match a token
+            collection_name: Collection to search, or None to search all collections
+            limit: Maximum number of hits to return
+            offset: Number of hits to skip
+
+        Returns:
+            Dict with ranked 'hits' (collection, row_number, score, product) and
+            'total_count', or None if the search index is unavailable
+        """
+        if not self._search_enabled:
+            return None
+
+        match_query = build_match_query(query)
+        if not match_query:
+            return {'hits': [], 'total_count': 0}
+
+        try:
+            conn = self._pool.connect()
+            cursor = conn.cursor()
+
+            conditions = [f'{SEARCH_TABLE} MATCH ?']
+            params = [match_query]
+            if collection_name:
+                table = self._get_table(conn, collection_name)
+                conditions.append('rowid BETWEEN ? AND ?')
+                params.extend([_search_rowid(table.collection_id, 0),
+                               _search_rowid(table.collection_id, 0xFFFFFFFF)])
+            where = ' AND '.join(conditions)
+
+            cursor.execute(f'SELECT COUNT(*) FROM {SEARCH_TABLE} WHERE {where}', params)
+            total_count = cursor.fetchone()[0]
+
+            weights = ', '.join(str(weight) for weight in SEARCH_INDEX_WEIGHTS.values())
+            cursor.execute(f'''
+                SELECT collection, rowid & 0xFFFFFFFF, bm25({SEARCH_TABLE}, 0, {weights}) AS score
+                FROM {SEARCH_TABLE}
+                WHERE {where}
+                ORDER BY score
+                LIMIT ? OFFSET ?
+            ''', params + [limit, offset])
+            matches = cursor.fetchall()
+
+            # Load the matched products, one query per collection
+            rows_by_collection = {}
+            for collection, row_number, _score in matches:
+                rows_by_collection.setdefault(collection, []).append(row_number)
+
+            products = {}
+            for collection, row_numbers in rows_by_collection.items():
+                table = self._get_table(conn, collection)
+                placeholders = ', '.join(['?'] * len(row_numbers))
+                cursor.execute(f'{table.select_sql()} WHERE {ROW_COLUMN} IN ({placeholders})', row_numbers)
+                for row in cursor.fetchall():
+                    row_number, product = table.decode(row)
+                    product['row_number'] = row_number
+                    products[(collection, row_number)] = product
+            conn.close()
+
+            hits = [{
+                'collection': collection,
+                'row_number': row_number,
+                # bm25() is lower-is-better; flip it so higher means more relevant
+                'score': round(-score, 4),
+                'product': products.get((collection, row_number), {})
+            } for collection, row_number, score in matches]
+
+            return {'hits': hits, 'total_count': total_count}
+
+        except Exception as e:
+            logger.error(f"❌ Failed to search products: {e}")
+            return None
+
+    def get_content_hashes(self, collection_name: str) -> Dict[int, str]:
+        """Get the stored content hash of every cached row in a collection
+
+        Args:
+            collection_name: Name of the collection
+
+        Returns:
+            Dictionary of content hashes keyed by row_number
+        """
+        try:
+            conn = self._pool.connect()
+            table = self._get_table(conn, collection_name)
+            cursor = conn.cursor()
+
+            cursor.execute(f'SELECT {ROW_COLUMN}, {HASH_COLUMN} FROM {table.quoted_table}')
+            hashes = dict(cursor.fetchall())
+            conn.close()
+            return hashes
+
+        except Exception as e:
+            logger.error(f"❌ Failed to get content hashes from cache: {e}")
+            return {}
+
     def save_all_products(self, collection_name: str, products: Dict[int, Dict[str, Any]],
                          sync_duration: float = 0) -> bool:
         """Save all products for a collection to cache
 
+        Only rows whose content hash changed are rewritten, and rows that are
+        no longer present are deleted, so the cost is proportional to the
+        number of changes rather than the size of the collection.
+
         Args:
             collection_name: Name of the collection
             products: Dictionary of products keyed by row_number
@@ -122,18 +984,36 @@ class DatabaseCache:
             True if successful, False otherwise
         """
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._pool.connect()
+            table = self._get_table(conn, collection_name)
             cursor = conn.cursor()
 
-            # Delete existing products for this collection
-            cursor.execute('DELETE FROM products WHERE collection = ?', (collection_name,))
+            cursor.execute(f'SELECT {ROW_COLUMN}, {HASH_COLUMN} FROM {table.quoted_table}')
+            existing_hashes = dict(cursor.fetchall())
 
-            # Insert all products
+            # Upsert only new or changed rows
+            changed_rows = []
             for row_number, product_data in products.items():
-                cursor.execute('''
-                    INSERT INTO products (collection, row_number, data, last_synced)
-                    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-                ''', (collection_name, row_number, json.dumps(product_data)))
+                row = table.encode(row_number, product_data)
+                if existing_hashes.get(row_number) != row[1]:
+                    changed_rows.append(row)
+            removed_rows = [(row_number,) for row_number in existing_hashes if row_number not in products]
+
+            previous = self._fetch_products(
+                cursor, table,
+                [row[0] for row in changed_rows if row[0] in existing_hashes] + [row[0] for row in removed_rows]
+            )
+            changed_products = {row[0]: products[row[0]] for row in changed_rows}
+
+            cursor.executemany(table.upsert_sql(), changed_rows)
+            self._index_products(cursor, table, changed_products)
+
+            # Remove rows that no longer exist in the sheet
+            cursor.executemany(f'DELETE FROM {table.quoted_table} WHERE {ROW_COLUMN} = ?', removed_rows)
+            self._unindex_products(cursor, table, [row[0] for row in removed_rows])
+            self._apply_stats(cursor, table, self._stats_delta(table, previous, changed_products))
+            if changed_rows or removed_rows:
+                self._bump_generation(cursor, collection_name)
 
             # Log sync
             cursor.execute('''
@@ -144,13 +1024,184 @@ class DatabaseCache:
             conn.commit()
             conn.close()
 
-            logger.info(f"✅ Saved {len(products)} products to cache for {collection_name}")
+            logger.info(f"✅ Saved {len(products)} products to cache for {collection_name} "
+                        f"({len(changed_rows)} written, {len(removed_rows)} removed, "
+                        f"{len(products) - len(changed_rows)} unchanged)")
             return True
 
         except Exception as e:
             logger.error(f"❌ Failed to save products to cache: {e}")
             return False
 
+    def upsert_products(self, collection_name: str, products: Dict[int, Dict[str, Any]],
+                        source_hashes: Optional[Dict[int, str]] = None) -> int:
+        """Insert or replace a set of rows without touching the rest of the collection
+
+        Args:
+            collection_name: Name of the collection
+            products: Dictionary of products keyed by row_number
+            source_hashes: Optional raw sheet-row hashes to store alongside (delta sync)
+
+        Returns:
+            Number of rows written (unchanged rows are skipped), or -1 on failure
+        """
+        source_hashes = source_hashes or {}
+        try:
+            conn = self._pool.connect()
+            table = self._get_table(conn, collection_name)
+            cursor = conn.cursor()
+
+            existing = {}
+            row_numbers = list(products.keys())
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(row_numbers), 500):
+                chunk = row_numbers[start:start + 500]
+                placeholders = ', '.join(['?'] * len(chunk))
+                cursor.execute(f'''
+                    SELECT {ROW_COLUMN}, {HASH_COLUMN}, {SOURCE_HASH_COLUMN} FROM {table.quoted_table}
+                    WHERE {ROW_COLUMN} IN ({placeholders})
+                ''', chunk)
+                existing.update((row[0], (row[1], row[2])) for row in cursor.fetchall())
+
+            changed_rows = []
+            for row_number, product_data in products.items():
+                row = table.encode(row_number, product_data, source_hashes.get(row_number))
+                if existing.get(row_number) != (row[1], row[3]):
+                    changed_rows.append(row)
+
+            previous = self._fetch_products(cursor, table, [row[0] for row in changed_rows if row[0] in existing])
+            changed_products = {row[0]: products[row[0]] for row in changed_rows}
+
+            cursor.executemany(table.upsert_sql(), changed_rows)
+            self._index_products(cursor, table, changed_products)
+            self._apply_stats(cursor, table, self._stats_delta(table, previous, changed_products))
+            if changed_rows:
+                self._bump_generation(cursor, collection_name)
+
+            conn.commit()
+            conn.close()
+
+            logger.info(f"✅ Upserted {len(changed_rows)}/{len(products)} products in cache for {collection_name}")
+            return len(changed_rows)
+
+        except Exception as e:
+            logger.error(f"❌ Failed to upsert products in cache: {e}")
+            return -1
+
+    def delete_products(self, collection_name: str, row_numbers: List[int]) -> int:
+        """Delete several products from the cache in one transaction
+
+        Args:
+            collection_name: Name of the collection
+            row_numbers: Row numbers of the products to delete
+
+        Returns:
+            Number of rows deleted, or -1 on failure
+        """
+        try:
+            conn = self._pool.connect()
+            table = self._get_table(conn, collection_name)
+            cursor = conn.cursor()
+
+            previous = self._fetch_products(cursor, table, row_numbers)
+
+            before = conn.total_changes
+            cursor.executemany(f'DELETE FROM {table.quoted_table} WHERE {ROW_COLUMN} = ?',
+                               [(row_number,) for row_number in row_numbers])
+            deleted_count = conn.total_changes - before
+            self._unindex_products(cursor, table, list(row_numbers))
+            self._apply_stats(cursor, table, self._stats_delta(table, previous, {}))
+            if deleted_count:
+                self._bump_generation(cursor, collection_name)
+
+            conn.commit()
+            conn.close()
+            return deleted_count
+
+        except Exception as e:
+            logger.error(f"❌ Failed to delete products from cache: {e}")
+            return -1
+
+    def get_source_hashes(self, collection_name: str) -> Dict[int, Optional[str]]:
+        """Get the raw sheet-row hash stored for every cached row (None if unknown)
+
+        Args:
+            collection_name: Name of the collection
+
+        Returns:
+            Dictionary of source hashes keyed by row_number
+        """
+        try:
+            conn = self._pool.connect()
+            table = self._get_table(conn, collection_name)
+            cursor = conn.cursor()
+
+            cursor.execute(f'SELECT {ROW_COLUMN}, {SOURCE_HASH_COLUMN} FROM {table.quoted_table}')
+            hashes = dict(cursor.fetchall())
+            conn.close()
+            return hashes
+
+        except Exception as e:
+            logger.error(f"❌ Failed to get source hashes from cache: {e}")
+            return {}
+
+    def log_sync(self, collection_name: str, products_count: int, sync_duration: float = 0) -> bool:
+        """Record a completed sync in the sync log
+
+        Args:
+            collection_name: Name of the collection
+            products_count: Number of products in the collection after the sync
+            sync_duration: Time taken to sync (seconds)
+
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            conn = self._pool.connect()
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO sync_log (collection, products_count, sync_duration_seconds)
+                VALUES (?, ?, ?)
+            ''', (collection_name, products_count, sync_duration))
+            conn.commit()
+            conn.close()
+            return True
+
+        except Exception as e:
+            logger.error(f"❌ Failed to log sync: {e}")
+            return False
+
+    def get_sheet_modified_time(self, collection_name: str) -> Optional[str]:
+        """Get the spreadsheet modifiedTime recorded at the last delta sync"""
+        try:
+            conn = self._pool.connect()
+            cursor = conn.cursor()
+            cursor.execute('SELECT modified_time FROM sheet_sync_state WHERE collection = ?', (collection_name,))
+            row = cursor.fetchone()
+            conn.close()
+            return row[0] if row else None
+
+        except Exception as e:
+            logger.error(f"❌ Failed to get sheet modified time: {e}")
+            return None
+
+    def set_sheet_modified_time(self, collection_name: str, modified_time: Optional[str]) -> bool:
+        """Record the spreadsheet modifiedTime the cache now reflects"""
+        try:
+            conn = self._pool.connect()
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT OR REPLACE INTO sheet_sync_state (collection, modified_time, checked_at)
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+            ''', (collection_name, modified_time))
+            conn.commit()
+            conn.close()
+            return True
+
+        except Exception as e:
+            logger.error(f"❌ Failed to set sheet modified time: {e}")
+            return False
+
     def update_single_product(self, collection_name: str, row_number: int,
                              product_data: Dict[str, Any]) -> bool:
         """Update a single product in the cache
@@ -164,32 +1215,17 @@ class DatabaseCache:
             True if successful, False otherwise
         """
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._pool.connect()
+            table = self._get_table(conn, collection_name)
             cursor = conn.cursor()
 
-            # Check if product exists
-            cursor.execute('''
-                SELECT COUNT(*) FROM products
-                WHERE collection = ? AND row_number = ?
-            ''', (collection_name, row_number))
+            previous = self._fetch_products(cursor, table, [row_number])
 
-            exists = cursor.fetchone()[0] > 0
-
-            if exists:
-                # Update existing product
-                cursor.execute('''
-                    UPDATE products
-                    SET data = ?, last_synced = CURRENT_TIMESTAMP
-                    WHERE collection = ? AND row_number = ?
-                ''', (json.dumps(product_data), collection_name, row_number))
-                logger.info(f"✅ Updated product {row_number} in cache for {collection_name}")
-            else:
-                # Insert new product
-                cursor.execute('''
-                    INSERT INTO products (collection, row_number, data, last_synced)
-                    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-                ''', (collection_name, row_number, json.dumps(product_data)))
-                logger.info(f"✅ Inserted new product {row_number} in cache for {collection_name}")
+            cursor.execute(table.upsert_sql(), table.encode(row_number, product_data))
+            self._index_products(cursor, table, {row_number: product_data})
+            self._apply_stats(cursor, table, self._stats_delta(table, previous, {row_number: product_data}))
+            self._bump_generation(cursor, collection_name)
+            logger.info(f"✅ Updated product {row_number} in cache for {collection_name}")
 
             conn.commit()
             conn.close()
@@ -211,39 +1247,51 @@ class DatabaseCache:
         Returns:
             True if successful, False otherwise
         """
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+        return self.update_products_fields(collection_name, {row_number: fields})
 
-            # Get existing product data
-            cursor.execute('''
-                SELECT data FROM products
-                WHERE collection = ? AND row_number = ?
-            ''', (collection_name, row_number))
+    def update_products_fields(self, collection_name: str,
+                               row_fields: Dict[int, Dict[str, Any]]) -> bool:
+        """Merge field updates into several products in one transaction
 
-            row = cursor.fetchone()
-            if row:
-                # Merge new fields into existing data
-                existing_data = json.loads(row[0])
-                existing_data.update(fields)
+        Args:
+            collection_name: Name of the collection
+            row_fields: Field names and values to update, keyed by row_number
 
-                # Update with merged data
-                cursor.execute('''
-                    UPDATE products
-                    SET data = ?, last_synced = CURRENT_TIMESTAMP
-                    WHERE collection = ? AND row_number = ?
-                ''', (json.dumps(existing_data), collection_name, row_number))
-                logger.info(f"✅ Updated {len(fields)} fields for product {row_number} in cache")
-            else:
-                # Product doesn't exist in cache, insert it
-                cursor.execute('''
-                    INSERT INTO products (collection, row_number, data, last_synced)
-                    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-                ''', (collection_name, row_number, json.dumps(fields)))
-                logger.info(f"✅ Inserted new product {row_number} in cache with {len(fields)} fields")
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            conn = self._pool.connect()
+            table = self._get_table(conn, collection_name)
+            cursor = conn.cursor()
+
+            previous = {}
+            updated = {}
+            for row_number, fields in row_fields.items():
+                # Get existing product data
+                cursor.execute(f'{table.select_sql()} WHERE {ROW_COLUMN} = ?', (row_number,))
+
+                row = cursor.fetchone()
+                if row:
+                    # Merge new fields into existing data
+                    previous[row_number] = table.decode(row)[1]
+                    product_data = dict(previous[row_number])
+                    product_data.update(fields)
+                else:
+                    # Product doesn't exist in cache, insert it
+                    product_data = dict(fields)
+                updated[row_number] = product_data
+
+            cursor.executemany(table.upsert_sql(),
+                               [table.encode(row_number, data) for row_number, data in updated.items()])
+            self._index_products(cursor, table, updated)
+            self._apply_stats(cursor, table, self._stats_delta(table, previous, updated))
+            if updated:
+                self._bump_generation(cursor, collection_name)
 
             conn.commit()
             conn.close()
+            logger.info(f"✅ Updated fields for {len(updated)} products in cache for {collection_name}")
             return True
 
         except Exception as e:
@@ -261,15 +1309,22 @@ class DatabaseCache:
             True if successful, False otherwise
         """
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._pool.connect()
+            table = self._get_table(conn, collection_name)
             cursor = conn.cursor()
 
-            cursor.execute('''
-                DELETE FROM products
-                WHERE collection = ? AND row_number = ?
-            ''', (collection_name, row_number))
+            previous = self._fetch_products(cursor, table, [row_number])
+
+            cursor.execute(f'''
+                DELETE FROM {table.quoted_table}
+                WHERE {ROW_COLUMN} = ?
+            ''', (row_number,))
 
             deleted_count = cursor.rowcount
+            self._unindex_products(cursor, table, [row_number])
+            self._apply_stats(cursor, table, self._stats_delta(table, previous, {}))
+            if deleted_count:
+                self._bump_generation(cursor, collection_name)
             conn.commit()
             conn.close()
 
@@ -294,15 +1349,17 @@ class DatabaseCache:
             True if successful, False otherwise
         """
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._pool.connect()
+            table = self._get_table(conn, collection_name)
             cursor = conn.cursor()
 
-            cursor.execute('''
-                DELETE FROM products
-                WHERE collection = ?
-            ''', (collection_name,))
+            cursor.execute(f'DELETE FROM {table.quoted_table}')
 
             deleted_count = cursor.rowcount
+            self._unindex_products(cursor, table)
+            self._reset_stats(cursor, collection_name)
+            self._bump_generation(cursor, collection_name)
+            cursor.execute('DELETE FROM sheet_sync_state WHERE collection = ?', (collection_name,))
             conn.commit()
             conn.close()
 
@@ -323,7 +1380,7 @@ class DatabaseCache:
             Datetime of last sync, or None if never synced
         """
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._pool.connect()
             cursor = conn.cursor()
 
             cursor.execute('''
@@ -356,7 +1413,7 @@ class DatabaseCache:
             List of sync records
         """
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._pool.connect()
             cursor = conn.cursor()
 
             cursor.execute('''
@@ -412,14 +1469,25 @@ class DatabaseCache:
             True if successful
         """
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._pool.connect()
             cursor = conn.cursor()
 
             if collection_name:
-                cursor.execute('DELETE FROM products WHERE collection = ?', (collection_name,))
+                table = self._get_table(conn, collection_name)
+                cursor.execute(f'DELETE FROM {table.quoted_table}')
+                self._unindex_products(cursor, table)
+                self._reset_stats(cursor, collection_name)
+                self._bump_generation(cursor, collection_name)
+                cursor.execute('DELETE FROM sheet_sync_state WHERE collection = ?', (collection_name,))
                 logger.info(f"🗑️ Cleared cache for {collection_name}")
             else:
-                cursor.execute('DELETE FROM products')
+                for registered_collection, table_name in self._registered_tables(cursor).items():
+                    cursor.execute(f'DELETE FROM {_quote(table_name)}')
+                    self._reset_stats(cursor, registered_collection)
+                    self._bump_generation(cursor, registered_collection)
+                if self._search_enabled:
+                    cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+                cursor.execute('DELETE FROM sheet_sync_state')
                 logger.info("🗑️ Cleared all cache")
 
             conn.commit()
@@ -437,16 +1505,16 @@ class DatabaseCache:
             Dictionary with cache statistics
         """
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._pool.connect()
             cursor = conn.cursor()
 
             # Get products count per collection
-            cursor.execute('''
-                SELECT collection, COUNT(*) as count
-                FROM products
-                GROUP BY collection
-            ''')
-            collections = dict(cursor.fetchall())
+            collections = {}
+            for collection, table_name in self._registered_tables(cursor).items():
+                cursor.execute(f'SELECT COUNT(*) FROM {_quote(table_name)}')
+                count = cursor.fetchone()[0]
+                if count:
+                    collections[collection] = count
 
             # Get total size
             cursor.execute("SELECT page_count * page_size as size FROM pragma_page_count(), pragma_page_size()")
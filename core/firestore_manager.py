@@ -2,26 +2,45 @@
 Firestore Manager - Cloud Database for Product Information Management
 Replaces Google Sheets for scalable storage of 30,000+ products
 """
+import os
 import json
 import logging
 import time
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Tuple, Iterator
 from datetime import datetime
 
 try:
     import firebase_admin
     from firebase_admin import credentials, firestore
+    from google.api_core import exceptions as google_exceptions
     FIREBASE_AVAILABLE = True
+    # Commit failures worth retrying; anything else means a write in the batch is bad
+    TRANSIENT_ERRORS = (google_exceptions.Aborted, google_exceptions.DeadlineExceeded,
+                        google_exceptions.ServiceUnavailable, google_exceptions.ResourceExhausted,
+                        google_exceptions.InternalServerError)
 except ImportError:
     FIREBASE_AVAILABLE = False
+    TRANSIENT_ERRORS = ()
     logging.warning("Firebase Admin SDK not installed. Run: pip install firebase-admin")
 
 from config.settings import get_settings
 from config.collections import get_collection_config
 from config.validation import validate_product_data
+from core.collection_stats import StatsDelta, summarize
 
 logger = logging.getLogger(__name__)
 
+# Firestore commits at most 500 writes per batch (server timestamps used to count
+# as extra writes), so bulk writes are committed in chunks below that
+BULK_WRITE_CHUNK_SIZE = 400
+
+# Document references per get_all() request
+BULK_READ_CHUNK_SIZE = 500
+
+# Attempts per batch commit on transient errors, with exponential backoff
+BULK_WRITE_MAX_ATTEMPTS = 4
+BULK_RETRY_BASE_DELAY = 0.5
+
 class FirestoreManager:
     """
     Firestore-based product database manager
@@ -36,6 +55,8 @@ class FirestoreManager:
         self.db = None
         self.settings = get_settings()
         self._initialized = False
+        # Collections whose stats document is known to hold a full rebuild
+        self._stats_built = set()
 
         if FIREBASE_AVAILABLE:
             self.setup_firestore()
@@ -46,6 +67,14 @@ class FirestoreManager:
             if self._initialized:
                 return True
 
+            # Local emulator: the client library connects to it without credentials
+            if self.settings.FIRESTORE_EMULATOR_HOST and not self.settings.GOOGLE_CREDENTIALS_JSON:
+                os.environ.setdefault('FIRESTORE_EMULATOR_HOST', self.settings.FIRESTORE_EMULATOR_HOST)
+                self.db = firestore.Client(project=self.settings.FIRESTORE_PROJECT_ID)
+                self._initialized = True
+                logger.info(f"✅ Firestore emulator connection established ({self.settings.FIRESTORE_EMULATOR_HOST})")
+                return True
+
             # Check if Firebase is already initialized
             if not firebase_admin._apps:
                 # Load credentials from settings (same as Google Sheets)
@@ -148,6 +177,76 @@ class FirestoreManager:
             logger.error(f"Error retrieving all products from {collection_name}: {e}")
             return {}
 
+    def iter_all_products(self, collection_name: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Yield every product in a collection as Firestore streams it
+
+        Unlike get_all_products nothing is collected, so exports can write rows
+        while later documents are still arriving. Documents come in document ID
+        order (string order of the row number), not numeric row order.
+
+        Yields:
+            (row_number, product data) tuples
+        """
+        if not self.db:
+            logger.error("Firestore not initialized")
+            return
+
+        for doc in self.get_collection_ref(collection_name).stream():
+            product_data = doc.to_dict() or {}
+            row_num = int(doc.id)  # Document ID is the row number
+            product_data['row_number'] = row_num
+            yield row_num, product_data
+
+    def _get_documents(self, collection_name: str, row_nums: List[int],
+                       field_paths: Optional[List[str]] = None) -> Dict[int, Dict[str, Any]]:
+        """Read several product documents with chunked get_all() calls (raises on failure)"""
+        collection_ref = self.get_collection_ref(collection_name)
+        unique_rows = list(dict.fromkeys(int(row_num) for row_num in row_nums))
+        products = {}
+
+        for start in range(0, len(unique_rows), BULK_READ_CHUNK_SIZE):
+            refs = [collection_ref.document(str(row_num))
+                    for row_num in unique_rows[start:start + BULK_READ_CHUNK_SIZE]]
+            for doc in self.db.get_all(refs, field_paths=field_paths):
+                if not doc.exists:
+                    continue
+                product_data = doc.to_dict() or {}
+                row_num = int(doc.id)
+                product_data['row_number'] = row_num
+                products[row_num] = product_data
+
+        return products
+
+    def get_products(self, collection_name: str, row_nums: List[int],
+                     field_paths: Optional[List[str]] = None) -> Dict[int, Dict[str, Any]]:
+        """
+        Get several products by row number in as few round trips as possible
+
+        Args:
+            collection_name: Collection name
+            row_nums: Row numbers to fetch
+            field_paths: Only return these fields (None = whole documents)
+
+        Returns:
+            Dict mapping row numbers to product data, for the products that exist
+        """
+        try:
+            if not self.db:
+                logger.error("Firestore not initialized")
+                return {}
+
+            start_time = time.time()
+            products = self._get_documents(collection_name, row_nums, field_paths)
+
+            elapsed_time = (time.time() - start_time) * 1000
+            logger.info(f"✅ Retrieved {len(products)}/{len(row_nums)} products from {collection_name} in {elapsed_time:.1f}ms")
+            return products
+
+        except Exception as e:
+            logger.error(f"Error retrieving products from {collection_name}: {e}")
+            return {}
+
     def add_product(self, collection_name: str, data: Dict[str, Any]) -> int:
         """
         Add a new product to Firestore
@@ -178,7 +277,9 @@ class FirestoreManager:
             logger.info(f"✅ Added product at row {next_row} to {collection_name}")
 
             # Update collection stats
-            self._update_collection_stats(collection_name)
+            delta = StatsDelta()
+            delta.add(data, self._stats_fields(collection_name))
+            self._update_collection_stats(collection_name, delta)
 
             return next_row
 
@@ -220,12 +321,26 @@ class FirestoreManager:
                 logger.info(f"No fields to update for row {row_num}")
                 return False
 
+            # Previous values of just the updated fields, for the stats delta
+            stats_fields = [field for field in self._stats_fields(collection_name) if field in update_data]
+            tracked = stats_fields + (['quality_score'] if 'quality_score' in update_data else [])
+            previous = {}
+            if tracked:
+                snapshot = product_ref.get(field_paths=tracked)
+                previous = (snapshot.to_dict() or {}) if snapshot.exists else {}
+
             # Add update timestamp
             update_data['updated_at'] = firestore.SERVER_TIMESTAMP
 
             # Update in Firestore
             product_ref.update(update_data)
 
+            if tracked:
+                delta = StatsDelta()
+                delta.remove(previous, stats_fields, count_product=False)
+                delta.add({field: update_data[field] for field in tracked}, stats_fields, count_product=False)
+                self._update_collection_stats(collection_name, delta)
+
             logger.info(f"✅ Updated {len(update_data)} fields in row {row_num} ({collection_name})")
             return True
 
@@ -237,8 +352,170 @@ class FirestoreManager:
         """Update a single field in a product"""
         return self.update_product_row(collection_name, row_num, {field: value}, overwrite_mode=True)
 
+    def bulk_write(self, collection_name: str, operations: List[Tuple[str, int, Optional[Dict[str, Any]]]],
+                   existing: Optional[Dict[int, Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Apply many product writes as chunked batch commits instead of one request each
+
+        Args:
+            collection_name: Collection name
+            operations: Writes applied in order, each ('set', row_num, data), ('update', row_num, fields)
+                or ('delete', row_num, None). 'set' on a new product stamps created_at like
+                add_product; 'update' sends only the given fields (a field mask) and fails for
+                products that don't exist
+            existing: Current data of every product the operations touch, if the caller has
+                already read it (products missing from it are treated as not existing).
+                When None, their stats fields are read in one get_all() pass
+
+        Returns:
+            Dict with successful/failed row numbers, error messages, a per-operation
+            results list (None or an error message) and the number of commits made
+        """
+        result = {'successful': [], 'failed': [], 'errors': [], 'results': [None] * len(operations), 'commits': 0}
+
+        def fail(index: int, row_num: int, error: str):
+            result['failed'].append(row_num)
+            result['errors'].append(f"Row {row_num}: {error}")
+            result['results'][index] = error
+
+        if not self.db:
+            for index, (_, row_num, _) in enumerate(operations):
+                fail(index, row_num, 'Firestore not initialized')
+            return result
+
+        start_time = time.time()
+        fields = self._stats_fields(collection_name)
+        tracked = fields + ['quality_score']
+
+        if existing is None:
+            try:
+                existing = self._get_documents(collection_name, [op[1] for op in operations], field_paths=tracked)
+            except Exception as e:
+                logger.error(f"Error reading products for bulk write to {collection_name}: {e}")
+                for index, (_, row_num, _) in enumerate(operations):
+                    fail(index, row_num, f"Could not read current product: {e}")
+                return result
+
+        # Track each product's state through the operations so stats deltas and
+        # existence checks stay right when a product is written more than once
+        current = {int(row_num): product for row_num, product in existing.items()}
+        planned = []
+        for index, (action, row_num, data) in enumerate(operations):
+            row_num = int(row_num)
+            previous = current.get(row_num)
+            delta = StatsDelta()
+
+            if action == 'delete':
+                if previous is not None:
+                    delta.remove(previous, fields)
+                current.pop(row_num, None)
+            elif action == 'set':
+                data = {**data, 'row_number': row_num, 'updated_at': firestore.SERVER_TIMESTAMP}
+                if previous is not None:
+                    delta.remove(previous, fields)
+                else:
+                    data['created_at'] = firestore.SERVER_TIMESTAMP
+                delta.add(data, fields)
+                current[row_num] = data
+            elif action == 'update':
+                if previous is None:
+                    fail(index, row_num, 'Product not found')
+                    continue
+                data = {**data, 'updated_at': firestore.SERVER_TIMESTAMP}
+                touched = [field for field in tracked if field in data]
+                if touched:
+                    changed = [field for field in fields if field in data]
+                    delta.remove({field: previous.get(field) for field in touched}, changed, count_product=False)
+                    delta.add({field: data[field] for field in touched}, changed, count_product=False)
+                current[row_num] = {**previous, **data}
+            else:
+                fail(index, row_num, f"Unknown bulk write action: {action}")
+                continue
+
+            planned.append((index, action, row_num, data, delta))
+
+        collection_ref = self.get_collection_ref(collection_name)
+        stats = StatsDelta()
+        highest_set_row = 0
+
+        for start in range(0, len(planned), BULK_WRITE_CHUNK_SIZE):
+            chunk = planned[start:start + BULK_WRITE_CHUNK_SIZE]
+            error = self._commit_batch(collection_ref, chunk)
+            result['commits'] += 1
+
+            if error is not None and len(chunk) > 1 and not isinstance(error, TRANSIENT_ERRORS):
+                # A batch commits atomically, so one bad write sinks the whole chunk;
+                # commit the writes on their own to find it and keep the rest
+                logger.warning(f"⚠️ Batch of {len(chunk)} writes to {collection_name} rejected ({error}), "
+                               f"retrying individually")
+                outcomes = []
+                for write in chunk:
+                    outcomes.append((write, self._commit_batch(collection_ref, [write])))
+                    result['commits'] += 1
+            else:
+                outcomes = [(write, error) for write in chunk]
+
+            for (index, action, row_num, data, delta), write_error in outcomes:
+                if write_error is not None:
+                    fail(index, row_num, str(write_error))
+                else:
+                    result['successful'].append(row_num)
+                    stats.merge(delta)
+                    if action == 'set':
+                        highest_set_row = max(highest_set_row, row_num)
+
+        self._update_collection_stats(collection_name, stats)
+        if highest_set_row:
+            self._raise_last_row_number(collection_name, highest_set_row)
+
+        elapsed_time = (time.time() - start_time) * 1000
+        logger.info(f"✅ Bulk wrote {len(result['successful'])} products to {collection_name} in "
+                    f"{result['commits']} commits ({len(result['failed'])} failed) in {elapsed_time:.1f}ms")
+        return result
+
+    def _commit_batch(self, collection_ref, writes: List[Tuple]) -> Optional[Exception]:
+        """Commit planned writes in one batch, retrying transient errors; returns the error if it failed"""
+        for attempt in range(1, BULK_WRITE_MAX_ATTEMPTS + 1):
+            batch = self.db.batch()
+            for _, action, row_num, data, _ in writes:
+                doc_ref = collection_ref.document(str(row_num))
+                if action == 'delete':
+                    batch.delete(doc_ref)
+                elif action == 'set':
+                    batch.set(doc_ref, data)
+                else:
+                    batch.update(doc_ref, data)
+
+            try:
+                batch.commit()
+                return None
+            except TRANSIENT_ERRORS as e:
+                if attempt == BULK_WRITE_MAX_ATTEMPTS:
+                    logger.error(f"❌ Batch commit of {len(writes)} writes failed after {attempt} attempts: {e}")
+                    return e
+                delay = BULK_RETRY_BASE_DELAY * 2 ** (attempt - 1)
+                logger.warning(f"⚠️ Batch commit of {len(writes)} writes failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+            except Exception as e:
+                return e
+
+    def _raise_last_row_number(self, collection_name: str, row_num: int):
+        """Keep last_row_number at or past rows written at explicit numbers, so add_product never reuses them"""
+        try:
+            stats_ref = self._stats_ref(collection_name)
+            snapshot = stats_ref.get(field_paths=['last_row_number'])
+            last_row = (snapshot.to_dict() or {}).get('last_row_number', 1) if snapshot.exists else 1
+            if row_num > last_row:
+                stats_ref.set({'last_row_number': row_num}, merge=True)
+        except Exception as e:
+            logger.error(f"Error updating last row number: {e}")
+
     def _get_next_row_number(self, collection_name: str) -> int:
         """Get the next available row number for a collection"""
+        return self._reserve_row_numbers(collection_name, 1)
+
+    def _reserve_row_numbers(self, collection_name: str, count: int) -> int:
+        """Claim `count` consecutive row numbers for new products, returning the first"""
         try:
             # Get metadata document that tracks the last row number
             metadata_ref = self.db.collection('collections').document(collection_name).collection('metadata').document('stats')
@@ -251,7 +528,7 @@ class FirestoreManager:
                 next_row = 2  # Start at row 2 (row 1 is headers in Google Sheets)
 
             # Update the metadata
-            metadata_ref.set({'last_row_number': next_row}, merge=True)
+            metadata_ref.set({'last_row_number': next_row + count - 1}, merge=True)
 
             return next_row
 
@@ -261,51 +538,96 @@ class FirestoreManager:
             products = self.get_all_products(collection_name)
             return max(products.keys()) + 1 if products else 2
 
-    def _update_collection_stats(self, collection_name: str):
-        """Update collection statistics"""
+    def _stats_ref(self, collection_name: str):
+        return self.db.collection('collections').document(collection_name).collection('metadata').document('stats')
+
+    def _stats_fields(self, collection_name: str) -> List[str]:
+        """Fields whose fill rate is tracked in the collection stats"""
         try:
-            products = self.get_all_products(collection_name)
-            total_products = len(products)
+            return list(get_collection_config(collection_name).column_mapping)
+        except ValueError:
+            return []
 
-            # Calculate quality stats
-            total_quality = sum(p.get('quality_score', 0) for p in products.values())
-            avg_quality = int(total_quality / total_products) if total_products > 0 else 0
+    def _stats_are_built(self, collection_name: str) -> bool:
+        """Whether the collection's aggregates have been built once (remembered once true)"""
+        if collection_name in self._stats_built:
+            return True
+        snapshot = self._stats_ref(collection_name).get(field_paths=['stats_built'])
+        if snapshot.exists and (snapshot.to_dict() or {}).get('stats_built'):
+            self._stats_built.add(collection_name)
+            return True
+        return False
 
-            complete_products = sum(1 for p in products.values() if p.get('quality_score', 0) >= 80)
+    def _update_collection_stats(self, collection_name: str, delta: StatsDelta):
+        """Apply a change to the collection's running statistics with atomic increments
 
-            stats = {
-                'total_products': total_products,
-                'complete_products': complete_products,
-                'missing_info_products': total_products - complete_products,
-                'avg_quality': avg_quality,
+        Skipped until the stats have been built once: increments on a document
+        without a base would turn the delta alone into the totals. The first
+        get_collection_stats() rebuilds them from the products instead.
+        """
+        try:
+            if not delta:
+                return
+            if not self._stats_are_built(collection_name):
+                return
+
+            update = {
+                'total_products': firestore.Increment(delta.total),
+                'quality_sum': firestore.Increment(delta.quality_sum),
+                'complete_products': firestore.Increment(delta.complete),
                 'last_updated': firestore.SERVER_TIMESTAMP
             }
+            field_changes = delta.changed_fields()
+            if field_changes:
+                update['field_fill_counts'] = {field: firestore.Increment(change)
+                                               for field, change in field_changes.items()}
 
             # Save stats
-            stats_ref = self.db.collection('collections').document(collection_name).collection('metadata').document('stats')
-            stats_ref.set(stats, merge=True)
+            self._stats_ref(collection_name).set(update, merge=True)
 
         except Exception as e:
             logger.error(f"Error updating collection stats: {e}")
 
+    def rebuild_collection_stats(self, collection_name: str) -> Dict[str, Any]:
+        """Recompute the collection's statistics by reading every product (one-off migration/repair)"""
+        products = self.get_all_products(collection_name)
+        fields = self._stats_fields(collection_name)
+        delta = StatsDelta()
+        for product in products.values():
+            delta.add(product, fields)
+
+        stats = {
+            'total_products': delta.total,
+            'quality_sum': delta.quality_sum,
+            'complete_products': delta.complete,
+            'field_fill_counts': delta.changed_fields(),
+            'stats_built': True,
+            'last_updated': firestore.SERVER_TIMESTAMP
+        }
+        # Listing the fields replaces field_fill_counts whole and leaves last_row_number alone
+        self._stats_ref(collection_name).set(stats, merge=list(stats))
+        self._stats_built.add(collection_name)
+        logger.info(f"📊 Rebuilt statistics for {len(products)} products in {collection_name}")
+        return stats
+
     def get_collection_stats(self, collection_name: str) -> Dict[str, Any]:
         """Get statistics for a collection"""
         try:
-            stats_ref = self.db.collection('collections').document(collection_name).collection('metadata').document('stats')
-            stats_doc = stats_ref.get()
+            stats_doc = self._stats_ref(collection_name).get()
+            stats = stats_doc.to_dict() if stats_doc.exists else {}
 
-            if stats_doc.exists:
-                return stats_doc.to_dict()
+            # Stats that were never built (including documents from before running
+            # aggregates existed, or increments applied without a base) are rebuilt once
+            if not stats.get('stats_built'):
+                stats.update(self.rebuild_collection_stats(collection_name))
             else:
-                # Calculate fresh if not cached
-                products = self.get_all_products(collection_name)
-                total = len(products)
-                return {
-                    'total_products': total,
-                    'complete_products': 0,
-                    'missing_info_products': total,
-                    'avg_quality': 0
-                }
+                self._stats_built.add(collection_name)
+
+            summary = summarize(int(stats.get('total_products', 0)), float(stats.get('quality_sum', 0)),
+                                int(stats.get('complete_products', 0)), stats.get('field_fill_counts'))
+            summary['avg_quality'] = summary['data_quality_percent']
+            summary['last_row_number'] = stats.get('last_row_number')
+            return summary
         except Exception as e:
             logger.error(f"Error getting collection stats: {e}")
             return {'total_products': 0, 'complete_products': 0, 'missing_info_products': 0, 'avg_quality': 0}
@@ -54,6 +54,13 @@ class GoogleAppsScriptManager:
         try:
             logger.info(f"🔄 Triggering Google Apps Script cleaning for {collection_name} row {row_number} after {operation_type}")
 
+            # The script reads the sheet, so queued write-behind updates must land first
+            from core.sheets_manager import get_sheets_manager
+            if not get_sheets_manager().flush_writes(collection_name):
+                logger.error(f"❌ Not triggering cleaning for {collection_name} row {row_number}: "
+                             f"queued sheet updates could not be written")
+                return {'success': False, 'error': 'Queued sheet updates could not be written'}
+
             config = self.script_configs.get(collection_name)
             if not config:
                 logger.warning(f"⚠️ No Google Apps Script config found for collection: {collection_name}")
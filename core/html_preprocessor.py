@@ -0,0 +1,473 @@
+"""
+HTML Preprocessing for LLM Extraction
+Turns a supplier page into a compact, deterministic product document -
+JSON-LD, Open Graph and microdata facts, specification tables as key: value
+lines, the finishes/sizes offered by variant pickers, and the main content
+text with navigation, footers and other
+boilerplate removed - so extraction prompts spend their tokens on product
+facts instead of markup, and facts deep in long pages aren't truncated away.
+Works on the shared page analysis without modifying its tree
+"""
+import re
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Iterable, Set
+
+from lxml import etree
+
+from config.settings import get_settings
+from core.llm_client import CHARS_PER_TOKEN
+from core.page_analysis import PageAnalysis, analyze_page
+
+logger = logging.getLogger(__name__)
+
+# Never part of the product content
+NON_CONTENT_TAGS = frozenset(['script', 'style', 'noscript', 'template', 'svg', 'canvas', 'iframe', 'object',
+                              'form', 'button', 'select', 'input', 'textarea', 'link', 'meta'])
+
+# Page chrome left out when no main-content container is found
+PAGE_CHROME_TAGS = ['header', 'nav', 'footer', 'aside']
+
+# Main-content containers, most specific first
+MAIN_CONTENT_XPATHS = ['//main', '//*[@role="main"]', '//*[contains(@itemtype, "schema.org/Product")]',
+                       '//*[@id="MainContent"]', '//*[@id="main-content"]', '//*[@id="content"]', '//article']
+
+# Elements that start a new line of page text
+BLOCK_TAGS = frozenset(['address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt', 'figcaption',
+                        'figure', 'footer', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'li', 'main',
+                        'nav', 'ol', 'p', 'pre', 'section', 'table', 'td', 'th', 'tr', 'ul'])
+
+# class/id tokens of blocks that are never product content
+BOILERPLATE_RE = re.compile(
+    r'(?:^|[-_\s])(?:nav|navbar|menu|megamenu|cookies?|consent|gdpr|newsletter|subscribe|signup|modal|popup|'
+    r'drawer|social|share|sharing|related|recommended|recommendations|upsell|cross-?sell|recently-viewed|'
+    r'minicart|mini-cart|cart-drawer|search|announcement|promo-bar|skip-link|visually-hidden|sr-only)(?:$|[-_\s])',
+    re.IGNORECASE
+)
+
+# class/id/name tokens of variant pickers (finish/colour swatches, size buttons)
+VARIANT_PICKER_RE = re.compile(r'swatch|variant|option|finish|colou?r|size|style', re.IGNORECASE)
+
+# Attributes that mark a swatch as the chosen one
+SELECTED_ATTRIBUTES = (('aria-pressed', 'true'), ('aria-checked', 'true'), ('aria-selected', 'true'))
+_SELECTED_CLASS_RE = re.compile(r'(?:^|[-_\s])(?:selected|active|is-selected|is-active|checked)(?:$|[-_\s])',
+                                re.IGNORECASE)
+
+# class/id tokens of lists that hold specifications
+SPEC_LIST_RE = re.compile(r'spec|attribute|technical|dimension|detail', re.IGNORECASE)
+
+# JSON-LD members that only add noise
+JSON_LD_SKIP_KEYS = {'@context', '@id', 'review', 'reviews', 'aggregateRating', 'potentialAction',
+                     'mainEntityOfPage', 'publisher', 'author', 'seller'}
+JSON_LD_MAX_LIST_ITEMS = 12
+
+# Pages that yield less main text than this are probably rendered client-side;
+# the caller falls back to sending the stripped HTML
+MIN_DOCUMENT_CHARS = 200
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_TAG_RE = re.compile(r'<[^>]+>')
+
+
+def estimate_text_tokens(text: str) -> int:
+    """Token estimate for prompt text (same ratio the shared OpenAI client uses)"""
+    return len(text or '') // CHARS_PER_TOKEN
+
+
+def _clean(text: Any) -> str:
+    """Collapse whitespace and drop embedded markup from a value"""
+    return _WHITESPACE_RE.sub(' ', _TAG_RE.sub(' ', str(text))).strip()
+
+
+def _dedupe(lines: Iterable[str]) -> List[str]:
+    seen = set()
+    unique = []
+    for line in lines:
+        if line and line not in seen:
+            seen.add(line)
+            unique.append(line)
+    return unique
+
+
+@dataclass
+class ProductDocument:
+    """Compact product document built from a page"""
+    text: str
+    input_tokens: int
+    output_tokens: int
+    sections: Dict[str, int] = field(default_factory=dict)  # Lines per section
+
+
+class HTMLPreprocessor:
+    """Builds product documents and keeps input/output token totals"""
+
+    def __init__(self, max_length: int = 24000):
+        """
+        Args:
+            max_length: Longest document in characters (page text is cut first)
+        """
+        self.max_length = max_length
+        self._lock = threading.Lock()
+        self.stats = {
+            'documents': 0,
+            'fallbacks': 0,
+            'input_tokens': 0,
+            'output_tokens': 0
+        }
+
+    def build(self, html_content: str, url: str = '') -> Optional[ProductDocument]:
+        """Build the product document for a page
+
+        Returns:
+            ProductDocument, or None when the page has too little static content
+            to work from (send the HTML instead)
+        """
+        page = analyze_page(html_content, url)
+
+        title = self._title(page)
+        structured = _dedupe(self._json_ld_lines(page) + self._meta_lines(page) + self._microdata_lines(page))
+
+        # Form controls are left out of the page text, but the variant choices they offer are product facts
+        variants = _dedupe(self._variant_lines(page))
+
+        # Subtrees left out of the document (the shared tree itself is never modified)
+        skipped = self._boilerplate(page)
+        container = self._main_container(page, skipped)
+        specs = _dedupe(variants + self._spec_lines(page, container, skipped))
+        text = _dedupe(self._text_lines(container, skipped))
+
+        input_tokens = estimate_text_tokens(html_content)
+        if sum(len(line) for line in structured + specs + text) < MIN_DOCUMENT_CHARS:
+            with self._lock:
+                self.stats['fallbacks'] += 1
+            logger.info(f"🧾 Too little static content for a product document from {url}, sending HTML")
+            return None
+
+        parts = []
+        if url:
+            parts.append(f"URL: {url}")
+        if title:
+            parts.append(f"Title: {title}")
+        for heading, lines in (('Structured data', structured), ('Specifications', specs), ('Page text', text)):
+            if lines:
+                parts.append(f"\n== {heading} ==")
+                parts.extend(lines)
+
+        document = '\n'.join(parts)
+        if len(document) > self.max_length:
+            document = document[:self.max_length] + "\n...[truncated]"
+
+        output_tokens = estimate_text_tokens(document)
+        with self._lock:
+            self.stats['documents'] += 1
+            self.stats['input_tokens'] += input_tokens
+            self.stats['output_tokens'] += output_tokens
+
+        saved = 100 - (output_tokens * 100 // input_tokens) if input_tokens else 0
+        logger.info(f"🧾 Product document for {url}: {input_tokens:,} → {output_tokens:,} tokens ({saved}% smaller)")
+        return ProductDocument(
+            text=document,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            sections={'structured': len(structured), 'specifications': len(specs), 'text': len(text)}
+        )
+
+    # ------------------------------------------------------------------
+    # Structured data
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _title(page: PageAnalysis) -> str:
+        h1 = next(page.root.iter('h1'), None)
+        if h1 is not None and page.text_of(h1):
+            return _clean(page.text_of(h1))
+        title = next(page.root.iter('title'), None)
+        if title is not None and title.text:
+            return _clean(title.text)
+        return ''
+
+    def _json_ld_lines(self, page: PageAnalysis) -> List[str]:
+        lines = []
+        for data in page.json_ld:
+            for item in self._json_ld_items(data):
+                item_type = item.get('@type')
+                item_type = ' '.join(item_type) if isinstance(item_type, list) else str(item_type or '')
+                if 'Product' in item_type or 'ProductGroup' in item_type:
+                    lines.extend(self._flatten(item))
+                elif 'BreadcrumbList' in item_type:
+                    names = []
+                    for entry in item.get('itemListElement', []):
+                        if isinstance(entry, dict):
+                            target = entry.get('item')
+                            names.append(_clean(entry.get('name') or (target.get('name', '') if isinstance(target, dict) else '')))
+                    if any(names):
+                        lines.append('breadcrumb: ' + ' > '.join(name for name in names if name))
+        return lines
+
+    @staticmethod
+    def _json_ld_items(data: Any) -> Iterable[Dict[str, Any]]:
+        """Top-level objects of a JSON-LD block, including those inside @graph"""
+        if isinstance(data, list):
+            for entry in data:
+                yield from HTMLPreprocessor._json_ld_items(entry)
+        elif isinstance(data, dict):
+            if '@graph' in data:
+                yield from HTMLPreprocessor._json_ld_items(data['@graph'])
+            else:
+                yield data
+
+    def _flatten(self, value: Any, prefix: str = '') -> List[str]:
+        """JSON-LD value as 'path: value' lines (PropertyValues as 'name: value unit')"""
+        if isinstance(value, dict):
+            if 'name' in value and 'value' in value and not isinstance(value['value'], (dict, list)):
+                unit = value.get('unitText') or value.get('unitCode') or ''
+                return [f"{_clean(value['name'])}: {_clean(value['value'])} {_clean(unit)}".rstrip()]
+            if 'value' in value and ('unitText' in value or 'unitCode' in value):
+                unit = value.get('unitText') or value.get('unitCode')
+                return [f"{prefix}: {_clean(value['value'])} {_clean(unit)}"]
+
+            lines = []
+            for key, member in value.items():
+                if key in JSON_LD_SKIP_KEYS or (key == '@type' and prefix):
+                    continue
+                lines.extend(self._flatten(member, f"{prefix}.{key}" if prefix else key))
+            return lines
+
+        if isinstance(value, list):
+            scalars = [item for item in value if not isinstance(item, (dict, list))]
+            if len(scalars) == len(value):
+                return [f"{prefix}: {', '.join(_clean(item) for item in value[:JSON_LD_MAX_LIST_ITEMS])}"] if value else []
+            lines = []
+            for item in value[:JSON_LD_MAX_LIST_ITEMS]:
+                lines.extend(self._flatten(item, prefix))
+            return lines
+
+        text = _clean(value)
+        return [f"{prefix}: {text}"] if text else []
+
+    @staticmethod
+    def _meta_lines(page: PageAnalysis) -> List[str]:
+        lines = []
+        for name, content in page.meta:
+            content = _clean(content)
+            if not content:
+                continue
+            if name.startswith(('og:', 'product:')) or name == 'description':
+                lines.append(f"{name}: {content}")
+        return lines
+
+    @staticmethod
+    def _microdata_lines(page: PageAnalysis) -> List[str]:
+        lines = []
+        for tag in page.root.xpath('//*[@itemprop]'):
+            # Reviews and ratings aren't product facts
+            scope = next((parent for parent in tag.iterancestors() if 'itemscope' in parent.attrib), None)
+            if scope is not None and re.search(r'Review|Rating', scope.get('itemtype', '')):
+                continue
+            if 'itemscope' in tag.attrib:
+                continue
+            value = tag.get('content') or tag.get('href') or tag.get('src') or page.text_of(tag)
+            value = _clean(value)
+            if value and len(value) <= 300:
+                lines.append(f"{tag.get('itemprop')}: {value}")
+        return lines
+
+    # ------------------------------------------------------------------
+    # Main content
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _boilerplate(page: PageAnalysis) -> Set[Any]:
+        """Non-content elements and blocks whose class/id mark them as boilerplate"""
+        skipped = set()
+        for tag in page.root.iter(etree.Element):
+            if tag.tag in NON_CONTENT_TAGS:
+                skipped.add(tag)
+            elif tag.tag not in ('html', 'body', 'main'):
+                marker = page.marker(tag)
+                if marker and BOILERPLATE_RE.search(marker):
+                    skipped.add(tag)
+        return skipped
+
+    def _variant_lines(self, page: PageAnalysis) -> List[str]:
+        """'Variant options: <name>: a, b (selected), c' for each select and swatch group outside page chrome"""
+        labels = {label.get('for'): _clean(page.text_of(label)) for label in page.root.iter('label') if label.get('for')}
+        groups: Dict[Any, Dict[str, Any]] = {}
+
+        for select in page.root.iter('select'):
+            if self._in_chrome(page, select):
+                continue
+            texts, options = [], []
+            for option in select.iter('option'):
+                text = _clean(page.text_of(option))
+                # Placeholders ("Choose an option") carry no value
+                if not text or option.get('value') == '':
+                    continue
+                texts.append(text)
+                options.append(f"{text} (selected)" if 'selected' in option.attrib else text)
+            # Quantity pickers aren't variants
+            if options and not all(text.isdigit() for text in texts):
+                name = labels.get(select.get('id')) or select.get('aria-label') or select.get('name') or ''
+                groups[select] = {'name': name, 'options': options}
+
+        for control in page.root.xpath('//button | //input[@type="radio"]'):
+            group = control.getparent()
+            if group is None or control.get('type') == 'submit' or self._in_chrome(page, control):
+                continue
+            fieldset = next(control.iterancestors('fieldset'), None)
+            if fieldset is not None:
+                group = fieldset
+            # Radio groups in a fieldset are option pickers; loose buttons and radios need a variant-ish marker
+            marker = ' '.join([page.marker(control), page.marker(group), control.get('name') or ''])
+            if not (control.tag == 'input' and fieldset is not None) and not VARIANT_PICKER_RE.search(marker):
+                continue
+
+            if control.tag == 'input':
+                text = labels.get(control.get('id')) or control.get('aria-label') or control.get('value') or ''
+                selected = 'checked' in control.attrib
+            else:
+                text = control.get('aria-label') or page.text_of(control) or control.get('title') or \
+                    control.get('data-value') or ''
+                selected = any(control.get(name) == value for name, value in SELECTED_ATTRIBUTES) or \
+                    bool(_SELECTED_CLASS_RE.search(control.get('class') or ''))
+            text = _clean(text)
+            if not text:
+                continue
+
+            entry = groups.setdefault(group, {'name': '', 'options': []})
+            if not entry['name']:
+                legend = next(group.iter('legend'), None) if group.tag == 'fieldset' else None
+                entry['name'] = _clean(page.text_of(legend)) if legend is not None else \
+                    group.get('aria-label') or group.get('data-option-name') or control.get('name') or ''
+            entry['options'].append(f"{text} (selected)" if selected else text)
+
+        lines = []
+        for entry in groups.values():
+            options = _dedupe(entry['options'])
+            if not options:
+                continue
+            name = _clean(entry['name'])
+            lines.append(f"Variant options: {name + ': ' if name else ''}{', '.join(options)}")
+        return lines
+
+    @staticmethod
+    def _in_chrome(page: PageAnalysis, tag) -> bool:
+        """Whether a tag sits in page chrome or a boilerplate block (header, cart drawer, newsletter...)"""
+        for element in (tag, *tag.iterancestors()):
+            if element.tag in PAGE_CHROME_TAGS:
+                return True
+            if element.tag not in ('html', 'body', 'main'):
+                marker = page.marker(element)
+                if marker and BOILERPLATE_RE.search(marker):
+                    return True
+        return False
+
+    @staticmethod
+    def _within(tag, skipped: Set[Any]) -> bool:
+        """Whether a tag or one of its ancestors is left out"""
+        return tag in skipped or any(parent in skipped for parent in tag.iterancestors())
+
+    def _main_container(self, page: PageAnalysis, skipped: Set[Any]):
+        for xpath in MAIN_CONTENT_XPATHS:
+            container = next(iter(page.root.xpath(xpath)), None)
+            if container is not None and not self._within(container, skipped) and \
+                    len(page.text_of(container)) >= MIN_DOCUMENT_CHARS:
+                return container
+
+        body = page.body
+        skipped.update(body.iter(*PAGE_CHROME_TAGS))
+        return body
+
+    def _spec_lines(self, page: PageAnalysis, container, skipped: Set[Any]) -> List[str]:
+        """Tables, definition lists and spec lists as key: value lines (left out of the page text after)"""
+        lines = []
+        for table in container.iter('table'):
+            if self._within(table, skipped):
+                continue
+            for row in table.iter('tr'):
+                cells = [_clean(page.text_of(cell)) for cell in row if cell.tag in ('th', 'td')]
+                cells = [cell for cell in cells if cell]
+                if len(cells) >= 2:
+                    lines.append(f"{cells[0]}: {' | '.join(cells[1:])}")
+                elif cells:
+                    lines.append(cells[0])
+            skipped.add(table)
+
+        for dl in container.iter('dl'):
+            if self._within(dl, skipped):
+                continue
+            for dt in dl.iter('dt'):
+                dd = next(dt.itersiblings('dd'), None)
+                key = _clean(page.text_of(dt))
+                value = _clean(page.text_of(dd)) if dd is not None else ''
+                if key and value:
+                    lines.append(f"{key}: {value}")
+            skipped.add(dl)
+
+        for spec_list in container.iter('ul', 'ol'):
+            if self._within(spec_list, skipped) or not SPEC_LIST_RE.search(page.marker(spec_list)):
+                continue
+            for item in spec_list.iter('li'):
+                text = _clean(page.text_of(item))
+                if text:
+                    lines.append(text)
+            skipped.add(spec_list)
+        return lines
+
+    @staticmethod
+    def _text_lines(container, skipped: Set[Any]) -> List[str]:
+        """Text of the container outside skipped subtrees, one line per block element"""
+        lines = []
+        current = []
+
+        def flush():
+            if current:
+                lines.append(_clean(''.join(current)))
+                current.clear()
+
+        walker = etree.iterwalk(container, events=('start', 'end', 'comment', 'pi'))
+        for event, tag in walker:
+            if event in ('comment', 'pi'):
+                if tag.tail:
+                    current.append(tag.tail)
+                continue
+            if event == 'start':
+                if tag in skipped and tag is not container:
+                    walker.skip_subtree()
+                    continue
+                if tag.tag in BLOCK_TAGS:
+                    flush()
+                if tag.text:
+                    current.append(tag.text)
+            else:
+                if tag.tag in BLOCK_TAGS:
+                    flush()
+                if tag is not container and tag.tail:
+                    current.append(tag.tail)
+        flush()
+        return lines
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        stats['tokens_saved'] = stats['input_tokens'] - stats['output_tokens']
+        stats['reduction_percent'] = round(100 * stats['tokens_saved'] / stats['input_tokens'], 1) \
+            if stats['input_tokens'] else 0.0
+        return stats
+
+
+# Global instance
+_html_preprocessor = None
+_html_preprocessor_lock = threading.Lock()
+
+
+def get_html_preprocessor() -> HTMLPreprocessor:
+    """Get the global HTML preprocessor instance"""
+    global _html_preprocessor
+    if _html_preprocessor is None:
+        with _html_preprocessor_lock:
+            if _html_preprocessor is None:
+                settings = get_settings()
+                _html_preprocessor = HTMLPreprocessor(settings.API_CONFIG['PRODUCT_DOCUMENT_MAX_LENGTH'])
+    return _html_preprocessor
@@ -0,0 +1,467 @@
+"""
+Shared HTTP Fetch Layer
+Pooled keep-alive sessions, per-host concurrency limits, in-flight request
+de-duplication and an on-disk content-addressed body store with
+ETag/Last-Modified revalidation and a size bound (LRU eviction) for supplier
+pages and spec-sheet PDFs
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from config.settings import get_settings
+from core.sqlite_pool import get_pool
+
+logger = logging.getLogger(__name__)
+
+# Response headers that describe the transfer rather than the stored body
+HOP_HEADERS = {'content-encoding', 'transfer-encoding', 'connection', 'keep-alive', 'set-cookie'}
+
+# Request headers that change the response, so identical URLs with different values are not shared in flight
+VARY_HEADERS = ('Accept', 'Range')
+
+# Check the size bound every N stored bodies rather than on every write
+EVICTION_CHECK_INTERVAL = 50
+
+
+class _InFlight:
+    """A fetch other threads can wait on instead of issuing the same request"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.response = None
+        self.error = None
+
+
+class HTTPFetcher:
+    """GET/HEAD with a shared session and a revalidating on-disk cache
+
+    Successful GET bodies are stored once per SHA-256 under `cache_dir` and
+    indexed by URL. A cached URL younger than `max_age` seconds is served
+    without touching the network; an older one is revalidated with
+    If-None-Match / If-Modified-Since and a 304 serves the stored body.
+    A response that varies on Accept is only served to requests with the
+    same Accept header it was fetched with.
+    Once the stored bodies exceed `max_bytes`, the least recently used ones
+    are dropped along with every URL that points at them.
+    """
+
+    def __init__(self, cache_dir: str, max_age: float = 86400, max_per_host: int = 4, pool_size: int = 20,
+                 max_bytes: int = 500 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.body_dir = os.path.join(cache_dir, 'bodies')
+        os.makedirs(self.body_dir, exist_ok=True)
+        self.max_age = max_age
+        self.max_per_host = max_per_host
+        self.max_bytes = max_bytes
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+
+        self._pool = get_pool(os.path.join(cache_dir, 'index.db'))
+        self._lock = threading.Lock()
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._inflight: Dict[Tuple[str, ...], _InFlight] = {}
+        self._writes_since_check = 0
+        self.stats = {
+            'requests': 0,
+            'cache_hits': 0,
+            'revalidated': 0,
+            'network_fetches': 0,
+            'deduplicated': 0,
+            'bytes_downloaded': 0,
+            'bytes_from_cache': 0,
+            'evictions': 0
+        }
+        self._init_index()
+
+    def _init_index(self):
+        conn = self._pool.connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS http_cache (
+                url TEXT PRIMARY KEY,
+                final_url TEXT,
+                body_hash TEXT NOT NULL,
+                headers TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                size_bytes INTEGER NOT NULL DEFAULT 0,
+                last_accessed REAL NOT NULL DEFAULT 0,
+                accept TEXT
+            )
+        ''')
+        # Indexes created before the size bound have no size/access columns
+        cursor.execute('PRAGMA table_info(http_cache)')
+        columns = {row[1] for row in cursor.fetchall()}
+        if 'size_bytes' not in columns:
+            cursor.execute('ALTER TABLE http_cache ADD COLUMN size_bytes INTEGER NOT NULL DEFAULT 0')
+            cursor.execute('SELECT DISTINCT body_hash FROM http_cache')
+            sizes = []
+            for (body_hash,) in cursor.fetchall():
+                try:
+                    sizes.append((os.path.getsize(self._body_path(body_hash)), body_hash))
+                except OSError:
+                    pass
+            cursor.executemany('UPDATE http_cache SET size_bytes = ? WHERE body_hash = ?', sizes)
+        if 'last_accessed' not in columns:
+            cursor.execute('ALTER TABLE http_cache ADD COLUMN last_accessed REAL NOT NULL DEFAULT 0')
+            cursor.execute('UPDATE http_cache SET last_accessed = fetched_at')
+        if 'accept' not in columns:
+            cursor.execute('ALTER TABLE http_cache ADD COLUMN accept TEXT')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_http_cache_body ON http_cache(body_hash)')
+        conn.commit()
+        conn.close()
+
+    def _count(self, stat: str, amount: int = 1):
+        with self._lock:
+            self.stats[stat] += amount
+
+    @contextmanager
+    def _host_slot(self, url: str):
+        """Limit concurrent connections to one host"""
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.max_per_host)
+                self._host_slots[host] = slot
+        with slot:
+            yield
+
+    def _body_path(self, body_hash: str) -> str:
+        return os.path.join(self.body_dir, body_hash[:2], body_hash)
+
+    def _load_entry(self, url: str) -> Optional[Dict[str, Any]]:
+        conn = self._pool.connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT final_url, body_hash, headers, etag, last_modified, fetched_at, accept
+            FROM http_cache WHERE url = ?
+        ''', (url,))
+        row = cursor.fetchone()
+        conn.close()
+        if not row:
+            return None
+        return {
+            'final_url': row[0],
+            'body_hash': row[1],
+            'headers': json.loads(row[2]) if row[2] else {},
+            'etag': row[3],
+            'last_modified': row[4],
+            'fetched_at': row[5],
+            'accept': row[6]
+        }
+
+    @staticmethod
+    def _serves(entry: Dict[str, Any], headers: Optional[Dict[str, str]]) -> bool:
+        """Whether a stored entry is the representation a request with these headers asks for"""
+        vary = CaseInsensitiveDict(entry['headers']).get('Vary', '')
+        varies_on = {name.strip().lower() for name in vary.split(',')}
+        if '*' in varies_on:
+            return False
+        if 'accept' not in varies_on:
+            return True
+        return (entry['accept'] or '') == CaseInsensitiveDict(headers or {}).get('Accept', '')
+
+    def _read_body(self, body_hash: str) -> Optional[bytes]:
+        try:
+            with open(self._body_path(body_hash), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _store(self, url: str, response: requests.Response, accept: Optional[str] = None):
+        """Write the body (once per content hash) and index it under the URL"""
+        body = response.content
+        body_hash = hashlib.sha256(body).hexdigest()
+        path = self._body_path(body_hash)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in HOP_HEADERS}
+        headers['Content-Length'] = str(len(body))
+
+        now = time.time()
+        conn = self._pool.connect()
+        cursor = conn.cursor()
+        cursor.execute('SELECT body_hash FROM http_cache WHERE url = ?', (url,))
+        previous = cursor.fetchone()
+        cursor.execute('''
+            INSERT OR REPLACE INTO http_cache (
+                url, final_url, body_hash, headers, etag, last_modified, fetched_at, size_bytes, last_accessed, accept
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (url, response.url, body_hash, json.dumps(headers),
+              response.headers.get('ETag'), response.headers.get('Last-Modified'), now, len(body), now, accept))
+        conn.commit()
+        # A changed page leaves its old body behind unless another URL still shares it
+        if previous and previous[0] != body_hash:
+            self._remove_unreferenced(cursor, [previous[0]])
+        conn.close()
+
+        with self._lock:
+            self._writes_since_check += 1
+            check = self._writes_since_check >= EVICTION_CHECK_INTERVAL
+            if check:
+                self._writes_since_check = 0
+        if check:
+            self.evict()
+
+    def _remove_unreferenced(self, cursor, body_hashes) -> int:
+        """Delete body files no URL in the index points at any more"""
+        removed = 0
+        for body_hash in body_hashes:
+            cursor.execute('SELECT 1 FROM http_cache WHERE body_hash = ? LIMIT 1', (body_hash,))
+            if cursor.fetchone():
+                continue
+            try:
+                os.remove(self._body_path(body_hash))
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def _touch(self, url: str, revalidated: bool = False):
+        """Record a read (and, after a 304, a fresh revalidation) of a stored URL"""
+        now = time.time()
+        conn = self._pool.connect()
+        cursor = conn.cursor()
+        if revalidated:
+            cursor.execute('UPDATE http_cache SET fetched_at = ?, last_accessed = ? WHERE url = ?', (now, now, url))
+        else:
+            cursor.execute('UPDATE http_cache SET last_accessed = ? WHERE url = ?', (now, url))
+        conn.commit()
+        conn.close()
+
+    def evict(self) -> int:
+        """Drop least recently used bodies until the store is under its size bound
+
+        Returns:
+            Number of bodies evicted
+        """
+        try:
+            conn = self._pool.connect()
+            cursor = conn.cursor()
+            # Bodies are shared between URLs: size and recency are per body, not per URL
+            cursor.execute('''
+                SELECT body_hash, MAX(size_bytes), MAX(last_accessed) FROM http_cache
+                GROUP BY body_hash ORDER BY MAX(last_accessed)
+            ''')
+            bodies = cursor.fetchall()
+            total = sum(size for _, size, _ in bodies)
+            if total <= self.max_bytes:
+                conn.close()
+                return 0
+
+            # Evict down to 90% so the next few writes don't immediately trigger another pass
+            target = total - int(self.max_bytes * 0.9)
+            victims = []
+            freed = 0
+            for body_hash, size, _ in bodies:
+                if freed >= target:
+                    break
+                victims.append(body_hash)
+                freed += size
+
+            cursor.executemany('DELETE FROM http_cache WHERE body_hash = ?', [(h,) for h in victims])
+            conn.commit()
+            self._remove_unreferenced(cursor, victims)
+            conn.close()
+
+            with self._lock:
+                self.stats['evictions'] += len(victims)
+            logger.info(f"🧹 Evicted {len(victims)} fetched bodies ({freed / 1024 / 1024:.1f}MB) from cache")
+            return len(victims)
+
+        except Exception as e:
+            logger.warning(f"⚠️ Fetch cache eviction failed: {e}")
+            return 0
+
+    def _cached_response(self, url: str, entry: Dict[str, Any], body: bytes) -> requests.Response:
+        """Rebuild a requests.Response from a stored entry"""
+        response = requests.Response()
+        response.status_code = 200
+        response._content = body
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.url = entry['final_url'] or url
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.from_cache = True
+        self._count('bytes_from_cache', len(body))
+        return response
+
+    @staticmethod
+    def _inflight_key(url: str, headers: Dict[str, str]) -> Tuple[str, ...]:
+        """URL plus the request headers that change what comes back"""
+        headers = CaseInsensitiveDict(headers)
+        return (url,) + tuple(headers.get(name, '') for name in VARY_HEADERS)
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, timeout: float = 30,
+            max_age: Optional[float] = None, use_cache: bool = True) -> requests.Response:
+        """GET a URL through the cache
+
+        Args:
+            url: URL to fetch
+            headers: Request headers
+            timeout: Request timeout in seconds
+            max_age: Serve cached bodies younger than this without revalidating (default: fetcher max_age)
+            use_cache: False to bypass the body store entirely
+
+        Returns:
+            requests.Response (with a `from_cache` attribute)
+        """
+        self._count('requests')
+        headers = dict(headers or {})
+
+        if not use_cache:
+            return self._network_get(url, headers, timeout)
+
+        key = self._inflight_key(url, headers)
+        with self._lock:
+            inflight = self._inflight.get(key)
+            owner = inflight is None
+            if owner:
+                inflight = _InFlight()
+                self._inflight[key] = inflight
+
+        if not owner:
+            self._count('deduplicated')
+            inflight.event.wait()
+            if inflight.error is not None:
+                raise inflight.error
+            return inflight.response
+
+        try:
+            # Partial content is shared with identical in-flight requests but never stored
+            if 'Range' in CaseInsensitiveDict(headers):
+                inflight.response = self._network_get(url, headers, timeout)
+            else:
+                inflight.response = self._cached_get(url, headers, timeout,
+                                                     self.max_age if max_age is None else max_age)
+            return inflight.response
+        except Exception as e:
+            inflight.error = e
+            raise
+        finally:
+            inflight.event.set()
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _cached_get(self, url: str, headers: Dict[str, str], timeout: float, max_age: float) -> requests.Response:
+        entry = self._load_entry(url)
+        if entry and not self._serves(entry, headers):
+            # Stored for a different Accept: fetch this representation (it replaces the stored one)
+            entry = None
+        body = self._read_body(entry['body_hash']) if entry else None
+
+        if body is not None:
+            if time.time() - entry['fetched_at'] < max_age:
+                self._count('cache_hits')
+                self._touch(url)
+                return self._cached_response(url, entry, body)
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        response = self._network_get(url, headers, timeout)
+
+        if response.status_code == 304 and body is not None:
+            self._count('revalidated')
+            self._touch(url, revalidated=True)
+            return self._cached_response(url, entry, body)
+
+        if response.status_code == 200:
+            try:
+                self._store(url, response, CaseInsensitiveDict(headers).get('Accept'))
+            except Exception as e:
+                logger.warning(f"⚠️ Could not cache response for {url}: {e}")
+        return response
+
+    def _network_get(self, url: str, headers: Dict[str, str], timeout: float) -> requests.Response:
+        with self._host_slot(url):
+            response = self._session.get(url, headers=headers, timeout=timeout)
+        self._count('network_fetches')
+        self._count('bytes_downloaded', len(response.content))
+        response.from_cache = False
+        return response
+
+    def head(self, url: str, headers: Optional[Dict[str, str]] = None, timeout: float = 10,
+             allow_redirects: bool = True) -> requests.Response:
+        """HEAD a URL, answered from the cache when a fresh copy is stored"""
+        self._count('requests')
+        entry = self._load_entry(url)
+        fresh = entry and self._serves(entry, headers) and time.time() - entry['fetched_at'] < self.max_age
+        if fresh and os.path.exists(self._body_path(entry['body_hash'])):
+            self._count('cache_hits')
+            self._touch(url)
+            response = requests.Response()
+            response.status_code = 200
+            response._content = b''
+            response.headers = CaseInsensitiveDict(entry['headers'])
+            response.url = entry['final_url'] or url
+            response.from_cache = True
+            return response
+
+        with self._host_slot(url):
+            response = self._session.head(url, headers=headers, timeout=timeout, allow_redirects=allow_redirects)
+        self._count('network_fetches')
+        response.from_cache = False
+        return response
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        conn = self._pool.connect()
+        cursor = conn.cursor()
+        cursor.execute('SELECT COUNT(*), COUNT(DISTINCT body_hash) FROM http_cache')
+        stats['cached_urls'], stats['stored_bodies'] = cursor.fetchone()
+        cursor.execute('''
+            SELECT COALESCE(SUM(size_bytes), 0)
+            FROM (SELECT MAX(size_bytes) AS size_bytes FROM http_cache GROUP BY body_hash)
+        ''')
+        stats['size_bytes'] = cursor.fetchone()[0]
+        conn.close()
+        stats['max_bytes'] = self.max_bytes
+        stats['hit_rate'] = round(
+            (stats['cache_hits'] + stats['revalidated'] + stats['deduplicated']) / stats['requests'], 3
+        ) if stats['requests'] else 0.0
+        return stats
+
+
+# Global instance
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+
+def get_fetcher() -> HTTPFetcher:
+    """Get the global fetcher instance"""
+    global _fetcher
+    if _fetcher is None:
+        with _fetcher_lock:
+            if _fetcher is None:
+                settings = get_settings()
+                _fetcher = HTTPFetcher(
+                    settings.FETCH_CACHE_DIR,
+                    max_age=settings.FETCH_CACHE_MAX_AGE,
+                    max_per_host=settings.FETCH_MAX_PER_HOST,
+                    max_bytes=settings.FETCH_CACHE_MAX_MB * 1024 * 1024
+                )
+    return _fetcher
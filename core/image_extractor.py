@@ -4,11 +4,13 @@ Extracts product images from supplier URLs using og:image meta tags
 """
 
 import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 import logging
 from typing import Optional
 
+from core.http_fetcher import get_fetcher
+from core.page_analysis import analyze_page
+
 logger = logging.getLogger(__name__)
 
 
@@ -29,46 +31,36 @@ def extract_og_image(url: str, timeout: int = 10) -> Optional[str]:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
 
-        response = requests.get(url, headers=headers, timeout=timeout)
+        response = get_fetcher().get(url, headers=headers, timeout=timeout)
         response.raise_for_status()
 
-        soup = BeautifulSoup(response.content, 'html.parser')
+        # Shared with AI extraction and image analysis of the same page
+        page = analyze_page(response.text, url)
 
         # Try og:image first (most common)
-        # Try both 'og:image' and 'og:image:url' (some sites use the latter)
-        og_image = soup.find('meta', property='og:image') or soup.find('meta', property='og:image:url')
-        if og_image and og_image.get('content'):
-            image_url = og_image['content']
+        # Try both 'og:image' and 'og:image:url' (some sites use the latter),
+        # then twitter:image (as property or name) as fallback
+        image_url = page.meta_content('og:image', 'og:image:url', 'twitter:image')
+        if image_url:
             # Make absolute URL if relative
             return urljoin(url, image_url)
 
-        # Try twitter:image as fallback
-        twitter_image = soup.find('meta', property='twitter:image')
-        if twitter_image and twitter_image.get('content'):
-            image_url = twitter_image['content']
-            return urljoin(url, image_url)
-
-        # Try name="twitter:image" as another fallback
-        twitter_image_name = soup.find('meta', attrs={'name': 'twitter:image'})
-        if twitter_image_name and twitter_image_name.get('content'):
-            image_url = twitter_image_name['content']
-            return urljoin(url, image_url)
-
         # Try to find main product image in img tags as final fallback
         # Look for images with specific classes or in specific containers
         product_image = None
 
         # Try common product image patterns
         for selector in [
-            'img[alt*="product"]',  # Alt text contains "product"
-            'img[class*="product"]',  # Class contains "product"
-            'img[src*="wp-content/uploads"]',  # WordPress uploads (common for WooCommerce)
-            'div[class*="product"] img:first-of-type',  # First image in product div
-            'figure img',  # Images in figure tags
+            '//img[contains(@alt, "product")]',  # Alt text contains "product"
+            '//img[contains(@class, "product")]',  # Class contains "product"
+            '//img[contains(@src, "wp-content/uploads")]',  # WordPress uploads (common for WooCommerce)
+            '//div[contains(@class, "product")]//img[not(preceding-sibling::img)]',  # First image in product div
+            '//figure//img',  # Images in figure tags
         ]:
-            img = soup.select_one(selector)
-            if img and img.get('src'):
-                src = img['src']
+            matches = page.root.xpath(selector)
+            img = matches[0] if matches else None
+            if img is not None and img.get('src'):
+                src = img.get('src')
                 src_lower = src.lower()
                 # Filter out SVG, icons, and logos
                 if not src_lower.endswith('.svg') and 'icon' not in src_lower and 'logo' not in src_lower:
@@ -78,10 +70,9 @@ def extract_og_image(url: str, timeout: int = 10) -> Optional[str]:
 
         # Final fallback: Find the largest image on the page that's not a logo/icon
         # This works for sites without semantic markup
-        all_images = soup.find_all('img')
         candidate_images = []
 
-        for img in all_images:
+        for img in page.images:
             src = img.get('src') or img.get('data-src')
             if not src:
                 continue
@@ -97,14 +88,9 @@ def extract_og_image(url: str, timeout: int = 10) -> Optional[str]:
                 continue
 
             # Check if image is in a brand/logo container
-            parent = img.find_parent(['div', 'span', 'a'])
-            if parent:
-                # Get class as list and id as string, combine them properly
-                parent_classes = parent.get('class', [])
-                if isinstance(parent_classes, list):
-                    parent_classes = ' '.join(parent_classes)
-                parent_id = parent.get('id', '')
-                parent_attrs = f"{parent_classes} {parent_id}".lower()
+            parent = next(img.iterancestors('div', 'span', 'a'), None)
+            if parent is not None:
+                parent_attrs = page.marker(parent).lower()
 
                 if any(brand_indicator in parent_attrs for brand_indicator in ['brand', 'logo', 'manufacturer']):
                     continue
@@ -0,0 +1,269 @@
+"""
+Persistent LLM Response Cache
+SQLite-backed cache of OpenAI completions keyed by model, prompt template
+version, collection and a hash of the normalized source content, with LRU
+size bounding and hit/miss/token-savings counters
+"""
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+from config.settings import get_settings
+from core.sqlite_pool import get_pool
+
+logger = logging.getLogger(__name__)
+
+# Bump when extraction/generation prompt templates change so old responses stop matching
+PROMPT_TEMPLATE_VERSION = 1
+
+# Check the total cache size every N writes rather than on each one
+EVICTION_CHECK_INTERVAL = 50
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_source(content: str) -> str:
+    """Collapse whitespace so cosmetic re-renders of a page hash the same"""
+    return _WHITESPACE_RE.sub(' ', content or '').strip()
+
+
+def hash_source(content: str) -> str:
+    """SHA-256 of the normalized source content"""
+    return hashlib.sha256(normalize_source(content).encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    """Durable cache of model responses"""
+
+    def __init__(self, db_path: str = 'llm_cache.db', max_bytes: int = 200 * 1024 * 1024, enabled: bool = True):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._pool = get_pool(db_path)
+        self._lock = threading.Lock()
+        self._writes_since_check = 0
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'prompt_tokens_saved': 0,
+            'completion_tokens_saved': 0
+        }
+        self._init_database()
+
+    def _init_database(self):
+        conn = self._pool.connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                cache_key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                template_version INTEGER NOT NULL,
+                collection TEXT,
+                source_hash TEXT NOT NULL,
+                response TEXT NOT NULL,
+                prompt_tokens INTEGER DEFAULT 0,
+                completion_tokens INTEGER DEFAULT 0,
+                size_bytes INTEGER NOT NULL,
+                hit_count INTEGER DEFAULT 0,
+                created_at REAL NOT NULL,
+                last_accessed REAL NOT NULL
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_llm_last_accessed ON llm_responses(last_accessed)')
+        conn.commit()
+        conn.close()
+
+    def make_key(self, model: str, collection_name: Optional[str], source: str,
+                 params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Build the cache key for a request
+
+        Args:
+            model: Model name
+            collection_name: Collection the request is for (None if not collection-specific)
+            source: Full prompt/content sent to the model
+            params: Other request parameters that change the output (max_tokens, temperature...)
+
+        Returns:
+            Key dict to pass to get()/put()
+        """
+        source_hash = hash_source(source)
+        key_material = json.dumps([model, PROMPT_TEMPLATE_VERSION, collection_name or '', source_hash,
+                                   params or {}], sort_keys=True)
+        return {
+            'cache_key': hashlib.sha256(key_material.encode('utf-8')).hexdigest(),
+            'model': model,
+            'collection': collection_name,
+            'source_hash': source_hash
+        }
+
+    def get(self, key: Dict[str, Any], bypass: bool = False) -> Optional[str]:
+        """Return the cached response text, or None on a miss (or when bypassed/disabled)"""
+        if not self.enabled or bypass:
+            return None
+
+        try:
+            conn = self._pool.connect()
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT response, prompt_tokens, completion_tokens FROM llm_responses WHERE cache_key = ?
+            ''', (key['cache_key'],))
+            row = cursor.fetchone()
+
+            if not row:
+                conn.close()
+                with self._lock:
+                    self.stats['misses'] += 1
+                return None
+
+            cursor.execute('''
+                UPDATE llm_responses SET last_accessed = ?, hit_count = hit_count + 1 WHERE cache_key = ?
+            ''', (time.time(), key['cache_key']))
+            conn.commit()
+            conn.close()
+
+            with self._lock:
+                self.stats['hits'] += 1
+                self.stats['prompt_tokens_saved'] += row[1] or 0
+                self.stats['completion_tokens_saved'] += row[2] or 0
+            logger.info(f"♻️ LLM cache hit for {key['model']} ({key['collection'] or 'no collection'})")
+            return row[0]
+
+        except Exception as e:
+            logger.warning(f"⚠️ LLM cache read failed: {e}")
+            return None
+
+    def put(self, key: Dict[str, Any], response: str, usage: Optional[Dict[str, Any]] = None) -> bool:
+        """Store a response
+
+        Args:
+            key: Key from make_key()
+            response: Response text to cache
+            usage: OpenAI `usage` block, recorded for token-savings accounting
+
+        Returns:
+            True if stored
+        """
+        if not self.enabled or response is None:
+            return False
+
+        usage = usage or {}
+        now = time.time()
+        try:
+            conn = self._pool.connect()
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT OR REPLACE INTO llm_responses (
+                    cache_key, model, template_version, collection, source_hash, response,
+                    prompt_tokens, completion_tokens, size_bytes, hit_count, created_at, last_accessed
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0, ?, ?)
+            ''', (key['cache_key'], key['model'], PROMPT_TEMPLATE_VERSION, key['collection'], key['source_hash'],
+                  response, usage.get('prompt_tokens', 0), usage.get('completion_tokens', 0),
+                  len(response.encode('utf-8')), now, now))
+            conn.commit()
+            conn.close()
+
+            with self._lock:
+                self.stats['stores'] += 1
+                self._writes_since_check += 1
+                check = self._writes_since_check >= EVICTION_CHECK_INTERVAL
+                if check:
+                    self._writes_since_check = 0
+            if check:
+                self.evict()
+            return True
+
+        except Exception as e:
+            logger.warning(f"⚠️ LLM cache write failed: {e}")
+            return False
+
+    def evict(self) -> int:
+        """Drop least recently used responses until the cache is under its size bound
+
+        Returns:
+            Number of responses evicted
+        """
+        try:
+            conn = self._pool.connect()
+            cursor = conn.cursor()
+            cursor.execute('SELECT COALESCE(SUM(size_bytes), 0) FROM llm_responses')
+            total = cursor.fetchone()[0]
+            if total <= self.max_bytes:
+                conn.close()
+                return 0
+
+            # Evict down to 90% so the next few writes don't immediately trigger another pass
+            target = total - int(self.max_bytes * 0.9)
+            cursor.execute('SELECT cache_key, size_bytes FROM llm_responses ORDER BY last_accessed')
+            victims = []
+            freed = 0
+            for cache_key, size_bytes in cursor.fetchall():
+                if freed >= target:
+                    break
+                victims.append((cache_key,))
+                freed += size_bytes
+
+            cursor.executemany('DELETE FROM llm_responses WHERE cache_key = ?', victims)
+            conn.commit()
+            conn.close()
+
+            with self._lock:
+                self.stats['evictions'] += len(victims)
+            logger.info(f"🧹 Evicted {len(victims)} LLM responses ({freed / 1024 / 1024:.1f}MB) from cache")
+            return len(victims)
+
+        except Exception as e:
+            logger.warning(f"⚠️ LLM cache eviction failed: {e}")
+            return 0
+
+    def clear(self) -> bool:
+        """Remove every cached response"""
+        try:
+            conn = self._pool.connect()
+            conn.execute('DELETE FROM llm_responses')
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            logger.error(f"❌ Failed to clear LLM cache: {e}")
+            return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss and token-savings counters plus current size"""
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        stats['enabled'] = self.enabled
+        stats['max_bytes'] = self.max_bytes
+        try:
+            conn = self._pool.connect()
+            cursor = conn.cursor()
+            cursor.execute('SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM llm_responses')
+            stats['entries'], stats['size_bytes'] = cursor.fetchone()
+            conn.close()
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read LLM cache size: {e}")
+        return stats
+
+
+# Global instance
+_llm_cache = None
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """Get the global LLM response cache instance"""
+    global _llm_cache
+    if _llm_cache is None:
+        settings = get_settings()
+        _llm_cache = LLMResponseCache(
+            settings.LLM_CACHE_DB,
+            max_bytes=settings.LLM_CACHE_MAX_MB * 1024 * 1024,
+            enabled=settings.LLM_CACHE_ENABLED
+        )
+    return _llm_cache
@@ -0,0 +1,335 @@
+"""
+Shared OpenAI Client
+One pooled HTTP session for every chat-completions call, paced by request
+and token buckets shared across threads and worker processes, with
+exponential backoff that honours Retry-After, priority lanes so interactive
+calls go ahead of bulk jobs, and per-call latency/token metrics
+"""
+import time
+import random
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config.settings import get_settings
+from core.rate_limiter import SharedTokenBuckets
+
+logger = logging.getLogger(__name__)
+
+CHAT_COMPLETIONS_URL = 'https://api.openai.com/v1/chat/completions'
+
+# Priority lanes: interactive calls (a user waiting on one product) may use the
+# whole quota; bulk calls leave the client's bulk_reserve of it untouched and step aside
+# while interactive calls in the same process are waiting
+PRIORITY_INTERACTIVE = 'interactive'
+PRIORITY_BULK = 'bulk'
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Rough token cost of content that isn't text (OpenAI bills high-detail images by tile)
+IMAGE_TOKEN_ESTIMATE = {'low': 85, 'high': 1105, 'auto': 1105}
+CHARS_PER_TOKEN = 4
+
+# Latencies kept per lane for percentile stats
+LATENCY_SAMPLES = 500
+
+_priority = threading.local()
+
+
+@contextmanager
+def llm_priority(lane: str):
+    """Run the calls made by this thread inside the block in the given lane"""
+    previous = getattr(_priority, 'lane', None)
+    _priority.lane = lane
+    try:
+        yield
+    finally:
+        _priority.lane = previous
+
+
+def current_priority() -> str:
+    """Lane for calls made by this thread (interactive unless a bulk job set it)"""
+    return getattr(_priority, 'lane', None) or PRIORITY_INTERACTIVE
+
+
+def estimate_tokens(payload: Dict[str, Any]) -> int:
+    """Upper estimate of the tokens a chat request counts against the quota (prompt + max_tokens)"""
+    chars = 0
+    image_tokens = 0
+    for message in payload.get('messages', []):
+        content = message.get('content')
+        if isinstance(content, str):
+            chars += len(content)
+            continue
+        for part in content or []:
+            if part.get('type') == 'text':
+                chars += len(part.get('text', ''))
+            elif part.get('type') == 'image_url':
+                detail = (part.get('image_url') or {}).get('detail', 'auto')
+                image_tokens += IMAGE_TOKEN_ESTIMATE.get(detail, IMAGE_TOKEN_ESTIMATE['auto'])
+    max_tokens = payload.get('max_tokens') or payload.get('max_completion_tokens') or 1000
+    return chars // CHARS_PER_TOKEN + image_tokens + int(max_tokens)
+
+
+def retry_after_seconds(response: requests.Response) -> Optional[float]:
+    """Delay the server asked for, from retry-after-ms or Retry-After (seconds or HTTP date)"""
+    value = response.headers.get('retry-after-ms')
+    if value:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_quota_exhausted(response: requests.Response) -> bool:
+    """429s for a used-up billing quota don't clear by waiting"""
+    try:
+        error = response.json().get('error') or {}
+    except ValueError:
+        return False
+    return error.get('code') == 'insufficient_quota' or error.get('type') == 'insufficient_quota'
+
+
+class LLMClient:
+    """Thread-safe OpenAI chat-completions client shared by every call path"""
+
+    def __init__(self, api_key: str, limiter: SharedTokenBuckets, pool_size: int = 10,
+                 max_retries: int = 5, base_delay: float = 1.0, max_delay: float = 60.0,
+                 bulk_reserve: float = 0.2, timeout: float = 60):
+        """
+        Args:
+            api_key: OpenAI API key
+            limiter: Shared 'requests' and 'tokens' buckets
+            pool_size: Keep-alive connections kept open to the API
+            max_retries: Retries after a 429/5xx/connection error before giving up
+            base_delay: First backoff delay in seconds (doubles each retry, with jitter)
+            max_delay: Cap on a single backoff delay
+            bulk_reserve: Fraction of the quota bulk calls leave for interactive ones
+            timeout: Default request timeout in seconds
+        """
+        self.api_key = api_key
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.bulk_reserve = bulk_reserve
+        self.timeout = timeout
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self._session.mount('https://', adapter)
+
+        self._lock = threading.Lock()
+        self._interactive_waiting = 0
+        self._interactive_done = threading.Condition(self._lock)
+        self.stats = {lane: self._empty_stats() for lane in (PRIORITY_INTERACTIVE, PRIORITY_BULK)}
+        self._latencies = {lane: deque(maxlen=LATENCY_SAMPLES) for lane in self.stats}
+        self.by_kind: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def _empty_stats() -> Dict[str, Any]:
+        return {
+            'calls': 0,
+            'errors': 0,
+            'retries': 0,
+            'rate_limited': 0,
+            'queue_seconds': 0.0,
+            'latency_seconds': 0.0,
+            'prompt_tokens': 0,
+            'completion_tokens': 0
+        }
+
+    def _wait_for_quota(self, estimate: int, lane: str) -> float:
+        """Block until the shared buckets admit one call; returns the seconds spent waiting"""
+        start = time.monotonic()
+        amounts = {'requests': 1, 'tokens': estimate}
+
+        if lane == PRIORITY_INTERACTIVE:
+            with self._lock:
+                self._interactive_waiting += 1
+            try:
+                self.limiter.acquire(amounts)
+            finally:
+                with self._lock:
+                    self._interactive_waiting -= 1
+                    self._interactive_done.notify_all()
+        else:
+            while True:
+                with self._lock:
+                    while self._interactive_waiting:
+                        self._interactive_done.wait(timeout=1.0)
+                wait = self.limiter.try_acquire(amounts, reserve=self.bulk_reserve)
+                if wait <= 0:
+                    break
+                time.sleep(min(wait, 1.0) * (1 + random.random() * 0.1))
+
+        return time.monotonic() - start
+
+    def _backoff(self, attempt: int) -> float:
+        """Exponential backoff with full jitter"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def post(self, payload: Dict[str, Any], timeout: Optional[float] = None, kind: str = 'chat',
+             priority: Optional[str] = None) -> requests.Response:
+        """
+        Send a chat-completions request through the shared quota, retrying transient failures
+
+        Args:
+            payload: Request body (model, messages, max_tokens...)
+            timeout: Request timeout in seconds (defaults to the client's)
+            kind: Label the call is counted under in the metrics
+            priority: Lane to queue in (defaults to the calling thread's lane)
+
+        Returns:
+            The final response, successful or not (callers check status as before)
+
+        Raises:
+            requests.exceptions.RequestException: If the API stays unreachable after every retry
+        """
+        lane = priority or current_priority()
+        estimate = estimate_tokens(payload)
+        headers = {
+            'Content-Type': 'application/json',
+            'Authorization': f'Bearer {self.api_key}',
+        }
+
+        queue_seconds = 0.0
+        attempt = 0
+        start = time.monotonic()
+        while True:
+            queue_seconds += self._wait_for_quota(estimate, lane)
+            try:
+                response = self._session.post(CHAT_COMPLETIONS_URL, headers=headers, json=payload,
+                                              timeout=timeout or self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                # Each attempt takes its own estimate; one that never got an answer used none of it
+                self.limiter.adjust('tokens', estimate)
+                if attempt >= self.max_retries:
+                    self._record(lane, kind, start, queue_seconds, attempt, None, error=True)
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"⚠️ OpenAI request failed ({e.__class__.__name__}), retry {attempt + 1} in {delay:.1f}s")
+            else:
+                if response.status_code not in RETRYABLE_STATUS_CODES or attempt >= self.max_retries or \
+                        (response.status_code == 429 and _is_quota_exhausted(response)):
+                    break
+                self.limiter.adjust('tokens', estimate)
+                delay = retry_after_seconds(response)
+                if delay is None:
+                    delay = self._backoff(attempt)
+                logger.warning(f"⚠️ OpenAI returned {response.status_code}, retry {attempt + 1} in {delay:.1f}s")
+                if response.status_code == 429:
+                    # Every process backs off, not just this thread; the next
+                    # _wait_for_quota() sits out the pause
+                    self.limiter.pause(delay)
+                    with self._lock:
+                        self.stats[lane]['rate_limited'] += 1
+                    delay = 0
+
+            attempt += 1
+            if delay:
+                time.sleep(delay)
+
+        usage = None
+        if response.ok:
+            try:
+                usage = response.json().get('usage')
+            except ValueError:
+                usage = None
+            if usage and usage.get('total_tokens') is not None:
+                # Settle the estimate against what the call really used
+                self.limiter.adjust('tokens', estimate - usage['total_tokens'])
+        else:
+            # Error responses (429s, 5xx, bad requests) aren't billed tokens
+            self.limiter.adjust('tokens', estimate)
+
+        self._record(lane, kind, start, queue_seconds, attempt, usage, error=not response.ok)
+        return response
+
+    def chat(self, payload: Dict[str, Any], timeout: Optional[float] = None, kind: str = 'chat',
+             priority: Optional[str] = None) -> Dict[str, Any]:
+        """post() that raises for an error status and returns the decoded body"""
+        response = self.post(payload, timeout=timeout, kind=kind, priority=priority)
+        response.raise_for_status()
+        return response.json()
+
+    def _record(self, lane: str, kind: str, start: float, queue_seconds: float, retries: int,
+                usage: Optional[Dict[str, Any]], error: bool):
+        latency = time.monotonic() - start
+        prompt_tokens = (usage or {}).get('prompt_tokens', 0) or 0
+        completion_tokens = (usage or {}).get('completion_tokens', 0) or 0
+        with self._lock:
+            for stats in (self.stats[lane], self.by_kind.setdefault(kind, self._empty_stats())):
+                stats['calls'] += 1
+                stats['errors'] += int(error)
+                stats['retries'] += retries
+                stats['queue_seconds'] += queue_seconds
+                stats['latency_seconds'] += latency
+                stats['prompt_tokens'] += prompt_tokens
+                stats['completion_tokens'] += completion_tokens
+            self._latencies[lane].append(latency)
+
+        logger.debug(f"🤖 OpenAI {kind} ({lane}): {latency:.2f}s, queued {queue_seconds:.2f}s, "
+                     f"{prompt_tokens}+{completion_tokens} tokens, {retries} retries")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lanes = {lane: dict(stats) for lane, stats in self.stats.items()}
+            by_kind = {kind: dict(stats) for kind, stats in self.by_kind.items()}
+            latencies = {lane: sorted(samples) for lane, samples in self._latencies.items()}
+
+        for lane, stats in lanes.items():
+            samples = latencies[lane]
+            stats['avg_latency_ms'] = round(stats['latency_seconds'] / stats['calls'] * 1000, 1) if stats['calls'] else 0.0
+            stats['p50_latency_ms'] = round(samples[len(samples) // 2] * 1000, 1) if samples else 0.0
+            stats['p95_latency_ms'] = round(samples[int(len(samples) * 0.95)] * 1000, 1) if samples else 0.0
+        return {
+            'lanes': lanes,
+            'by_kind': by_kind,
+            'limiter': self.limiter.get_stats()
+        }
+
+
+# Global instance
+_llm_client = None
+_llm_client_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    """Get the global OpenAI client instance"""
+    global _llm_client
+    if _llm_client is None:
+        with _llm_client_lock:
+            if _llm_client is None:
+                settings = get_settings()
+                limiter = SharedTokenBuckets(settings.OPENAI_LIMITER_DB, {
+                    'requests': settings.OPENAI_REQUESTS_PER_MINUTE,
+                    'tokens': settings.OPENAI_TOKENS_PER_MINUTE
+                })
+                _llm_client = LLMClient(
+                    settings.OPENAI_API_KEY,
+                    limiter,
+                    pool_size=settings.OPENAI_POOL_SIZE,
+                    max_retries=settings.OPENAI_MAX_RETRIES,
+                    bulk_reserve=settings.OPENAI_BULK_RESERVE,
+                    timeout=settings.AI_REQUEST_TIMEOUT
+                )
+    return _llm_client
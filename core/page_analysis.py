@@ -0,0 +1,304 @@
+"""
+Page Analysis
+Parses a product page once with lxml and shares the tree between product
+extraction, image candidate analysis and og:image lookup. The visible text is
+laid out once in document order with each element's (start, end) offsets, so
+an element's text, the text around an image and its container markers are
+lookups instead of repeated tree walks
+"""
+import re
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from copy import deepcopy
+from typing import Dict, Any, List, Optional, Tuple, Iterable
+
+import lxml.html
+from lxml import etree
+
+from config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Elements whose text is never visible on the page
+INVISIBLE_TAGS = frozenset(['script', 'style', 'noscript', 'template'])
+
+# Keywords in a container's class/id that mark product imagery
+PRODUCT_CONTAINER_KEYWORDS = ['product', 'gallery', 'image', 'photo', 'main', 'hero', 'detail']
+
+_BACKGROUND_STYLE_RE = re.compile(r'background.*image')
+_BACKGROUND_URL_RE = re.compile(r'background-image:\s*url\(["\']?([^"\']+)["\']?\)')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+_parsers = threading.local()
+
+
+def _parser() -> lxml.html.HTMLParser:
+    """lxml parsers aren't shared between threads"""
+    parser = getattr(_parsers, 'parser', None)
+    if parser is None:
+        parser = _parsers.parser = lxml.html.HTMLParser(encoding='utf-8')
+    return parser
+
+
+class PageAnalysis:
+    """One parsed page: the lxml tree plus a text offset table over it
+
+    Read-only once built, so one instance can be used from several threads.
+    """
+
+    def __init__(self, html_content: str, url: str = ''):
+        self.url = url
+        try:
+            self.root = lxml.html.document_fromstring(html_content.encode('utf-8', 'replace'), parser=_parser())
+        except (etree.ParserError, ValueError):
+            # Empty or whitespace-only documents
+            self.root = lxml.html.document_fromstring(b'<html><body></body></html>', parser=_parser())
+
+        self.text = ''
+        self._spans: Dict[Any, Tuple[int, int]] = {}
+        self._index_text()
+
+        self._markers: Dict[Any, str] = {}
+        self._images: Optional[List[Any]] = None
+        self._meta: Optional[List[Tuple[str, str]]] = None
+        self._json_ld: Optional[List[Any]] = None
+
+    def _index_text(self):
+        """Lay out the visible text in document order, recording each element's span
+
+        Text nodes are whitespace-collapsed and joined by single spaces; an
+        element's span covers its own text and that of its descendants (not
+        its tail).
+        """
+        pieces = []
+        position = 0
+
+        def add(text: Optional[str]):
+            nonlocal position
+            if not text:
+                return
+            text = _WHITESPACE_RE.sub(' ', text).strip()
+            if not text:
+                return
+            if pieces:
+                pieces.append(' ')
+                position += 1
+            pieces.append(text)
+            position += len(text)
+
+        starts = {}
+        walker = etree.iterwalk(self.root, events=('start', 'end', 'comment', 'pi'))
+        for event, element in walker:
+            if event in ('comment', 'pi'):
+                add(element.tail)
+            elif event == 'start':
+                starts[element] = position + 1 if pieces else position
+                if element.tag in INVISIBLE_TAGS:
+                    walker.skip_subtree()
+                else:
+                    add(element.text)
+            else:
+                start = starts.pop(element)
+                self._spans[element] = (min(start, position), position)
+                if element is not self.root:
+                    add(element.tail)
+
+        self.text = ''.join(pieces)
+
+    # ------------------------------------------------------------------
+    # Text
+    # ------------------------------------------------------------------
+
+    @property
+    def body(self):
+        body = self.root.find('body')
+        return body if body is not None else self.root
+
+    def span(self, element) -> Tuple[int, int]:
+        """(start, end) of an element's text in self.text"""
+        return self._spans.get(element, (0, 0))
+
+    def text_of(self, element) -> str:
+        """Visible text of an element and its descendants"""
+        start, end = self.span(element)
+        return self.text[start:end]
+
+    def surrounding_text(self, element, radius: int = 100) -> str:
+        """Up to `radius` characters of text around an element, taken from within its parent"""
+        parent = element.getparent()
+        if parent is None:
+            return self.text_of(element)[:radius]
+        start, end = self.span(element)
+        parent_start, parent_end = self.span(parent)
+
+        before = self.text[max(parent_start, start - radius // 2):start].strip()
+        own = self.text[start:end]
+        after = self.text[end:min(parent_end, end + radius)].strip()
+        text = ' '.join(part for part in (before, own, after) if part)
+        return text[:radius]
+
+    def marker(self, element) -> str:
+        """An element's class and id, space separated"""
+        marker = self._markers.get(element)
+        if marker is None:
+            classes = ' '.join((element.get('class') or '').split())
+            marker = self._markers[element] = f"{classes} {element.get('id') or ''}".strip()
+        return marker
+
+    def parent_context(self, element, levels: int = 5) -> Dict[str, Any]:
+        """Parent tag/classes/id, plus the product-looking containers within `levels` ancestors"""
+        context = {}
+        parent = element.getparent()
+        if parent is not None:
+            context['parent_tag'] = parent.tag
+            context['parent_classes'] = ' '.join((parent.get('class') or '').split())
+            context['parent_id'] = parent.get('id', '')
+
+        for level, ancestor in enumerate(element.iterancestors()):
+            if level >= levels:
+                break
+            marker = self.marker(ancestor).lower()
+            if any(keyword in marker for keyword in PRODUCT_CONTAINER_KEYWORDS):
+                context[f'container_level_{level}'] = {
+                    'tag': ancestor.tag,
+                    'classes': ' '.join((ancestor.get('class') or '').split()),
+                    'id': ancestor.get('id', '')
+                }
+        return context
+
+    def html_without(self, tags: Iterable[str]) -> str:
+        """The page serialized back to HTML with the given elements removed (the tree isn't changed)"""
+        root = deepcopy(self.root)
+        etree.strip_elements(root, *tags, with_tail=False)
+        return lxml.html.tostring(root, encoding='unicode')
+
+    # ------------------------------------------------------------------
+    # Images
+    # ------------------------------------------------------------------
+
+    @property
+    def images(self) -> List[Any]:
+        """Every <img> element in document order"""
+        if self._images is None:
+            self._images = list(self.root.iter('img'))
+        return self._images
+
+    def background_images(self) -> List[Tuple[Any, str]]:
+        """(element, url) for inline style background-image declarations"""
+        found = []
+        for element in self.root.xpath('//*[@style]'):
+            style = element.get('style', '')
+            if not _BACKGROUND_STYLE_RE.search(style):
+                continue
+            match = _BACKGROUND_URL_RE.search(style)
+            if match:
+                found.append((element, match.group(1)))
+        return found
+
+    # ------------------------------------------------------------------
+    # Metadata
+    # ------------------------------------------------------------------
+
+    @property
+    def meta(self) -> List[Tuple[str, str]]:
+        """(property or name, content) of every <meta> tag in document order"""
+        if self._meta is None:
+            self._meta = []
+            for element in self.root.iter('meta'):
+                name = element.get('property') or element.get('name') or ''
+                content = element.get('content')
+                if name and content is not None:
+                    self._meta.append((name, content))
+        return self._meta
+
+    def meta_content(self, *names: str) -> Optional[str]:
+        """Content of the first non-empty meta tag for the first name that has one"""
+        for name in names:
+            for meta_name, content in self.meta:
+                if meta_name == name and content:
+                    return content
+        return None
+
+    @property
+    def json_ld(self) -> List[Any]:
+        """Decoded application/ld+json blocks (invalid ones are skipped)"""
+        if self._json_ld is None:
+            self._json_ld = []
+            for script in self.root.xpath('//script[@type="application/ld+json"]'):
+                try:
+                    self._json_ld.append(json.loads(script.text or ''))
+                except (ValueError, TypeError):
+                    continue
+        return self._json_ld
+
+
+class PageAnalysisCache:
+    """Small LRU of analysed pages, so every step that looks at a page shares one parse"""
+
+    def __init__(self, max_entries: int = 16):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[int, Tuple[str, PageAnalysis]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {
+            'parses': 0,
+            'hits': 0,
+            'parse_seconds': 0.0
+        }
+
+    def get(self, html_content: str, url: str = '') -> PageAnalysis:
+        """The analysis for a page, parsing it only if it isn't cached"""
+        html_content = html_content or ''
+        key = hash(html_content)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == html_content:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry[1]
+
+        start = time.monotonic()
+        page = PageAnalysis(html_content, url)
+        elapsed = time.monotonic() - start
+
+        with self._lock:
+            self.stats['parses'] += 1
+            self.stats['parse_seconds'] += elapsed
+            self._entries[key] = (html_content, page)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        logger.debug(f"🔎 Parsed {len(html_content):,} chars of HTML for {url or 'page'} in {elapsed * 1000:.1f}ms")
+        return page
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats['cached_pages'] = len(self._entries)
+        lookups = stats['parses'] + stats['hits']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        stats['avg_parse_ms'] = round(stats['parse_seconds'] / stats['parses'] * 1000, 1) if stats['parses'] else 0.0
+        return stats
+
+
+# Global instance
+_page_analysis_cache = None
+_page_analysis_cache_lock = threading.Lock()
+
+
+def get_page_analysis_cache() -> PageAnalysisCache:
+    """Get the global page analysis cache instance"""
+    global _page_analysis_cache
+    if _page_analysis_cache is None:
+        with _page_analysis_cache_lock:
+            if _page_analysis_cache is None:
+                settings = get_settings()
+                _page_analysis_cache = PageAnalysisCache(settings.API_CONFIG['PAGE_ANALYSIS_CACHE_SIZE'])
+    return _page_analysis_cache
+
+
+def analyze_page(html_content: str, url: str = '') -> PageAnalysis:
+    """Shared analysis of a page (parsed on first use)"""
+    return get_page_analysis_cache().get(html_content, url)
@@ -0,0 +1,348 @@
+"""
+PDF Page Image Cache
+Renders spec-sheet PDF pages one at a time for the Vision API, trims blank
+margins, downscales to the resolution Vision actually reads and stores the
+compressed result on disk keyed by PDF hash, page, DPI and target size,
+dropping the least recently used pages once the directory outgrows its bound
+"""
+import io
+import os
+import base64
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Iterator, Optional, Tuple
+
+from config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Page counts remembered per PDF hash so iterating pages doesn't re-parse the document
+PAGE_COUNT_CACHE_SIZE = 256
+
+# Pixels of white border kept around the trimmed content
+TRIM_PADDING = 16
+
+# Check the size bound every N rendered pages rather than on every write
+EVICTION_CHECK_INTERVAL = 20
+
+
+def vision_target_size(width: int, height: int, max_long_side: int, max_short_side: int) -> Tuple[int, int]:
+    """Size an image the way Vision's high-detail mode will resize it anyway
+
+    The API fits images inside a max_long_side square and then scales the
+    short side down to max_short_side, so any pixels beyond that are uploaded
+    and discarded.
+    """
+    scale = min(1.0, max_long_side / max(width, height))
+    scale = min(scale, max_short_side / max(1, min(width, height)))
+    return max(1, int(round(width * scale))), max(1, int(round(height * scale)))
+
+
+class PDFPageImageCache:
+    """Lazily rendered, compressed page images for a PDF
+
+    A page file's modification time doubles as its last use: hits touch it,
+    and once the directory exceeds `max_bytes` the oldest files are removed.
+    """
+
+    def __init__(self, cache_dir: str, max_long_side: int = 2048, max_short_side: int = 768,
+                 jpeg_quality: int = 85, max_bytes: int = 500 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self.max_long_side = max_long_side
+        self.max_short_side = max_short_side
+        self.jpeg_quality = jpeg_quality
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._page_counts: 'OrderedDict[str, int]' = OrderedDict()
+        self._writes_since_check = 0
+        self.stats = {
+            'hits': 0,
+            'renders': 0,
+            'render_failures': 0,
+            'rendered_pixels': 0,
+            'stored_pixels': 0,
+            'bytes_served': 0,
+            'evictions': 0
+        }
+
+    def _count(self, stat: str, amount: int = 1):
+        with self._lock:
+            self.stats[stat] += amount
+
+    @staticmethod
+    def pdf_hash(pdf_content: bytes) -> str:
+        return hashlib.sha256(pdf_content).hexdigest()
+
+    def _image_path(self, pdf_hash: str, page: int, dpi: int, ext: str) -> str:
+        name = f"{pdf_hash}_p{page}_{dpi}dpi_{self.max_long_side}x{self.max_short_side}.{ext}"
+        return os.path.join(self.cache_dir, pdf_hash[:2], name)
+
+    def get_page_count(self, pdf_content: bytes, pdf_hash: Optional[str] = None) -> int:
+        """Number of pages in the PDF (0 if it can't be read)"""
+        pdf_hash = pdf_hash or self.pdf_hash(pdf_content)
+        with self._lock:
+            if pdf_hash in self._page_counts:
+                self._page_counts.move_to_end(pdf_hash)
+                return self._page_counts[pdf_hash]
+
+        count = 0
+        try:
+            import fitz  # PyMuPDF
+            with fitz.open(stream=pdf_content, filetype='pdf') as doc:
+                count = doc.page_count
+        except ImportError:
+            try:
+                from pdf2image import pdfinfo_from_bytes
+                count = int(pdfinfo_from_bytes(pdf_content).get('Pages', 0))
+            except Exception as e:
+                logger.error(f"❌ Could not read PDF page count: {e}")
+        except Exception as e:
+            logger.error(f"❌ Could not read PDF page count: {e}")
+
+        if count:
+            with self._lock:
+                self._page_counts[pdf_hash] = count
+                while len(self._page_counts) > PAGE_COUNT_CACHE_SIZE:
+                    self._page_counts.popitem(last=False)
+        return count
+
+    def _render_page(self, pdf_content: bytes, page: int, dpi: int):
+        """Render a single page to a PIL image (pdf2image first, PyMuPDF as fallback)"""
+        try:
+            from pdf2image import convert_from_bytes
+            images = convert_from_bytes(pdf_content, dpi=dpi, first_page=page, last_page=page)
+            if images:
+                return images[0]
+        except ImportError:
+            pass
+        except Exception as e:
+            # Usually poppler missing on the host; PyMuPDF doesn't need it
+            logger.debug(f"pdf2image render failed, trying PyMuPDF: {e}")
+
+        import fitz  # PyMuPDF
+        from PIL import Image
+        with fitz.open(stream=pdf_content, filetype='pdf') as doc:
+            if page < 1 or page > doc.page_count:
+                return None
+            zoom = dpi / 72.0
+            pix = doc[page - 1].get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+            return Image.frombytes('RGB', (pix.width, pix.height), pix.samples)
+
+    @staticmethod
+    def _trim_margins(image):
+        """Crop the blank border so the downscaled page spends its pixels on content"""
+        from PIL import Image, ImageChops
+        background = Image.new(image.mode, image.size, (255, 255, 255) if image.mode == 'RGB' else 255)
+        bbox = ImageChops.difference(image, background).getbbox()
+        if not bbox:
+            return image
+        left, top, right, bottom = bbox
+        return image.crop((
+            max(0, left - TRIM_PADDING),
+            max(0, top - TRIM_PADDING),
+            min(image.width, right + TRIM_PADDING),
+            min(image.height, bottom + TRIM_PADDING)
+        ))
+
+    def _encode(self, image) -> Tuple[bytes, str]:
+        """Encode as PNG or JPEG, whichever is smaller
+
+        Line drawings compress far better as PNG, photographic pages as JPEG.
+        Both encodings are tried once per render; later requests read the file.
+        """
+        png_buffer = io.BytesIO()
+        image.save(png_buffer, format='PNG', optimize=True)
+        jpeg_buffer = io.BytesIO()
+        image.save(jpeg_buffer, format='JPEG', quality=self.jpeg_quality, optimize=True)
+        if jpeg_buffer.tell() < png_buffer.tell():
+            return jpeg_buffer.getvalue(), 'jpeg'
+        return png_buffer.getvalue(), 'png'
+
+    def get_page_image(self, pdf_content: bytes, page: int = 1, dpi: int = 200,
+                       pdf_hash: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Get a Vision-ready image of one page, rendering it on first use
+
+        Args:
+            pdf_content: Raw PDF bytes
+            page: 1-based page number
+            dpi: Render resolution
+            pdf_hash: SHA-256 of pdf_content if the caller already has it
+
+        Returns:
+            Dict with data (bytes), mime_type, base64 and data_url, or None if the page can't be rendered
+        """
+        pdf_hash = pdf_hash or self.pdf_hash(pdf_content)
+
+        for ext in ('png', 'jpeg'):
+            path = self._image_path(pdf_hash, page, dpi, ext)
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                self._mark_used(path)
+                self._count('hits')
+                self._count('bytes_served', len(data))
+                return self._as_result(data, ext)
+            except OSError:
+                continue
+
+        try:
+            image = self._render_page(pdf_content, page, dpi)
+        except Exception as e:
+            logger.error(f"❌ Failed to render page {page} of PDF {pdf_hash[:12]}: {e}")
+            self._count('render_failures')
+            return None
+        if image is None:
+            return None
+
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        rendered_pixels = image.width * image.height
+        image = self._trim_margins(image)
+        target = vision_target_size(image.width, image.height, self.max_long_side, self.max_short_side)
+        if target != image.size:
+            from PIL import Image
+            image = image.resize(target, Image.LANCZOS)
+        data, ext = self._encode(image)
+
+        path = self._image_path(pdf_hash, page, dpi, ext)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not cache page image {path}: {e}")
+        else:
+            with self._lock:
+                self._writes_since_check += 1
+                check = self._writes_since_check >= EVICTION_CHECK_INTERVAL
+                if check:
+                    self._writes_since_check = 0
+            if check:
+                self.evict()
+
+        self._count('renders')
+        self._count('rendered_pixels', rendered_pixels)
+        self._count('stored_pixels', image.width * image.height)
+        self._count('bytes_served', len(data))
+        logger.info(f"🖼️ Rendered page {page} of PDF {pdf_hash[:12]} at {dpi}dpi -> "
+                    f"{image.width}x{image.height} {ext.upper()} ({len(data) / 1024:.0f}KB)")
+        return self._as_result(data, ext)
+
+    @staticmethod
+    def _mark_used(path: str):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _stored_files(self) -> Iterator[Tuple[float, int, str]]:
+        """(last used, size, path) of every cached page image"""
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith('.tmp'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                yield stat.st_mtime, stat.st_size, entry.path
+
+    def evict(self) -> int:
+        """Remove least recently used page images until the cache is under its size bound
+
+        Returns:
+            Number of page images evicted
+        """
+        try:
+            files = sorted(self._stored_files())
+            total = sum(size for _, size, _ in files)
+            if total <= self.max_bytes:
+                return 0
+
+            # Evict down to 90% so the next few renders don't immediately trigger another pass
+            target = total - int(self.max_bytes * 0.9)
+            evicted = 0
+            freed = 0
+            for _, size, path in files:
+                if freed >= target:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                evicted += 1
+                freed += size
+
+            self._count('evictions', evicted)
+            logger.info(f"🧹 Evicted {evicted} page images ({freed / 1024 / 1024:.1f}MB) from cache")
+            return evicted
+
+        except OSError as e:
+            logger.warning(f"⚠️ Page image cache eviction failed: {e}")
+            return 0
+
+    @staticmethod
+    def _as_result(data: bytes, ext: str) -> Dict[str, Any]:
+        mime_type = f'image/{ext}'
+        image_base64 = base64.b64encode(data).decode('ascii')
+        return {
+            'data': data,
+            'mime_type': mime_type,
+            'base64': image_base64,
+            'data_url': f'data:{mime_type};base64,{image_base64}'
+        }
+
+    def iter_pages(self, pdf_content: bytes, dpi: int = 200,
+                   max_pages: Optional[int] = None) -> Iterator[Tuple[int, int, Dict[str, Any]]]:
+        """Yield (page_num, page_count, image) one page at a time
+
+        Only the current page is ever held in memory; pages that fail to
+        render are skipped.
+        """
+        pdf_hash = self.pdf_hash(pdf_content)
+        page_count = self.get_page_count(pdf_content, pdf_hash)
+        if max_pages:
+            page_count = min(page_count, max_pages)
+        for page_num in range(1, page_count + 1):
+            image = self.get_page_image(pdf_content, page_num, dpi, pdf_hash)
+            if image is not None:
+                yield page_num, page_count, image
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats['hits'] + stats['renders']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        stats['pixel_reduction'] = round(
+            1 - stats['stored_pixels'] / stats['rendered_pixels'], 3
+        ) if stats['rendered_pixels'] else 0.0
+        stats['max_bytes'] = self.max_bytes
+        return stats
+
+
+# Global instance
+_page_cache = None
+_page_cache_lock = threading.Lock()
+
+
+def get_page_image_cache() -> PDFPageImageCache:
+    """Get the global PDF page image cache instance"""
+    global _page_cache
+    if _page_cache is None:
+        with _page_cache_lock:
+            if _page_cache is None:
+                settings = get_settings()
+                _page_cache = PDFPageImageCache(
+                    settings.PDF_PAGE_CACHE_DIR,
+                    max_long_side=settings.PDF_PAGE_MAX_LONG_SIDE,
+                    max_short_side=settings.PDF_PAGE_MAX_SHORT_SIDE,
+                    max_bytes=settings.PDF_PAGE_CACHE_MAX_MB * 1024 * 1024
+                )
+    return _page_cache
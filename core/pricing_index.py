@@ -0,0 +1,199 @@
+"""
+Pricing Index
+A pricing worksheet loaded once into memory and indexed by SKU, with every
+cell pre-parsed to a float so price lookups are dictionary probes instead of
+full-sheet downloads. Snapshots are refreshed in the background once they
+are older than the TTL, and only re-read when the spreadsheet has changed.
+"""
+import time
+import logging
+import threading
+from array import array
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def parse_price(price_str) -> float:
+    """Parse price string to float (0.0 for blanks, N/A and junk)"""
+    if not price_str:
+        return 0.0
+
+    try:
+        # Remove currency symbols, commas, and whitespace
+        cleaned = str(price_str).replace('$', '').replace(',', '').strip()
+        if not cleaned or cleaned.lower() in ['n/a', 'na', '-', '']:
+            return 0.0
+        return float(cleaned)
+    except (ValueError, TypeError):
+        return 0.0
+
+
+class _PricingSnapshot:
+    """Point-in-time copy of the sheet (key maps are built on first use)"""
+
+    def __init__(self, values: List[List[str]], modified_time: Optional[str]):
+        self.headers = tuple(values[0]) if values else ()
+        self.rows = [tuple(row) for row in values[1:]]
+        # One float per cell, so competitor price vectors are slices of the row
+        self.prices = [array('d', (parse_price(cell) for cell in row)) for row in self.rows]
+        self.modified_time = modified_time
+        self.loaded_at = time.time()
+        self.keys: Dict[Tuple[int, bool], Dict[str, int]] = {}
+
+
+class PricingIndex:
+    """SKU -> row index over one pricing worksheet"""
+
+    def __init__(self, name: str, load_values: Callable[[], List[List[str]]],
+                 get_modified_time: Optional[Callable[[], Optional[str]]] = None, ttl: float = 300):
+        """
+        Args:
+            name: Label for logs and stats
+            load_values: Returns the worksheet's values (header row first), e.g. worksheet.get_all_values
+            get_modified_time: Returns the spreadsheet's last update time, used to skip unchanged reloads
+            ttl: Seconds before a snapshot is revalidated in the background
+        """
+        self.name = name
+        self.ttl = ttl
+        self._load_values = load_values
+        self._get_modified_time = get_modified_time
+        self._snapshot: Optional[_PricingSnapshot] = None
+        self._load_lock = threading.Lock()
+        self._keys_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._refreshing = False
+        self.stats = {
+            'loads': 0,
+            'revalidations': 0,
+            'load_failures': 0,
+            'lookups': 0,
+            'hits': 0
+        }
+
+    def _count(self, stat: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[stat] += amount
+
+    def _modified_time(self) -> Optional[str]:
+        if not self._get_modified_time:
+            return None
+        try:
+            return self._get_modified_time()
+        except Exception as e:
+            logger.debug(f"Could not read modified time for pricing sheet {self.name}: {e}")
+            return None
+
+    def _load(self) -> bool:
+        start_time = time.time()
+        try:
+            modified_time = self._modified_time()
+            values = self._load_values()
+            if not values or len(values) < 2:
+                logger.warning(f"No data found in pricing sheet {self.name}")
+            self._snapshot = _PricingSnapshot(values or [], modified_time)
+            self._count('loads')
+            logger.info(f"💲 Loaded pricing index {self.name}: {len(self._snapshot.rows)} rows "
+                        f"in {time.time() - start_time:.1f}s")
+            return True
+        except Exception as e:
+            self._count('load_failures')
+            logger.error(f"❌ Failed to load pricing sheet {self.name}: {e}")
+            return False
+
+    def _revalidate(self):
+        """Reload the snapshot unless the spreadsheet is unchanged since it was taken"""
+        try:
+            snapshot = self._snapshot
+            modified_time = self._modified_time()
+            if snapshot and modified_time and modified_time == snapshot.modified_time:
+                snapshot.loaded_at = time.time()
+                self._count('revalidations')
+                logger.debug(f"Pricing sheet {self.name} unchanged since last load")
+                return
+            with self._load_lock:
+                self._load()
+        finally:
+            self._refreshing = False
+
+    def _current(self) -> Optional[_PricingSnapshot]:
+        """The current snapshot, loading it on first use and refreshing stale ones in the background"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._load_lock:
+                if self._snapshot is None:
+                    self._load()
+            return self._snapshot
+
+        if time.time() - snapshot.loaded_at > self.ttl and not self._refreshing:
+            self._refreshing = True
+            threading.Thread(target=self._revalidate, name=f'pricing-refresh-{self.name}', daemon=True).start()
+        return snapshot
+
+    def _key_map(self, snapshot: _PricingSnapshot, column: int, case_sensitive: bool) -> Dict[str, int]:
+        """SKU -> row position for a 1-based key column (first row wins, like a top-down scan)"""
+        key = (column, case_sensitive)
+        key_map = snapshot.keys.get(key)
+        if key_map is None:
+            with self._keys_lock:
+                key_map = snapshot.keys.get(key)
+                if key_map is None:
+                    key_map = {}
+                    for position, row in enumerate(snapshot.rows):
+                        if len(row) >= column:
+                            sku = row[column - 1].strip()
+                            key_map.setdefault(sku if case_sensitive else sku.upper(), position)
+                    snapshot.keys[key] = key_map
+        return key_map
+
+    def get_rows(self, skus: List[str], column: int,
+                 case_sensitive: bool = True) -> Dict[str, Tuple[Tuple[str, ...], array]]:
+        """
+        Look up several SKUs in one pass
+
+        Args:
+            skus: SKUs to find
+            column: 1-based column holding the SKU
+            case_sensitive: False to match SKUs case-insensitively
+
+        Returns:
+            Dict of sku -> (raw row values, parsed float prices) for the SKUs found
+        """
+        snapshot = self._current()
+        if snapshot is None:
+            return {}
+
+        key_map = self._key_map(snapshot, column, case_sensitive)
+        found = {}
+        for sku in skus:
+            position = key_map.get(sku if case_sensitive else sku.upper())
+            if position is not None:
+                found[sku] = (snapshot.rows[position], snapshot.prices[position])
+
+        self._count('lookups', len(skus))
+        self._count('hits', len(found))
+        return found
+
+    def get_row(self, sku: str, column: int,
+                case_sensitive: bool = True) -> Optional[Tuple[Tuple[str, ...], array]]:
+        """Look up one SKU (see get_rows)"""
+        return self.get_rows([sku], column, case_sensitive).get(sku)
+
+    @property
+    def headers(self) -> Tuple[str, ...]:
+        snapshot = self._current()
+        return snapshot.headers if snapshot else ()
+
+    def invalidate(self):
+        """Drop the snapshot so the next lookup reloads the sheet"""
+        with self._load_lock:
+            self._snapshot = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        snapshot = self._snapshot
+        stats['rows'] = len(snapshot.rows) if snapshot else 0
+        stats['age_seconds'] = round(time.time() - snapshot.loaded_at, 1) if snapshot else None
+        stats['ttl'] = self.ttl
+        return stats
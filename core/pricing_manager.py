@@ -9,6 +9,9 @@ import logging
 from typing import Dict, Optional, List, Tuple
 from dataclasses import dataclass
 
+from config.settings import get_settings
+from core.pricing_index import PricingIndex, parse_price
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -28,6 +31,7 @@ class PricingManager:
         self.pricing_sheet_id = '1Kky3LE5qBgyeA7G-7g2pvfjDjoeRfRg1NQL7XiF8ToU'
         self.gc = None
         self.worksheet = None
+        self._index = None
         self._initialize_connection()
 
     def _initialize_connection(self):
@@ -51,6 +55,14 @@ class PricingManager:
             pricing_sheet = self.gc.open_by_key(self.pricing_sheet_id)
             self.worksheet = pricing_sheet.get_worksheet(0)
 
+            # Whole sheet loaded once and indexed by SKU (column F); refreshed in the background
+            self._index = PricingIndex(
+                'caprice',
+                self.worksheet.get_all_values,
+                pricing_sheet.get_lastUpdateTime,
+                ttl=get_settings().PRICING_INDEX_TTL
+            )
+
             logger.info(f"✅ Connected to pricing sheet: {pricing_sheet.title}")
 
         except Exception as e:
@@ -66,83 +78,70 @@ class PricingManager:
         Returns:
             PricingData object or None if not found
         """
-        if not self.worksheet:
+        pricing_data = self.get_pricing_many([variant_sku]).get(variant_sku)
+        if not pricing_data and self._index:
+            logger.warning(f"SKU {variant_sku} not found in pricing sheet")
+        return pricing_data
+
+    def get_pricing_many(self, variant_skus: List[str]) -> Dict[str, PricingData]:
+        """
+        Get pricing data for several variant SKUs in one pass over the index
+
+        Args:
+            variant_skus: SKUs to look up pricing for
+
+        Returns:
+            Dict of SKU -> PricingData for the SKUs found
+        """
+        if not self._index:
             logger.error("No worksheet connection available")
-            return None
+            return {}
 
         try:
-            # Get all data to search through
-            all_values = self.worksheet.get_all_values()
-
-            if not all_values:
-                logger.warning("No data found in pricing sheet")
-                return None
-
-            headers = all_values[0]
-
-            # Find the row with matching SKU
-            matching_row = None
-            for row in all_values[1:]:  # Skip header row
-                if len(row) > 5 and row[5].strip().upper() == variant_sku.upper():  # Column F (index 5)
-                    matching_row = row
-                    break
-
-            if not matching_row:
-                logger.warning(f"SKU {variant_sku} not found in pricing sheet")
-                return None
-
-            # Extract pricing information
-            our_price_str = matching_row[9] if len(matching_row) > 9 else "0"  # Column J (index 9)
-            lowest_price_str = matching_row[11] if len(matching_row) > 11 else "0"  # Column L (index 11)
-
-            # Clean and convert prices
-            our_price = self._parse_price(our_price_str)
-            lowest_competitor_price = self._parse_price(lowest_price_str)
-
-            # Calculate price difference
-            price_difference = our_price - lowest_competitor_price
-
-            # Extract competitor prices (columns R onwards - index 17+)
-            competitor_prices = {}
-            competitor_start_index = 17  # Column R
-
-            for i in range(competitor_start_index, len(headers)):
-                if i < len(matching_row):
-                    competitor_name = headers[i]
-                    price_str = matching_row[i]
-                    price = self._parse_price(price_str)
-                    if price > 0:
-                        competitor_prices[competitor_name] = price
-
-            # Find which competitor has the lowest price
-            lowest_competitor_name = self._find_lowest_competitor(competitor_prices, lowest_competitor_price)
-
-            return PricingData(
-                variant_sku=variant_sku,
-                our_price=our_price,
-                lowest_competitor_price=lowest_competitor_price,
-                lowest_competitor_name=lowest_competitor_name,
-                price_difference=price_difference,
-                competitor_prices=competitor_prices
-            )
+            rows = self._index.get_rows(variant_skus, 6, case_sensitive=False)  # Column F
+            headers = self._index.headers
+            return {
+                sku: self._build_pricing_data(sku, row, prices, headers)
+                for sku, (row, prices) in rows.items()
+            }
 
         except Exception as e:
-            logger.error(f"Error fetching pricing data for SKU {variant_sku}: {e}")
-            return None
+            logger.error(f"Error fetching pricing data for SKUs {variant_skus[:5]}: {e}")
+            return {}
+
+    def _build_pricing_data(self, variant_sku: str, row: Tuple[str, ...], prices, headers: Tuple[str, ...]) -> PricingData:
+        """Build PricingData from an indexed row and its pre-parsed prices"""
+        # Extract pricing information
+        our_price = prices[9] if len(row) > 9 else 0.0  # Column J (index 9)
+        lowest_competitor_price = prices[11] if len(row) > 11 else 0.0  # Column L (index 11)
+
+        # Calculate price difference
+        price_difference = our_price - lowest_competitor_price
+
+        # Extract competitor prices (columns R onwards - index 17+)
+        competitor_prices = {}
+        competitor_start_index = 17  # Column R
+
+        for i in range(competitor_start_index, min(len(headers), len(row))):
+            price = prices[i]
+            if price > 0:
+                competitor_prices[headers[i]] = price
+
+        # Find which competitor has the lowest price
+        lowest_competitor_name = self._find_lowest_competitor(competitor_prices, lowest_competitor_price)
+
+        return PricingData(
+            variant_sku=variant_sku,
+            our_price=our_price,
+            lowest_competitor_price=lowest_competitor_price,
+            lowest_competitor_name=lowest_competitor_name,
+            price_difference=price_difference,
+            competitor_prices=competitor_prices
+        )
 
     def _parse_price(self, price_str: str) -> float:
         """Parse price string to float"""
-        if not price_str:
-            return 0.0
-
-        try:
-            # Remove currency symbols, commas, and whitespace
-            cleaned = price_str.replace('$', '').replace(',', '').strip()
-            if not cleaned or cleaned.lower() in ['n/a', 'na', '-', '']:
-                return 0.0
-            return float(cleaned)
-        except (ValueError, TypeError):
-            return 0.0
+        return parse_price(price_str)
 
     def _find_lowest_competitor(self, competitor_prices: Dict[str, float], target_price: float) -> str:
         """Find which competitor has the lowest price"""
@@ -163,9 +162,13 @@ class PricingManager:
         return closest_competitor or "Unknown"
 
     def refresh_connection(self):
-        """Refresh the Google Sheets connection"""
+        """Refresh the Google Sheets connection (and reload the pricing index)"""
         self._initialize_connection()
 
+    def get_stats(self) -> Dict:
+        """Pricing index statistics"""
+        return self._index.get_stats() if self._index else {}
+
 # Global instance
 _pricing_manager = None
 
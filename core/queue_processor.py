@@ -135,8 +135,8 @@ class QueueProcessor:
         """
         import base64
         import io
-        import requests as req
         from config.settings import get_settings
+        from core.llm_client import get_llm_client
 
         settings = get_settings()
         openai_key = settings.OPENAI_API_KEY
@@ -188,7 +188,7 @@ Return as JSON object."""
         if image_content:
             image_data = {
                 "type": "image_url",
-                "image_url": {"url": f"data:image/png;base64,{image_content}"}
+                "image_url": {"url": image_content}
             }
         else:
             image_data = {
@@ -208,15 +208,7 @@ Return as JSON object."""
             "max_tokens": 2000
         }
 
-        response = req.post(
-            "https://api.openai.com/v1/chat/completions",
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {openai_key}"
-            },
-            json=payload,
-            timeout=60
-        )
+        response = get_llm_client().post(payload, timeout=60, kind='queue_extraction')
         response.raise_for_status()
 
         result = response.json()
@@ -226,10 +218,9 @@ Return as JSON object."""
         return self._parse_json_response(content)
 
     def _convert_to_image(self, url: str) -> Optional[str]:
-        """Convert PDF to base64 image for Vision API"""
-        import requests as req
-        import base64
-        import io
+        """Convert PDF to an image data URL for Vision API"""
+        from core.http_fetcher import get_fetcher
+        from core.pdf_page_cache import get_page_image_cache
 
         is_pdf = url.lower().endswith('.pdf') or 'pdf' in url.lower()
 
@@ -239,42 +230,18 @@ Return as JSON object."""
         logger.info(f"  📄 Converting PDF to image: {url[:60]}...")
 
         try:
-            pdf_response = req.get(url, timeout=30)
+            pdf_response = get_fetcher().get(url, timeout=30)
             pdf_response.raise_for_status()
-            pdf_bytes = pdf_response.content
 
-            # Try pdf2image first
-            try:
-                from pdf2image import convert_from_bytes
-                images = convert_from_bytes(pdf_bytes, first_page=1, last_page=1, dpi=150)
-                if images:
-                    img_buffer = io.BytesIO()
-                    images[0].save(img_buffer, format='PNG')
-                    img_buffer.seek(0)
-                    return base64.b64encode(img_buffer.read()).decode('utf-8')
-            except ImportError:
-                pass
-
-            # Try PyMuPDF as fallback
-            try:
-                import fitz
-                doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-                if doc.page_count > 0:
-                    page = doc[0]
-                    mat = fitz.Matrix(2, 2)
-                    pix = page.get_pixmap(matrix=mat)
-                    result = base64.b64encode(pix.tobytes("png")).decode('utf-8')
-                    doc.close()
-                    return result
-            except ImportError:
-                raise ValueError("PDF conversion libraries not available")
+            page_image = get_page_image_cache().get_page_image(pdf_response.content, page=1, dpi=150)
+            if not page_image:
+                raise ValueError("PDF conversion failed (is pdf2image or PyMuPDF installed?)")
+            return page_image['data_url']
 
         except Exception as e:
             logger.error(f"  ❌ PDF conversion failed: {e}")
             raise
 
-        return None
-
     def _get_collection_context(self, collection_name: str) -> str:
         """Get context description for collection"""
         contexts = {
@@ -0,0 +1,315 @@
+"""
+Rate Limiting
+Thread-safe token buckets for pacing calls against external API quotas, and
+SQLite-backed buckets for quotas shared by several worker processes
+"""
+import time
+import random
+import threading
+from typing import Dict, Any, Optional
+
+from core.sqlite_pool import get_pool
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `rate` tokens per `per` seconds
+
+    Callers block in acquire() until enough tokens are available, so bursts
+    up to `capacity` go straight through and sustained load settles at the
+    configured rate instead of relying on fixed sleeps.
+    """
+
+    def __init__(self, rate: float, per: float = 60.0, capacity: Optional[float] = None):
+        self.rate = float(rate)
+        self.per = float(per)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+        self.stats = {
+            'acquired': 0,
+            'waits': 0,
+            'wait_seconds': 0.0
+        }
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate / self.per)
+            self._updated = now
+
+    def try_acquire(self, tokens: float = 1) -> float:
+        """Take tokens if available; otherwise return the seconds to wait before retrying (0 = acquired)"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            self._refill(now)
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                self.stats['acquired'] += 1
+                return 0.0
+            # Requests larger than the bucket wait for a full bucket and overdraw it
+            needed = min(tokens, self.capacity) - self._tokens
+            if needed <= 0:
+                self._tokens -= tokens
+                self.stats['acquired'] += 1
+                return 0.0
+            return needed * self.per / self.rate
+
+    def acquire(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        """Block until tokens are available
+
+        Args:
+            tokens: Number of tokens to take
+            timeout: Give up after this many seconds (None = wait indefinitely)
+
+        Returns:
+            True if the tokens were taken, False on timeout
+        """
+        start = time.monotonic()
+        waited = False
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                if waited:
+                    with self._lock:
+                        self.stats['waits'] += 1
+                        self.stats['wait_seconds'] += time.monotonic() - start
+                return True
+            if timeout is not None and time.monotonic() - start + wait > timeout:
+                return False
+            waited = True
+            time.sleep(min(wait, 1.0))
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens for a while (e.g. after a 429 / Retry-After) and empty the bucket"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+            self._updated = self._paused_until
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refill(time.monotonic())
+            stats = dict(self.stats)
+            stats['available_tokens'] = round(self._tokens, 2)
+            stats['rate_per_minute'] = round(self.rate * 60.0 / self.per, 2)
+        return stats
+
+
+class SharedTokenBuckets:
+    """Token buckets whose state lives in SQLite, so every worker process shares one quota
+
+    Each bucket refills at its own rate; try_acquire() takes from several
+    buckets (e.g. requests and tokens per minute) in one transaction so a
+    call only goes ahead when all of them have room. A `reserve` keeps part
+    of each bucket back, which lets low-priority callers stop short of
+    draining the quota that interactive callers rely on.
+    """
+
+    def __init__(self, db_path: str, limits: Dict[str, float], per: float = 60.0):
+        """
+        Args:
+            db_path: SQLite file shared by the processes
+            limits: Bucket name -> tokens per `per` seconds (also the burst size)
+            per: Refill period in seconds
+        """
+        self.limits = {name: float(rate) for name, rate in limits.items()}
+        self.per = float(per)
+        self._pool = get_pool(db_path)
+        self._lock = threading.Lock()
+        self.stats = {
+            'acquired': 0,
+            'waits': 0,
+            'wait_seconds': 0.0,
+            'pauses': 0
+        }
+        self._init_database()
+
+    def _init_database(self):
+        conn = self._pool.connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS rate_buckets (
+                name TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                paused_until REAL NOT NULL DEFAULT 0
+            )
+        ''')
+        now = time.time()
+        cursor.executemany('''
+            INSERT OR IGNORE INTO rate_buckets (name, tokens, updated_at) VALUES (?, ?, ?)
+        ''', [(name, capacity, now) for name, capacity in self.limits.items()])
+        conn.commit()
+        conn.close()
+
+    def _load(self, cursor, now: float) -> Dict[str, list]:
+        """Current (refilled) [tokens, paused_until] of every bucket"""
+        placeholders = ', '.join(['?'] * len(self.limits))
+        cursor.execute(f'SELECT name, tokens, updated_at, paused_until FROM rate_buckets WHERE name IN ({placeholders})',
+                       list(self.limits))
+        state = {}
+        for name, tokens, updated_at, paused_until in cursor.fetchall():
+            capacity = self.limits[name]
+            refill_from = max(updated_at, paused_until)
+            if now > refill_from:
+                tokens = min(capacity, tokens + (now - refill_from) * capacity / self.per)
+            state[name] = [tokens, paused_until]
+        for name, capacity in self.limits.items():
+            state.setdefault(name, [capacity, 0.0])
+        return state
+
+    def _save(self, cursor, state: Dict[str, list], now: float):
+        cursor.executemany('''
+            INSERT OR REPLACE INTO rate_buckets (name, tokens, updated_at, paused_until) VALUES (?, ?, ?, ?)
+        ''', [(name, tokens, now, paused_until) for name, (tokens, paused_until) in state.items()])
+
+    def try_acquire(self, amounts: Dict[str, float], reserve: float = 0.0) -> float:
+        """Take from every bucket at once if all have room
+
+        Args:
+            amounts: Bucket name -> tokens to take
+            reserve: Fraction of each bucket's capacity that must be left behind
+
+        Returns:
+            0 if acquired, otherwise the seconds to wait before retrying
+        """
+        conn = self._pool.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            now = time.time()
+            state = self._load(cursor, now)
+
+            wait = 0.0
+            for name, amount in amounts.items():
+                capacity = self.limits[name]
+                tokens, paused_until = state[name]
+                if now < paused_until:
+                    wait = max(wait, paused_until - now)
+                    continue
+                # Requests larger than the bucket wait for a full bucket (less the reserve) and overdraw it
+                needed = min(amount, capacity * (1 - reserve)) + reserve * capacity - tokens
+                if needed > 0:
+                    wait = max(wait, needed * self.per / capacity)
+
+            if wait <= 0:
+                for name, amount in amounts.items():
+                    state[name][0] -= amount
+                self._save(cursor, state, now)
+            conn.commit()
+        finally:
+            conn.close()
+
+        if wait <= 0:
+            with self._lock:
+                self.stats['acquired'] += 1
+        return wait
+
+    def acquire(self, amounts: Dict[str, float], reserve: float = 0.0, timeout: Optional[float] = None) -> bool:
+        """Block until every bucket has room
+
+        Returns:
+            True if the tokens were taken, False on timeout
+        """
+        start = time.monotonic()
+        waited = False
+        while True:
+            wait = self.try_acquire(amounts, reserve)
+            if wait <= 0:
+                if waited:
+                    with self._lock:
+                        self.stats['waits'] += 1
+                        self.stats['wait_seconds'] += time.monotonic() - start
+                return True
+            if timeout is not None and time.monotonic() - start + wait > timeout:
+                return False
+            waited = True
+            # Jitter keeps waiting processes from all polling at the same instant
+            time.sleep(min(wait, 1.0) * (1 + random.random() * 0.1))
+
+    def adjust(self, name: str, delta: float):
+        """Give back (positive) or take (negative) tokens, e.g. once the real usage of a call is known"""
+        conn = self._pool.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            now = time.time()
+            state = self._load(cursor, now)
+            state[name][0] = min(self.limits[name], state[name][0] + delta)
+            self._save(cursor, state, now)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def pause(self, seconds: float):
+        """Stop every process handing out tokens for a while (e.g. after a 429 / Retry-After) and empty the buckets"""
+        conn = self._pool.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            now = time.time()
+            state = self._load(cursor, now)
+            for bucket in state.values():
+                bucket[0] = 0.0
+                bucket[1] = max(bucket[1], now + seconds)
+            self._save(cursor, state, now)
+            conn.commit()
+        finally:
+            conn.close()
+        with self._lock:
+            self.stats['pauses'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        conn = self._pool.connect()
+        try:
+            now = time.time()
+            state = self._load(conn.cursor(), now)
+        finally:
+            conn.close()
+        with self._lock:
+            stats = dict(self.stats)
+        stats['buckets'] = {
+            name: {
+                'available': round(tokens, 2),
+                'per_minute': round(self.limits[name] * 60.0 / self.per, 2),
+                'paused_for': round(max(0.0, paused_until - now), 2)
+            }
+            for name, (tokens, paused_until) in state.items()
+        }
+        return stats
+
+
+# Named limiters shared by every caller of the same backend in this process
+_limiters: Dict[str, TokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name: str, rate: float, per: float = 60.0, capacity: Optional[float] = None) -> TokenBucket:
+    """Get (or create on first use) the shared limiter for a backend
+
+    Args:
+        name: Backend name, e.g. 'sheets_writes' or 'openai_tokens'
+        rate: Tokens per `per` seconds (only used when the limiter is created)
+        per: Refill period in seconds
+        capacity: Burst size (defaults to `rate`)
+
+    Returns:
+        The shared TokenBucket
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            limiter = TokenBucket(rate, per=per, capacity=capacity)
+            _limiters[name] = limiter
+        return limiter
+
+
+def get_rate_limiter_stats() -> Dict[str, Dict[str, Any]]:
+    """Statistics for every named limiter"""
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {name: limiter.get_stats() for name, limiter in limiters.items()}
@@ -0,0 +1,247 @@
+"""
+Response Cache
+Serialized API responses stored once per data version, with gzip (and brotli,
+when installed) variants compressed up front, so repeat requests are served
+straight from precompressed bytes or answered 304 from their ETag
+"""
+import os
+import gzip
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, List, Optional
+
+from config.settings import get_settings
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Compression levels that stay quick enough for multi-megabyte bodies on a request thread
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_BYTES = 1024
+
+# Content-Encoding -> file suffix, in order of preference
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+def choose_encoding(accept_encoding: str, available: List[str]) -> Optional[str]:
+    """Pick the best stored encoding the client accepts (None = identity)"""
+    accepted = {}
+    for part in (accept_encoding or '').lower().split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name] = quality
+
+    for encoding in ENCODING_SUFFIXES:
+        if encoding in available and accepted.get(encoding, accepted.get('*', 0.0)) > 0:
+            return encoding
+    return None
+
+
+class CachedResponse:
+    """One stored response body and its precompressed variants"""
+
+    def __init__(self, meta: Dict[str, Any], base_path: str):
+        self.key = meta['key']
+        self.version = meta['version']
+        self.etag = meta['etag']
+        self.created_at = meta['created_at']
+        self.sizes: Dict[str, int] = meta['sizes']
+        self._base_path = base_path
+
+    @property
+    def encodings(self) -> List[str]:
+        return [encoding for encoding in ENCODING_SUFFIXES if encoding in self.sizes]
+
+    def body(self, encoding: Optional[str] = None) -> bytes:
+        """The response bytes in the given Content-Encoding (None = identity)"""
+        with open(self._base_path + ENCODING_SUFFIXES.get(encoding, ''), 'rb') as f:
+            return f.read()
+
+
+class ResponseCache:
+    """Disk-backed response bodies shared by every worker process"""
+
+    def __init__(self, cache_dir: str, ttl: int = 300):
+        """
+        Args:
+            cache_dir: Directory holding the bodies and their metadata
+            ttl: Seconds an entry is served before it is rebuilt, even if its version still matches
+        """
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'not_modified': 0,
+            'bytes_stored': 0,
+            'bytes_compressed': 0
+        }
+
+    def count(self, stat: str, amount: int = 1):
+        with self._lock:
+            self.stats[stat] += amount
+
+    def _safe_key(self, key: str) -> str:
+        return key.replace('/', '_').replace('\\', '_')
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{self._safe_key(key)}.meta.json")
+
+    def _body_path(self, key: str, etag: str) -> str:
+        return os.path.join(self.cache_dir, f"{self._safe_key(key)}.{etag}.json")
+
+    def _write_atomic(self, path: str, data: bytes):
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    def _read_meta(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._meta_path(key), 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def get(self, key: str, version: str) -> Optional[CachedResponse]:
+        """
+        Return the stored response if it was built from this data version and is within the TTL
+
+        Args:
+            key: Response key (e.g. 'sinks_all_products')
+            version: Version of the data the response must have been built from
+
+        Returns:
+            CachedResponse, or None on a miss
+        """
+        try:
+            meta = self._read_meta(key)
+            if meta and meta.get('version') == version:
+                age = time.time() - meta['created_at']
+                if age < self.ttl:
+                    self.count('hits')
+                    logger.info(f"✅ Response cache HIT for {key} (version {version}, age {age:.1f}s)")
+                    return CachedResponse(meta, self._body_path(key, meta['etag']))
+                logger.info(f"⏰ Response cache EXPIRED for {key} (age {age:.1f}s)")
+        except Exception as e:
+            logger.warning(f"⚠️ Response cache read error for {key}: {e}")
+
+        self.count('misses')
+        return None
+
+    def put(self, key: str, version: str, body: bytes) -> CachedResponse:
+        """
+        Store a serialized response with its compressed variants
+
+        Args:
+            key: Response key
+            version: Version of the data the body was built from
+            body: Serialized response bytes
+
+        Returns:
+            The stored CachedResponse (ETag is a hash of the body, so unchanged content keeps its ETag)
+        """
+        etag = hashlib.sha256(body).hexdigest()[:32]
+        meta = {
+            'key': key,
+            'version': version,
+            'etag': etag,
+            'created_at': time.time(),
+            'sizes': {'identity': len(body)}
+        }
+        base_path = self._body_path(key, etag)
+
+        variants = {}
+        if len(body) >= MIN_COMPRESS_BYTES:
+            variants['gzip'] = gzip.compress(body, compresslevel=GZIP_LEVEL)
+            if BROTLI_AVAILABLE:
+                variants['br'] = brotli.compress(body, quality=BROTLI_QUALITY)
+
+        try:
+            previous = self._read_meta(key)
+
+            self._write_atomic(base_path, body)
+            for encoding, data in variants.items():
+                self._write_atomic(base_path + ENCODING_SUFFIXES[encoding], data)
+                meta['sizes'][encoding] = len(data)
+            # Metadata goes last, so readers never see it before the bodies exist
+            self._write_atomic(self._meta_path(key), json.dumps(meta).encode('utf-8'))
+
+            if previous and previous.get('etag') != etag:
+                self._remove_bodies(key, previous['etag'])
+
+            self.count('stores')
+            self.count('bytes_stored', len(body))
+            self.count('bytes_compressed', min(meta['sizes'].values()))
+            logger.info(f"💾 Stored response {key} (version {version}): " + ', '.join(
+                f"{encoding} {size / 1024:.0f}KB" for encoding, size in meta['sizes'].items()))
+        except Exception as e:
+            logger.warning(f"⚠️ Response cache write error for {key}: {e}")
+
+        return CachedResponse(meta, base_path)
+
+    def _remove_bodies(self, key: str, etag: str):
+        base_path = self._body_path(key, etag)
+        for suffix in [''] + list(ENCODING_SUFFIXES.values()):
+            try:
+                os.remove(base_path + suffix)
+            except FileNotFoundError:
+                pass
+
+    def invalidate(self, key: str) -> bool:
+        """Drop a stored response"""
+        try:
+            meta = self._read_meta(key)
+            if not meta:
+                return False
+            os.remove(self._meta_path(key))
+            self._remove_bodies(key, meta['etag'])
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Could not invalidate response cache for {key}: {e}")
+            return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        stats['ttl'] = self.ttl
+        stats['brotli_available'] = BROTLI_AVAILABLE
+        return stats
+
+
+# Global instance
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Get the global response cache instance"""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                settings = get_settings()
+                _response_cache = ResponseCache(settings.RESPONSE_CACHE_DIR, ttl=settings.RESPONSE_CACHE_TTL)
+    return _response_cache
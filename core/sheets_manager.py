@@ -9,18 +9,419 @@ import time
 import csv
 import os
 import requests
-from typing import Dict, List, Any, Optional, Tuple, Union
+import threading
+from collections import deque
+from typing import Dict, List, Any, Optional, Tuple, Union, Iterator
 import gspread
 from google.oauth2.service_account import Credentials
 
 from config.settings import get_settings
 from config.collections import get_collection_config, CollectionConfig
-from config.validation import get_validator, validate_product_data
+from config.validation import get_validator, validate_product_data, calculate_quality_scores
 from core.cache_manager import cache_manager
-from core.db_cache import get_db_cache
+from core.db_cache import get_db_cache, compute_content_hash
+from core.rate_limiter import get_rate_limiter
+from core.pricing_index import PricingIndex
 
 logger = logging.getLogger(__name__)
 
+# HTTP statuses worth retrying a Sheets write for (quota exhausted / transient server errors)
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Delay before cells from a failed flush are tried again (doubles per consecutive failure)
+FAILED_FLUSH_RETRY_SECONDS = 30.0
+FAILED_FLUSH_MAX_RETRY_SECONDS = 600.0
+
+# Ranges the Sheets API rejected outright, kept for the stats endpoint
+DEAD_LETTER_LIMIT = 100
+
+
+def merge_cell_ranges(cells: Dict[Tuple[int, int], str]) -> List[Tuple[int, int, List[List[str]]]]:
+    """Merge single-cell updates into rectangular blocks
+
+    Cells adjacent in a row become one run, and runs covering the same columns
+    on consecutive rows are stacked into one block.
+
+    Args:
+        cells: Values keyed by (row, col), both 1-based
+
+    Returns:
+        List of (start_row, start_col, values) blocks, values as rows of cells
+    """
+    runs = []
+    for (row, col) in sorted(cells):
+        if runs and runs[-1][0] == row and runs[-1][1] + len(runs[-1][2]) == col:
+            runs[-1][2].append(cells[(row, col)])
+        else:
+            runs.append((row, col, [cells[(row, col)]]))
+
+    blocks = []
+    open_blocks = {}
+    for row, col, values in runs:
+        block = open_blocks.get((col, len(values)))
+        if block and block[0] + len(block[2]) == row:
+            block[2].append(values)
+        else:
+            block = (row, col, [values])
+            blocks.append(block)
+            open_blocks[(col, len(values))] = block
+    return blocks
+
+
+class SheetsWriteQueue:
+    """Write-behind queue for Google Sheets cell updates
+
+    Updates are queued per spreadsheet and coalesced (a later value for the
+    same cell replaces the earlier one). A background thread flushes each
+    spreadsheet once its oldest update is `window_seconds` old, sending every
+    pending cell as one values.batchUpdate with adjacent cells merged into
+    ranges. Calls are paced by a token bucket sized to the Sheets write quota
+    and quota/transient errors are retried with backoff. Cells from a flush
+    that still fails are put back in the queue (behind any newer value for the
+    same cell) and tried again later, so an update the cache already shows is
+    never silently lost.
+    """
+
+    def __init__(self, sheets_manager: 'SheetsManager', window_seconds: float = 2.0,
+                 requests_per_minute: int = 60, max_retries: int = 5):
+        self._manager = sheets_manager
+        self.window_seconds = window_seconds
+        self.max_retries = max_retries
+        # Shared with other direct Sheets writers (e.g. row appends) so they draw on one quota
+        self._bucket = get_rate_limiter('sheets_writes', requests_per_minute, per=60.0,
+                                        capacity=max(1, requests_per_minute // 6))
+
+        # spreadsheet_id -> {(collection_name, row, col): formatted value}
+        self._pending: Dict[str, Dict[Tuple[str, int, int], str]] = {}
+        self._first_queued: Dict[str, float] = {}
+        # spreadsheet_id -> (monotonic time of the next attempt, consecutive failed flushes)
+        self._retry_at: Dict[str, Tuple[float, int]] = {}
+        self._condition = threading.Condition()
+        self._flush_locks: Dict[str, threading.Lock] = {}
+        self._worker = None
+        self._dead_letters = deque(maxlen=DEAD_LETTER_LIMIT)
+
+        self.stats = {
+            'cells_queued': 0,
+            'cells_coalesced': 0,
+            'cells_written': 0,
+            'ranges_written': 0,
+            'flushes': 0,
+            'api_calls': 0,
+            'retries': 0,
+            'failed_flushes': 0,
+            'cells_requeued': 0,
+            'ranges_dead_lettered': 0,
+            'cells_dead_lettered': 0,
+            'last_flush_at': None,
+            'last_flush_seconds': 0.0,
+            'last_error': None
+        }
+
+    def enqueue(self, collection_name: str, spreadsheet_id: str, cells: Dict[Tuple[int, int], str]):
+        """Queue formatted cell values keyed by (row, col) for a collection's worksheet"""
+        if not cells:
+            return
+
+        with self._condition:
+            pending = self._pending.setdefault(spreadsheet_id, {})
+            for (row, col), value in cells.items():
+                key = (collection_name, row, col)
+                if key in pending:
+                    self.stats['cells_coalesced'] += 1
+                pending[key] = value
+            self.stats['cells_queued'] += len(cells)
+            self._first_queued.setdefault(spreadsheet_id, time.monotonic())
+            self._ensure_worker()
+            self._condition.notify()
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name='sheets-write-behind', daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+
+                now = time.monotonic()
+                due_at = {sid: self._due_at(sid) for sid in self._first_queued}
+                due = [sid for sid, at in due_at.items() if at <= now]
+                if not due:
+                    self._condition.wait(max(0.01, min(due_at.values()) - now))
+                    continue
+
+            for spreadsheet_id in due:
+                try:
+                    self._flush_spreadsheet(spreadsheet_id)
+                except Exception as e:
+                    logger.error(f"❌ Write-behind flush failed for spreadsheet {spreadsheet_id[:10]}...: {e}")
+
+    def _due_at(self, spreadsheet_id: str) -> float:
+        """When a spreadsheet's pending cells should be flushed. Call with the condition held."""
+        due = self._first_queued[spreadsheet_id] + self.window_seconds
+        retry_at = self._retry_at.get(spreadsheet_id)
+        return max(due, retry_at[0]) if retry_at else due
+
+    def _flush_spreadsheet(self, spreadsheet_id: str) -> bool:
+        """Send every pending cell for one spreadsheet as a single values.batchUpdate"""
+        with self._condition:
+            flush_lock = self._flush_locks.setdefault(spreadsheet_id, threading.Lock())
+
+        # One flush per spreadsheet at a time keeps writes to the same cell in order
+        with flush_lock:
+            with self._condition:
+                pending = self._pending.pop(spreadsheet_id, None)
+                self._first_queued.pop(spreadsheet_id, None)
+            if not pending:
+                return True
+
+            start_time = time.time()
+            entries = []  # (range for values.batchUpdate, queued cells it carries)
+            by_collection: Dict[str, Dict[Tuple[int, int], str]] = {}
+            for (collection_name, row, col), value in pending.items():
+                by_collection.setdefault(collection_name, {})[(row, col)] = value
+
+            spreadsheet = None
+            unreachable = {}
+            for collection_name, cells in by_collection.items():
+                # Cached spreadsheet handle; the worksheet is addressed by title so no metadata fetch is needed
+                collection_spreadsheet = self._manager.get_spreadsheet(collection_name)
+                if not collection_spreadsheet:
+                    logger.error(f"❌ Write-behind: no spreadsheet for {collection_name}, "
+                                 f"re-queueing {len(cells)} cells")
+                    unreachable.update({(collection_name, row, col): value for (row, col), value in cells.items()})
+                    continue
+                spreadsheet = collection_spreadsheet
+                sheet_title = get_collection_config(collection_name).worksheet_name.replace("'", "''")
+                for start_row, start_col, values in merge_cell_ranges(cells):
+                    end_row = start_row + len(values) - 1
+                    end_col = start_col + len(values[0]) - 1
+                    entries.append(({
+                        'range': f"'{sheet_title}'!{gspread.utils.rowcol_to_a1(start_row, start_col)}:"
+                                 f"{gspread.utils.rowcol_to_a1(end_row, end_col)}",
+                        'values': values
+                    }, {(collection_name, row, col): values[row - start_row][col - start_col]
+                        for row in range(start_row, end_row + 1) for col in range(start_col, end_col + 1)}))
+
+            if unreachable:
+                self._requeue(spreadsheet_id, unreachable, 'No spreadsheet for '
+                              + ', '.join(sorted({key[0] for key in unreachable})))
+            if not entries:
+                return False
+
+            written, failed, error = self._write_ranges(spreadsheet, spreadsheet_id, entries)
+            if failed:
+                logger.error(f"❌ Write-behind batch update failed for spreadsheet "
+                             f"{spreadsheet_id[:10]}... after {self.max_retries + 1} attempts: {error}")
+                self._requeue(spreadsheet_id, {key: value for _, cells in failed for key, value in cells.items()},
+                              str(error))
+            if not written:
+                return False
+
+            written_cells = sum(len(cells) for _, cells in written)
+            duration = time.time() - start_time
+            with self._condition:
+                if not unreachable and not failed:
+                    self._retry_at.pop(spreadsheet_id, None)
+                self.stats['flushes'] += 1
+                self.stats['cells_written'] += written_cells
+                self.stats['ranges_written'] += len(written)
+                self.stats['last_flush_at'] = time.time()
+                self.stats['last_flush_seconds'] = duration
+
+            logger.info(f"✅ Write-behind flushed {written_cells} cells as {len(written)} ranges "
+                        f"to spreadsheet {spreadsheet_id[:10]}... in {duration:.2f}s")
+            return not unreachable and len(written) == len(entries)
+
+    def _write_ranges(self, spreadsheet, spreadsheet_id: str, entries: List[Tuple[Dict[str, Any], Dict]]) -> Tuple:
+        """Write ranges in one values.batchUpdate, splitting a rejected batch to find the ranges at fault
+
+        The whole batch fails if any one range is refused (e.g. a 400 for a
+        protected or out-of-grid range), so a refused batch is halved until
+        each refused range is on its own; those are dead-lettered and the rest
+        are written.
+
+        Returns:
+            (written entries, entries to retry later, error that made them fail)
+        """
+        error = self._send(spreadsheet, [entry for entry, _ in entries])
+        if error is None:
+            return entries, [], None
+        if self._is_retryable(error):
+            return [], entries, error
+        if len(entries) == 1:
+            self._dead_letter(spreadsheet_id, *entries[0], error)
+            return [], [], None
+
+        middle = len(entries) // 2
+        written, failed, first_error = self._write_ranges(spreadsheet, spreadsheet_id, entries[:middle])
+        more_written, more_failed, second_error = self._write_ranges(spreadsheet, spreadsheet_id, entries[middle:])
+        return written + more_written, failed + more_failed, first_error or second_error
+
+    def _send(self, spreadsheet, data: List[Dict[str, Any]]) -> Optional[Exception]:
+        """One values.batchUpdate, retried for quota, server and network errors
+
+        Returns:
+            None once written, otherwise the error it gave up on
+        """
+        for attempt in range(self.max_retries + 1):
+            self._bucket.acquire()
+            try:
+                with self._condition:
+                    self.stats['api_calls'] += 1
+                spreadsheet.values_batch_update({'valueInputOption': 'RAW', 'data': data})
+                return None
+            except Exception as e:
+                if not self._is_retryable(e) or attempt == self.max_retries:
+                    return e
+
+                status_code = self._get_status_code(e)
+                backoff = self._get_retry_after(e) or min(60.0, 2.0 ** attempt)
+                if status_code == 429:
+                    # Quota exhausted: hold every writer back, not just this flush
+                    self._bucket.pause(backoff)
+                logger.warning(f"⏳ Sheets write {status_code or 'error'}, retrying in {backoff:.1f}s "
+                               f"(attempt {attempt + 1}/{self.max_retries})")
+                with self._condition:
+                    self.stats['retries'] += 1
+                time.sleep(backoff)
+
+    def _dead_letter(self, spreadsheet_id: str, entry: Dict[str, Any], cells: Dict[Tuple[str, int, int], str],
+                     error: Exception):
+        """Give up on a range the Sheets API refused
+
+        The cache already holds the refused values, so the collections'
+        recorded modifiedTime is cleared to make the next delta sync read the
+        sheet and put its values back.
+        """
+        collections = sorted({key[0] for key in cells})
+        with self._condition:
+            self._dead_letters.append({
+                'spreadsheet_id': spreadsheet_id,
+                'collections': collections,
+                'range': entry['range'],
+                'cells': len(cells),
+                'status_code': self._get_status_code(error),
+                'error': str(error),
+                'at': time.time()
+            })
+            self.stats['ranges_dead_lettered'] += 1
+            self.stats['cells_dead_lettered'] += len(cells)
+            self.stats['last_error'] = str(error)
+        logger.error(f"❌ Sheets refused {entry['range']} ({len(cells)} cells) in spreadsheet "
+                     f"{spreadsheet_id[:10]}..., dropping it: {error}")
+
+        db_cache = get_db_cache()
+        for collection_name in collections:
+            db_cache.set_sheet_modified_time(collection_name, None)
+
+    def _requeue(self, spreadsheet_id: str, cells: Dict[Tuple[str, int, int], str], error: str):
+        """Put cells from a failed flush back in the queue and back off before the next attempt
+
+        A value queued for the same cell while the flush was running is newer,
+        so it is kept instead of the failed one.
+        """
+        if not cells:
+            return
+        with self._condition:
+            pending = self._pending.setdefault(spreadsheet_id, {})
+            for key, value in cells.items():
+                pending.setdefault(key, value)
+            now = time.monotonic()
+            self._first_queued[spreadsheet_id] = min(self._first_queued.get(spreadsheet_id, now), now)
+
+            failures = self._retry_at.get(spreadsheet_id, (0.0, 0))[1] + 1
+            delay = min(FAILED_FLUSH_MAX_RETRY_SECONDS, FAILED_FLUSH_RETRY_SECONDS * 2 ** (failures - 1))
+            self._retry_at[spreadsheet_id] = (now + delay, failures)
+
+            self.stats['failed_flushes'] += 1
+            self.stats['cells_requeued'] += len(cells)
+            self.stats['last_error'] = error
+            self._ensure_worker()
+            self._condition.notify()
+        logger.warning(f"🔁 Re-queued {len(cells)} cells for spreadsheet {spreadsheet_id[:10]}..., "
+                       f"next attempt in {delay:.0f}s (failure {failures})")
+
+    @staticmethod
+    def _get_status_code(error: Exception) -> Optional[int]:
+        response = getattr(error, 'response', None)
+        return getattr(response, 'status_code', None)
+
+    @classmethod
+    def _is_retryable(cls, error: Exception) -> bool:
+        """Quota, server and network errors; other HTTP errors will fail the same way again"""
+        status_code = cls._get_status_code(error)
+        return status_code is None or status_code in RETRYABLE_STATUS_CODES
+
+    @staticmethod
+    def _get_retry_after(error: Exception) -> Optional[float]:
+        response = getattr(error, 'response', None)
+        headers = getattr(response, 'headers', None) or {}
+        try:
+            return float(headers.get('Retry-After'))
+        except (TypeError, ValueError):
+            return None
+
+    def flush(self, collection_name: Optional[str] = None) -> bool:
+        """Write pending updates now (all spreadsheets, or just the collection's)
+
+        Returns:
+            True if every flushed spreadsheet was written successfully
+        """
+        with self._condition:
+            if collection_name:
+                spreadsheet_ids = [sid for sid, pending in self._pending.items()
+                                   if any(key[0] == collection_name for key in pending)]
+            else:
+                spreadsheet_ids = list(self._pending.keys())
+
+        success = True
+        for spreadsheet_id in spreadsheet_ids:
+            success = self._flush_spreadsheet(spreadsheet_id) and success
+        return success
+
+    def get_pending_fields(self, collection_name: str) -> Dict[int, Dict[str, str]]:
+        """Queued-but-unwritten values for a collection, keyed by row then field"""
+        config = get_collection_config(collection_name)
+        fields_by_col = {}
+        for field, col in config.column_mapping.items():
+            fields_by_col.setdefault(col, []).append(field)
+
+        pending_fields: Dict[int, Dict[str, str]] = {}
+        with self._condition:
+            for pending in self._pending.values():
+                for (name, row, col), value in pending.items():
+                    if name != collection_name:
+                        continue
+                    for field in fields_by_col.get(col, []):
+                        pending_fields.setdefault(row, {})[field] = value
+        return pending_fields
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Flush counters plus the current backlog"""
+        with self._condition:
+            stats = dict(self.stats)
+            now = time.monotonic()
+            stats['pending_cells'] = sum(len(pending) for pending in self._pending.values())
+            stats['pending_spreadsheets'] = len(self._pending)
+            stats['oldest_pending_seconds'] = (
+                round(now - min(self._first_queued.values()), 2) if self._first_queued else 0.0
+            )
+            # Spreadsheets whose last flush failed, with their queued cell counts
+            stats['failing_spreadsheets'] = {
+                sid: {'cells': len(self._pending.get(sid, {})), 'failures': failures,
+                      'retry_in_seconds': round(max(0.0, retry_at - now), 1)}
+                for sid, (retry_at, failures) in self._retry_at.items()
+            }
+            stats['dead_letters'] = list(self._dead_letters)
+        stats['window_seconds'] = self.window_seconds
+        stats['rate_limiter'] = self._bucket.get_stats()
+        return stats
+
+
 class SheetsManager:
     """Collection-agnostic Google Sheets manager with pricing lookup support"""
 
@@ -29,7 +430,15 @@ class SheetsManager:
         self.settings = get_settings()
         self.setup_credentials()
         self._spreadsheet_cache = {}  # Cache spreadsheet objects
-        self._pricing_cache = {}  # Cache pricing data
+        self._pricing_indexes = {}  # (pricing_sheet_id, worksheet) -> PricingIndex
+        self._pricing_indexes_lock = threading.Lock()
+        self._auto_sync_thread = None
+        self.write_queue = SheetsWriteQueue(
+            self,
+            window_seconds=self.settings.SHEETS_WRITE_WINDOW_SECONDS,
+            requests_per_minute=self.settings.SHEETS_WRITE_REQUESTS_PER_MINUTE,
+            max_retries=self.settings.SHEETS_WRITE_MAX_RETRIES
+        )
 
     def setup_credentials(self) -> bool:
         """Setup Google Sheets credentials"""
@@ -43,7 +452,11 @@ class SheetsManager:
 
                 creds = Credentials.from_service_account_info(
                     creds_dict,
-                    scopes=['https://www.googleapis.com/auth/spreadsheets']
+                    scopes=[
+                        'https://www.googleapis.com/auth/spreadsheets',
+                        # Read-only Drive metadata lets delta sync check modifiedTime
+                        'https://www.googleapis.com/auth/drive.metadata.readonly'
+                    ]
                 )
                 self.gc = gspread.authorize(creds)
                 logger.info("✅ Google Sheets authentication successful")
@@ -120,63 +533,64 @@ class SheetsManager:
         Returns:
             Dict containing pricing data or empty dict if not found
         """
+        return self.get_pricing_many(pricing_sheet_id, pricing_worksheet, pricing_config, [target_sku]).get(target_sku, {})
+
+    def get_pricing_many(self, pricing_sheet_id: str, pricing_worksheet: str, pricing_config: Dict,
+                         target_skus: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Get pricing data for several SKUs from the external pricing sheet in one pass
+
+        Args:
+            pricing_sheet_id: Google Sheets ID of the pricing spreadsheet
+            pricing_worksheet: Name of the worksheet containing pricing data
+            pricing_config: Configuration dict with column mappings
+            target_skus: SKUs to look up
+
+        Returns:
+            Dict of SKU -> pricing data for the SKUs found
+        """
         try:
-            # Check cache first
-            cache_key = f"{pricing_sheet_id}_{target_sku}"
-            if cache_key in self._pricing_cache:
-                logger.debug(f"Using cached pricing data for SKU: {target_sku}")
-                return self._pricing_cache[cache_key]
+            pricing_index = self._get_pricing_index(pricing_sheet_id, pricing_worksheet)
+            if not pricing_index:
+                return {}
+
+            rows = pricing_index.get_rows(target_skus, pricing_config['sku_column'])
+            return {
+                sku: {
+                    'our_price': self._safe_get_cell_value(row, pricing_config.get('our_price_column', 0)),
+                    'competitor_name': pricing_config.get('competitor_name', ''),
+                    'competitor_price': self._safe_get_cell_value(row, pricing_config.get('competitor_price_column', 0)),
+                    'rrp': self._safe_get_cell_value(row, pricing_config.get('rrp_column', 0)),
+                    'lowest_price': self._safe_get_cell_value(row, pricing_config.get('lowest_price_column', 0))
+                }
+                for sku, (row, prices) in rows.items()
+            }
+
+        except Exception as e:
+            logger.error(f"Error getting pricing data for {len(target_skus)} SKUs: {e}")
+            return {}
+
+    def _get_pricing_index(self, pricing_sheet_id: str, pricing_worksheet: str) -> Optional[PricingIndex]:
+        """Get (or create) the SKU index for a pricing worksheet"""
+        key = (pricing_sheet_id, pricing_worksheet)
+        with self._pricing_indexes_lock:
+            pricing_index = self._pricing_indexes.get(key)
+            if pricing_index:
+                return pricing_index
 
-            # Connect to the pricing spreadsheet
             if not self.gc:
                 logger.error("No Google Sheets client available for pricing lookup")
-                return {}
+                return None
 
             pricing_spreadsheet = self.gc.open_by_key(pricing_sheet_id)
-            pricing_sheet = pricing_spreadsheet.worksheet(pricing_worksheet)
-            
-            # Get all data from the pricing sheet
-            all_data = pricing_sheet.get_all_values()
-            
-            if not all_data or len(all_data) < 2:
-                logger.warning("No data found in pricing sheet")
-                return {}
-            
-            logger.info(f"Searching for SKU '{target_sku}' in {len(all_data)} rows of pricing data")
-            
-            # Find the target SKU
-            for row_index, row in enumerate(all_data[1:], start=2):  # Skip header row
-                if len(row) >= pricing_config['sku_column']:
-                    sheet_sku = row[pricing_config['sku_column'] - 1].strip()  # Convert to 0-based index
-                    
-                    if sheet_sku == target_sku:
-                        logger.info(f"Found SKU '{target_sku}' at row {row_index}")
-                        
-                        # Extract pricing data safely
-                        pricing_data = {
-                            'our_price': self._safe_get_cell_value(row, pricing_config.get('our_price_column', 0)),
-                            'competitor_name': pricing_config.get('competitor_name', ''),
-                            'competitor_price': self._safe_get_cell_value(row, pricing_config.get('competitor_price_column', 0)),
-                            'rrp': self._safe_get_cell_value(row, pricing_config.get('rrp_column', 0)),
-                            'lowest_price': self._safe_get_cell_value(row, pricing_config.get('lowest_price_column', 0))
-                        }
-                        
-                        # Cache the result
-                        self._pricing_cache[cache_key] = pricing_data
-                        
-                        logger.info(f"Retrieved pricing data for {target_sku}: Our: {pricing_data['our_price']}, Competitor: {pricing_data['competitor_price']}")
-                        return pricing_data
-            
-            # SKU not found
-            logger.warning(f"SKU '{target_sku}' not found in pricing sheet")
-            
-            # Cache the empty result to avoid repeated lookups
-            self._pricing_cache[cache_key] = {}
-            return {}
-            
-        except Exception as e:
-            logger.error(f"Error getting pricing data for SKU {target_sku}: {e}")
-            return {}
+            pricing_index = PricingIndex(
+                pricing_worksheet,
+                lambda: pricing_spreadsheet.worksheet(pricing_worksheet).get_all_values(),
+                pricing_spreadsheet.get_lastUpdateTime,
+                ttl=self.settings.PRICING_INDEX_TTL
+            )
+            self._pricing_indexes[key] = pricing_index
+            return pricing_index
 
     def _safe_get_cell_value(self, row: List[str], column_index: int) -> str:
         """Safely get a cell value from a row"""
@@ -249,9 +663,18 @@ class SheetsManager:
 
     def clear_pricing_cache(self):
         """Clear the pricing data cache"""
-        self._pricing_cache.clear()
+        with self._pricing_indexes_lock:
+            pricing_indexes = list(self._pricing_indexes.values())
+        for pricing_index in pricing_indexes:
+            pricing_index.invalidate()
         logger.info("Pricing cache cleared")
 
+    def get_pricing_index_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Statistics for each loaded pricing index"""
+        with self._pricing_indexes_lock:
+            pricing_indexes = dict(self._pricing_indexes)
+        return {worksheet: pricing_index.get_stats() for (sheet_id, worksheet), pricing_index in pricing_indexes.items()}
+
     def get_urls_from_collection(self, collection_name: str, force_refresh: bool = False,
                                    source_type: str = 'auto') -> List[Tuple[int, str, str]]:
         """Get all URLs from a collection's spreadsheet
@@ -437,33 +860,75 @@ class SheetsManager:
 
         # Fetch from Google Sheets
         worksheet = self.get_worksheet(collection_name)
-        if not worksheet:
-            # Use CSV fallback for public Google Sheets
-            logger.info(f"🔄 No Google Sheets API access, using CSV export for {collection_name}")
-            products = self.get_all_products_csv_fallback(collection_name)
-        else:
-            products = self._fetch_products_from_sheet(collection_name, worksheet)
+        products = None
+        if worksheet:
+            # Delta sync only rewrites changed rows, then the cache is the source of truth
+            sync_result = self.sync_collection(collection_name, force=True, worksheet=worksheet)
+            if sync_result.get('success'):
+                products = db_cache.get_all_products(collection_name) or {}
+                if products:
+                    cache_manager.warm_cache(collection_name, products)
+
+        if products is None:
+            if not worksheet:
+                # Use CSV fallback for public Google Sheets
+                logger.info(f"🔄 No Google Sheets API access, using CSV export for {collection_name}")
+                products = self.get_all_products_csv_fallback(collection_name)
+            else:
+                products = self._fetch_products_from_sheet(collection_name, worksheet)
 
-        # Cache the results for future requests
-        if products:
-            # Save to both caches
-            sync_duration = time.time() - start_time
-            db_cache.save_all_products(collection_name, products, sync_duration)
-            cache_manager.warm_cache(collection_name, products)
+            # Cache the results for future requests
+            if products:
+                # Save to both caches
+                sync_duration = time.time() - start_time
+                db_cache.save_all_products(collection_name, products, sync_duration)
+                cache_manager.warm_cache(collection_name, products)
 
         elapsed_time = (time.time() - start_time) * 1000
         logger.info(f"📊 Retrieved {len(products)} products from Google Sheets for {collection_name} in {elapsed_time:.1f}ms")
         return products
 
+    def iter_all_products(self, collection_name: str, force_refresh: bool = False) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Yield a collection's products in row order, reading the SQLite cache in batches
+
+        Used by streaming listings and exports so memory stays flat whatever
+        the collection size. When the collection is not cached (or a refresh
+        is forced) this falls back to get_all_products, which loads it once.
+        """
+        if not force_refresh:
+            cached = get_db_cache().iter_products(collection_name)
+            first = next(cached, None)
+            if first is not None:
+                yield first
+                yield from cached
+                return
+
+        products = self.get_all_products(collection_name, force_refresh=force_refresh)
+        for row_num in sorted(products or {}):
+            yield row_num, products[row_num]
+
     def get_products_paginated(self, collection_name: str, page: int = 1, limit: int = 50,
-                             search: str = '', quality_filter: str = '', sort_by: str = 'sheet_order', force_refresh: bool = False) -> Dict[str, Any]:
+                             search: str = '', quality_filter: str = '', sort_by: str = 'sheet_order', force_refresh: bool = False,
+                             after: Optional[str] = None) -> Dict[str, Any]:
         """Get paginated products for better performance with large datasets
 
+        When the collection is in the SQLite cache, filtering, sorting and
+        pagination run as SQL so only the requested page is loaded.
+
         Args:
             sort_by: 'sheet_order' (default, preserves Google Sheets order) or 'quality_score'
+            after: Keyset cursor (`next_cursor` from the previous page), SQLite path only
         """
         start_time = time.time()
 
+        if not force_refresh:
+            result = get_db_cache().query_products(collection_name, page, limit, search,
+                                                   quality_filter, sort_by, after)
+            if result is not None:
+                elapsed_time = (time.time() - start_time) * 1000
+                logger.info(f"📄 Paginated {len(result['products'])} products from {result['total_count']} total for {collection_name} in {elapsed_time:.1f}ms (SQLite)")
+                return result
+
         # Get all products (this uses cache if available)
         all_products = self.get_all_products(collection_name, force_refresh=force_refresh)
 
@@ -560,35 +1025,16 @@ class SheetsManager:
             products = {}
 
             for row_index, row_data in enumerate(all_values[1:], start=2):  # Start at row 2
-                # Ensure row has enough columns
-                while len(row_data) < max(config.column_mapping.values()):
-                    row_data.append('')
-
-                # Map data using column mapping from config
-                product = {}
-                for field, col_index in config.column_mapping.items():
-                    if col_index <= len(row_data):
-                        value = row_data[col_index - 1] if col_index > 0 else ''
-                        product[field] = value.strip() if value else ''
-                    else:
-                        product[field] = ''
-
-                # Only include products that have some meaningful data
-                # Check if ANY field has actual content (not just key fields)
-                has_any_content = any(
-                    str(value).strip()
-                    for value in product.values()
-                    if value and str(value).strip().lower() not in ['', 'n/a', 'null', 'none']
-                )
+                product = self._map_row_to_product(config, row_data)
 
-                if has_any_content:
-                    # Calculate or use existing quality score
-                    quality_score = self._get_quality_score(collection_name, product)
-                    product['quality_score'] = quality_score
+                if self._row_has_content(product):
                     products[row_index] = product
                 else:
                     logger.debug(f"⏭️ Skipping completely empty row {row_index}")
 
+            # Calculate or use existing quality scores
+            self._set_quality_scores(collection_name, products)
+
             logger.info(f"📊 Included {len(products)} products from {len(all_values) - 1} rows in {collection_name}")
             return products
 
@@ -596,6 +1042,199 @@ class SheetsManager:
             logger.error(f"❌ Error retrieving products from {collection_name}: {e}")
             return {}
 
+    def _map_row_to_product(self, config: CollectionConfig, row_data: List[str]) -> Dict[str, Any]:
+        """Map a raw sheet row (column A first) to a product dict using the column mapping"""
+        # Ensure row has enough columns
+        while len(row_data) < max(config.column_mapping.values()):
+            row_data.append('')
+
+        # Map data using column mapping from config
+        product = {}
+        for field, col_index in config.column_mapping.items():
+            if col_index <= len(row_data):
+                value = row_data[col_index - 1] if col_index > 0 else ''
+                product[field] = value.strip() if value else ''
+            else:
+                product[field] = ''
+        return product
+
+    def _row_has_content(self, product: Dict[str, Any]) -> bool:
+        """Only include products that have some meaningful data
+        Check if ANY field has actual content (not just key fields)"""
+        return any(
+            str(value).strip()
+            for value in product.values()
+            if value and str(value).strip().lower() not in ['', 'n/a', 'null', 'none']
+        )
+
+    def _get_column_bands(self, config: CollectionConfig, max_gap: int = 3) -> List[Tuple[int, int]]:
+        """Group the mapped columns into contiguous (start, end) bands, bridging small gaps"""
+        bands = []
+        for col in sorted(set(c for c in config.column_mapping.values() if c > 0)):
+            if bands and col - bands[-1][1] <= max_gap + 1:
+                bands[-1][1] = col
+            else:
+                bands.append([col, col])
+        return [(start, end) for start, end in bands]
+
+    def _fetch_rows_by_band(self, worksheet, config: CollectionConfig) -> List[List[str]]:
+        """Read only the mapped column bands (from row 2 down) in one values.batchGet call
+
+        Returns full-width rows (column A at index 0) so they map like get_all_values() rows
+        """
+        bands = self._get_column_bands(config)
+        ranges = []
+        for start, end in bands:
+            end_column = gspread.utils.rowcol_to_a1(1, end).rstrip('0123456789')
+            ranges.append(f"{gspread.utils.rowcol_to_a1(2, start)}:{end_column}")
+
+        value_ranges = worksheet.batch_get(ranges)
+
+        width = max(config.column_mapping.values())
+        row_count = max((len(value_range) for value_range in value_ranges), default=0)
+        rows = [[''] * width for _ in range(row_count)]
+        for (start, end), value_range in zip(bands, value_ranges):
+            for row_offset, band_values in enumerate(value_range):
+                row = rows[row_offset]
+                for col_offset, value in enumerate(band_values[:end - start + 1]):
+                    row[start - 1 + col_offset] = value
+        return rows
+
+    def _get_sheet_modified_time(self, collection_name: str) -> Optional[str]:
+        """Drive modifiedTime of a collection's spreadsheet, or None if unavailable"""
+        spreadsheet = self.get_spreadsheet(collection_name)
+        if not spreadsheet:
+            return None
+        try:
+            return spreadsheet.get_lastUpdateTime()
+        except Exception as e:
+            logger.debug(f"Could not read modifiedTime for {collection_name}: {e}")
+            return None
+
+    def sync_collection(self, collection_name: str, force: bool = False, worksheet=None) -> Dict[str, Any]:
+        """Incrementally sync a collection's sheet into the SQLite cache
+
+        Skips the read entirely when the spreadsheet's Drive modifiedTime is
+        unchanged. Otherwise reads only the mapped column bands, compares a
+        hash of each raw row with the one stored at the last sync and only
+        rebuilds, re-scores and writes the rows that changed.
+
+        Args:
+            collection_name: Name of the collection
+            force: Read the sheet even if modifiedTime has not changed
+            worksheet: Worksheet to read (looked up if not given)
+
+        Returns:
+            Dict with success flag, status, and changed/removed/total row counts
+        """
+        start_time = time.time()
+        db_cache = get_db_cache()
+
+        try:
+            if worksheet is None:
+                worksheet = self.get_worksheet(collection_name)
+            if not worksheet:
+                return {'success': False, 'error': f'Could not access worksheet for {collection_name}'}
+
+            config = get_collection_config(collection_name)
+            modified_time = self._get_sheet_modified_time(collection_name)
+            previous_hashes = db_cache.get_source_hashes(collection_name)
+
+            if (not force and modified_time and previous_hashes
+                    and modified_time == db_cache.get_sheet_modified_time(collection_name)):
+                logger.info(f"⏭️ {collection_name} sheet unchanged since {modified_time}, skipping sync")
+                return {
+                    'success': True,
+                    'status': 'unchanged',
+                    'changed': 0,
+                    'removed': 0,
+                    'total': len(previous_hashes),
+                    'duration': time.time() - start_time
+                }
+
+            rows = self._fetch_rows_by_band(worksheet, config)
+            pending_fields = self.write_queue.get_pending_fields(collection_name)
+
+            changed_products = {}
+            changed_hashes = {}
+            current_rows = set()
+            for row_index, row_data in enumerate(rows, start=2):  # Start at row 2
+                product = self._map_row_to_product(config, row_data)
+                if not self._row_has_content(product):
+                    continue
+
+                current_rows.add(row_index)
+                source_hash = compute_content_hash(product)
+                pending = pending_fields.get(row_index)
+                if pending:
+                    # Queued writes haven't reached the sheet yet: keep them and re-check next sync
+                    product.update(pending)
+                    source_hash = None
+                elif previous_hashes.get(row_index) == source_hash:
+                    continue
+
+                changed_products[row_index] = product
+                changed_hashes[row_index] = source_hash
+
+            self._set_quality_scores(collection_name, changed_products)
+
+            removed_rows = [row for row in previous_hashes
+                            if row not in current_rows and row not in pending_fields]
+
+            if changed_products and db_cache.upsert_products(collection_name, changed_products, changed_hashes) < 0:
+                return {'success': False, 'error': 'Failed to write changed rows to cache'}
+            if removed_rows and db_cache.delete_products(collection_name, removed_rows) < 0:
+                return {'success': False, 'error': 'Failed to remove deleted rows from cache'}
+
+            sync_duration = time.time() - start_time
+            db_cache.set_sheet_modified_time(collection_name, modified_time)
+            db_cache.log_sync(collection_name, len(current_rows), sync_duration)
+
+            if changed_products or removed_rows:
+                cache_manager.invalidate('products', collection_name)
+
+            logger.info(f"🔄 Delta sync {collection_name}: {len(changed_products)} changed, "
+                        f"{len(removed_rows)} removed, {len(current_rows)} total in {sync_duration:.2f}s")
+            return {
+                'success': True,
+                'status': 'synced',
+                'changed': len(changed_products),
+                'removed': len(removed_rows),
+                'total': len(current_rows),
+                'duration': sync_duration
+            }
+
+        except Exception as e:
+            logger.error(f"❌ Delta sync failed for {collection_name}: {e}")
+            return {'success': False, 'error': str(e)}
+
+    def sync_all_collections(self, force: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Delta-sync every collection that has a spreadsheet configured"""
+        from config.collections import get_all_collections
+
+        results = {}
+        for name, config in get_all_collections().items():
+            if config.spreadsheet_id:
+                results[name] = self.sync_collection(name, force=force)
+        return results
+
+    def start_auto_sync(self, interval_seconds: int):
+        """Start a daemon thread that delta-syncs every collection periodically"""
+        if self._auto_sync_thread and self._auto_sync_thread.is_alive():
+            return
+
+        def run():
+            while True:
+                time.sleep(interval_seconds)
+                try:
+                    self.sync_all_collections()
+                except Exception as e:
+                    logger.error(f"❌ Auto sync failed: {e}")
+
+        self._auto_sync_thread = threading.Thread(target=run, name='sheets-auto-sync', daemon=True)
+        self._auto_sync_thread.start()
+        logger.info(f"🔁 Started Google Sheets auto sync every {interval_seconds}s")
+
     def get_single_product(self, collection_name: str, row_num: int) -> Optional[Dict[str, Any]]:
         """Get a single product by row number"""
         worksheet = self.get_worksheet(collection_name)
@@ -629,12 +1268,11 @@ class SheetsManager:
             logger.error(f"❌ Error retrieving product row {row_num} from {collection_name}: {e}")
             return None
 
-    def _get_quality_score(self, collection_name: str, product: Dict[str, Any]) -> int:
-        """Get quality score - use existing from sheet or calculate new one"""
-        # Try to use quality score from column if it exists
+    def _stored_quality_score(self, product: Dict[str, Any]) -> Optional[int]:
+        """Quality score from the sheet's own column, or None if it is blank or invalid"""
         quality_score_raw = product.get('quality_score', '')
 
-        if quality_score_raw and quality_score_raw.strip():
+        if quality_score_raw and str(quality_score_raw).strip():
             try:
                 # Handle percentage values
                 quality_str = str(quality_score_raw).strip().replace('%', '')
@@ -651,13 +1289,43 @@ class SheetsManager:
             except (ValueError, TypeError):
                 logger.warning(f"Invalid quality score '{quality_score_raw}', calculating fallback")
 
-        # Fallback: calculate using validation system
-        try:
-            validation_result = validate_product_data(collection_name, product)
-            return int(validation_result['quality_score'])
-        except Exception as e:
-            logger.warning(f"Failed to calculate quality score: {e}")
-            return 0
+        return None
+
+    def _get_quality_score(self, collection_name: str, product: Dict[str, Any]) -> int:
+        """Get quality score - use existing from sheet or calculate new one"""
+        return self._set_quality_scores(collection_name, {0: dict(product)})[0]
+
+    def _set_quality_scores(self, collection_name: str, products: Dict[int, Dict[str, Any]]) -> Dict[int, int]:
+        """Set quality_score on many products, scoring those without a sheet value in one batch
+
+        Args:
+            collection_name: Name of the collection
+            products: Products keyed by row number (updated in place)
+
+        Returns:
+            Quality scores keyed by row number
+        """
+        scores = {}
+        unscored = []
+        for row_num, product in products.items():
+            stored = self._stored_quality_score(product)
+            if stored is None:
+                unscored.append(row_num)
+            else:
+                scores[row_num] = stored
+
+        # Fallback: calculate using validation system (unchanged rows come from the score cache)
+        if unscored:
+            try:
+                calculated = calculate_quality_scores(collection_name, [products[row_num] for row_num in unscored])
+                scores.update((row_num, int(score)) for row_num, score in zip(unscored, calculated))
+            except Exception as e:
+                logger.warning(f"Failed to calculate quality score: {e}")
+                scores.update((row_num, 0) for row_num in unscored)
+
+        for row_num, score in scores.items():
+            products[row_num]['quality_score'] = score
+        return scores
 
     def row_needs_processing(self, collection_name: str, row_num: int, force_overwrite: bool = True) -> bool:
         """Check if a row needs processing"""
@@ -750,16 +1418,15 @@ class SheetsManager:
             overwrite_mode: Whether to overwrite existing data
             allowed_fields: List of fields allowed to be updated (None = all fields)
         """
-        worksheet = self.get_worksheet(collection_name)
-        if not worksheet:
-            return False
-
         config = get_collection_config(collection_name)
+        if not self.gc or not config.spreadsheet_id:
+            logger.error(f"❌ No Google Sheets access for {collection_name}")
+            return False
 
         try:
-            # Prepare batch update list
-            batch_updates = []
-            updates_made = []
+            # Prepare cell updates for the write-behind queue
+            cells = {}
+            updates_made = {}
 
             for field, value in data.items():
                 # Check if field is in column mapping
@@ -779,43 +1446,22 @@ class SheetsManager:
                 col_num = config.column_mapping[field]
                 formatted_value = self._format_value_for_sheets(value)
 
-                # Add to batch update list
-                batch_updates.append({
-                    'range': f'{gspread.utils.rowcol_to_a1(row_num, col_num)}',
-                    'values': [[formatted_value]]
-                })
-                updates_made.append(field)
+                cells[(row_num, col_num)] = formatted_value
+                updates_made[field] = value
 
-                logger.debug(f"✅ Prepared batch update for {field}: {str(formatted_value)[:50]}{'...' if len(str(formatted_value)) > 50 else ''}")
+                logger.debug(f"✅ Prepared update for {field}: {str(formatted_value)[:50]}{'...' if len(str(formatted_value)) > 50 else ''}")
 
-            # Execute batch update (single API call for all fields)
-            if batch_updates:
-                try:
-                    worksheet.batch_update(batch_updates)
-                    logger.info(f"✅ Updated row {row_num} ({collection_name}): {len(updates_made)} fields updated in BATCH - {updates_made}")
-                except Exception as e:
-                    logger.error(f"❌ Batch update failed for row {row_num}: {e}")
-                    return False
-
-                # Update SQLite cache directly with the data we have (no extra API call)
-                try:
-                    from core.db_cache import get_db_cache
-                    db_cache = get_db_cache()
-
-                    # Update cache with the fields we just saved (faster than re-fetching)
-                    db_cache.update_product_fields(collection_name, row_num, data)
-                    logger.info(f"💾 Updated {len(updates_made)} fields in SQLite cache for {collection_name} row {row_num}")
-                except Exception as e:
-                    logger.warning(f"⚠️ Failed to update SQLite cache: {e}")
-
-                # Clear in-memory cache for this specific product
-                cache_manager.invalidate('products', collection_name)
-
-                return True
-            else:
+            if not cells:
                 logger.info(f"⏭️ Row {row_num} ({collection_name}): No fields updated")
                 return False
 
+            if not self._write_cells(collection_name, {row_num: updates_made}, cells):
+                logger.error(f"❌ Sheet write failed for row {row_num}")
+                return False
+
+            logger.info(f"✅ Updated row {row_num} ({collection_name}): {len(updates_made)} fields queued - {list(updates_made)}")
+            return True
+
         except Exception as e:
             logger.error(f"❌ Failed to update row {row_num} ({collection_name}): {e}")
             return False
@@ -833,15 +1479,14 @@ class SheetsManager:
         Returns:
             dict: {'success_count': int, 'failed_rows': [int]}
         """
-        worksheet = self.get_worksheet(collection_name)
-        if not worksheet:
-            return {'success_count': 0, 'failed_rows': [update['row_num'] for update in updates]}
-
         config = get_collection_config(collection_name)
+        if not self.gc or not config.spreadsheet_id:
+            return {'success_count': 0, 'failed_rows': [update['row_num'] for update in updates]}
 
         try:
-            # Prepare single batch update for ALL products
-            all_batch_updates = []
+            # Collect cell updates for ALL products; the queue sends them as one batchUpdate
+            cells = {}
+            row_fields = {}
             success_rows = []
 
             for update_item in updates:
@@ -859,28 +1504,17 @@ class SheetsManager:
                         continue
 
                     col_num = config.column_mapping[field]
-                    formatted_value = self._format_value_for_sheets(value)
-
-                    # Add to mega batch update list
-                    all_batch_updates.append({
-                        'range': f'{gspread.utils.rowcol_to_a1(row_num, col_num)}',
-                        'values': [[formatted_value]]
-                    })
+                    cells[(row_num, col_num)] = self._format_value_for_sheets(value)
+                    row_fields.setdefault(row_num, {})[field] = value
 
                 success_rows.append(row_num)
 
-            # Execute single batch update for ALL products (one API call!)
-            if all_batch_updates:
-                try:
-                    worksheet.batch_update(all_batch_updates)
-                    logger.info(f"✅ BULK UPDATE: Updated {len(success_rows)} products with {len(all_batch_updates)} total field updates in SINGLE API call")
-                except Exception as e:
-                    logger.error(f"❌ Bulk batch update failed: {e}")
+            if cells:
+                if not self._write_cells(collection_name, row_fields, cells):
+                    logger.error(f"❌ Bulk sheet write failed")
                     return {'success_count': 0, 'failed_rows': [update['row_num'] for update in updates]}
 
-                # Clear cache for collection (don't refetch individual products - too slow)
-                cache_manager.invalidate('products', collection_name)
-
+                logger.info(f"✅ BULK UPDATE: Queued {len(cells)} field updates for {len(success_rows)} products")
                 return {'success_count': len(success_rows), 'failed_rows': []}
             else:
                 logger.info(f"⏭️ Bulk update: No fields updated")
@@ -890,6 +1524,47 @@ class SheetsManager:
             logger.error(f"❌ Failed bulk update: {e}")
             return {'success_count': 0, 'failed_rows': [update['row_num'] for update in updates]}
 
+    def _write_cells(self, collection_name: str, row_fields: Dict[int, Dict[str, Any]],
+                     cells: Dict[Tuple[int, int], str]) -> bool:
+        """Apply field updates to the SQLite cache and queue the sheet cells
+
+        Args:
+            collection_name: Name of the collection
+            row_fields: Raw field values keyed by row number (for the cache)
+            cells: Formatted sheet values keyed by (row, col)
+
+        Returns:
+            True once queued (write-behind), or the flush result when write-behind is disabled
+        """
+        config = get_collection_config(collection_name)
+
+        # Cache first so reads see the change before the sheet write lands
+        try:
+            get_db_cache().update_products_fields(collection_name, row_fields)
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to update SQLite cache: {e}")
+        cache_manager.invalidate('products', collection_name)
+
+        self.write_queue.enqueue(collection_name, config.spreadsheet_id, cells)
+        if not self.settings.SHEETS_WRITE_BEHIND:
+            return self.write_queue.flush(collection_name)
+        return True
+
+    def flush_writes(self, collection_name: Optional[str] = None) -> bool:
+        """Write queued sheet updates now instead of waiting for the next window
+
+        Args:
+            collection_name: Only flush this collection's spreadsheet (None = all)
+
+        Returns:
+            True if every pending update was written
+        """
+        return self.write_queue.flush(collection_name)
+
+    def get_write_queue_stats(self) -> Dict[str, Any]:
+        """Write-behind flush counters and current backlog"""
+        return self.write_queue.get_stats()
+
     def update_single_field(self, collection_name: str, row_num: int, field: str, value: Any) -> bool:
         """Update a single field in a product row"""
         return self.update_product_row(collection_name, row_num, {field: value}, overwrite_mode=True)
@@ -914,6 +1589,12 @@ class SheetsManager:
                 logger.error(f"❌ Could not get worksheet for {collection_name}")
                 return False
 
+            # Queued cells are addressed by row number and every row below this one is about to move up
+            if not self.flush_writes(collection_name):
+                logger.error(f"❌ Not deleting row {row_num} from {collection_name}: "
+                             f"queued sheet updates could not be written first")
+                return False
+
             # Delete the row from Google Sheets
             # Note: Google Sheets API uses 1-based indexing
             worksheet.delete_rows(row_num)
@@ -962,6 +1643,12 @@ class SheetsManager:
                 logger.error(f"❌ [WEBHOOK DEBUG] No spreadsheet ID found for collection: {collection_name}")
                 return False
 
+            # The script reads the sheet, so queued writes must land first
+            if not self.flush_writes(collection_name):
+                logger.error(f"❌ Not triggering data cleaning for {collection_name} row {row_num}: "
+                             f"queued sheet updates could not be written")
+                return False
+
             # Get the script ID
             script_id = self._get_script_id_for_spreadsheet(spreadsheet_id)
             logger.info(f"🔧 [WEBHOOK DEBUG] Script ID: {script_id}")
@@ -1033,13 +1720,13 @@ class SheetsManager:
         """
         try:
             config = get_collection_config(collection_name)
-            worksheet = self.get_worksheet(collection_name)
 
-            if not worksheet:
+            if not self.gc or not config.spreadsheet_id:
                 logger.error(f"Could not access worksheet for {collection_name}")
                 return False
 
-            updates_made = []
+            cells = {}
+            updates_made = {}
 
             for field, value in field_updates.items():
                 # Check if field is in column mapping
@@ -1048,23 +1735,11 @@ class SheetsManager:
                     continue
 
                 col_num = config.column_mapping[field]
+                cells[(row_num, col_num)] = self._format_value_for_sheets(value)
+                updates_made[field] = value
 
-                try:
-                    formatted_value = self._format_value_for_sheets(value)
-                    worksheet.update_cell(row_num, col_num, formatted_value)
-                    updates_made.append(field)
-
-                    logger.debug(f"✅ Updated {field} at row {row_num}: {str(formatted_value)[:50]}...")
-
-                    # Rate limiting
-                    time.sleep(self.settings.SHEETS_DELAY_BETWEEN_REQUESTS)
-
-                except Exception as e:
-                    logger.error(f"Failed to update {field} in row {row_num}: {e}")
-                    continue
-
-            if updates_made:
-                logger.info(f"✅ Updated row {row_num} ({collection_name}): {len(updates_made)} fields - {updates_made}")
+            if updates_made and self._write_cells(collection_name, {row_num: updates_made}, cells):
+                logger.info(f"✅ Updated row {row_num} ({collection_name}): {len(updates_made)} fields - {list(updates_made)}")
                 return True
             else:
                 logger.warning(f"No fields updated for row {row_num} in {collection_name}")
@@ -1073,6 +1748,7 @@ class SheetsManager:
         except Exception as e:
             logger.error(f"Error in update_multiple_fields: {e}")
             return False
+
     def get_empty_content_rows(self, collection_name: str,
                               content_fields: List[str]) -> List[int]:
         """
@@ -1159,10 +1835,16 @@ class SheetsManager:
             return str(value)
 
     def get_collection_stats(self, collection_name: str) -> Dict[str, Any]:
-        """Get statistics for a collection"""
-        products = self.get_all_products(collection_name)
+        """Get statistics for a collection from the cache's running aggregates"""
+        db_cache = get_db_cache()
+        stats = db_cache.get_collection_stats(collection_name)
+
+        if not stats or not stats['total_products']:
+            # Nothing cached yet - loading the collection fills the cache and its stats
+            if self.get_all_products(collection_name):
+                stats = db_cache.get_collection_stats(collection_name)
 
-        if not products:
+        if not stats:
             return {
                 'total_products': 0,
                 'complete_products': 0,
@@ -1170,25 +1852,11 @@ class SheetsManager:
                 'data_quality_percent': 0
             }
 
-        total_products = len(products)
-        complete_products = 0
-        total_quality = 0
-
-        for product in products.values():
-            quality = product.get('quality_score', 0)
-            total_quality += quality
-
-            if quality >= 80:  # Consider 80%+ as complete
-                complete_products += 1
-
-        missing_info_products = total_products - complete_products
-        avg_quality = int(total_quality / total_products) if total_products > 0 else 0
-
         return {
-            'total_products': total_products,
-            'complete_products': complete_products,
-            'missing_info_products': missing_info_products,
-            'data_quality_percent': avg_quality
+            'total_products': stats['total_products'],
+            'complete_products': stats['complete_products'],
+            'missing_info_products': stats['missing_info_products'],
+            'data_quality_percent': stats['data_quality_percent']
         }
 
     def validate_collection_access(self, collection_name: str) -> Tuple[bool, str]:
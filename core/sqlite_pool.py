@@ -0,0 +1,256 @@
+"""
+Shared SQLite Connection Pool
+Per-thread persistent connections for the local SQLite stores (product cache,
+supplier catalogue, WIP jobs) with WAL journaling and lock-wait metrics
+"""
+import os
+import time
+import random
+import sqlite3
+import logging
+import threading
+from typing import Dict, Any, Callable, List
+
+logger = logging.getLogger(__name__)
+
+# How long a statement keeps retrying while another connection holds the write lock
+DEFAULT_LOCK_TIMEOUT = 15.0
+
+# Size of each connection's prepared-statement cache
+STATEMENT_CACHE_SIZE = 256
+
+PRAGMAS = [
+    'PRAGMA journal_mode=WAL',      # Readers don't block the writer and vice versa
+    'PRAGMA synchronous=NORMAL',    # Safe with WAL, avoids an fsync per commit
+    'PRAGMA cache_size=-20000',     # ~20MB page cache per connection
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA foreign_keys=OFF',
+    # Lock waits are handled in Python so they can be measured
+    'PRAGMA busy_timeout=0',
+]
+
+# Listeners called as fn(db_path, wait_seconds, sql) whenever a statement had to wait for a lock
+_lock_wait_listeners: List[Callable[[str, float, str], None]] = []
+
+
+def add_lock_wait_listener(listener: Callable[[str, float, str], None]):
+    """Register a metrics hook called after every statement that waited on a lock"""
+    _lock_wait_listeners.append(listener)
+
+
+def remove_lock_wait_listener(listener: Callable[[str, float, str], None]):
+    """Unregister a lock-wait metrics hook"""
+    if listener in _lock_wait_listeners:
+        _lock_wait_listeners.remove(listener)
+
+
+def _is_lock_error(error: sqlite3.OperationalError) -> bool:
+    message = str(error).lower()
+    return 'locked' in message or 'busy' in message
+
+
+class PooledCursor:
+    """Cursor wrapper that retries statements blocked by another writer"""
+
+    def __init__(self, cursor: sqlite3.Cursor, pool: 'SQLitePool'):
+        self._cursor = cursor
+        self._pool = pool
+
+    def execute(self, sql: str, parameters=()):
+        self._pool._run_with_lock_retry(self._cursor.execute, sql, parameters)
+        return self
+
+    def executemany(self, sql: str, seq_of_parameters):
+        # Materialise so a retry can replay generators
+        if not isinstance(seq_of_parameters, (list, tuple)):
+            seq_of_parameters = list(seq_of_parameters)
+        self._pool._run_with_lock_retry(self._cursor.executemany, sql, seq_of_parameters)
+        return self
+
+    def executescript(self, sql_script: str):
+        self._pool._run_with_lock_retry(lambda script, _: self._cursor.executescript(script), sql_script, ())
+        return self
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class PooledConnection:
+    """Checked-out handle on the calling thread's persistent connection
+
+    Mirrors the parts of sqlite3.Connection the stores use. close() returns
+    the connection to the pool (rolling back anything left uncommitted)
+    instead of closing it, so existing connect/close call patterns keep working.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, pool: 'SQLitePool'):
+        self._conn = conn
+        self._pool = pool
+        self.row_factory = None
+
+    def cursor(self) -> PooledCursor:
+        cursor = self._conn.cursor()
+        cursor.row_factory = self.row_factory
+        return PooledCursor(cursor, self._pool)
+
+    def execute(self, sql: str, parameters=()) -> PooledCursor:
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters) -> PooledCursor:
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        self._pool._run_with_lock_retry(lambda *_: self._conn.commit(), 'COMMIT', ())
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        if self._conn.in_transaction:
+            self._conn.rollback()
+
+    @property
+    def in_transaction(self) -> bool:
+        return self._conn.in_transaction
+
+    @property
+    def total_changes(self) -> int:
+        return self._conn.total_changes
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+
+class SQLitePool:
+    """Per-thread persistent connections to one SQLite database file"""
+
+    def __init__(self, db_path: str, lock_timeout: float = DEFAULT_LOCK_TIMEOUT):
+        self.db_path = db_path
+        self.lock_timeout = lock_timeout
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            'connections_opened': 0,
+            'checkouts': 0,
+            'lock_waits': 0,
+            'lock_wait_seconds': 0.0,
+            'max_lock_wait_seconds': 0.0,
+            'lock_timeouts': 0
+        }
+
+    def connect(self) -> PooledConnection:
+        """Check out this thread's connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+        elif conn.in_transaction:
+            # A previous caller on this thread raised before committing
+            conn.rollback()
+
+        with self._stats_lock:
+            self.stats['checkouts'] += 1
+        return PooledConnection(conn, self)
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=0, cached_statements=STATEMENT_CACHE_SIZE)
+        for pragma in PRAGMAS:
+            try:
+                conn.execute(pragma)
+            except sqlite3.OperationalError as e:
+                # journal_mode=WAL needs a brief exclusive lock the first time
+                logger.warning(f"⚠️ Could not apply '{pragma}' to {self.db_path}: {e}")
+
+        with self._stats_lock:
+            self.stats['connections_opened'] += 1
+        logger.debug(f"🔌 Opened SQLite connection to {self.db_path} for thread {threading.get_ident()}")
+        return conn
+
+    def close_thread_connection(self):
+        """Close the calling thread's connection (e.g. before a worker thread exits)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _run_with_lock_retry(self, func, sql: str, parameters):
+        """Run a statement, backing off and retrying while the database is locked"""
+        start = None
+        delay = 0.001
+        while True:
+            try:
+                result = func(sql, parameters)
+                break
+            except sqlite3.OperationalError as e:
+                if not _is_lock_error(e):
+                    raise
+                if start is None:
+                    start = time.monotonic()
+                if time.monotonic() - start >= self.lock_timeout:
+                    with self._stats_lock:
+                        self.stats['lock_timeouts'] += 1
+                    self._record_lock_wait(time.monotonic() - start, sql)
+                    raise
+                time.sleep(delay * (1 + random.random()))
+                delay = min(delay * 2, 0.05)
+
+        if start is not None:
+            self._record_lock_wait(time.monotonic() - start, sql)
+        return result
+
+    def _record_lock_wait(self, wait_seconds: float, sql: str):
+        with self._stats_lock:
+            self.stats['lock_waits'] += 1
+            self.stats['lock_wait_seconds'] += wait_seconds
+            self.stats['max_lock_wait_seconds'] = max(self.stats['max_lock_wait_seconds'], wait_seconds)
+
+        if wait_seconds > 1:
+            logger.warning(f"⏳ Waited {wait_seconds:.2f}s for SQLite lock on {os.path.basename(self.db_path)}")
+
+        for listener in list(_lock_wait_listeners):
+            try:
+                listener(self.db_path, wait_seconds, sql)
+            except Exception as e:
+                logger.warning(f"⚠️ Lock-wait listener failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats['db_path'] = self.db_path
+        stats['avg_lock_wait_ms'] = (
+            round(stats['lock_wait_seconds'] / stats['lock_waits'] * 1000, 2) if stats['lock_waits'] else 0.0
+        )
+        return stats
+
+
+# One pool per database file, shared by every store that uses it
+_pools: Dict[str, SQLitePool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str) -> SQLitePool:
+    """Get the shared pool for a database file"""
+    key = os.path.abspath(db_path) if db_path != ':memory:' else db_path
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = SQLitePool(key)
+            _pools[key] = pool
+        return pool
+
+
+def get_pool_stats() -> List[Dict[str, Any]]:
+    """Connection and lock-wait statistics for every pool"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [pool.get_stats() for pool in pools]
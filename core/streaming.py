@@ -0,0 +1,187 @@
+"""
+Streaming Response Writers
+Generators that turn lazily-read product rows into NDJSON, chunked JSON and
+CSV bodies, plus a write-only Excel writer, so large listings and exports
+start sending immediately and never hold the whole collection in memory
+"""
+import io
+import csv
+import json
+import logging
+import tempfile
+from itertools import chain, islice
+from typing import Dict, Any, List, Iterable, Iterator, Optional, Tuple, Callable, IO
+
+logger = logging.getLogger(__name__)
+
+# Bodies are flushed to the client in pieces of about this size
+CHUNK_BYTES = 64 * 1024
+
+# Excel exports spill from memory to a temporary file beyond this size
+XLSX_SPOOL_BYTES = 8 * 1024 * 1024
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def peek(iterable: Iterable) -> Tuple[Any, Iterator]:
+    """Take the first item of an iterable without losing it
+
+    Returns:
+        (first item or None, iterator over every item including the first)
+    """
+    iterator = iter(iterable)
+    first = next(iterator, None)
+    if first is None:
+        return None, iterator
+    return first, chain([first], iterator)
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[List]:
+    """Split an iterable into lists of at most `size` items"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _default_dumps(value: Any) -> str:
+    return json.dumps(value, default=str)
+
+
+def iter_ndjson(records: Iterable[Dict[str, Any]], dumps: Callable[[Any], str] = _default_dumps) -> Iterator[bytes]:
+    """Serialize records as newline-delimited JSON, one record per line"""
+    buffer = []
+    size = 0
+    for record in records:
+        line = dumps(record) + '\n'
+        buffer.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            yield ''.join(buffer).encode('utf-8')
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def iter_json_object(head: Dict[str, Any], key: str, items: Iterable[Tuple[Any, Any]],
+                     tail: Optional[Callable[[int], Dict[str, Any]]] = None,
+                     dumps: Callable[[Any], str] = _default_dumps) -> Iterator[bytes]:
+    """Serialize {**head, key: {k: v, ...}, **tail} piece by piece
+
+    The result parses to the same object a single json.dumps would produce,
+    but the mapping under `key` is written as its items arrive.
+
+    Args:
+        head: Members written before the streamed mapping
+        key: Name of the streamed mapping
+        items: (key, value) pairs of the mapping
+        tail: Called with the number of items written; returns the members
+              written after the mapping (e.g. totals only known at the end)
+        dumps: Serializer for individual values
+    """
+    opening = dumps(head)[:-1]
+    prefix = (opening + ', ' if len(opening) > 1 else '{') + dumps(key) + ': {'
+    buffer = [prefix]
+    size = len(prefix)
+    count = 0
+    for item_key, value in items:
+        piece = ('' if count == 0 else ', ') + dumps(str(item_key)) + ': ' + dumps(value)
+        buffer.append(piece)
+        size += len(piece)
+        count += 1
+        if size >= CHUNK_BYTES:
+            yield ''.join(buffer).encode('utf-8')
+            buffer = []
+            size = 0
+
+    closing = '}'
+    trailer = tail(count) if tail else {}
+    if trailer:
+        closing += ', ' + dumps(trailer)[1:]
+    else:
+        closing += '}'
+    buffer.append(closing)
+    yield ''.join(buffer).encode('utf-8')
+
+
+def iter_csv(fieldnames: List[str], rows: Iterable[Dict[str, Any]], header: bool = True,
+             extrasaction: str = 'ignore') -> Iterator[bytes]:
+    """Write dict rows as CSV, yielding the text in chunks as it fills up"""
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=fieldnames, extrasaction=extrasaction)
+    if header:
+        writer.writeheader()
+
+    for row in rows:
+        writer.writerow(row)
+        if output.tell() >= CHUNK_BYTES:
+            yield output.getvalue().encode('utf-8')
+            output.seek(0)
+            output.truncate()
+
+    if output.tell():
+        yield output.getvalue().encode('utf-8')
+
+
+def iter_csv_rows(rows: Iterable[List[Any]]) -> Iterator[bytes]:
+    """Write list rows (header included) as CSV, yielding the text in chunks"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    for row in rows:
+        writer.writerow(row)
+        if output.tell() >= CHUNK_BYTES:
+            yield output.getvalue().encode('utf-8')
+            output.seek(0)
+            output.truncate()
+
+    if output.tell():
+        yield output.getvalue().encode('utf-8')
+
+
+def write_xlsx(fieldnames: List[str], rows: Iterable[Dict[str, Any]], sheet_name: str = 'Sheet1') -> IO[bytes]:
+    """Write dict rows to an .xlsx file with openpyxl's write-only workbook
+
+    Rows are written to the sheet as they arrive instead of being collected
+    into a DataFrame first; the finished workbook spills to a temporary file
+    once it outgrows XLSX_SPOOL_BYTES. Raises ImportError without openpyxl.
+
+    Returns:
+        File object positioned at the start of the workbook
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    # Excel limits sheet names to 31 characters
+    worksheet = workbook.create_sheet(title=sheet_name[:31])
+    worksheet.append(fieldnames)
+    for row in rows:
+        worksheet.append([_excel_value(row.get(field, '')) for field in fieldnames])
+
+    output = tempfile.SpooledTemporaryFile(max_size=XLSX_SPOOL_BYTES)
+    workbook.save(output)
+    output.seek(0)
+    return output
+
+
+def _excel_value(value: Any) -> Any:
+    """Cells take scalars only; lists and dicts are written as JSON, anything else as text"""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+
+def iter_file(fileobj: IO[bytes], chunk_size: int = CHUNK_BYTES) -> Iterator[bytes]:
+    """Read a file object out in chunks, closing it at the end"""
+    try:
+        while True:
+            chunk = fileobj.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    finally:
+        fileobj.close()
@@ -6,12 +6,42 @@ Handles supplier product catalog and work-in-progress tracking
 import sqlite3
 import json
 import os
+import threading
 from datetime import datetime
-from typing import Optional, Dict, List, Any
+from itertools import islice
+from typing import Optional, Dict, List, Any, Iterable, Callable
 import logging
 
+from core.sqlite_pool import get_pool
+
 logger = logging.getLogger(__name__)
 
+# Rows parsed, detected and upserted per transaction during CSV imports
+IMPORT_CHUNK_SIZE = 500
+
+# Stay under SQLite's default host-parameter limit in IN (...) lookups
+SQLITE_MAX_VARIABLES = 900
+
+# Deferred og:image extraction after imports (per-host limits come from the HTTP fetcher)
+IMAGE_EXTRACTION_WORKERS = 8
+IMAGE_EXTRACTION_CHUNK_SIZE = 100
+
+# Insert or refresh a supplier product; an existing image is kept when the row has none
+_UPSERT_PRODUCT_SQL = '''
+    INSERT INTO supplier_products
+    (sku, supplier_name, product_url, product_name, image_url,
+     detected_collection, confidence_score)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(sku) DO UPDATE SET
+        supplier_name = excluded.supplier_name,
+        product_url = excluded.product_url,
+        product_name = excluded.product_name,
+        image_url = COALESCE(NULLIF(excluded.image_url, ''), supplier_products.image_url),
+        detected_collection = excluded.detected_collection,
+        confidence_score = excluded.confidence_score,
+        updated_at = CURRENT_TIMESTAMP
+'''
+
 
 class SupplierDatabase:
     """Manage supplier products and WIP tracking"""
@@ -24,12 +54,15 @@ class SupplierDatabase:
             db_path = os.path.join(project_dir, 'supplier_products.db')
 
         self.db_path = db_path
+        self._pool = get_pool(db_path)
+        self._image_progress_lock = threading.Lock()
+        self.image_extraction_progress = {'running': 0, 'pending': 0, 'completed': 0, 'found': 0}
         self._init_database()
         logger.info(f"✅ Supplier database initialized: {db_path}")
 
     def _init_database(self):
         """Create database tables if they don't exist"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._pool.connect()
         cursor = conn.cursor()
 
         # Supplier product catalog
@@ -139,7 +172,9 @@ class SupplierDatabase:
         conn.commit()
         conn.close()
 
-    def import_from_csv(self, csv_data: List[Dict[str, str]], auto_extract_images: bool = True) -> Dict[str, Any]:
+    def import_from_csv(self, csv_data: Iterable[Dict[str, str]], auto_extract_images: bool = True,
+                        chunk_size: int = IMPORT_CHUNK_SIZE, wait_for_images: bool = False,
+                        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
         """
         Import supplier products from CSV data
 
@@ -150,94 +185,140 @@ class SupplierDatabase:
         - product_name: (optional) Product name
         - image_url: (optional) Direct image URL
 
+        Rows are streamed in chunks: each chunk's collections are detected in
+        one batch and upserted in one transaction. Products still missing an
+        image are queued for concurrent extraction afterwards, which runs in
+        the background unless wait_for_images is set.
+
         Args:
-            csv_data: List of product dictionaries
-            auto_extract_images: If True, automatically extract images from product URLs
+            csv_data: Product dictionaries (a list, csv.DictReader or any iterable)
+            auto_extract_images: If True, extract images from product URLs for products without one
+            chunk_size: Rows parsed, detected and written per transaction
+            wait_for_images: If True, extract images before returning instead of in the background
+            progress_callback: Called with the running statistics after each chunk
 
         Returns dict with import statistics
         """
-        from .image_extractor import extract_og_image
-        from .collection_detector import detect_collection
-
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        from .collection_detector import detect_collections
 
         imported = 0
         updated = 0
         skipped = 0
-        images_extracted = 0
         errors = []
+        needs_image: Dict[str, List[str]] = {}
 
-        for row in csv_data:
-            try:
-                sku = row.get('sku', '').strip()
-                supplier_name = row.get('supplier_name', '').strip()
-                product_url = row.get('product_url', '').strip()
-                product_name = row.get('product_name', '').strip()
-                image_url = row.get('image_url', '').strip()
+        rows = iter(csv_data)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+
+            records = []
+            for row in chunk:
+                try:
+                    sku = (row.get('sku') or '').strip()
+                    supplier_name = (row.get('supplier_name') or '').strip()
+                    product_url = (row.get('product_url') or '').strip()
+                    product_name = (row.get('product_name') or '').strip()
+                    image_url = (row.get('image_url') or '').strip()
+                except Exception as e:
+                    errors.append(f"Row {row}: {str(e)}")
+                    logger.error(f"Error importing row: {e}")
+                    continue
 
                 if not sku or not supplier_name or not product_url:
                     skipped += 1
                     continue
 
-                # Auto-extract image if not provided and auto_extract is enabled
-                if auto_extract_images and not image_url and product_url:
-                    try:
-                        logger.info(f"Extracting image for {sku}...")
-                        extracted_image = extract_og_image(product_url, timeout=15)
-                        if extracted_image:
-                            image_url = extracted_image
-                            images_extracted += 1
-                            logger.info(f"✅ Extracted image for {sku}")
-                    except Exception as e:
-                        logger.warning(f"Failed to extract image for {sku}: {e}")
-
-                # Auto-detect collection
-                detected_collection = None
-                confidence_score = 0.0
-                if product_name or product_url:
-                    detected_collection, confidence_score = detect_collection(
-                        product_name or '', product_url
-                    )
-
-                # Check if SKU already exists
-                cursor.execute('SELECT id FROM supplier_products WHERE sku = ?', (sku,))
-                existing = cursor.fetchone()
-
-                if existing:
-                    # Update existing record
-                    cursor.execute('''
-                        UPDATE supplier_products
-                        SET supplier_name = ?, product_url = ?, product_name = ?,
-                            image_url = ?, detected_collection = ?, confidence_score = ?,
-                            updated_at = CURRENT_TIMESTAMP
-                        WHERE sku = ?
-                    ''', (supplier_name, product_url, product_name, image_url,
-                          detected_collection, confidence_score, sku))
-                    updated += 1
-                else:
-                    # Insert new record
-                    cursor.execute('''
-                        INSERT INTO supplier_products
-                        (sku, supplier_name, product_url, product_name, image_url,
-                         detected_collection, confidence_score)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)
-                    ''', (sku, supplier_name, product_url, product_name, image_url,
-                          detected_collection, confidence_score))
-                    imported += 1
-
-            except Exception as e:
-                errors.append(f"Row {row}: {str(e)}")
-                logger.error(f"Error importing row: {e}")
+                records.append((row, sku, supplier_name, product_url, product_name, image_url))
 
-        conn.commit()
-        conn.close()
+            if not records:
+                continue
+
+            # Auto-detect collections for the whole chunk
+            detections = detect_collections([(record[4], record[3]) for record in records])
+            params = [
+                (sku, supplier_name, product_url, product_name, image_url, detected_collection, confidence_score)
+                for (_, sku, supplier_name, product_url, product_name, image_url), (detected_collection, confidence_score)
+                in zip(records, detections)
+            ]
+
+            conn = self._pool.connect()
+            try:
+                cursor = conn.cursor()
+                skus = list({record[1] for record in records})
+                existing = set()
+                for i in range(0, len(skus), SQLITE_MAX_VARIABLES):
+                    batch = skus[i:i + SQLITE_MAX_VARIABLES]
+                    cursor.execute(f'''
+                        SELECT sku FROM supplier_products WHERE sku IN ({','.join('?' * len(batch))})
+                    ''', batch)
+                    existing.update(sku for (sku,) in cursor.fetchall())
+
+                written = []
+                try:
+                    cursor.executemany(_UPSERT_PRODUCT_SQL, params)
+                    written = records
+                except sqlite3.Error as e:
+                    # Fall back to row-by-row so one bad row doesn't sink the chunk
+                    conn.rollback()
+                    logger.warning(f"⚠️ Bulk upsert failed, retrying chunk row by row: {e}")
+                    for record, values in zip(records, params):
+                        try:
+                            cursor.execute(_UPSERT_PRODUCT_SQL, values)
+                            written.append(record)
+                        except Exception as row_error:
+                            errors.append(f"Row {record[0]}: {str(row_error)}")
+                            logger.error(f"Error importing row: {row_error}")
+                conn.commit()
+
+                for record in written:
+                    sku = record[1]
+                    if sku in existing:
+                        updated += 1
+                    else:
+                        imported += 1
+                        existing.add(sku)
+
+                if auto_extract_images:
+                    # Existing images are kept on re-import, so only products still without one need a fetch
+                    missing = list({record[1] for record in written if not record[5]})
+                    for i in range(0, len(missing), SQLITE_MAX_VARIABLES):
+                        batch = missing[i:i + SQLITE_MAX_VARIABLES]
+                        cursor.execute(f'''
+                            SELECT sku, product_url FROM supplier_products
+                            WHERE sku IN ({','.join('?' * len(batch))}) AND (image_url IS NULL OR image_url = '')
+                        ''', batch)
+                        for sku, product_url in cursor.fetchall():
+                            needs_image.setdefault(product_url, []).append(sku)
+            finally:
+                conn.close()
+
+            if progress_callback:
+                progress_callback({
+                    'imported': imported,
+                    'updated': updated,
+                    'skipped': skipped,
+                    'errors': len(errors)
+                })
+            logger.info(f"📦 Import progress: {imported} imported, {updated} updated, {skipped} skipped")
+
+        images_extracted = 0
+        images_pending = sum(len(skus) for skus in needs_image.values())
+        if needs_image:
+            if wait_for_images:
+                images_extracted = self.extract_images_for_products(needs_image)
+                images_pending = 0
+            else:
+                threading.Thread(target=self.extract_images_for_products, args=(needs_image,),
+                                 name='supplier-image-extraction', daemon=True).start()
 
         result = {
             'imported': imported,
             'updated': updated,
             'skipped': skipped,
             'images_extracted': images_extracted,
+            'images_pending': images_pending,
             'errors': errors,
             'total_processed': imported + updated + skipped
         }
@@ -245,12 +326,82 @@ class SupplierDatabase:
         logger.info(f"📊 Import complete: {result}")
         return result
 
+    def extract_images_for_products(self, urls_to_skus: Dict[str, List[str]],
+                                    max_workers: int = IMAGE_EXTRACTION_WORKERS) -> int:
+        """
+        Extract og:images for supplier products concurrently and store them
+
+        Runs extract_images_batch in chunks, writing each chunk's results as it
+        finishes so images fill in progressively. Connections per supplier host
+        are capped by the shared HTTP fetcher.
+
+        Args:
+            urls_to_skus: Product URL -> SKUs that use it
+            max_workers: Concurrent page fetches
+
+        Returns:
+            Number of products that got an image
+        """
+        from .image_extractor import extract_images_batch
+
+        urls = list(urls_to_skus)
+        total = sum(len(skus) for skus in urls_to_skus.values())
+        with self._image_progress_lock:
+            self.image_extraction_progress['running'] += 1
+            self.image_extraction_progress['pending'] += total
+
+        found = 0
+        try:
+            for i in range(0, len(urls), IMAGE_EXTRACTION_CHUNK_SIZE):
+                batch = urls[i:i + IMAGE_EXTRACTION_CHUNK_SIZE]
+                try:
+                    images = extract_images_batch(batch, max_workers=max_workers)
+                except Exception as e:
+                    logger.error(f"❌ Image extraction batch failed: {e}")
+                    images = {}
+
+                updates = [(images[url], sku) for url in batch if images.get(url) for sku in urls_to_skus[url]]
+                if updates:
+                    try:
+                        conn = self._pool.connect()
+                        try:
+                            conn.executemany('''
+                                UPDATE supplier_products
+                                SET image_url = ?, updated_at = CURRENT_TIMESTAMP
+                                WHERE sku = ? AND (image_url IS NULL OR image_url = '')
+                            ''', updates)
+                            conn.commit()
+                        finally:
+                            conn.close()
+                    except Exception as e:
+                        logger.error(f"❌ Failed to store extracted images: {e}")
+                        updates = []
+
+                processed = sum(len(urls_to_skus[url]) for url in batch)
+                found += len(updates)
+                with self._image_progress_lock:
+                    self.image_extraction_progress['pending'] -= processed
+                    self.image_extraction_progress['completed'] += processed
+                    self.image_extraction_progress['found'] += len(updates)
+                logger.info(f"🖼️ Image extraction: {min(i + len(batch), len(urls))}/{len(urls)} URLs, "
+                            f"{found} images found")
+        finally:
+            with self._image_progress_lock:
+                self.image_extraction_progress['running'] -= 1
+
+        return found
+
+    def get_image_extraction_progress(self) -> Dict[str, int]:
+        """Progress of background image extraction from imports"""
+        with self._image_progress_lock:
+            return dict(self.image_extraction_progress)
+
     def search_by_sku(self, sku_list: List[str]) -> List[Dict[str, Any]]:
         """Search for products by SKU list"""
         if not sku_list:
             return []
 
-        conn = sqlite3.connect(self.db_path)
+        conn = self._pool.connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
 
@@ -268,7 +419,7 @@ class SupplierDatabase:
 
     def get_by_collection(self, collection_name: str, confidence_threshold: float = 0.9) -> List[Dict[str, Any]]:
         """Get products detected for a specific collection with high confidence"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._pool.connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
 
@@ -285,7 +436,7 @@ class SupplierDatabase:
 
     def update_collection_detection(self, sku: str, collection_name: str, confidence: float):
         """Update the detected collection for a product"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._pool.connect()
         cursor = conn.cursor()
 
         cursor.execute('''
@@ -300,7 +451,7 @@ class SupplierDatabase:
     def add_manual_product(self, sku: str, product_url: str, product_name: Optional[str] = None,
                           supplier_name: str = 'Manual Entry') -> int:
         """Add a manually entered product to supplier_products table"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._pool.connect()
         cursor = conn.cursor()
 
         cursor.execute('SELECT id FROM supplier_products WHERE sku = ?', (sku,))
@@ -337,7 +488,7 @@ class SupplierDatabase:
         Returns:
             The ID of the new WIP entry
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._pool.connect()
         cursor = conn.cursor()
 
         if extracted_data:
@@ -366,7 +517,7 @@ class SupplierDatabase:
                 - Single status: 'pending'
                 - Multiple statuses (comma-separated): 'pending,extracting,generating'
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._pool.connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
 
@@ -465,9 +616,58 @@ class SupplierDatabase:
 
         return [dict(row) for row in rows]
 
+    def get_wip_products_by_ids(self, wip_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Get several work-in-progress products by id in one query
+
+        Args:
+            wip_ids: WIP product ids
+
+        Returns:
+            Dictionary of WIP products (joined with their supplier product) keyed by id
+        """
+        conn = self._pool.connect()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+
+        products = {}
+        ids = list(wip_ids)
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            cursor.execute(f'''
+                SELECT
+                    w.id as id,
+                    w.supplier_product_id,
+                    w.collection_name,
+                    w.status,
+                    w.sheet_row_number,
+                    w.extracted_data,
+                    w.generated_content,
+                    w.error_message,
+                    w.user_notes,
+                    w.created_at,
+                    w.updated_at,
+                    w.completed_at,
+                    s.sku,
+                    s.supplier_name,
+                    s.product_url,
+                    s.product_name,
+                    s.image_url,
+                    s.detected_collection,
+                    s.confidence_score
+                FROM wip_products w
+                JOIN supplier_products s ON w.supplier_product_id = s.id
+                WHERE w.id IN ({placeholders})
+            ''', chunk)
+            products.update((row['id'], dict(row)) for row in cursor.fetchall())
+
+        conn.close()
+        return products
+
     def update_wip_status(self, wip_id: int, status: str, extracted_data: Optional[Dict] = None):
         """Update WIP product status"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._pool.connect()
         cursor = conn.cursor()
 
         if extracted_data:
@@ -488,7 +688,7 @@ class SupplierDatabase:
 
     def update_wip_sheet_row(self, wip_id: int, row_number: int):
         """Update WIP with Google Sheets row number"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._pool.connect()
         cursor = conn.cursor()
 
         cursor.execute('''
@@ -502,7 +702,7 @@ class SupplierDatabase:
 
     def update_wip_error(self, wip_id: int, error_message: str):
         """Update WIP with error message"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._pool.connect()
         cursor = conn.cursor()
 
         cursor.execute('''
@@ -516,7 +716,7 @@ class SupplierDatabase:
 
     def update_wip_generated_content(self, wip_id: int, generated_content: Dict):
         """Update WIP with generated content (descriptions, FAQs, etc)"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._pool.connect()
         cursor = conn.cursor()
 
         cursor.execute('''
@@ -530,7 +730,7 @@ class SupplierDatabase:
 
     def remove_from_wip(self, wip_id: int) -> Optional[int]:
         """Remove product from WIP and return sheet row number if exists"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._pool.connect()
         cursor = conn.cursor()
 
         # Get sheet row number before deleting
@@ -548,7 +748,7 @@ class SupplierDatabase:
 
     def complete_wip(self, wip_id: int):
         """Mark WIP product as completed and ready for approval"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._pool.connect()
         cursor = conn.cursor()
 
         cursor.execute('''
@@ -562,7 +762,7 @@ class SupplierDatabase:
 
     def get_statistics(self) -> Dict[str, Any]:
         """Get database statistics"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._pool.connect()
         cursor = conn.cursor()
 
         # Total supplier products
@@ -600,7 +800,7 @@ class SupplierDatabase:
 
     def set_collection_override(self, sku: str, collection_name: str) -> bool:
         """Set or update a collection override for a SKU"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._pool.connect()
         cursor = conn.cursor()
 
         try:
@@ -621,7 +821,7 @@ class SupplierDatabase:
 
     def get_collection_override(self, sku: str) -> Optional[str]:
         """Get collection override for a SKU, returns None if not set"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._pool.connect()
         cursor = conn.cursor()
 
         cursor.execute('''
@@ -634,7 +834,7 @@ class SupplierDatabase:
 
     def get_all_collection_overrides(self) -> Dict[str, str]:
         """Get all collection overrides as a dict of sku -> collection_name"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._pool.connect()
         cursor = conn.cursor()
 
         cursor.execute('SELECT sku, collection_name FROM collection_overrides')
@@ -645,7 +845,7 @@ class SupplierDatabase:
 
     def delete_collection_override(self, sku: str) -> bool:
         """Remove a collection override"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._pool.connect()
         cursor = conn.cursor()
 
         cursor.execute('DELETE FROM collection_overrides WHERE sku = ?', (sku,))
@@ -670,7 +870,7 @@ class SupplierDatabase:
         Returns:
             The ID of the new queue entry
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._pool.connect()
         cursor = conn.cursor()
 
         cursor.execute('''
@@ -709,7 +909,7 @@ class SupplierDatabase:
         Returns:
             Dict with added_count and skipped_skus (already in queue)
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._pool.connect()
         cursor = conn.cursor()
 
         added = 0
@@ -772,7 +972,7 @@ class SupplierDatabase:
         Returns:
             Dict with items, total, page, total_pages
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._pool.connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
 
@@ -824,7 +1024,7 @@ class SupplierDatabase:
 
     def get_processing_queue_item(self, queue_id: int) -> Optional[Dict[str, Any]]:
         """Get a single item from the processing queue"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._pool.connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
 
@@ -848,7 +1048,7 @@ class SupplierDatabase:
                                        extracted_images: str = None,
                                        processing_notes: str = None) -> bool:
         """Update the status of a processing queue item"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._pool.connect()
         cursor = conn.cursor()
 
         update_fields = ['status = ?', 'updated_at = CURRENT_TIMESTAMP']
@@ -887,7 +1087,7 @@ class SupplierDatabase:
 
     def remove_from_processing_queue(self, queue_id: int) -> bool:
         """Remove an item from the processing queue"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._pool.connect()
         cursor = conn.cursor()
 
         cursor.execute('DELETE FROM processing_queue WHERE id = ?', (queue_id,))
@@ -899,7 +1099,7 @@ class SupplierDatabase:
 
     def get_processing_queue_stats(self) -> Dict[str, Any]:
         """Get statistics for the processing queue"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._pool.connect()
         cursor = conn.cursor()
 
         # Count by status
@@ -932,7 +1132,7 @@ class SupplierDatabase:
 
     def get_processing_queue_by_sku(self, sku: str) -> Optional[Dict[str, Any]]:
         """Check if a SKU is already in the processing queue"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._pool.connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
 
@@ -944,7 +1144,7 @@ class SupplierDatabase:
 
     def update_processing_queue_extracted_data(self, queue_id: int, extracted_data: Dict[str, Any]) -> bool:
         """Update the extracted data for a processing queue item"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._pool.connect()
         cursor = conn.cursor()
 
         # Ensure the extracted_data column exists
@@ -969,7 +1169,7 @@ class SupplierDatabase:
 
     def update_processing_queue_notes(self, queue_id: int, notes: str) -> bool:
         """Update the notes field for a processing queue item (used for audit trail)"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._pool.connect()
         cursor = conn.cursor()
 
         # Ensure the notes column exists
@@ -2,16 +2,30 @@
 WELS Data Lookup Module
 Looks up WELS ratings, flow rates, and registration numbers from the reference Google Sheet
 Each worksheet/tab represents a different brand
+
+The workbook is snapshotted into a local SQLite store and indexed in memory
+by normalized model code, so lookups never read the sheet. The snapshot is
+refreshed on a schedule.
 """
 import logging
 import json
 import os
-from typing import Dict, Optional
+import time
+import threading
+from typing import Dict, Any, List, Optional, Tuple
 import gspread
 from google.oauth2.service_account import Credentials
 
+from config.settings import get_settings
+from core.sqlite_pool import get_pool
+
 logger = logging.getLogger(__name__)
 
+
+def normalize_model_code(code) -> str:
+    """Normalize a model code/SKU for index keys and lookups"""
+    return str(code).strip().upper() if code is not None else ''
+
 class WELSLookup:
     """Lookup WELS data from reference Google Sheet"""
 
@@ -26,11 +40,80 @@ class WELSLookup:
         # Add more brand mappings as needed
     }
 
-    def __init__(self):
-        """Initialize Google Sheets connection"""
+    # Columns that hold a row's model code, in priority order
+    # WELS sheet uses 'Model code' and 'Variant model code'
+    SKU_COLUMNS = ['Model code', 'Variant model code', 'SKU', 'sku', 'Sku', 'Product Code', 'Code', 'Model']
+
+    def __init__(self, db_path: Optional[str] = None, refresh_interval: Optional[int] = None):
+        """Initialize Google Sheets connection and load the local snapshot
+
+        Args:
+            db_path: SQLite file holding the snapshot (default: WELS_CACHE_DB setting)
+            refresh_interval: Seconds between snapshot refreshes (default: WELS_REFRESH_INTERVAL, 0 = manual only)
+        """
+        settings = get_settings()
+        self.db_path = db_path or settings.WELS_CACHE_DB
+        self.refresh_interval = settings.WELS_REFRESH_INTERVAL if refresh_interval is None else refresh_interval
         self.gc = None
         self.spreadsheet = None
+        self._pool = get_pool(self.db_path)
+        self._refresh_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._refresh_thread = None
+        self.refreshed_at = 0.0
+        self.model_count = 0
+
+        # Swapped as a whole on refresh: (worksheet titles, lower title -> title,
+        # title -> {code: entry}, code -> (title, entry) across all worksheets in order)
+        self._snapshot: Tuple[List[str], Dict[str, str], Dict[str, Dict[str, Dict]], Dict[str, Tuple[str, Dict]]] = ([], {}, {}, {})
+
+        self.stats = {
+            'lookups': 0,
+            'hits': 0,
+            'misses': 0,
+            'refreshes': 0,
+            'refresh_failures': 0
+        }
+
+        self._init_database()
         self._connect()
+        self._load_snapshot()
+
+        if not self._snapshot[0]:
+            self.refresh()
+        if self.refresh_interval > 0:
+            self.start_auto_refresh(self.refresh_interval)
+
+    def _init_database(self):
+        conn = self._pool.connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS wels_worksheets (
+                title TEXT PRIMARY KEY,
+                position INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS wels_models (
+                worksheet TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                model_code TEXT NOT NULL,
+                wels_rating TEXT,
+                flow_rate TEXT,
+                wels_registration_number TEXT,
+                min_pressure_kpa TEXT,
+                max_pressure_kpa TEXT,
+                PRIMARY KEY (worksheet, position)
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS wels_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        ''')
+        conn.commit()
+        conn.close()
 
     def _connect(self):
         """Connect to Google Sheets"""
@@ -59,6 +142,188 @@ class WELSLookup:
         except Exception as e:
             logger.error(f"❌ Failed to connect to WELS sheet: {e}")
 
+    def _row_model_code(self, row: Dict) -> str:
+        """The row's model code: the first populated SKU column"""
+        for key in self.SKU_COLUMNS:
+            if key in row and row[key]:
+                return normalize_model_code(row[key])
+        return ''
+
+    def _row_entry(self, row: Dict, model_code: str) -> Dict:
+        """Pull the WELS fields out of a sheet row"""
+        entry = {
+            'model_code': model_code,
+            'wels_rating': self._extract_field(row, ['Star rating', 'WELS Rating', 'WELS', 'Rating', 'Star Rating', 'Stars']),
+            'flow_rate': self._extract_field(row, ['Water consumption (Litres)', 'Water consump. (L/min)', 'Flow Rate', 'Flow', 'L/min', 'Flow (L/min)', 'Litres/min', 'L/Min']),
+            'wels_registration_number': self._extract_field(row, ['Registration number', 'Reg. number', 'WELS Registration', 'Registration Number', 'Reg Number', 'WELS Reg', 'Reg']),
+            'min_pressure_kpa': None,
+            'max_pressure_kpa': None
+        }
+
+        # Parse pressure range from "Tested pressure" field
+        # Format: "150 kPa, 250 kPa, 350 kPa" -> min=150, max=350
+        tested_pressure = self._extract_field(row, ['Tested pressure', 'Pressure', 'Test pressure'])
+        if tested_pressure:
+            entry['min_pressure_kpa'], entry['max_pressure_kpa'] = self._parse_pressure_range(tested_pressure)
+
+        return entry
+
+    def _build_index(self, titles: List[str], entries: List[Tuple[str, Dict]]):
+        """Index entries by model code and swap in the new snapshot
+
+        A row matches its whole model code and, when the code is a
+        comma-separated list of variants, each variant on its own. The first
+        row in a worksheet wins, and the first worksheet in workbook order
+        wins for lookups without a brand.
+        """
+        by_title = {}
+        for title in titles:
+            by_title.setdefault(title.lower(), title)
+
+        index = {title: {} for title in titles}
+        all_codes = {}
+        for title, entry in entries:
+            codes = [entry['model_code']]
+            if ',' in entry['model_code']:
+                codes.extend(part.strip() for part in entry['model_code'].split(','))
+            worksheet_index = index.setdefault(title, {})
+            for code in codes:
+                if code:
+                    worksheet_index.setdefault(code, entry)
+
+        for title in titles:
+            for code, entry in index[title].items():
+                all_codes.setdefault(code, (title, entry))
+
+        self._snapshot = (list(titles), by_title, index, all_codes)
+        self.model_count = len(entries)
+
+    @staticmethod
+    def _stored_entries(cursor, worksheet: Optional[str] = None) -> List[Tuple[str, Dict[str, Any]]]:
+        """(worksheet, entry) pairs from the local store, for one worksheet or all of them"""
+        sql = '''
+            SELECT worksheet, model_code, wels_rating, flow_rate, wels_registration_number,
+                   min_pressure_kpa, max_pressure_kpa
+            FROM wels_models
+        '''
+        if worksheet is None:
+            cursor.execute(sql + ' ORDER BY position')
+        else:
+            cursor.execute(sql + ' WHERE worksheet = ? ORDER BY position', (worksheet,))
+        return [(row[0], {
+            'model_code': row[1],
+            'wels_rating': row[2] or '',
+            'flow_rate': row[3] or '',
+            'wels_registration_number': row[4] or '',
+            'min_pressure_kpa': row[5],
+            'max_pressure_kpa': row[6]
+        }) for row in cursor.fetchall()]
+
+    def _load_snapshot(self):
+        """Rebuild the in-memory index from the local store"""
+        try:
+            conn = self._pool.connect()
+            cursor = conn.cursor()
+            cursor.execute('SELECT title FROM wels_worksheets ORDER BY position')
+            titles = [row[0] for row in cursor.fetchall()]
+            entries = self._stored_entries(cursor)
+            cursor.execute("SELECT value FROM wels_meta WHERE key = 'refreshed_at'")
+            meta = cursor.fetchone()
+            conn.close()
+
+            self._build_index(titles, entries)
+            self.refreshed_at = float(meta[0]) if meta else 0.0
+            if titles:
+                logger.info(f"📦 Loaded WELS snapshot: {len(entries)} models across {len(titles)} worksheets")
+        except Exception as e:
+            logger.error(f"❌ Failed to load WELS snapshot: {e}")
+
+    def refresh(self) -> bool:
+        """Re-read the whole WELS workbook into the local store
+
+        Returns:
+            True if the snapshot was refreshed
+        """
+        if not self.spreadsheet:
+            logger.warning("⚠️ Not connected to WELS sheet, keeping existing snapshot")
+            return False
+
+        with self._refresh_lock:
+            start_time = time.time()
+            try:
+                worksheets = self.spreadsheet.worksheets()
+                titles = [ws.title for ws in worksheets]
+                entries = []
+                unread = []
+
+                for worksheet in worksheets:
+                    try:
+                        records = worksheet.get_all_records()
+                    except Exception as e:
+                        # Keep what the last refresh read rather than dropping the worksheet's models
+                        logger.error(f"❌ Error reading worksheet '{worksheet.title}', keeping its previous rows: {e}")
+                        conn = self._pool.connect()
+                        entries.extend(self._stored_entries(conn.cursor(), worksheet.title))
+                        conn.close()
+                        unread.append(worksheet.title)
+                        continue
+                    for row in records:
+                        model_code = self._row_model_code(row)
+                        if model_code:
+                            entries.append((worksheet.title, self._row_entry(row, model_code)))
+
+                refreshed_at = time.time()
+                conn = self._pool.connect()
+                cursor = conn.cursor()
+                cursor.execute('DELETE FROM wels_worksheets')
+                cursor.execute('DELETE FROM wels_models')
+                cursor.executemany('INSERT INTO wels_worksheets (title, position) VALUES (?, ?)',
+                                   [(title, position) for position, title in enumerate(titles)])
+                cursor.executemany('''
+                    INSERT INTO wels_models (worksheet, position, model_code, wels_rating, flow_rate,
+                                             wels_registration_number, min_pressure_kpa, max_pressure_kpa)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', [(title, position, entry['model_code'], entry['wels_rating'], entry['flow_rate'],
+                       entry['wels_registration_number'], entry['min_pressure_kpa'], entry['max_pressure_kpa'])
+                      for position, (title, entry) in enumerate(entries)])
+                cursor.execute("INSERT OR REPLACE INTO wels_meta (key, value) VALUES ('refreshed_at', ?)",
+                               (str(refreshed_at),))
+                conn.commit()
+                conn.close()
+
+                self._build_index(titles, entries)
+                self.refreshed_at = refreshed_at
+                with self._stats_lock:
+                    self.stats['refreshes'] += 1
+                logger.info(f"✅ Refreshed WELS snapshot: {len(entries)} models across {len(titles)} worksheets "
+                            f"in {time.time() - start_time:.1f}s"
+                            f"{f' ({len(unread)} kept from the previous snapshot)' if unread else ''}")
+                return True
+
+            except Exception as e:
+                with self._stats_lock:
+                    self.stats['refresh_failures'] += 1
+                logger.error(f"❌ Failed to refresh WELS snapshot: {e}")
+                return False
+
+    def start_auto_refresh(self, interval_seconds: int):
+        """Start a daemon thread that refreshes the snapshot whenever it is older than the interval"""
+        if self._refresh_thread and self._refresh_thread.is_alive():
+            return
+
+        def run():
+            while True:
+                time.sleep(max(1.0, self.refreshed_at + interval_seconds - time.time()))
+                if time.time() - self.refreshed_at < interval_seconds:
+                    continue
+                if not self.refresh():
+                    # Don't spin on a broken connection; try again next interval
+                    time.sleep(interval_seconds)
+
+        self._refresh_thread = threading.Thread(target=run, name='wels-auto-refresh', daemon=True)
+        self._refresh_thread.start()
+        logger.info(f"🔁 Started WELS snapshot refresh every {interval_seconds}s")
+
     def lookup_by_sku(self, sku: str, brand: str = None) -> Optional[Dict]:
         """
         Look up WELS data by SKU
@@ -78,134 +343,84 @@ class WELSLookup:
                 'found_in_sheet': str
             }
         """
-        if not self.spreadsheet:
-            logger.warning("⚠️ Not connected to WELS sheet")
+        titles, by_title, index, all_codes = self._snapshot
+        if not titles:
+            logger.warning("⚠️ WELS snapshot is empty")
             return None
 
-        sku = str(sku).strip().upper()
+        sku = normalize_model_code(sku)
+        result = None
 
         # If brand provided, map it to parent company if needed
         if brand:
             brand_lower = brand.lower().strip()
             mapped_brand = self.BRAND_MAPPING.get(brand_lower, brand)
 
-            logger.info(f"🔍 Looking up SKU '{sku}' for brand '{brand}' (mapped to '{mapped_brand}')")
-
-            # Try mapped brand first
-            result = self._search_worksheet(mapped_brand, sku)
-            if result:
-                return result
-
-            # If mapped brand didn't work, try original brand name
-            if mapped_brand.lower() != brand_lower:
-                logger.info(f"🔍 Trying original brand name '{brand}'")
-                result = self._search_worksheet(brand, sku)
-                if result:
-                    return result
+            # Try mapped brand first, then the original brand name
+            result = self._lookup_in_worksheet(mapped_brand, sku)
+            if not result and mapped_brand.lower() != brand_lower:
+                result = self._lookup_in_worksheet(brand, sku)
 
         # Otherwise search all worksheets
-        logger.info(f"🔍 Searching all worksheets for SKU '{sku}'")
-        worksheets = self.spreadsheet.worksheets()
-        for worksheet in worksheets:
-            result = self._search_worksheet(worksheet.title, sku)
-            if result:
-                return result
-
-        logger.info(f"⚠️ SKU '{sku}' not found in WELS reference sheet")
-        return None
-
-    def _search_worksheet(self, worksheet_name: str, sku: str) -> Optional[Dict]:
+        if not result:
+            hit = all_codes.get(sku)
+            if hit:
+                result = self._build_result(sku, hit[0], hit[1])
+
+        with self._stats_lock:
+            self.stats['lookups'] += 1
+            self.stats['hits' if result else 'misses'] += 1
+
+        if result:
+            logger.debug(f"✅ Found WELS data for SKU '{sku}' in '{result['found_in_sheet']}' sheet")
+        else:
+            logger.debug(f"⚠️ SKU '{sku}' not found in WELS reference sheet")
+        return result
+
+    def lookup_candidates(self, skus: List[str], brand: str = None) -> Optional[Dict]:
         """
-        Search a specific worksheet for SKU
+        Look up the first of several candidate SKUs that has WELS data
 
         Args:
-            worksheet_name: Name of worksheet (brand name)
-            sku: SKU to search for
+            skus: Candidate SKUs/model codes, in priority order
+            brand: Brand name (worksheet name)
 
         Returns:
-            Dictionary with WELS data or None
+            WELS data for the first candidate found (see lookup_by_sku), or None
         """
-        try:
-            # Case-insensitive worksheet lookup
-            # Find worksheet by matching case-insensitively
-            actual_worksheet_name = None
-            available_worksheets = [ws.title for ws in self.spreadsheet.worksheets()]
-
-            for ws in self.spreadsheet.worksheets():
-                if ws.title.lower() == worksheet_name.lower():
-                    actual_worksheet_name = ws.title
-                    break
-
-            if not actual_worksheet_name:
-                logger.warning(f"⚠️ Worksheet '{worksheet_name}' not found")
-                logger.info(f"📋 Available worksheets: {', '.join(available_worksheets)}")
-                return None
-
-            logger.info(f"🔍 Searching worksheet '{actual_worksheet_name}' for SKU '{sku}'")
-            worksheet = self.spreadsheet.worksheet(actual_worksheet_name)
-
-            # Get all data
-            data = worksheet.get_all_records()
-
-            # Search for SKU (check common column names)
-            for row in data:
-                # Try different possible SKU column names
-                # WELS sheet uses 'Model code' and 'Variant model code'
-                row_sku = None
-                for key in ['Model code', 'Variant model code', 'SKU', 'sku', 'Sku', 'Product Code', 'Code', 'Model']:
-                    if key in row and row[key]:
-                        row_sku = str(row[key]).strip().upper()
-                        break
-
-                # Check for match - either exact match OR SKU is in comma-separated list
-                is_match = False
-                if row_sku:
-                    if row_sku == sku:
-                        # Exact match
-                        is_match = True
-                    elif ',' in row_sku:
-                        # WELS sheet has comma-separated SKUs - check if our SKU is one of them
-                        wels_skus = [s.strip().upper() for s in row_sku.split(',')]
-                        if sku in wels_skus:
-                            is_match = True
-                            logger.info(f"   Found '{sku}' within comma-separated list: {row_sku}")
-
-                if is_match:
-                    # Found it! Extract WELS data
-                    result = {
-                        'sku': sku,
-                        'wels_rating': self._extract_field(row, ['Star rating', 'WELS Rating', 'WELS', 'Rating', 'Star Rating', 'Stars']),
-                        'flow_rate': self._extract_field(row, ['Water consumption (Litres)', 'Water consump. (L/min)', 'Flow Rate', 'Flow', 'L/min', 'Flow (L/min)', 'Litres/min', 'L/Min']),
-                        'wels_registration_number': self._extract_field(row, ['Registration number', 'Reg. number', 'WELS Registration', 'Registration Number', 'Reg Number', 'WELS Reg', 'Reg']),
-                        'brand': worksheet_name,
-                        'found_in_sheet': worksheet_name
-                    }
-
-                    # Parse pressure range from "Tested pressure" field
-                    # Format: "150 kPa, 250 kPa, 350 kPa" -> min=150, max=350
-                    tested_pressure = self._extract_field(row, ['Tested pressure', 'Pressure', 'Test pressure'])
-                    if tested_pressure:
-                        min_pressure, max_pressure = self._parse_pressure_range(tested_pressure)
-                        if min_pressure:
-                            result['min_pressure_kpa'] = min_pressure
-                        if max_pressure:
-                            result['max_pressure_kpa'] = max_pressure
-
-                    logger.info(f"✅ Found WELS data for SKU '{sku}' in '{worksheet_name}' sheet")
-                    logger.info(f"   WELS: {result['wels_rating']}, Flow: {result['flow_rate']}, Reg: {result['wels_registration_number']}")
-                    if 'min_pressure_kpa' in result:
-                        logger.info(f"   Pressure: {result.get('min_pressure_kpa')}-{result.get('max_pressure_kpa')} kPa")
-
-                    return result
+        for sku in skus:
+            result = self.lookup_by_sku(sku, brand)
+            if result:
+                return result
+        return None
 
+    def _lookup_in_worksheet(self, worksheet_name: str, sku: str) -> Optional[Dict]:
+        """Probe one worksheet's index (worksheet names match case-insensitively)"""
+        titles, by_title, index, all_codes = self._snapshot
+        actual_worksheet_name = by_title.get(worksheet_name.lower())
+        if not actual_worksheet_name:
+            logger.debug(f"⚠️ Worksheet '{worksheet_name}' not found")
             return None
 
-        except gspread.exceptions.WorksheetNotFound:
-            logger.warning(f"⚠️ Worksheet '{worksheet_name}' not found")
-            return None
-        except Exception as e:
-            logger.error(f"❌ Error searching worksheet '{worksheet_name}': {e}")
+        entry = index[actual_worksheet_name].get(sku)
+        if not entry:
             return None
+        return self._build_result(sku, worksheet_name, entry)
+
+    def _build_result(self, sku: str, worksheet_name: str, entry: Dict) -> Dict:
+        result = {
+            'sku': sku,
+            'wels_rating': entry['wels_rating'],
+            'flow_rate': entry['flow_rate'],
+            'wels_registration_number': entry['wels_registration_number'],
+            'brand': worksheet_name,
+            'found_in_sheet': worksheet_name
+        }
+        if entry['min_pressure_kpa']:
+            result['min_pressure_kpa'] = entry['min_pressure_kpa']
+        if entry['max_pressure_kpa']:
+            result['max_pressure_kpa'] = entry['max_pressure_kpa']
+        return result
 
     def _extract_field(self, row: Dict, possible_keys: list) -> str:
         """
@@ -258,23 +473,31 @@ class WELSLookup:
         Returns:
             List of worksheet names (brands)
         """
-        if not self.spreadsheet:
-            return []
-
-        try:
-            worksheets = self.spreadsheet.worksheets()
-            return [ws.title for ws in worksheets]
-        except Exception as e:
-            logger.error(f"❌ Error getting worksheets: {e}")
-            return []
+        return list(self._snapshot[0])
+
+    def get_stats(self) -> Dict:
+        """Snapshot size/age and lookup counters"""
+        titles, by_title, index, all_codes = self._snapshot
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats['worksheets'] = len(titles)
+        stats['models'] = self.model_count
+        stats['indexed_codes'] = sum(len(codes) for codes in index.values())
+        stats['refreshed_at'] = self.refreshed_at
+        stats['snapshot_age_seconds'] = round(time.time() - self.refreshed_at, 1) if self.refreshed_at else None
+        stats['refresh_interval'] = self.refresh_interval
+        return stats
 
 
 # Global instance
 _wels_lookup = None
+_wels_lookup_lock = threading.Lock()
 
 def get_wels_lookup() -> WELSLookup:
     """Get global WELS lookup instance"""
     global _wels_lookup
     if _wels_lookup is None:
-        _wels_lookup = WELSLookup()
+        with _wels_lookup_lock:
+            if _wels_lookup is None:
+                _wels_lookup = WELSLookup()
     return _wels_lookup
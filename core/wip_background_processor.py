@@ -3,15 +3,88 @@ Background WIP Product Processor
 
 Handles the actual processing of WIP products in the background,
 including AI extraction, content generation, and Google Apps Script cleaning.
+
+Products flow through a pipeline of stages connected by bounded queues, each
+with its own worker pool:
+
+    sheet row -> fetch -> AI extraction -> content generation -> sheet write -> cleaning
+
+so many products are in flight at once. Instead of fixed sleeps, OpenAI calls
+go through the shared client in its bulk lane (paced by the shared request and
+token quota) and Sheets writes are paced by the shared write quota limiter.
 """
 
 import logging
+import queue
+import threading
 import time
-from typing import List, Dict, Any, Callable
+from typing import List, Dict, Any, Callable, Optional
 import asyncio
 
+from config.settings import get_settings
+from core.rate_limiter import get_rate_limiter
+from core.llm_client import llm_priority, PRIORITY_BULK
+
 logger = logging.getLogger(__name__)
 
+_STOP = object()
+
+
+class PipelineStage:
+    """A bounded queue drained by a fixed pool of worker threads
+
+    The handler returns the item to pass to the next stage, or None when the
+    item is finished (failed or terminal).
+    """
+
+    def __init__(self, name: str, workers: int, handler: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]],
+                 next_stage: Optional['PipelineStage'] = None):
+        self.name = name
+        self.handler = handler
+        self.next_stage = next_stage
+        self.queue = queue.Queue(maxsize=max(1, workers) * 2)
+        self.processed = 0
+        self._lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._run, name=f'wip-{name}-{i}', daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def put(self, item: Dict[str, Any]):
+        self.queue.put(item)
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                break
+
+            try:
+                result = self.handler(item)
+            except Exception as e:
+                logger.error(f"❌ WIP pipeline stage '{self.name}' crashed on WIP {item.get('wip_id')}: {e}", exc_info=True)
+                result = None
+                # A worker that dies here leaves the bounded queues full and close() waiting forever
+                try:
+                    item['fail'](f"{self.name} error: {str(e)}")
+                except Exception as fail_error:
+                    logger.error(f"❌ Could not record failure of WIP {item.get('wip_id')} "
+                                 f"in stage '{self.name}': {fail_error}", exc_info=True)
+
+            with self._lock:
+                self.processed += 1
+            if result is not None and self.next_stage is not None:
+                self.next_stage.put(result)
+
+    def close(self):
+        """Wait for queued items to finish, then stop the workers"""
+        for _ in self._threads:
+            self.queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+
 
 def process_wip_products_background(
     job_id: str,
@@ -37,187 +110,211 @@ def process_wip_products_background(
         data_processor: Data processor instance
         google_apps_script_manager: Google Apps Script manager instance
     """
+    settings = get_settings()
+    sheets_limiter = get_rate_limiter('sheets_writes', settings.SHEETS_WRITE_REQUESTS_PER_MINUTE,
+                                      capacity=max(1, settings.SHEETS_WRITE_REQUESTS_PER_MINUTE // 6))
 
     mode_text = "FAST mode (extraction only)" if fast_mode else "FULL mode (extraction + content generation)"
     logger.info(f"🚀 Starting background processing of {len(wip_ids)} WIP products for job {job_id} - {mode_text}")
-
-    for idx, wip_id in enumerate(wip_ids):
-        product_start_time = time.time()
+    job_start_time = time.time()
+
+    # Load every WIP row once instead of re-querying the collection per product
+    wip_products = supplier_db.get_wip_products_by_ids(wip_ids)
+
+    def make_failure(wip_id: int, sku: Optional[str] = None):
+        def fail(error: str):
+            supplier_db.update_wip_error(wip_id, error)
+            failure = {'wip_id': wip_id, 'success': False, 'error': error}
+            if sku:
+                failure['sku'] = sku
+            progress_callback(job_id, failure)
+        return fail
+
+    # Step 1: Add to Google Sheets (SKU + URL only)
+    def add_to_sheet(item):
+        sku = item['sku']
+        logger.info(f"📝 Adding {sku} to Google Sheets...")
+        supplier_db.update_wip_status(item['wip_id'], 'extracting')
+
+        new_row_data = {
+            'variant_sku': sku,
+            'url': item['product']['product_url']
+        }
 
         try:
-            # Add delay between products to avoid Google Sheets API rate limits
-            # (60 requests/minute = 1 request/second max)
-            # Each product uses ~15-20 API calls (add, extract, generate content, clean)
-            # So wait 20 seconds between products to stay well under the limit
-            if idx > 0:
-                logger.info(f"⏳ Waiting 20 seconds before next product to avoid rate limits...")
-                time.sleep(20)
-
-            # Get WIP product data
-            wip_products = supplier_db.get_wip_products(collection_name)
-            wip_product = next((p for p in wip_products if p.get('id') == wip_id), None)
-
-            if not wip_product:
-                logger.warning(f"WIP product {wip_id} not found")
-                progress_callback(job_id, {
-                    'wip_id': wip_id,
-                    'success': False,
-                    'error': 'WIP product not found'
-                })
-                continue
+            sheets_limiter.acquire()
+            row_num = sheets_manager.add_product(collection_name, new_row_data)
+            supplier_db.update_wip_sheet_row(item['wip_id'], row_num)
+            logger.info(f"✅ Added {sku} to sheet at row {row_num}")
+        except Exception as e:
+            logger.error(f"❌ Failed to add {sku} to Google Sheets: {e}")
+            item['fail'](f"Failed to add to sheets: {str(e)}")
+            return None
+
+        item['row_num'] = row_num
+        return item
+
+    # Step 2: Fetch the product page (network bound, so this pool is the widest)
+    def fetch_page(item):
+        url = item['product']['product_url']
+        logger.info(f"🌐 Scraping URL: {url}")
+        # A failed prefetch isn't fatal: extraction fetches again and reports the error
+        item['content'] = data_processor.ai_extractor.fetch_html(url)
+        return item
+
+    # Step 3: Run AI Extraction
+    def extract(item):
+        sku = item['sku']
+        logger.info(f"🤖 Running AI extraction for {sku}...")
+        extraction_start = time.time()
+
+        with llm_priority(PRIORITY_BULK):
+            result = data_processor._process_single_url(
+                collection_name,
+                item['row_num'],
+                item['product']['product_url'],
+                overwrite_mode=True,
+                prefetched_content=item.pop('content', None)
+            )
+
+        extraction_duration = time.time() - extraction_start
+        logger.info(f"⏱️  AI extraction took {extraction_duration:.1f}s for {sku}")
+
+        if not result.success:
+            logger.error(f"❌ AI extraction failed for {sku}: {result.error}")
+            item['fail'](result.error or "Extraction failed")
+            return None
+
+        logger.info(f"✅ AI extraction completed for {sku} - extracted {len(result.extracted_fields) if hasattr(result, 'extracted_fields') else 0} fields")
+        item['result'] = result
+        return item
+
+    # Step 4: Generate Descriptions (Features, Care Instructions)
+    # SKIP in fast mode for 3x faster processing
+    def generate(item):
+        sku = item['sku']
+        wip_id = item['wip_id']
+        if fast_mode:
+            logger.info(f"⚡ FAST MODE: Skipping content generation for {sku}")
+            return item
+
+        logger.info(f"✍️  Generating descriptions for {sku}...")
+        supplier_db.update_wip_status(wip_id, 'generating')
+        generation_start = time.time()
 
-            sku = wip_product['sku']
-            logger.info(f"📦 Processing product {idx + 1}/{len(wip_ids)}: {sku} (WIP ID: {wip_id})")
+        try:
+            # Generate all content types: body_html, features, care_instructions
+            with llm_priority(PRIORITY_BULK):
+                gen_result = data_processor.generate_product_content(
+                    collection_name=collection_name,
+                    selected_rows=[item['row_num']],
+                    use_url_content=True,  # Use scraped URL content for richer descriptions
+                    fields_to_generate=['body_html', 'features', 'care_instructions']
+                )
 
-            # Step 1: Add to Google Sheets (SKU + URL only)
-            logger.info(f"📝 Adding {sku} to Google Sheets...")
-            supplier_db.update_wip_status(wip_id, 'extracting')
+            generation_duration = time.time() - generation_start
+            logger.info(f"⏱️  Content generation took {generation_duration:.1f}s for {sku}")
 
-            new_row_data = {
-                'variant_sku': sku,
-                'url': wip_product['product_url']
-            }
+            if gen_result.get('success') and gen_result.get('results'):
+                gen_data = gen_result['results'][0]
 
-            try:
-                row_num = sheets_manager.add_product(collection_name, new_row_data)
-                supplier_db.update_wip_sheet_row(wip_id, row_num)
-                logger.info(f"✅ Added to sheet at row {row_num}")
-            except Exception as e:
-                logger.error(f"❌ Failed to add {sku} to Google Sheets: {e}")
-                supplier_db.update_wip_error(wip_id, f"Failed to add to sheets: {str(e)}")
-                progress_callback(job_id, {
-                    'wip_id': wip_id,
-                    'sku': sku,
-                    'success': False,
-                    'error': f"Failed to add to sheets: {str(e)}"
-                })
-                continue
+                if gen_data.get('success'):
+                    generated_content = gen_data.get('generated_content', {})
+                    supplier_db.update_wip_generated_content(wip_id, generated_content)
+                    logger.info(f"✅ Generated content for {sku}: {list(generated_content.keys())}")
+                else:
+                    error_msg = gen_data.get('error', 'Unknown error')
+                    logger.warning(f"⚠️  Content generation failed for {sku}: {error_msg}")
+                    supplier_db.update_wip_error(wip_id, f"Content generation failed: {error_msg}")
+            else:
+                error_msg = gen_result.get('message', 'No results returned')
+                logger.warning(f"⚠️  Content generation returned no results for {sku}: {error_msg}")
+                supplier_db.update_wip_error(wip_id, f"Content generation failed: {error_msg}")
 
-            # Step 2: Run AI Extraction
-            logger.info(f"🤖 Running AI extraction for {sku}...")
-            logger.info(f"🌐 Scraping URL: {wip_product['product_url']}")
-            extraction_start = time.time()
+        except Exception as e:
+            logger.error(f"❌ Content generation exception for {sku}: {e}", exc_info=True)
+            supplier_db.update_wip_error(wip_id, f"Content generation error: {str(e)}")
+            # Don't fail the whole product, continue to cleaning
 
-            try:
-                result = data_processor._process_single_url(
-                    collection_name,
-                    row_num,
-                    wip_product['product_url'],
-                    overwrite_mode=True
-                )
+        return item
 
-                extraction_duration = time.time() - extraction_start
-                logger.info(f"⏱️  AI extraction took {extraction_duration:.1f}s for {sku}")
+    # Step 5: Push the queued field updates to the sheet before the cleaning script reads it
+    def write_sheet(item):
+        supplier_db.update_wip_status(item['wip_id'], 'cleaning')
+        if not sheets_manager.flush_writes(collection_name):
+            logger.warning(f"⚠️  Some sheet writes for {item['sku']} are still pending retry")
+        return item
 
-                if not result.success:
-                    logger.error(f"❌ AI extraction failed for {sku}: {result.error}")
-                    supplier_db.update_wip_error(wip_id, result.error or "Extraction failed")
-                    progress_callback(job_id, {
-                        'wip_id': wip_id,
-                        'sku': sku,
-                        'success': False,
-                        'error': result.error
-                    })
-                    continue
+    # Step 6: Trigger Google Apps Script to clean data
+    def clean(item):
+        sku = item['sku']
+        logger.info(f"🧹 Cleaning data for {sku}...")
 
-                logger.info(f"✅ AI extraction completed for {sku} - extracted {len(result.extracted_fields) if hasattr(result, 'extracted_fields') else 0} fields")
+        try:
+            gas_result = asyncio.run(google_apps_script_manager.trigger_post_ai_cleaning(
+                collection_name=collection_name,
+                row_number=item['row_num'],
+                operation_type='wip_processing'
+            ))
+            if gas_result['success']:
+                logger.info(f"✅ Google Apps Script cleaning completed for {sku}")
+            else:
+                logger.warning(f"⚠️  Google Apps Script cleaning failed for {sku}: {gas_result.get('error')}")
+        except Exception as gas_error:
+            logger.warning(f"⚠️  Google Apps Script cleaning exception for {sku}: {gas_error}")
+
+        # Mark as completed
+        supplier_db.complete_wip(item['wip_id'])  # Sets status to 'ready'
+
+        product_duration = time.time() - item['start_time']
+        logger.info(f"✅ Completed processing for {sku} in {product_duration:.1f}s")
+
+        # Report success
+        progress_callback(job_id, {
+            'wip_id': item['wip_id'],
+            'sku': sku,
+            'row_num': item['row_num'],
+            'success': True,
+            'extracted_fields': item['result'].extracted_fields,
+            'duration': product_duration
+        })
+        return None
+
+    # Build back to front so each stage knows where to hand items on
+    clean_stage = PipelineStage('clean', settings.WIP_CLEAN_WORKERS, clean)
+    write_stage = PipelineStage('write', 1, write_sheet, clean_stage)
+    generate_stage = PipelineStage('generate', settings.WIP_GENERATE_WORKERS, generate, write_stage)
+    extract_stage = PipelineStage('extract', settings.WIP_EXTRACT_WORKERS, extract, generate_stage)
+    fetch_stage = PipelineStage('fetch', settings.WIP_FETCH_WORKERS, fetch_page, extract_stage)
+    # Row appends must be sequential so each product gets its own row
+    sheet_row_stage = PipelineStage('sheet_row', 1, add_to_sheet, fetch_stage)
+    stages = [sheet_row_stage, fetch_stage, extract_stage, generate_stage, write_stage, clean_stage]
+
+    try:
+        for idx, wip_id in enumerate(wip_ids):
+            wip_product = wip_products.get(wip_id)
 
-            except Exception as e:
-                logger.error(f"❌ AI extraction exception for {sku}: {e}", exc_info=True)
-                supplier_db.update_wip_error(wip_id, f"Extraction error: {str(e)}")
+            if not wip_product:
+                logger.warning(f"WIP product {wip_id} not found")
                 progress_callback(job_id, {
                     'wip_id': wip_id,
-                    'sku': sku,
                     'success': False,
-                    'error': f"Extraction error: {str(e)}"
+                    'error': 'WIP product not found'
                 })
                 continue
 
-            # Step 3: Generate Descriptions (Features, Care Instructions)
-            # SKIP in fast mode for 3x faster processing
-            if not fast_mode:
-                logger.info(f"✍️  Generating descriptions for {sku}...")
-                supplier_db.update_wip_status(wip_id, 'generating')
-                generation_start = time.time()
-
-                try:
-                    # Generate all content types: body_html, features, care_instructions
-                    logger.info(f"🤖 Calling AI to generate: body_html, features, care_instructions...")
-                    gen_result = data_processor.generate_product_content(
-                        collection_name=collection_name,
-                        selected_rows=[row_num],
-                        use_url_content=True,  # Use scraped URL content for richer descriptions
-                        fields_to_generate=['body_html', 'features', 'care_instructions']
-                    )
-
-                    generation_duration = time.time() - generation_start
-                    logger.info(f"⏱️  Content generation took {generation_duration:.1f}s for {sku}")
-                    logger.info(f"📊 Content generation result for {sku}: {gen_result}")
-
-                    if gen_result.get('success') and gen_result.get('results'):
-                        gen_data = gen_result['results'][0]
-                        logger.info(f"📊 Individual result for {sku}: {gen_data}")
-
-                        if gen_data.get('success'):
-                            generated_content = gen_data.get('generated_content', {})
-                            supplier_db.update_wip_generated_content(wip_id, generated_content)
-                            logger.info(f"✅ Generated content for {sku}: {list(generated_content.keys())}")
-                        else:
-                            error_msg = gen_data.get('error', 'Unknown error')
-                            logger.warning(f"⚠️  Content generation failed for {sku}: {error_msg}")
-                            supplier_db.update_wip_error(wip_id, f"Content generation failed: {error_msg}")
-                    else:
-                        error_msg = gen_result.get('message', 'No results returned')
-                        logger.warning(f"⚠️  Content generation returned no results for {sku}: {error_msg}")
-                        supplier_db.update_wip_error(wip_id, f"Content generation failed: {error_msg}")
-
-                except Exception as e:
-                    logger.error(f"❌ Content generation exception for {sku}: {e}", exc_info=True)
-                    supplier_db.update_wip_error(wip_id, f"Content generation error: {str(e)}")
-                    # Don't fail the whole product, continue to cleaning
-            else:
-                logger.info(f"⚡ FAST MODE: Skipping content generation for {sku}")
-
-            # Step 4: Trigger Google Apps Script to clean data
-            logger.info(f"🧹 Cleaning data for {sku}...")
-            supplier_db.update_wip_status(wip_id, 'cleaning')
-
-            try:
-                gas_result = asyncio.run(google_apps_script_manager.trigger_post_ai_cleaning(
-                    collection_name=collection_name,
-                    row_number=row_num,
-                    operation_type='wip_processing'
-                ))
-                if gas_result['success']:
-                    logger.info(f"✅ Google Apps Script cleaning completed for {sku}")
-                else:
-                    logger.warning(f"⚠️  Google Apps Script cleaning failed for {sku}: {gas_result.get('error')}")
-            except Exception as gas_error:
-                logger.warning(f"⚠️  Google Apps Script cleaning exception for {sku}: {gas_error}")
-
-            # Mark as completed
-            supplier_db.complete_wip(wip_id)  # Sets status to 'ready'
-
-            product_duration = time.time() - product_start_time
-            logger.info(f"✅ Completed processing for {sku} in {product_duration:.1f}s")
-
-            # Report success
-            progress_callback(job_id, {
+            sku = wip_product['sku']
+            logger.info(f"📦 Queueing product {idx + 1}/{len(wip_ids)}: {sku} (WIP ID: {wip_id})")
+            sheet_row_stage.put({
                 'wip_id': wip_id,
                 'sku': sku,
-                'row_num': row_num,
-                'success': True,
-                'extracted_fields': result.extracted_fields,
-                'duration': product_duration
-            })
-
-        except Exception as e:
-            logger.error(f"❌ Unexpected error processing WIP {wip_id}: {e}", exc_info=True)
-            supplier_db.update_wip_error(wip_id, str(e))
-            progress_callback(job_id, {
-                'wip_id': wip_id,
-                'success': False,
-                'error': str(e)
+                'product': wip_product,
+                'start_time': time.time(),
+                'fail': make_failure(wip_id, sku)
             })
+    finally:
+        # Close in pipeline order: a stage only stops once everything upstream has drained into it
+        for stage in stages:
+            stage.close()
 
-    logger.info(f"🎉 Background processing completed for job {job_id}")
+    logger.info(f"🎉 Background processing completed for job {job_id} in {time.time() - job_start_time:.1f}s")
@@ -17,6 +17,8 @@ import sqlite3
 from dataclasses import dataclass
 from enum import Enum
 
+from core.sqlite_pool import get_pool
+
 logger = logging.getLogger(__name__)
 
 
@@ -58,6 +60,7 @@ class WIPJobManager:
 
     def __init__(self, db_path: str = 'supplier_products.db'):
         self.db_path = db_path
+        self._pool = get_pool(db_path)
         self.jobs: Dict[str, WIPJob] = {}
         self.active_threads: Dict[str, threading.Thread] = {}
         self.lock = threading.Lock()
@@ -70,7 +73,7 @@ class WIPJobManager:
 
     def _ensure_job_table(self):
         """Ensure the jobs table exists in the database"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._pool.connect()
         cursor = conn.cursor()
 
         cursor.execute('''
@@ -305,7 +308,7 @@ class WIPJobManager:
         """Save job state to database"""
         import json
 
-        conn = sqlite3.connect(self.db_path)
+        conn = self._pool.connect()
         cursor = conn.cursor()
 
         cursor.execute('''
@@ -337,7 +340,7 @@ class WIPJobManager:
         """Load job from database"""
         import json
 
-        conn = sqlite3.connect(self.db_path)
+        conn = self._pool.connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
 
@@ -371,7 +374,7 @@ class WIPJobManager:
 
     def list_jobs(self, collection_name: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
         """List recent jobs"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._pool.connect()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
 
@@ -5,7 +5,6 @@ Extracts product dimensions from PDF spec sheets
 import os
 import base64
 import json
-from openai import OpenAI
 from pathlib import Path
 from typing import Dict, Optional, List
 try:
@@ -15,6 +14,8 @@ except ImportError:
     PDF2IMAGE_AVAILABLE = False
     print("⚠️ pdf2image not available - will try direct PDF upload")
 
+from core.llm_client import LLMClient, get_llm_client, llm_priority, PRIORITY_BULK
+
 class PDFDimensionExtractor:
     """Extract dimensions from PDF spec sheets using OpenAI GPT-4 Vision"""
 
@@ -29,7 +30,10 @@ class PDFDimensionExtractor:
         if not self.api_key:
             raise ValueError("OPENAI_API_KEY not found. Set it as environment variable or pass as argument.")
 
-        self.client = OpenAI(api_key=self.api_key)
+        # Shared OpenAI client, so these calls count against the same quota as the app's
+        self.client = get_llm_client()
+        if self.client.api_key != self.api_key:
+            self.client = LLMClient(self.api_key, self.client.limiter)
         # Use GPT-4 Vision for image analysis
         self.model = "gpt-4o"
 
@@ -69,19 +73,19 @@ class PDFDimensionExtractor:
                     }
                 })
 
-            response = self.client.chat.completions.create(
-                model=self.model,
-                max_tokens=2000,
-                messages=[
+            response = self.client.chat({
+                "model": self.model,
+                "max_tokens": 2000,
+                "messages": [
                     {
                         "role": "user",
                         "content": content
                     }
                 ]
-            )
+            }, kind='pdf_dimensions')
 
             # Parse response
-            result = self._parse_response(response.choices[0].message.content)
+            result = self._parse_response(response['choices'][0]['message']['content'])
             print(f"✅ Extracted dimensions: {json.dumps(result, indent=2)}")
             return result
 
@@ -319,7 +323,9 @@ IMPORTANT:
             print(f"Processing {i}/{len(pdf_files)}: {pdf_path.name}")
             print(f"{'='*60}")
 
-            result = self.extract_dimensions_from_pdf(str(pdf_path), product_type)
+            # Batch runs queue behind interactive calls from the app
+            with llm_priority(PRIORITY_BULK):
+                result = self.extract_dimensions_from_pdf(str(pdf_path), product_type)
             results.append({
                 "filename": pdf_path.name,
                 "dimensions": result
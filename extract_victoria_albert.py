@@ -11,12 +11,10 @@ load_dotenv()
 import sys
 import time
 import requests
-import base64
-import io
-from pdf2image import convert_from_bytes
 from openai import OpenAI
 
 from core.sheets_manager import SheetsManager
+from core.pdf_page_cache import get_page_image_cache
 from config.collections import get_collection_config
 
 COLLECTION_NAME = 'basins'
@@ -34,24 +32,19 @@ def extract_dimensions_from_pdf(url: str) -> dict:
 
         print(f"✅ Downloaded {len(pdf_content)/1024:.1f} KB")
 
-        # Convert to images
-        print(f"🖼️  Converting PDF to images...")
-        images = convert_from_bytes(pdf_content, dpi=200, fmt='PNG')
+        # Render only the first page (cached across re-runs)
+        print(f"🖼️  Converting PDF page 1 to image...")
+        page_image = get_page_image_cache().get_page_image(pdf_content, page=1, dpi=200)
 
-        if not images:
+        if not page_image:
             print("❌ No images generated from PDF")
             return None
 
-        print(f"✅ Converted to {len(images)} image(s)")
+        print(f"✅ Converted to {page_image['mime_type']} ({len(page_image['data'])/1024:.1f} KB)")
 
         # Process first page with Vision API
         print(f"🔍 Calling Vision API...")
 
-        # Convert PIL Image to base64
-        buffer = io.BytesIO()
-        images[0].save(buffer, format='PNG')
-        image_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-
         # Vision API prompt
         vision_prompt = """Extract the basin dimensions from this technical drawing.
 
@@ -84,7 +77,7 @@ Return ONLY the JSON, nothing else."""
                         {
                             "type": "image_url",
                             "image_url": {
-                                "url": f"data:image/png;base64,{image_base64}",
+                                "url": page_image['data_url'],
                                 "detail": "high"
                             }
                         }
@@ -15,7 +15,7 @@ import time
 import sqlite3
 import logging.config
 from datetime import datetime, timedelta
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for, stream_with_context
 from jinja2 import TemplateNotFound
 from flask_socketio import SocketIO, emit
 import requests
@@ -26,7 +26,7 @@ from functools import lru_cache
 # Import configuration
 from config.settings import get_settings, validate_environment
 from config.collections import get_all_collections, get_collection_config
-from config.validation import validate_product_data, calculate_quality_score
+from config.validation import validate_product_data
 from config.suppliers import get_supplier_contact, get_all_suppliers
 
 # Import core modules
@@ -37,12 +37,23 @@ from core.google_apps_script_manager import google_apps_script_manager
 from core.pricing_manager import get_pricing_manager
 from core.cache_manager import cache_manager
 from core.supplier_db import get_supplier_db
-from core.collection_detector import detect_collection, detect_collection_batch, COLLECTION_PATTERNS
+from core.collection_detector import detect_collection, detect_collection_batch, detect_collections, COLLECTION_PATTERNS
 from core.image_extractor import extract_og_image
 from core.wip_job_manager import get_wip_job_manager
 from core.wip_background_processor import process_wip_products_background
 from core.unassigned_products_manager import get_unassigned_products_manager
 from core.queue_processor import get_queue_processor
+from core.sqlite_pool import get_pool, get_pool_stats
+from core.http_fetcher import get_fetcher
+from core.llm_cache import get_llm_cache
+from core.llm_client import get_llm_client
+from core.batch_processor import get_batch_job_manager
+from core.html_preprocessor import get_html_preprocessor
+from core.page_analysis import analyze_page, get_page_analysis_cache
+from core.browser_pool import get_browser_pool
+from core.pdf_page_cache import get_page_image_cache
+from core.response_cache import get_response_cache, choose_encoding
+from core.streaming import iter_json_object, iter_ndjson, iter_csv_rows, batched, peek, NDJSON_MIMETYPE
 
 # Initialize settings and configure logging
 settings = get_settings()
@@ -83,6 +94,7 @@ def get_cached_detections(products=None):
         products = get_cached_unassigned_products()
 
     new_cache = {}
+    to_detect = []
     for row in products:
         sku = str(row.get('variant_sku') or '').strip()
         if not sku:
@@ -101,8 +113,11 @@ def get_cached_detections(products=None):
         title = str(row.get('title') or '')
         handle = str(row.get('handle') or '')
         shopify_url = str(row.get('shopify_url') or '') or build_shopify_product_url(handle)
+        to_detect.append((sku, title, shopify_url))
 
-        detected_collection, confidence = detect_collection(title, shopify_url)
+    # One batch call so large catalogues are sharded across worker processes
+    detections = detect_collections([(title, shopify_url) for _, title, shopify_url in to_detect])
+    for (sku, _, _), (detected_collection, confidence) in zip(to_detect, detections):
         new_cache[sku] = {
             'collection': detected_collection,
             'confidence': float(confidence or 0.0),
@@ -318,7 +333,7 @@ def validate_spec_sheet_sku(spec_sheet_url, expected_sku, product_title=""):
 
     try:
         # Test URL accessibility
-        response = requests.head(spec_sheet_url, timeout=10, headers={
+        response = get_fetcher().head(spec_sheet_url, timeout=10, headers={
             'User-Agent': 'Mozilla/5.0 (compatible; PIM-Validator/1.0)'
         }, allow_redirects=True)
 
@@ -364,15 +379,14 @@ def validate_spec_sheet_sku(spec_sheet_url, expected_sku, product_title=""):
         content_sku_found = False
         if spec_sheet_url.lower().endswith('.pdf'):
             try:
-                # Attempt to get a small portion of the PDF content
-                pdf_response = requests.get(spec_sheet_url, timeout=15, stream=True, headers={
-                    'User-Agent': 'Mozilla/5.0 (compatible; PIM-Validator/1.0)',
-                    'Range': 'bytes=0-10240'  # Only get first 10KB
+                # Fetch through the shared cache: extraction reuses the same PDF afterwards
+                pdf_response = get_fetcher().get(spec_sheet_url, timeout=15, headers={
+                    'User-Agent': 'Mozilla/5.0 (compatible; PIM-Validator/1.0)'
                 })
 
                 if pdf_response.status_code in [200, 206]:  # 206 for partial content
-                    # Simple text search in PDF header/metadata
-                    content_text = str(pdf_response.content)
+                    # Simple text search in PDF header/metadata (first 10KB)
+                    content_text = str(pdf_response.content[:10241])
                     if expected_sku.upper() in content_text.upper():
                         content_sku_found = True
                         sku_matches.append('pdf_content')
@@ -484,9 +498,19 @@ else:
 
 # Get global instances
 sheets_manager = get_sheets_manager()
+if settings.SHEETS_AUTO_SYNC_INTERVAL > 0:
+    sheets_manager.start_auto_sync(settings.SHEETS_AUTO_SYNC_INTERVAL)
 ai_extractor = get_ai_extractor()
 data_processor = get_data_processor()
 
+# Pick up OpenAI batch jobs a previous process left unfinished
+batch_job_manager = get_batch_job_manager()
+batch_job_manager.resume_jobs()
+
+# Start headless browsers in the background so the first screenshots skip the launch
+if settings.BROWSER_PREWARM > 0:
+    get_browser_pool().warm(settings.BROWSER_PREWARM)
+
 # Initialize WIP job manager and connect to Socket.IO
 wip_job_manager = get_wip_job_manager()
 if socketio:
@@ -593,13 +617,7 @@ def extract_pricing_data(product_data, collection_name):
                 
                 # Map external pricing to expected format
                 if external_pricing and any(external_pricing.values()):
-                    from datetime import datetime
-                    return {
-                        'our_current_price': external_pricing.get('our_price', ''),
-                        'competitor_name': external_pricing.get('competitor_name', ''),
-                        'competitor_price': external_pricing.get('competitor_price', ''),
-                        'price_last_updated': datetime.now().strftime('%Y-%m-%d')
-                    }
+                    return map_external_pricing(external_pricing)
                 else:
                     logger.info(f"No external pricing data found for SKU: {sku}")
         
@@ -621,6 +639,81 @@ def extract_pricing_data(product_data, collection_name):
             'price_last_updated': ''
         }
 
+def map_external_pricing(external_pricing):
+    """Map a pricing sheet lookup result to the product pricing fields"""
+    from datetime import datetime
+    return {
+        'our_current_price': external_pricing.get('our_price', ''),
+        'competitor_name': external_pricing.get('competitor_name', ''),
+        'competitor_price': external_pricing.get('competitor_price', ''),
+        'price_last_updated': datetime.now().strftime('%Y-%m-%d')
+    }
+
+def extract_pricing_data_many(products, collection_name):
+    """Extract pricing data for a batch of products with one pricing sheet lookup
+
+    Same result per product as extract_pricing_data, but every SKU that needs
+    external pricing is resolved in a single get_pricing_many() call.
+
+    Args:
+        products: Dict of row_num -> product data
+        collection_name: Name of the collection
+
+    Returns:
+        Dict of row_num -> pricing data
+    """
+    empty_pricing = {
+        'our_current_price': '',
+        'competitor_name': '',
+        'competitor_price': '',
+        'price_last_updated': ''
+    }
+    results = {}
+    needs_lookup = {}
+
+    try:
+        config = get_collection_config(collection_name)
+        pricing_fields = get_pricing_fields_for_collection(collection_name)
+        external_enabled = (hasattr(config, 'pricing_enabled') and config.pricing_enabled and
+                            hasattr(config, 'pricing_sheet_id') and hasattr(config, 'pricing_lookup_config'))
+
+        for row_num, product_data in products.items():
+            results[row_num] = dict(empty_pricing)
+            try:
+                main_sheet_pricing = {key: product_data.get(field_name, '') for key, field_name in pricing_fields.items()}
+                # If main sheet has pricing data, use it
+                if any(value.strip() for value in main_sheet_pricing.values() if value):
+                    results[row_num] = main_sheet_pricing
+                    continue
+
+                sku = product_data.get('variant_sku', '').strip()
+                if external_enabled and sku:
+                    needs_lookup[row_num] = sku
+            except Exception as e:
+                logger.error(f"Error extracting pricing data for row {row_num}: {e}")
+
+        if needs_lookup:
+            external_pricing = sheets_manager.get_pricing_many(
+                config.pricing_sheet_id,
+                config.pricing_worksheet,
+                config.pricing_lookup_config,
+                list(set(needs_lookup.values()))
+            )
+            for row_num, sku in needs_lookup.items():
+                pricing = external_pricing.get(sku)
+                if pricing and any(pricing.values()):
+                    results[row_num] = map_external_pricing(pricing)
+
+        logger.info(f"Extracted pricing for {len(products)} {collection_name} products "
+                    f"({len(needs_lookup)} external lookups)")
+
+    except Exception as e:
+        logger.error(f"Error extracting pricing data: {e}")
+        for row_num in products:
+            results.setdefault(row_num, dict(empty_pricing))
+
+    return results
+
 def validate_pricing_data(pricing_data):
     """Validate pricing data structure"""
     required_fields = ['our_current_price', 'competitor_price']
@@ -1778,9 +1871,6 @@ def extract_from_spec_sheet_vision(spec_sheet_url: str, collection: str) -> dict
     Uses the ai_extraction_fields from the collection's config to build
     a dynamic extraction prompt, ensuring consistency with the collection schema.
     """
-    import base64
-    import requests as req
-    import io
     from config.settings import get_settings
 
     settings = get_settings()
@@ -2058,56 +2148,27 @@ CRITICAL RULES:
     if is_pdf:
         logger.info(f"Converting PDF to image for Vision API: {spec_sheet_url}")
         try:
-            # Download the PDF
-            pdf_response = req.get(spec_sheet_url, timeout=30)
+            # Download the PDF (shared fetch cache) and render page 1 once per PDF
+            pdf_response = get_fetcher().get(spec_sheet_url, timeout=30)
             pdf_response.raise_for_status()
-            pdf_bytes = pdf_response.content
 
-            # Try to convert PDF to image using pdf2image (if available)
-            try:
-                from pdf2image import convert_from_bytes
-                images = convert_from_bytes(pdf_bytes, first_page=1, last_page=1, dpi=150)
-                if images:
-                    # Convert first page to base64
-                    img_buffer = io.BytesIO()
-                    images[0].save(img_buffer, format='PNG')
-                    img_buffer.seek(0)
-                    image_content = base64.b64encode(img_buffer.read()).decode('utf-8')
-                    logger.info("Successfully converted PDF to image using pdf2image")
-            except ImportError:
-                logger.warning("pdf2image not available, trying PyMuPDF...")
-                # Try PyMuPDF as fallback
-                try:
-                    import fitz  # PyMuPDF
-                    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-                    if doc.page_count > 0:
-                        page = doc[0]
-                        # Render at 2x resolution for better quality
-                        mat = fitz.Matrix(2, 2)
-                        pix = page.get_pixmap(matrix=mat)
-                        image_content = base64.b64encode(pix.tobytes("png")).decode('utf-8')
-                        logger.info("Successfully converted PDF to image using PyMuPDF")
-                    doc.close()
-                except ImportError:
-                    logger.error("Neither pdf2image nor PyMuPDF available for PDF conversion")
-                    raise ValueError("PDF conversion libraries not available. Please install pdf2image or PyMuPDF.")
+            page_image = get_page_image_cache().get_page_image(pdf_response.content, page=1, dpi=150)
+            if not page_image:
+                raise ValueError("Could not render PDF page. Please install pdf2image or PyMuPDF.")
+            image_content = page_image['data_url']
+            logger.info(f"Converted PDF to {page_image['mime_type']} ({len(page_image['data']) / 1024:.0f}KB)")
 
         except Exception as e:
             logger.error(f"Failed to convert PDF: {e}")
             raise ValueError(f"Failed to process PDF: {str(e)}")
 
     # Use OpenAI Vision API
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {openai_key}"
-    }
-
     # Build image content - either base64 or URL
     if image_content:
         image_data = {
             "type": "image_url",
             "image_url": {
-                "url": f"data:image/png;base64,{image_content}"
+                "url": image_content
             }
         }
     else:
@@ -2140,12 +2201,7 @@ For boolean fields (like has_overflow), use true/false."""
         "max_tokens": 2000
     }
 
-    response = req.post(
-        "https://api.openai.com/v1/chat/completions",
-        headers=headers,
-        json=payload,
-        timeout=60
-    )
+    response = get_llm_client().post(payload, timeout=60, kind='spec_sheet_extraction')
     response.raise_for_status()
 
     result = response.json()
@@ -3059,6 +3115,30 @@ def api_get_collections():
             'error': str(e)
         }), 500
 
+@app.route('/api/<collection_name>/stats/summary', methods=['GET'])
+def api_get_collection_stats_summary(collection_name):
+    """Get a collection's running statistics: counts, quality and per-field fill rates"""
+    try:
+        from core.db_cache import get_db_cache
+        stats = get_db_cache().get_collection_stats(collection_name)
+        if stats is None:
+            return jsonify({
+                'success': False,
+                'error': f'No statistics available for {collection_name}'
+            }), 404
+
+        return jsonify({
+            'success': True,
+            'stats': stats,
+            'collection': collection_name
+        })
+    except Exception as e:
+        logger.error(f"Error getting stats summary for {collection_name}: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @app.route('/api/<collection_name>/stats', methods=['GET'])
 def api_get_collection_stats(collection_name):
     """Get statistics for a specific collection"""
@@ -3080,57 +3160,86 @@ def api_get_collection_stats(collection_name):
 # API ENDPOINTS - PRODUCT DATA (ENHANCED WITH PRICING)
 # =============================================================================
 
-# File-based cache for all products (works with PythonAnywhere)
-import pickle
-from pathlib import Path
-
-CACHE_DIR = Path('/tmp/pim_cache')
-CACHE_DIR.mkdir(exist_ok=True)
-CACHE_TTL_SECONDS = 300  # 5 minutes
-
-def get_cache_path(cache_key):
-    """Get the file path for a cache key"""
-    safe_key = cache_key.replace('/', '_').replace('\\', '_')
-    return CACHE_DIR / f"{safe_key}.pkl"
+# Serialized, precompressed response cache for all products (shared by every worker via disk)
+def send_cached_response(entry, cache_status):
+    """Serve a cached response: 304 if the client's copy is current, else the best precompressed body"""
+    response_cache = get_response_cache()
+    if request.if_none_match.contains_weak(entry.etag):
+        response_cache.count('not_modified')
+        response = app.response_class(status=304)
+    else:
+        encoding = choose_encoding(request.headers.get('Accept-Encoding', ''), entry.encodings)
+        response = app.response_class(entry.body(encoding), mimetype='application/json')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+
+    response.set_etag(entry.etag, weak=True)
+    response.headers['Vary'] = 'Accept-Encoding'
+    # Browsers revalidate every time, which costs one conditional request when nothing changed
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Cache'] = cache_status
+    return response
+
+def add_pricing_to_products(products, collection_name):
+    """Merge pricing data into each product, plus validated pricing for the API response"""
+    all_pricing = extract_pricing_data_many(products, collection_name)
+    for row_num, product in products.items():
+        pricing_data = all_pricing[row_num]
+        if pricing_data:
+            # Merge pricing data directly into product
+            product.update(pricing_data)
+        # Also add validated pricing for API response
+        product['pricing_data'] = validate_pricing_data(pricing_data)
+    return products
 
-def get_cached_data(cache_key):
-    """Get data from file cache if valid"""
-    cache_file = get_cache_path(cache_key)
-    if not cache_file.exists():
-        return None
+# Products per pricing lookup while streaming a full collection
+ALL_PRODUCTS_STREAM_BATCH = 500
 
-    try:
-        with open(cache_file, 'rb') as f:
-            cached_data = pickle.load(f)
+def stream_all_products(collection_name, stream_format, force_refresh=False):
+    """Stream a full collection as NDJSON or as chunked JSON in the /products/all shape
 
-        cache_age = time.time() - cached_data['timestamp']
-        if cache_age < CACHE_TTL_SECONDS:
-            logger.info(f"✅ Cache HIT! Age: {cache_age:.1f}s")
-            return cached_data['data']
-        else:
-            logger.info(f"⏰ Cache EXPIRED (age: {cache_age:.1f}s)")
-            cache_file.unlink()  # Delete expired cache
-            return None
-    except Exception as e:
-        logger.warning(f"Cache read error: {e}")
-        return None
+    Products are read from the cache a batch at a time and written as they
+    are priced, so the first byte goes out before the last row is read and
+    memory does not grow with the collection. Streams skip the response cache.
+    """
+    if stream_format not in ('ndjson', 'json'):
+        return jsonify({
+            'success': False,
+            'error': f'Invalid stream format: {stream_format}. Use ndjson or json.'
+        }), 400
+
+    def priced_products():
+        rows = sheets_manager.iter_all_products(collection_name, force_refresh=force_refresh)
+        for batch in batched(rows, ALL_PRODUCTS_STREAM_BATCH):
+            yield from add_pricing_to_products(dict(batch), collection_name).items()
+
+    if stream_format == 'ndjson':
+        body = iter_ndjson(({**product, 'row_number': row_num} for row_num, product in priced_products()),
+                           dumps=app.json.dumps)
+        mimetype = NDJSON_MIMETYPE
+    else:
+        head = {
+            'success': True,
+            'collection': collection_name,
+            'pricing_support': bool(get_pricing_fields_for_collection(collection_name)),
+            'cached': False
+        }
+        body = iter_json_object(head, 'products', priced_products(),
+                                tail=lambda count: {'total_count': count}, dumps=app.json.dumps)
+        mimetype = 'application/json'
 
-def set_cached_data(cache_key, data):
-    """Save data to file cache"""
-    cache_file = get_cache_path(cache_key)
-    try:
-        with open(cache_file, 'wb') as f:
-            pickle.dump({
-                'timestamp': time.time(),
-                'data': data
-            }, f)
-        logger.info(f"💾 Saved to cache: {cache_file.name}")
-    except Exception as e:
-        logger.warning(f"Cache write error: {e}")
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    # Stop proxies from buffering the whole stream before passing it on
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @app.route('/api/<collection_name>/products/all', methods=['GET'])
 def api_get_all_products(collection_name):
-    """Get all products from a collection (including pricing data) - with caching"""
+    """Get all products from a collection (including pricing data) - with caching
+
+    ?stream=ndjson streams one product per line, ?stream=json streams the usual body
+    """
     try:
         # Check for force_refresh parameter
         force_refresh = request.args.get('force_refresh', 'false', type=str).lower() == 'true'
@@ -3145,29 +3254,33 @@ def api_get_all_products(collection_name):
         if page is not None and limit is not None:
             return api_get_products_paginated(collection_name, page, limit)
 
-        # Check file-based cache first (unless force refresh)
+        # ?stream=ndjson|json sends rows as they are read instead of building the whole body
+        stream_format = request.args.get('stream', '').lower()
+        if stream_format:
+            get_collection_config(collection_name)  # Unknown collection -> 404 before streaming starts
+            return stream_all_products(collection_name, stream_format, force_refresh)
+
+        # Check the response cache first (unless force refresh); entries are only valid
+        # for the cache generation they were built from
+        from core.db_cache import get_db_cache
+        response_cache = get_response_cache()
         cache_key = f"{collection_name}_all_products"
+        version = str(get_db_cache().get_cache_generation(collection_name))
 
         if not force_refresh:
-            cached_response = get_cached_data(cache_key)
-            if cached_response:
-                cached_response['cached'] = True
-                return jsonify(cached_response)
+            cached_entry = response_cache.get(cache_key, version)
+            if cached_entry:
+                try:
+                    return send_cached_response(cached_entry, 'HIT')
+                except FileNotFoundError:
+                    logger.info("Cached response was replaced by another worker, rebuilding")
 
         # Cache miss or expired - fetch from sheets
         logger.info(f"📥 Fetching products from Google Sheets...")
         products = sheets_manager.get_all_products(collection_name, force_refresh=force_refresh)
 
         # Add pricing data to each product
-        enhanced_products = {}
-        for row_num, product in products.items():
-            pricing_data = extract_pricing_data(product, collection_name)
-            if pricing_data:
-                # Merge pricing data directly into product
-                product.update(pricing_data)
-            # Also add validated pricing for API response
-            product['pricing_data'] = validate_pricing_data(pricing_data)
-            enhanced_products[row_num] = product
+        enhanced_products = add_pricing_to_products(products, collection_name)
 
         # Build response
         response_data = {
@@ -3179,10 +3292,9 @@ def api_get_all_products(collection_name):
             'cached': False
         }
 
-        # Save to file cache
-        set_cached_data(cache_key, response_data)
-
-        return jsonify(response_data)
+        # Serialize once and store with compressed variants
+        entry = response_cache.put(cache_key, version, app.json.response(response_data).get_data())
+        return send_cached_response(entry, 'MISS')
 
     except ValueError as e:
         return jsonify({
@@ -3207,11 +3319,12 @@ def api_get_products_paginated(collection_name, page=None, limit=None):
         quality_filter = request.args.get('quality_filter', '', type=str)
         sort_by = request.args.get('sort_by', 'sheet_order', type=str)
         force_refresh = request.args.get('force_refresh', 'false', type=str).lower() == 'true'
+        after = request.args.get('after', None, type=str)
 
         logger.info(f"API: Getting paginated products for {collection_name} (page {page}, limit {limit}, sort: {sort_by})")
 
         # Get products with pagination from sheets manager
-        result = sheets_manager.get_products_paginated(collection_name, page, limit, search, quality_filter, sort_by, force_refresh)
+        result = sheets_manager.get_products_paginated(collection_name, page, limit, search, quality_filter, sort_by, force_refresh, after)
 
         # Skip pricing data for large requests (optimization for loading all products)
         # Pricing data can be loaded on-demand when viewing individual products
@@ -3224,64 +3337,31 @@ def api_get_products_paginated(collection_name, page=None, limit=None):
             enhanced_products = result['products']
         else:
             # Normal path: Add pricing data for small requests
+            page_pricing = extract_pricing_data_many(result['products'], collection_name)
             for row_num, product in result['products'].items():
-                pricing_data = extract_pricing_data(product, collection_name)
+                pricing_data = page_pricing[row_num]
                 if pricing_data:
                     product.update(pricing_data)
                 product['pricing_data'] = validate_pricing_data(pricing_data)
                 enhanced_products[row_num] = product
 
-        # Calculate statistics on first page load only (for performance)
+        # Statistics come from the cache's running aggregates, so they are cheap to include
         statistics = None
         if page == 1:
-            cache_key = f"{collection_name}_statistics"
-            statistics = get_cached_data(cache_key)
-
-            if not statistics:
-                try:
-                    logger.info(f"📊 Calculating statistics for {collection_name}...")
-                    all_products = sheets_manager.get_all_products(collection_name)
-
-                    # Calculate quality scores
-                    complete_count = 0
-                    missing_count = 0
-                    total_quality = 0
-
-                    for product in all_products.values():
-                        # Use existing quality_score if available, otherwise calculate
-                        if 'quality_score' in product and product['quality_score']:
-                            try:
-                                quality_score = float(str(product['quality_score']).strip().replace('%', ''))
-                            except:
-                                quality_score = calculate_quality_score(collection_name, product)
-                        else:
-                            quality_score = calculate_quality_score(collection_name, product)
-
-                        total_quality += quality_score
-                        if quality_score >= 80:
-                            complete_count += 1
-                        else:
-                            missing_count += 1
-
-                    total_products = len(all_products)
-                    avg_quality = round(total_quality / total_products) if total_products > 0 else 0
-
+            try:
+                from core.db_cache import get_db_cache
+                aggregates = get_db_cache().get_collection_stats(collection_name)
+                if aggregates:
                     statistics = {
-                        'total_products': total_products,
-                        'complete_products': complete_count,
-                        'missing_info_products': missing_count,
-                        'avg_quality_percent': avg_quality
+                        'total_products': aggregates['total_products'],
+                        'complete_products': aggregates['complete_products'],
+                        'missing_info_products': aggregates['missing_info_products'],
+                        'avg_quality_percent': aggregates['avg_quality_percent']
                     }
-
-                    # Cache statistics for 5 minutes
-                    set_cached_data(cache_key, statistics)
-                    logger.info(f"✅ Statistics calculated and cached: {statistics}")
-                except Exception as e:
-                    logger.error(f"❌ Failed to calculate statistics: {e}")
-                    import traceback
-                    traceback.print_exc()
-                    # Don't fail the whole request if statistics calculation fails
-                    statistics = None
+            except Exception as e:
+                logger.error(f"❌ Failed to get statistics: {e}")
+                # Don't fail the whole request if statistics are unavailable
+                statistics = None
 
         response_data = {
             'success': True,
@@ -3292,7 +3372,8 @@ def api_get_products_paginated(collection_name, page=None, limit=None):
                 'total_count': result['total_count'],
                 'total_pages': result['total_pages'],
                 'has_next': result['has_next'],
-                'has_prev': result['has_prev']
+                'has_prev': result['has_prev'],
+                'next_cursor': result.get('next_cursor')
             },
             'collection': collection_name,
             'search': search,
@@ -3332,6 +3413,21 @@ def api_search_products(collection_name):
 
         logger.info(f"API: Searching products in {collection_name} for: {query}")
 
+        # Ranked search through the SQLite full-text index when available
+        from core.db_cache import get_db_cache
+        limit = request.args.get('limit', 100, type=int)
+        search_result = get_db_cache().search_products(query, collection_name, limit=limit)
+        if search_result is not None and search_result['total_count'] > 0:
+            matching_products = {hit['row_number']: hit['product'] for hit in search_result['hits']}
+            return jsonify({
+                'success': True,
+                'products': matching_products,
+                'ranked_row_numbers': [hit['row_number'] for hit in search_result['hits']],
+                'total_count': search_result['total_count'],
+                'query': query,
+                'collection': collection_name
+            })
+
         # Get all products
         all_products = sheets_manager.get_all_products(collection_name)
 
@@ -3372,6 +3468,43 @@ def api_search_products(collection_name):
             'error': str(e)
         }), 500
 
+@app.route('/api/products/search', methods=['GET'])
+def api_search_all_collections():
+    """Ranked full-text search across every cached collection"""
+    try:
+        from core.db_cache import get_db_cache
+
+        query = request.args.get('q', '', type=str).strip()
+        limit = request.args.get('limit', 50, type=int)
+        offset = request.args.get('offset', 0, type=int)
+
+        if not query:
+            return jsonify({
+                'success': False,
+                'error': 'Search query is required'
+            }), 400
+
+        search_result = get_db_cache().search_products(query, limit=limit, offset=offset)
+        if search_result is None:
+            return jsonify({
+                'success': False,
+                'error': 'Search index not available'
+            }), 503
+
+        return jsonify({
+            'success': True,
+            'results': search_result['hits'],
+            'total_count': search_result['total_count'],
+            'query': query
+        })
+
+    except Exception as e:
+        logger.error(f"API Error searching all collections: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @app.route('/api/<collection_name>/products/filter-missing-fields', methods=['POST'])
 def api_filter_missing_fields(collection_name):
     """Fast filter endpoint - returns products missing specified fields"""
@@ -3710,6 +3843,8 @@ def api_process_extract(collection_name):
 
         selected_rows = payload.get("selected_rows", [])
         overwrite_mode = payload.get("overwrite_mode", True)
+        # use_cache=false re-asks the model instead of reusing a cached extraction of the same page
+        use_cache = payload.get("use_cache", True)
 
         if not selected_rows:
             return jsonify({"success": False, "message": "No rows selected"}), 400
@@ -3724,7 +3859,8 @@ def api_process_extract(collection_name):
         result = data_processor.extract_from_urls(
             collection_name=collection_name,
             selected_rows=selected_rows,
-            overwrite_mode=overwrite_mode
+            overwrite_mode=overwrite_mode,
+            use_cache=use_cache
         )
 
         if result["success"]:
@@ -3795,6 +3931,7 @@ def api_extract_single_product(collection_name, row_num):
     try:
         payload = request.get_json()
         overwrite_mode = payload.get("overwrite_mode", True) if payload else True
+        use_cache = payload.get("use_cache", True) if payload else True
 
         logger.info(f"Starting single product AI extraction for {collection_name} row {row_num}")
 
@@ -3830,7 +3967,8 @@ def api_extract_single_product(collection_name, row_num):
         data_processor = get_data_processor()
 
         # Process single URL directly
-        result = data_processor._process_single_url(collection_name, row_num, product_url, overwrite_mode)
+        result = data_processor._process_single_url(collection_name, row_num, product_url, overwrite_mode,
+                                                    use_cache=use_cache)
 
         if result.success:
             # Emit SocketIO event for live updates
@@ -4972,10 +5110,6 @@ def api_get_missing_info(collection_name):
 def api_export_missing_info_csv(collection_name):
     """Export missing information analysis as CSV for suppliers"""
     try:
-        import csv
-        import io
-        from flask import make_response
-
         logger.info(f"API: Exporting missing info CSV for {collection_name}")
 
         # Get collection configuration
@@ -4986,59 +5120,44 @@ def api_export_missing_info_csv(collection_name):
                 'error': f'Collection not found: {collection_name}'
             }), 404
 
-        # Get all products
+        # Products are read from the cache in batches as the CSV is written
         sheets_manager = get_sheets_manager()
-        products = sheets_manager.get_all_products(collection_name)
+        first_product, products = peek(sheets_manager.iter_all_products(collection_name))
 
-        if not products:
+        if first_product is None:
             return jsonify({
                 'success': False,
                 'error': f'No products found for {collection_name}'
             }), 404
 
-        # Analyze missing information (reuse logic from missing-info endpoint)
-        missing_info_analysis = []
         quality_fields = config.quality_fields
 
-        for row_num, product in products.items():
-            missing_fields = []
-
-            # Check each quality field for missing data
-            for field in quality_fields:
-                value = product.get(field, '').strip()
-                if not value or value.lower() in ['', 'none', 'null', 'n/a', '-', 'tbd', 'tbc']:
-                    missing_fields.append({
-                        'field': field,
-                        'display_name': field.replace('_', ' ').title(),
-                        'is_critical': field in ['title', 'variant_sku', 'brand_name', 'product_material', 'installation_type', 'style', 'grade_of_material', 'waste_outlet_dimensions', 'body_html', 'features', 'care_instructions', 'faqs']
-                    })
-
-            if missing_fields:
-                missing_info_analysis.append({
-                    'row_num': row_num,
-                    'title': product.get('title', ''),
-                    'variant_sku': product.get('variant_sku', ''),
-                    'brand_name': product.get('brand_name', ''),
-                    'missing_fields': [f['display_name'] for f in missing_fields],
-                    'missing_critical': [f['display_name'] for f in missing_fields if f['is_critical']],
-                    'total_missing_count': len(missing_fields),
-                    'critical_missing_count': len([f for f in missing_fields if f['is_critical']])
-                })
-
-        # Create CSV content - ONE ROW PER MISSING FIELD for maximum readability
-        output = io.StringIO()
-        writer = csv.writer(output)
+        def analyze_missing_info():
+            """Analyze missing information per product (reuse logic from missing-info endpoint)"""
+            for row_num, product in products:
+                missing_fields = []
+
+                # Check each quality field for missing data
+                for field in quality_fields:
+                    value = str(product.get(field) or '').strip()
+                    if not value or value.lower() in ['', 'none', 'null', 'n/a', '-', 'tbd', 'tbc']:
+                        missing_fields.append({
+                            'field': field,
+                            'display_name': field.replace('_', ' ').title(),
+                            'is_critical': field in ['title', 'variant_sku', 'brand_name', 'product_material', 'installation_type', 'style', 'grade_of_material', 'waste_outlet_dimensions', 'body_html', 'features', 'care_instructions', 'faqs']
+                        })
 
-        # Simple, clear header
-        writer.writerow([
-            'Product Title',
-            'SKU',
-            'Brand',
-            'Missing Field',
-            'Field Category',
-            'Priority',
-            'Example/Description'
-        ])
+                if missing_fields:
+                    yield {
+                        'row_num': row_num,
+                        'title': product.get('title', ''),
+                        'variant_sku': product.get('variant_sku', ''),
+                        'brand_name': product.get('brand_name', ''),
+                        'missing_fields': [f['display_name'] for f in missing_fields],
+                        'missing_critical': [f['display_name'] for f in missing_fields if f['is_critical']],
+                        'total_missing_count': len(missing_fields),
+                        'critical_missing_count': len([f for f in missing_fields if f['is_critical']])
+                    }
 
         # Define field categories and examples
         field_info = {
@@ -5075,32 +5194,42 @@ def api_export_missing_info_csv(collection_name):
             'Brand Name': {'category': 'Basic Info', 'priority': 'HIGH', 'example': 'Manufacturer brand name'}
         }
 
-        # Write one row per missing field for each product
-        for product in missing_info_analysis:
-            for missing_field in product['missing_fields']:
-                field_details = field_info.get(missing_field, {
-                    'category': 'Other',
-                    'priority': 'MEDIUM',
-                    'example': 'Please provide this information'
-                })
-
-                writer.writerow([
-                    product['title'],
-                    product['variant_sku'],
-                    product['brand_name'] or 'Unknown Brand',
-                    missing_field,
-                    field_details['category'],
-                    field_details['priority'],
-                    field_details['example']
-                ])
+        def csv_rows():
+            """CSV content - ONE ROW PER MISSING FIELD for maximum readability"""
+            # Simple, clear header
+            yield [
+                'Product Title',
+                'SKU',
+                'Brand',
+                'Missing Field',
+                'Field Category',
+                'Priority',
+                'Example/Description'
+            ]
 
-        # Create response
-        csv_content = output.getvalue()
-        output.close()
+            # Write one row per missing field for each product
+            for product in analyze_missing_info():
+                for missing_field in product['missing_fields']:
+                    field_details = field_info.get(missing_field, {
+                        'category': 'Other',
+                        'priority': 'MEDIUM',
+                        'example': 'Please provide this information'
+                    })
 
-        response = make_response(csv_content)
-        response.headers['Content-Type'] = 'text/csv'
+                    yield [
+                        product['title'],
+                        product['variant_sku'],
+                        product['brand_name'] or 'Unknown Brand',
+                        missing_field,
+                        field_details['category'],
+                        field_details['priority'],
+                        field_details['example']
+                    ]
+
+        # Stream the CSV as it is written
+        response = Response(stream_with_context(iter_csv_rows(csv_rows())), mimetype='text/csv')
         response.headers['Content-Disposition'] = f'attachment; filename="{collection_name}_missing_information.csv"'
+        response.headers['X-Accel-Buffering'] = 'no'
 
         return response
 
@@ -5957,6 +6086,183 @@ def _clean_product_data(product_data, collection_name):
 
     return cleaned
 
+# =============================================================================
+# API ENDPOINTS - OPENAI BATCH JOBS
+# =============================================================================
+
+@app.route('/api/<collection_name>/batch/extract', methods=['POST'])
+def api_batch_extract(collection_name):
+    """Start an offline (OpenAI Batch API) AI extraction job
+
+    Request: {"selected_rows": [...] (omit for the whole collection), "overwrite_mode": true}
+    """
+    try:
+        payload = request.get_json(silent=True) or {}
+
+        if not settings.OPENAI_API_KEY:
+            return jsonify({"success": False, "message": "OpenAI API key not configured"}), 500
+
+        job_id = batch_job_manager.create_job(
+            'extraction',
+            collection_name,
+            selected_rows=payload.get("selected_rows") or None,
+            options={"overwrite_mode": payload.get("overwrite_mode", True)}
+        )
+        batch_job_manager.start_job(job_id)
+
+        return jsonify({
+            "success": True,
+            "job_id": job_id,
+            "message": f"Batch extraction job started for {collection_name}"
+        }), 202
+
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error starting batch extraction for {collection_name}: {e}", exc_info=True)
+        return jsonify({"success": False, "message": str(e)}), 500
+
+
+@app.route('/api/<collection_name>/batch/generate', methods=['POST'])
+def api_batch_generate(collection_name):
+    """Start an offline (OpenAI Batch API) content generation job
+
+    Request: {"selected_rows": [...] (omit for the whole collection), "use_url_content": false,
+              "fields_to_generate": ["description", "care_instructions"], "max_feature_words": 5}
+    """
+    try:
+        payload = request.get_json(silent=True) or {}
+
+        if not settings.OPENAI_API_KEY:
+            return jsonify({"success": False, "message": "OpenAI API key not configured"}), 500
+
+        job_id = batch_job_manager.create_job(
+            'generation',
+            collection_name,
+            selected_rows=payload.get("selected_rows") or None,
+            options={
+                "use_url_content": payload.get("use_url_content", False),
+                "fields_to_generate": payload.get("fields_to_generate"),
+                "max_feature_words": payload.get("max_feature_words", 5)
+            }
+        )
+        batch_job_manager.start_job(job_id)
+
+        return jsonify({
+            "success": True,
+            "job_id": job_id,
+            "message": f"Batch content generation job started for {collection_name}"
+        }), 202
+
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error starting batch generation for {collection_name}: {e}", exc_info=True)
+        return jsonify({"success": False, "message": str(e)}), 500
+
+
+@app.route('/api/<collection_name>/batch/jobs', methods=['GET'])
+def api_list_batch_jobs(collection_name):
+    """List recent OpenAI batch jobs for a collection"""
+    try:
+        limit = request.args.get('limit', 50, type=int)
+        jobs = batch_job_manager.list_jobs(collection_name, limit)
+
+        return jsonify({
+            'success': True,
+            'jobs': jobs,
+            'count': len(jobs)
+        })
+
+    except Exception as e:
+        logger.error(f"Error listing batch jobs: {e}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/<collection_name>/batch/jobs/<job_id>', methods=['GET'])
+def api_get_batch_job(collection_name, job_id):
+    """Get status of an OpenAI batch job"""
+    try:
+        job = batch_job_manager.get_job(job_id)
+        if not job:
+            return jsonify({
+                'success': False,
+                'error': 'Job not found'
+            }), 404
+
+        return jsonify({
+            'success': True,
+            'job': job
+        })
+
+    except Exception as e:
+        logger.error(f"Error getting batch job status: {e}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/<collection_name>/batch/jobs/<job_id>/resume', methods=['POST'])
+def api_resume_batch_job(collection_name, job_id):
+    """Resume an unfinished OpenAI batch job in this process (a failed one is re-opened if its batches were submitted)"""
+    try:
+        job = batch_job_manager.get_job(job_id)
+        if not job:
+            return jsonify({
+                'success': False,
+                'error': 'Job not found'
+            }), 404
+
+        resumed, message = batch_job_manager.resume_job(job_id)
+        if not resumed:
+            return jsonify({
+                'success': False,
+                'status': job['status'],
+                'error': message
+            }), 409
+
+        return jsonify({
+            'success': True,
+            'status': batch_job_manager.get_job(job_id)['status'],
+            'message': message
+        })
+
+    except Exception as e:
+        logger.error(f"Error resuming batch job: {e}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/<collection_name>/batch/jobs/<job_id>/cancel', methods=['POST'])
+def api_cancel_batch_job(collection_name, job_id):
+    """Cancel an OpenAI batch job (and its batches at OpenAI)"""
+    try:
+        success = batch_job_manager.cancel_job(job_id)
+
+        if not success:
+            return jsonify({
+                'success': False,
+                'error': 'Job not found or cannot be cancelled'
+            }), 404
+
+        return jsonify({
+            'success': True,
+            'message': 'Job cancelled successfully'
+        })
+
+    except Exception as e:
+        logger.error(f"Error cancelling batch job: {e}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 # =============================================================================
 # API ENDPOINTS - DATA CLEANING
 # =============================================================================
@@ -6335,7 +6641,7 @@ def process_spec_sheet_url(collection_name):
                 logger.info(f"🤖 Using AI to extract dimensions from PDF: {url}")
 
                 # Download PDF temporarily
-                response = requests.get(url, timeout=30)
+                response = get_fetcher().get(url, timeout=30)
                 response.raise_for_status()
 
                 # Save to temp file
@@ -6591,17 +6897,10 @@ def bulk_lookup_wels(collection_name):
                 continue
 
             total_processed += 1
-            wels_data = None
-
-            logger.info(f"📋 Row {row_num} - Will try {len(skus_to_try)} SKU(s): {skus_to_try}")
 
-            # Try each potential SKU until we find a match
-            for sku in skus_to_try:
-                logger.info(f"🔍 Trying SKU '{sku}' for row {row_num} with brand '{brand}'")
-                wels_data = wels_lookup.lookup_by_sku(sku, brand)
-                if wels_data:
-                    logger.info(f"✅ Found WELS data using SKU: {sku}")
-                    break
+            # Try each potential SKU until we find a match (hash probes against the local WELS snapshot)
+            wels_data = wels_lookup.lookup_candidates(skus_to_try, brand)
+            sku = wels_data['sku'] if wels_data else skus_to_try[-1]
 
             if wels_data:
                 found_count += 1
@@ -7239,6 +7538,224 @@ def api_cache_stats():
             'misses': 0
         })
 
+@app.route('/api/system/db-stats', methods=['GET'])
+def api_db_stats():
+    """Get SQLite connection pool and lock-wait statistics"""
+    try:
+        return jsonify({
+            'success': True,
+            'pools': get_pool_stats()
+        })
+    except Exception as e:
+        logger.error(f"Error getting database stats: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/system/fetch-cache-stats', methods=['GET'])
+def api_fetch_cache_stats():
+    """Get shared HTTP fetch cache hit/revalidation statistics"""
+    try:
+        return jsonify({
+            'success': True,
+            'fetch_cache': get_fetcher().get_stats()
+        })
+    except Exception as e:
+        logger.error(f"Error getting fetch cache stats: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/system/llm-cache', methods=['GET'])
+def api_llm_cache_stats():
+    """Get LLM response cache hit/miss and token-savings statistics"""
+    try:
+        return jsonify({
+            'success': True,
+            'llm_cache': get_llm_cache().get_stats()
+        })
+    except Exception as e:
+        logger.error(f"Error getting LLM cache stats: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/system/llm-cache', methods=['DELETE'])
+def api_clear_llm_cache():
+    """Clear every cached LLM response"""
+    try:
+        return jsonify({
+            'success': get_llm_cache().clear()
+        })
+    except Exception as e:
+        logger.error(f"Error clearing LLM cache: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/system/response-cache', methods=['GET'])
+def api_response_cache_stats():
+    """Get precompressed response cache hit/304 statistics"""
+    try:
+        return jsonify({
+            'success': True,
+            'response_cache': get_response_cache().get_stats()
+        })
+    except Exception as e:
+        logger.error(f"Error getting response cache stats: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/system/llm-client', methods=['GET'])
+def api_llm_client_stats():
+    """Get shared OpenAI client lane, latency, retry and quota statistics"""
+    try:
+        return jsonify({
+            'success': True,
+            'llm_client': get_llm_client().get_stats()
+        })
+    except Exception as e:
+        logger.error(f"Error getting LLM client stats: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/system/html-preprocessor', methods=['GET'])
+def api_html_preprocessor_stats():
+    """Get product document input/output token statistics for AI extraction"""
+    try:
+        return jsonify({
+            'success': True,
+            'html_preprocessor': get_html_preprocessor().get_stats()
+        })
+    except Exception as e:
+        logger.error(f"Error getting HTML preprocessor stats: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/system/page-analysis', methods=['GET'])
+def api_page_analysis_stats():
+    """Get shared page parse statistics (parses, reuse hits, parse time)"""
+    try:
+        return jsonify({
+            'success': True,
+            'page_analysis': get_page_analysis_cache().get_stats()
+        })
+    except Exception as e:
+        logger.error(f"Error getting page analysis stats: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/system/browser-pool', methods=['GET'])
+def api_browser_pool_stats():
+    """Get headless browser pool statistics (running browsers, pages rendered, launch and page times)"""
+    try:
+        return jsonify({
+            'success': True,
+            'browser_pool': get_browser_pool().get_stats()
+        })
+    except Exception as e:
+        logger.error(f"Error getting browser pool stats: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/system/sheets-write-queue', methods=['GET'])
+def api_sheets_write_queue_stats():
+    """Get Google Sheets write-behind queue backlog and flush statistics"""
+    try:
+        return jsonify({
+            'success': True,
+            'write_queue': sheets_manager.get_write_queue_stats()
+        })
+    except Exception as e:
+        logger.error(f"Error getting sheets write queue stats: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/system/sheets-write-queue/flush', methods=['POST'])
+def api_flush_sheets_write_queue():
+    """Write all queued Google Sheets updates now"""
+    try:
+        collection_name = request.args.get('collection') or None
+        flushed = sheets_manager.flush_writes(collection_name)
+        return jsonify({
+            'success': flushed,
+            'write_queue': sheets_manager.get_write_queue_stats()
+        })
+    except Exception as e:
+        logger.error(f"Error flushing sheets write queue: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/system/pricing-index', methods=['GET'])
+def api_pricing_index_stats():
+    """Get pricing sheet index size, age and hit statistics"""
+    try:
+        return jsonify({
+            'success': True,
+            'pricing_indexes': sheets_manager.get_pricing_index_stats(),
+            'competitor_pricing': get_pricing_manager().get_stats()
+        })
+    except Exception as e:
+        logger.error(f"Error getting pricing index stats: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/system/wels-registry', methods=['GET'])
+def api_wels_registry_stats():
+    """Get WELS snapshot size, age and lookup statistics"""
+    try:
+        from core.wels_lookup import get_wels_lookup
+        return jsonify({
+            'success': True,
+            'wels_registry': get_wels_lookup().get_stats()
+        })
+    except Exception as e:
+        logger.error(f"Error getting WELS registry stats: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/system/wels-registry/refresh', methods=['POST'])
+def api_refresh_wels_registry():
+    """Re-read the WELS reference workbook into the local snapshot now"""
+    try:
+        from core.wels_lookup import get_wels_lookup
+        wels_lookup = get_wels_lookup()
+        refreshed = wels_lookup.refresh()
+        return jsonify({
+            'success': refreshed,
+            'wels_registry': wels_lookup.get_stats()
+        })
+    except Exception as e:
+        logger.error(f"Error refreshing WELS registry: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @app.route('/api/system/queue-stats', methods=['GET'])
 def api_queue_stats():
     """Get async processing queue statistics"""
@@ -7418,7 +7935,7 @@ def api_supplier_product_image_stats():
     """Get statistics about supplier product images"""
     try:
         supplier_db = get_supplier_db()
-        conn = sqlite3.connect(supplier_db.db_path)
+        conn = get_pool(supplier_db.db_path).connect()
         cursor = conn.cursor()
 
         cursor.execute('SELECT COUNT(*) FROM supplier_products WHERE image_url IS NOT NULL AND image_url != ""')
@@ -7437,7 +7954,8 @@ def api_supplier_product_image_stats():
             'total_products': total,
             'products_with_images': with_images,
             'percentage': round((with_images/total*100) if total > 0 else 0, 1),
-            'sample_products': samples
+            'sample_products': samples,
+            'extraction': supplier_db.get_image_extraction_progress()
         })
     except Exception as e:
         logger.error(f"Error getting image stats: {e}", exc_info=True)
@@ -7633,11 +8151,10 @@ def api_extract_product_image_ai():
         # Fallback to og:image if AI extraction fails
         if not image_urls or len(image_urls) == 0:
             try:
-                from bs4 import BeautifulSoup
-                soup = BeautifulSoup(html_content, 'html.parser')
-                og_image = soup.find('meta', property='og:image')
-                if og_image and og_image.get('content'):
-                    image_urls = [og_image.get('content')]
+                # Same parse the AI image extraction above used
+                og_image = analyze_page(html_content, product_url).meta_content('og:image')
+                if og_image:
+                    image_urls = [og_image]
                     logger.info(f"Using og:image fallback: {image_urls[0]}")
             except Exception as e:
                 logger.warning(f"Fallback image extraction failed: {e}")
@@ -7693,7 +8210,7 @@ def api_extract_product_image_ai():
         # Update database if product_id provided
         if product_id:
             supplier_db = get_supplier_db()
-            conn = sqlite3.connect(supplier_db.db_path)
+            conn = get_pool(supplier_db.db_path).connect()
             cursor = conn.cursor()
 
             if product_title:
@@ -8290,9 +8807,8 @@ def api_extract_product_image():
         # Optionally update database if SKU provided
         sku = data.get('sku')
         if sku and image_url:
-            import sqlite3
             supplier_db = get_supplier_db()
-            conn = sqlite3.connect(supplier_db.db_path)
+            conn = get_pool(supplier_db.db_path).connect()
             cursor = conn.cursor()
             cursor.execute('''
                 UPDATE supplier_products
@@ -8,6 +8,7 @@ import threading
 from flask import request, jsonify
 from extract_dimensions_from_pdf import PDFDimensionExtractor
 from core.ai_extractor import AIExtractor
+from core.http_fetcher import get_fetcher
 from config.collections import get_collection_config
 import tempfile
 import requests
@@ -150,7 +151,7 @@ def setup_bulk_pdf_routes(app, sheets_manager, socketio):
                     logger.info(f"🔄 Processing {idx + 1}/{total_count}: Row {row_num} - {sku}")
 
                     # Download PDF
-                    response = requests.get(spec_sheet_url, timeout=30)
+                    response = get_fetcher().get(spec_sheet_url, timeout=30)
                     response.raise_for_status()
 
                     # Save to temp file
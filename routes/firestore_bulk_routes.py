@@ -2,7 +2,7 @@
 Firestore Bulk Operations Routes
 Handles bulk edit, delete, import/export for Firestore collections
 """
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, Response, request, jsonify, send_file, stream_with_context
 import logging
 import csv
 import io
@@ -21,6 +21,7 @@ def setup_firestore_bulk_routes(app):
     """
     from core.firestore_manager import get_firestore_manager
     from core.data_cleaner import get_data_cleaner
+    from core.streaming import iter_csv, write_xlsx, peek
 
     # =============================================================================
     # BULK EDIT
@@ -69,52 +70,38 @@ def setup_firestore_bulk_routes(app):
 
             logger.info(f"🔄 [Bulk Edit] Updating {len(product_ids)} products in {collection_name}")
 
-            successful = []
-            failed = []
-            errors = []
+            # Append mode needs the current values, read in one pass for all products
+            current_products = None
+            if update_mode == 'append':
+                current_products = firestore_manager.get_products(collection_name, product_ids)
 
+            operations = []
             for row_num in product_ids:
-                try:
-                    # Get current product if append mode
-                    if update_mode == 'append':
-                        current_product = firestore_manager.get_single_product(collection_name, row_num)
-                        if current_product:
-                            # Merge updates (append tags, etc.)
-                            merged_updates = {}
-                            for field, new_value in updates.items():
-                                current_value = current_product.get(field, '')
-                                if field in ['tags', 'features']:
-                                    # Append to comma-separated lists
-                                    if current_value:
-                                        merged_updates[field] = f"{current_value}, {new_value}"
-                                    else:
-                                        merged_updates[field] = new_value
-                                else:
-                                    merged_updates[field] = new_value
-                            updates_to_apply = merged_updates
+                current_product = current_products.get(int(row_num)) if current_products is not None else None
+                if current_product:
+                    # Merge updates (append tags, etc.)
+                    merged_updates = {}
+                    for field, new_value in updates.items():
+                        current_value = current_product.get(field, '')
+                        if field in ['tags', 'features']:
+                            # Append to comma-separated lists
+                            if current_value:
+                                merged_updates[field] = f"{current_value}, {new_value}"
+                            else:
+                                merged_updates[field] = new_value
                         else:
-                            updates_to_apply = updates
-                    else:
-                        updates_to_apply = updates
-
-                    # Apply updates
-                    success = firestore_manager.update_product_row(
-                        collection_name,
-                        row_num,
-                        updates_to_apply,
-                        overwrite_mode=True
-                    )
+                            merged_updates[field] = new_value
+                    updates_to_apply = merged_updates
+                else:
+                    updates_to_apply = updates
 
-                    if success:
-                        successful.append(row_num)
-                    else:
-                        failed.append(row_num)
-                        errors.append(f"Row {row_num}: Update failed")
+                operations.append(('update', row_num, updates_to_apply))
 
-                except Exception as e:
-                    failed.append(row_num)
-                    errors.append(f"Row {row_num}: {str(e)}")
-                    logger.error(f"Error updating row {row_num}: {e}")
+            # Apply updates
+            result = firestore_manager.bulk_write(collection_name, operations, existing=current_products)
+            successful = result['successful']
+            failed = result['failed']
+            errors = result['errors']
 
             logger.info(f"✅ [Bulk Edit] Complete: {len(successful)} success, {len(failed)} failed")
 
@@ -170,27 +157,11 @@ def setup_firestore_bulk_routes(app):
 
             logger.info(f"🗑️ [Bulk Delete] Deleting {len(product_ids)} products from {collection_name}")
 
-            successful = []
-            failed = []
-            errors = []
-
-            collection_ref = firestore_manager.get_collection_ref(collection_name)
-
-            for row_num in product_ids:
-                try:
-                    # Delete the document
-                    doc_ref = collection_ref.document(str(row_num))
-                    doc_ref.delete()
-                    successful.append(row_num)
-                    logger.debug(f"✅ Deleted row {row_num}")
-
-                except Exception as e:
-                    failed.append(row_num)
-                    errors.append(f"Row {row_num}: {str(e)}")
-                    logger.error(f"Error deleting row {row_num}: {e}")
-
-            # Invalidate cache
-            firestore_manager._invalidate_cache(collection_name)
+            # Delete the documents
+            result = firestore_manager.bulk_write(collection_name, [('delete', row_num, None) for row_num in product_ids])
+            successful = result['successful']
+            failed = result['failed']
+            errors = result['errors']
 
             logger.info(f"✅ [Bulk Delete] Complete: {len(successful)} deleted, {len(failed)} failed")
 
@@ -306,8 +277,9 @@ def setup_firestore_bulk_routes(app):
             failed = []
             errors = []
 
-            collection_ref = firestore_manager.get_collection_ref(collection_name)
-
+            # First pass: work out what each line does and which products it targets
+            planned = []
+            sku_index = None
             for i, row in enumerate(rows, start=1):
                 try:
                     # Check for _action column
@@ -324,111 +296,99 @@ def setup_firestore_bulk_routes(app):
                     if not any(clean_row.values()):
                         continue
 
-                    # Handle DELETE action
-                    if action == 'DELETE':
-                        # Find product by row_number or variant_sku
-                        row_num = None
-
-                        if 'row_number' in clean_row and clean_row['row_number']:
-                            row_num = int(clean_row['row_number'])
-                        elif 'variant_sku' in clean_row and clean_row['variant_sku']:
-                            # Find by SKU
-                            sku = str(clean_row['variant_sku']).strip()
-                            all_products = firestore_manager.get_all_products(collection_name)
-                            for r, product in all_products.items():
-                                if product.get('variant_sku', '').strip() == sku:
-                                    row_num = r
-                                    break
-
-                        if row_num:
-                            doc_ref = collection_ref.document(str(row_num))
-                            doc_ref.delete()
-                            deleted.append(row_num)
-                            logger.info(f"🗑️ Deleted row {row_num} (CSV line {i})")
-                        else:
-                            errors.append(f"Row {i}: DELETE failed - product not found")
-                            failed.append(i)
-
+                    if action not in ('DELETE', 'UPDATE'):
+                        planned.append((i, 'ADD', None, clean_row))
                         continue
 
-                    # Handle UPDATE action
-                    if action == 'UPDATE':
-                        # Find product by row_number or variant_sku
-                        row_num = None
-
-                        if 'row_number' in clean_row and clean_row['row_number']:
-                            row_num = int(clean_row['row_number'])
-                        elif 'variant_sku' in clean_row and clean_row['variant_sku']:
-                            # Find by SKU
-                            sku = str(clean_row['variant_sku']).strip()
-                            all_products = firestore_manager.get_all_products(collection_name)
-                            for r, product in all_products.items():
-                                if product.get('variant_sku', '').strip() == sku:
-                                    row_num = r
-                                    break
-
-                        if row_num:
-                            # Update the product (overwrite existing data)
-                            success = firestore_manager.update_product_row(
-                                collection_name,
-                                row_num,
-                                clean_row,
-                                overwrite_mode=True  # Overwrite existing data with new values
-                            )
-
-                            if success:
-                                # Apply data cleaning
-                                current_product = firestore_manager.get_single_product(collection_name, row_num)
-                                cleaning_updates = data_cleaner.clean_product(collection_name, current_product)
-                                if cleaning_updates:
-                                    firestore_manager.update_product_row(
-                                        collection_name,
-                                        row_num,
-                                        cleaning_updates,
-                                        overwrite_mode=False
-                                    )
-
-                                updated.append(row_num)
-                                logger.info(f"✏️ Updated row {row_num} (CSV line {i})")
-                            else:
-                                errors.append(f"Row {i}: UPDATE failed - could not update product")
-                                failed.append(i)
-                        else:
-                            errors.append(f"Row {i}: UPDATE failed - product not found")
-                            failed.append(i)
+                    # Find product by row_number or variant_sku
+                    row_num = None
+
+                    if 'row_number' in clean_row and clean_row['row_number']:
+                        row_num = int(clean_row['row_number'])
+                    elif 'variant_sku' in clean_row and clean_row['variant_sku']:
+                        # Find by SKU (index built once from a single collection read)
+                        if sku_index is None:
+                            sku_index = {}
+                            for r, product in firestore_manager.get_all_products(collection_name).items():
+                                sku_index.setdefault(str(product.get('variant_sku') or '').strip(), r)
+                        row_num = sku_index.get(str(clean_row['variant_sku']).strip())
+
+                    if row_num:
+                        planned.append((i, action, row_num, clean_row))
+                    else:
+                        errors.append(f"Row {i}: {action} failed - product not found")
+                        failed.append(i)
 
-                        continue
+                except Exception as e:
+                    failed.append(i)
+                    errors.append(f"Row {i}: {str(e)}")
+                    logger.error(f"Error processing row {i}: {e}")
+
+            # Current data of every targeted product in one read, and row numbers for every new one
+            targeted = [row_num for _, action, row_num, _ in planned if action != 'ADD']
+            current_products = firestore_manager.get_products(collection_name, targeted) if targeted else {}
+            new_count = sum(1 for _, action, _, _ in planned if action == 'ADD')
+            next_row = firestore_manager._reserve_row_numbers(collection_name, new_count) if new_count else None
+            existing = dict(current_products)
+
+            # Second pass: build the writes, folding data cleaning into the same write
+            operations = []
+            operation_lines = []
+            for i, action, row_num, clean_row in planned:
+                try:
+                    if action == 'DELETE':
+                        current_products.pop(row_num, None)
+                        operations.append(('delete', row_num, None))
+
+                    elif action == 'UPDATE':
+                        current_product = current_products.get(row_num)
+                        if current_product is None:
+                            errors.append(f"Row {i}: UPDATE failed - could not update product")
+                            failed.append(i)
+                            continue
 
-                    # Default: ADD new product
-                    # Add metadata
-                    clean_row['created_at'] = datetime.utcnow().isoformat()
-                    clean_row['imported_from'] = file.filename
+                        # Update the product (overwrite existing data), then apply data cleaning
+                        update_data = dict(clean_row)
+                        cleaning_updates = _cleaning_updates(data_cleaner, collection_name, {**current_product, **update_data})
+                        update_data.update(cleaning_updates)
+                        current_products[row_num] = {**current_product, **update_data}
+                        operations.append(('update', row_num, update_data))
 
-                    # Add product to Firestore
-                    row_num = firestore_manager.add_product(collection_name, clean_row)
+                    else:
+                        # Default: ADD new product
+                        row_num = next_row
+                        next_row += 1
 
-                    # Apply data cleaning rules
-                    product_with_row = {**clean_row, 'row_number': row_num}
-                    cleaning_updates = data_cleaner.clean_product(collection_name, product_with_row)
+                        # Add metadata
+                        clean_row['created_at'] = datetime.utcnow().isoformat()
+                        clean_row['imported_from'] = file.filename
 
-                    if cleaning_updates:
-                        firestore_manager.update_product_row(
-                            collection_name,
-                            row_num,
-                            cleaning_updates,
-                            overwrite_mode=False
-                        )
+                        # Apply data cleaning rules
+                        product_with_row = {**clean_row, 'row_number': row_num}
+                        cleaning_updates = _cleaning_updates(data_cleaner, collection_name, product_with_row)
+                        product_data = {**clean_row, **cleaning_updates}
+                        current_products[row_num] = product_data
+                        operations.append(('set', row_num, product_data))
 
-                    imported.append(row_num)
-                    logger.debug(f"✅ Imported row {i} as document {row_num}")
+                    operation_lines.append((i, action))
 
                 except Exception as e:
                     failed.append(i)
                     errors.append(f"Row {i}: {str(e)}")
                     logger.error(f"Error processing row {i}: {e}")
 
-            # Invalidate cache after all operations
-            firestore_manager._invalidate_cache(collection_name)
+            if operations:
+                result = firestore_manager.bulk_write(collection_name, operations, existing=existing)
+                for (i, action), (_, row_num, _), error in zip(operation_lines, operations, result['results']):
+                    if error:
+                        errors.append(f"Row {i}: {action} failed - {error}")
+                        failed.append(i)
+                    elif action == 'DELETE':
+                        deleted.append(row_num)
+                    elif action == 'UPDATE':
+                        updated.append(row_num)
+                    else:
+                        imported.append(row_num)
 
             total_success = len(imported) + len(updated) + len(deleted)
             logger.info(f"✅ [Import] Complete: {len(imported)} imported, {len(updated)} updated, {len(deleted)} deleted, {len(failed)} failed")
@@ -487,20 +447,23 @@ def setup_firestore_bulk_routes(app):
 
             logger.info(f"📥 [Export] Exporting {collection_name} as {export_format}")
 
+            if export_format not in ('csv', 'excel'):
+                return jsonify({
+                    'success': False,
+                    'error': f'Invalid format: {export_format}. Use csv or excel.'
+                }), 400
+
             # Get products
             if product_ids_str:
                 # Export specific products
                 product_ids = [int(id.strip()) for id in product_ids_str.split(',') if id.strip()]
-                products = {}
-                for row_num in product_ids:
-                    product = firestore_manager.get_single_product(collection_name, row_num)
-                    if product:
-                        products[row_num] = product
+                products = iter(sorted(firestore_manager.get_products(collection_name, product_ids).items()))
             else:
-                # Export all products
-                products = firestore_manager.get_all_products(collection_name)
+                # Export all products, written out as Firestore streams them
+                products = firestore_manager.iter_all_products(collection_name)
 
-            if not products:
+            first_product, products = peek(products)
+            if first_product is None:
                 return jsonify({
                     'success': False,
                     'error': 'No products found to export'
@@ -511,8 +474,7 @@ def setup_firestore_bulk_routes(app):
                 fields = [f.strip() for f in fields_str.split(',') if f.strip()]
             else:
                 # Get all fields from first product
-                first_product = next(iter(products.values()))
-                fields = list(first_product.keys())
+                fields = list(first_product[1].keys())
 
             # Reorder fields: SKU, row_number, title, id first, then others, _action last
             priority_fields = ['variant_sku', 'row_number', 'title', 'id']
@@ -533,55 +495,30 @@ def setup_firestore_bulk_routes(app):
 
             fields = ordered_fields
 
-            logger.info(f"📊 [Export] Exporting {len(products)} products with {len(fields)} fields")
-
-            # Generate export file
-            if export_format == 'csv':
-                # Generate CSV
-                output = io.StringIO()
-                writer = csv.DictWriter(output, fieldnames=fields, extrasaction='ignore')
-                writer.writeheader()
+            logger.info(f"📊 [Export] Exporting {collection_name} with {len(fields)} fields")
 
-                for row_num, product in sorted(products.items()):
+            def export_rows():
+                for row_num, product in products:
                     # Only include requested fields
                     filtered_product = {k: product.get(k, '') for k in fields}
                     # Add empty _action column (user can fill in DELETE, UPDATE, etc.)
                     if '_action' not in filtered_product:
                         filtered_product['_action'] = ''
-                    writer.writerow(filtered_product)
-
-                output.seek(0)
+                    yield filtered_product
 
-                # Create response
+            # Generate export file
+            if export_format == 'csv':
+                # Stream the CSV as rows are written
                 filename = f"{collection_name}_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-                return send_file(
-                    io.BytesIO(output.getvalue().encode('utf-8')),
-                    mimetype='text/csv',
-                    as_attachment=True,
-                    download_name=filename
-                )
+                response = Response(stream_with_context(iter_csv(fields, export_rows())), mimetype='text/csv')
+                response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+                response.headers['X-Accel-Buffering'] = 'no'
+                return response
 
-            elif export_format == 'excel':
-                # Generate Excel
+            else:
+                # Generate Excel with a write-only workbook, row by row
                 try:
-                    import pandas as pd
-
-                    # Convert to DataFrame
-                    data = []
-                    for row_num, product in sorted(products.items()):
-                        filtered_product = {k: product.get(k, '') for k in fields}
-                        # Add empty _action column (user can fill in DELETE, UPDATE, etc.)
-                        if '_action' not in filtered_product:
-                            filtered_product['_action'] = ''
-                        data.append(filtered_product)
-
-                    df = pd.DataFrame(data)
-
-                    # Create Excel file in memory
-                    output = io.BytesIO()
-                    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                        df.to_excel(writer, index=False, sheet_name=collection_name)
-                    output.seek(0)
+                    output = write_xlsx(fields, export_rows(), sheet_name=collection_name)
 
                     filename = f"{collection_name}_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
                     return send_file(
@@ -594,15 +531,9 @@ def setup_firestore_bulk_routes(app):
                 except ImportError:
                     return jsonify({
                         'success': False,
-                        'error': 'Excel support not installed. Run: pip install pandas openpyxl'
+                        'error': 'Excel support not installed. Run: pip install openpyxl'
                     }), 500
 
-            else:
-                return jsonify({
-                    'success': False,
-                    'error': f'Invalid format: {export_format}. Use csv or excel.'
-                }), 400
-
         except Exception as e:
             logger.error(f"❌ [Export] Error: {e}")
             import traceback
@@ -711,3 +642,23 @@ def setup_firestore_bulk_routes(app):
             }), 500
 
     logger.info("✅ Firestore bulk operation routes registered")
+
+
+def _cleaning_updates(data_cleaner, collection_name: str, product: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Data cleaning changes for a product, folded into the same write as the import
+
+    Blank values are dropped, since cleaning never writes over existing data. A cleaning
+    failure doesn't stop the product being written, as with the separate cleaning write.
+    """
+    try:
+        updates = data_cleaner.clean_product(collection_name, product) or {}
+    except Exception as e:
+        logger.warning(f"⚠️ Data cleaning failed for row {product.get('row_number')}: {e}")
+        return {}
+
+    return {
+        field: value
+        for field, value in updates.items()
+        if value is not None and str(value).strip() != ''
+    }
@@ -2,7 +2,7 @@
 Google Sheets Bulk Operations Routes
 Handles bulk edit, delete, import/export for Google Sheets collections
 """
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 import logging
 import csv
 import io
@@ -23,6 +23,7 @@ def setup_sheets_bulk_routes(app):
     from core.db_cache import get_db_cache
     from core.cache_manager import cache_manager
     from config.collections import get_collection_config
+    from core.streaming import iter_csv, peek
 
     # =============================================================================
     # BULK EDIT
@@ -459,27 +460,32 @@ def setup_sheets_bulk_routes(app):
             if product_ids_str:
                 # Export specific products
                 product_ids = [int(id.strip()) for id in product_ids_str.split(',') if id.strip()]
-                products = {}
+                selected = {}
                 for row_num in product_ids:
                     product = sheets_manager.get_product(collection_name, row_num)
                     if product:
-                        products[row_num] = product
+                        selected[row_num] = product
+                products = iter(sorted(selected.items()))
             else:
-                # Export all products
-                products = sheets_manager.get_all_products(collection_name)
+                # Export all products, read from the cache in batches while the CSV streams
+                products = sheets_manager.iter_all_products(collection_name)
 
-            if not products:
+            first_product, products = peek(products)
+            if first_product is None:
                 return jsonify({
                     'success': False,
                     'error': 'No products found to export'
                 }), 404
 
-            logger.info(f"📊 [Export] Exporting {len(products)} products")
-
-            # Collect all unique fields across all products
-            fields = set()
-            for product in products.values():
-                fields.update(product.keys())
+            if product_ids_str:
+                # Collect all unique fields across the selected products
+                fields = set()
+                for product in selected.values():
+                    fields.update(product.keys())
+            else:
+                # Every field holding a value anywhere in the collection, from the cache
+                # (which iter_all_products has filled by now if it was empty)
+                fields = get_db_cache().get_product_fields(collection_name) or list(first_product[1].keys())
 
             # Convert to list and remove unwanted fields
             fields = list(fields)
@@ -506,30 +512,21 @@ def setup_sheets_bulk_routes(app):
 
             fields = ordered_fields
 
-            # Create CSV
-            output = io.StringIO()
-            writer = csv.DictWriter(output, fieldnames=fields, extrasaction='ignore')
-            writer.writeheader()
-
-            for row_num in sorted(products.keys()):
-                product = products[row_num]
-                # Add row_number if not already present
-                if 'row_number' not in product:
-                    product['row_number'] = row_num
-                # Add empty _action column (user will fill it for DELETE/UPDATE)
-                product['_action'] = ''
-                writer.writerow(product)
-
-            # Prepare file for download
-            output.seek(0)
-            filename = f"{collection_name}_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+            def export_rows():
+                for row_num, product in products:
+                    # Add row_number if not already present
+                    if 'row_number' not in product:
+                        product['row_number'] = row_num
+                    # Add empty _action column (user will fill it for DELETE/UPDATE)
+                    product['_action'] = ''
+                    yield product
 
-            return send_file(
-                io.BytesIO(output.getvalue().encode('utf-8')),
-                mimetype='text/csv',
-                as_attachment=True,
-                download_name=filename
-            )
+            # Stream the CSV download as rows are written
+            filename = f"{collection_name}_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+            response = Response(stream_with_context(iter_csv(fields, export_rows())), mimetype='text/csv')
+            response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+            response.headers['X-Accel-Buffering'] = 'no'
+            return response
 
         except Exception as e:
             logger.error(f"❌ [Export] Error: {e}")
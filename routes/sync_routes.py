@@ -57,7 +57,7 @@ def setup_sync_routes(app):
             logger.info(f"✅ Retrieved {len(all_products)} products from Google Sheets")
 
             # Get existing Firestore data for comparison
-            firestore_products = fm.get_all_products(collection_name, force_refresh=True)
+            firestore_products = fm.get_all_products(collection_name)
 
             # Filter to specific rows if requested
             if specific_rows:
@@ -67,6 +67,9 @@ def setup_sync_routes(app):
             else:
                 stats['total_rows'] = len(all_products)
 
+            # Collect the writes, then send them as a few batch commits
+            operations = []
+
             # Process each row
             for row_num, sheet_product in all_products.items():
                 try:
@@ -81,7 +84,7 @@ def setup_sync_routes(app):
                         continue
 
                     # Get existing Firestore product
-                    firestore_product = firestore_products.get(str(row_num), {})
+                    firestore_product = firestore_products.get(int(row_num), {})
                     is_new = not firestore_product or len(firestore_product) == 0
 
                     # Check for changes
@@ -109,30 +112,31 @@ def setup_sync_routes(app):
                             stats['created'] += 1
                         else:
                             stats['updated'] += 1
+                    elif is_new:
+                        operations.append(('set', int(row_num), product_data))
                     else:
-                        # Actually update
-                        success = fm.update_product_row(
-                            collection_name,
-                            row_num,
-                            product_data,
-                            overwrite_mode=True
-                        )
-
-                        if success:
-                            if is_new:
-                                stats['created'] += 1
-                            else:
-                                stats['updated'] += 1
-
-                            if stats['updated'] % 50 == 0:
-                                logger.info(f"📊 Progress: {stats['updated']} products synced...")
-                        else:
-                            stats['errors'] += 1
+                        # Field mask: only send the fields that actually differ
+                        update_data = {change['field']: sheet_product.get(change['field']) for change in changed_fields}
+                        update_data['updated_at'] = product_data['updated_at']
+                        update_data['synced_from_sheets'] = True
+                        operations.append(('update', int(row_num), update_data))
 
                 except Exception as e:
                     stats['errors'] += 1
                     logger.error(f"❌ Error processing row {row_num}: {e}")
 
+            if operations:
+                logger.info(f"📤 Writing {len(operations)} changed products to Firestore...")
+                result = fm.bulk_write(collection_name, operations, existing=firestore_products)
+                for (action, row_num, _), error in zip(operations, result['results']):
+                    if error:
+                        stats['errors'] += 1
+                        logger.error(f"❌ Error syncing row {row_num}: {error}")
+                    elif action == 'set':
+                        stats['created'] += 1
+                    else:
+                        stats['updated'] += 1
+
             logger.info(f"✅ Sync complete: {stats['updated']} updated, {stats['created']} created")
 
             return jsonify({
@@ -0,0 +1,87 @@
+"""
+Tests for how extraction requests are resolved against the LLM cache,
+including variant pages that are rendered in a browser
+"""
+import json
+
+import pytest
+import requests
+
+import core.ai_extractor as ai_extractor
+from core.ai_extractor import AIExtractor
+from core.llm_cache import LLMResponseCache
+
+COLLECTION = 'sinks'
+VARIANT_URL = 'https://example.com/vale-basin?finish=black'
+FETCHED_PAGE = '<html><body><h1>Vale Basin</h1><p>Available in chrome and black.</p></body></html>'
+RENDERED_PAGE = '<html><body><h1>Vale Basin</h1><p>Finish: Matte Black</p></body></html>'
+
+
+class FakeClient:
+    def __init__(self):
+        self.payloads = []
+
+    def post(self, payload, timeout=None, kind=None):
+        self.payloads.append(payload)
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps({
+            'choices': [{'message': {'content': '{"title": "Vale Basin"}'}}],
+            'usage': {'prompt_tokens': 100, 'completion_tokens': 10}
+        }).encode('utf-8')
+        return response
+
+
+@pytest.fixture
+def llm_cache(tmp_path, monkeypatch):
+    cache = LLMResponseCache(str(tmp_path / 'llm_cache.db'))
+    monkeypatch.setattr(ai_extractor, 'get_llm_cache', lambda: cache)
+    return cache
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = FakeClient()
+    monkeypatch.setattr(ai_extractor, 'get_llm_client', lambda: client)
+    return client
+
+
+@pytest.fixture
+def extractor(llm_cache, client, monkeypatch):
+    extractor = AIExtractor()
+    extractor.api_key = 'test-key'
+    monkeypatch.setattr(extractor.settings, 'RENDER_JS_VARIANTS', True)
+    extractor.renders = []
+
+    def render_page_html(url):
+        extractor.renders.append(url)
+        return RENDERED_PAGE
+    monkeypatch.setattr(extractor, 'render_page_html', render_page_html)
+    monkeypatch.setattr(extractor, 'extract_product_images_with_ai', lambda html, url, context='': [])
+    return extractor
+
+
+def test_cached_variant_extraction_does_not_render(extractor, client):
+    assert extractor.extract_product_data(COLLECTION, FETCHED_PAGE, VARIANT_URL) == {'title': 'Vale Basin'}
+    assert extractor.renders == [VARIANT_URL]
+    assert 'Matte Black' in client.payloads[0]['messages'][0]['content']
+
+    assert extractor.extract_product_data(COLLECTION, FETCHED_PAGE, VARIANT_URL) == {'title': 'Vale Basin'}
+    assert extractor.renders == [VARIANT_URL]
+    assert len(client.payloads) == 1
+
+    # Bypassing the cache renders and asks again
+    extractor.extract_product_data(COLLECTION, FETCHED_PAGE, VARIANT_URL, use_cache=False)
+    assert extractor.renders == [VARIANT_URL] * 2
+    assert len(client.payloads) == 2
+
+
+def test_batch_and_live_requests_share_the_rendered_key(extractor, llm_cache):
+    request = extractor.resolve_extraction_request(COLLECTION, FETCHED_PAGE, VARIANT_URL)
+    assert request['response'] is None and 'Matte Black' in request['payload']['messages'][0]['content']
+
+    llm_cache.put(request['cache_key'], '{"title": "Vale Basin"}')
+    cached = extractor.resolve_extraction_request(COLLECTION, FETCHED_PAGE, VARIANT_URL)
+    assert cached['cache_key'] == request['cache_key']
+    assert cached['response'] == '{"title": "Vale Basin"}'
+    assert extractor.renders == [VARIANT_URL]
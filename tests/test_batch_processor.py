@@ -0,0 +1,256 @@
+"""
+Tests for OpenAI batch jobs against a fake Files/Batches API: build, submit,
+poll, collect and apply, plus cancelling, partial failure and claims
+"""
+import os
+import json
+import time
+
+import pytest
+import requests
+
+import core.batch_processor as batch_processor
+import core.data_processor as data_processor
+from core.batch_processor import BatchJobManager, BatchJobStatus
+from core.llm_cache import LLMResponseCache
+
+COLLECTION = 'sinks'
+
+
+class FakeBatchAPI:
+    """In-memory Files/Batches API; a batch finishes on its `polls_to_finish`th poll"""
+
+    def __init__(self):
+        self.files = {}
+        self.batches = {}
+        self.cancelled = []
+        self.polls_to_finish = 1
+        self.poll_errors = []
+        self.on_finish = None
+        self.responses = {}
+
+    def upload_file(self, path):
+        file_id = f'file-{len(self.files)}'
+        with open(path) as f:
+            self.files[file_id] = [json.loads(line) for line in f]
+        return file_id
+
+    def create_batch(self, input_file_id, completion_window='24h', metadata=None):
+        batch_id = f'batch-{len(self.batches)}'
+        self.batches[batch_id] = {'id': batch_id, 'input_file_id': input_file_id, 'status': 'in_progress',
+                                  'polls': 0}
+        return {'id': batch_id, 'status': 'in_progress'}
+
+    def get_batch(self, batch_id):
+        if self.poll_errors:
+            raise self.poll_errors.pop(0)
+        batch = self.batches[batch_id]
+        batch['polls'] += 1
+        if batch['status'] == 'in_progress' and batch['polls'] >= self.polls_to_finish:
+            self._finish(batch)
+        return dict(batch)
+
+    def _finish(self, batch):
+        output, errors = [], []
+        for request in self.files[batch['input_file_id']]:
+            response = self.responses.get(request['custom_id'], '{"title": "Basin"}')
+            if isinstance(response, dict):
+                errors.append({'custom_id': request['custom_id'], 'error': response})
+            else:
+                output.append({'custom_id': request['custom_id'], 'response': {
+                    'status_code': 200,
+                    'body': {'choices': [{'message': {'content': response}}], 'usage': {'prompt_tokens': 10}}
+                }})
+        batch['output_file_id'] = self._store(output)
+        batch['error_file_id'] = self._store(errors) if errors else None
+        batch['status'] = 'completed'
+        if self.on_finish:
+            self.on_finish()
+
+    def _store(self, lines):
+        file_id = f'file-{len(self.files)}'
+        self.files[file_id] = lines
+        return file_id
+
+    def cancel_batch(self, batch_id):
+        self.cancelled.append(batch_id)
+        self.batches[batch_id]['status'] = 'cancelled'
+        return dict(self.batches[batch_id])
+
+    def iter_file_lines(self, file_id):
+        yield from self.files[file_id]
+
+
+class FakeProcessor:
+    def __init__(self):
+        self.applied = []
+
+    def extract_from_urls(self, collection_name, selected_rows, overwrite_mode=True):
+        self.applied.append(list(selected_rows))
+        return {'success': True, 'results': []}
+
+
+def http_error(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    return requests.exceptions.HTTPError(f'HTTP {status_code}', response=response)
+
+
+@pytest.fixture
+def llm_cache(tmp_path, monkeypatch):
+    cache = LLMResponseCache(str(tmp_path / 'llm_cache.db'))
+    monkeypatch.setattr(batch_processor, 'get_llm_cache', lambda: cache)
+    return cache
+
+
+@pytest.fixture
+def processor(monkeypatch):
+    processor = FakeProcessor()
+    monkeypatch.setattr(data_processor, 'get_data_processor', lambda: processor)
+    return processor
+
+
+@pytest.fixture
+def api():
+    return FakeBatchAPI()
+
+
+@pytest.fixture
+def manager(tmp_path, api, llm_cache, processor, monkeypatch):
+    manager = BatchJobManager(str(tmp_path / 'batch.db'), str(tmp_path / 'batches'), api, poll_interval=0)
+
+    def extraction_requests(processor, job):
+        for row_num in job['selected_rows']:
+            key = llm_cache.make_key('gpt-4o-mini', COLLECTION, f'page for row {row_num}')
+            yield row_num, {'cache_key': key, 'payload': {'model': 'gpt-4o-mini', 'messages': []}}, True
+    monkeypatch.setattr(manager, '_extraction_requests', extraction_requests)
+    return manager
+
+
+def request_key(llm_cache, row_num):
+    return llm_cache.make_key('gpt-4o-mini', COLLECTION, f'page for row {row_num}')
+
+
+def request_statuses(manager, job_id):
+    conn = manager._pool.connect()
+    rows = conn.execute('SELECT row_num, status FROM llm_batch_requests WHERE job_id = ? ORDER BY row_num',
+                        (job_id,)).fetchall()
+    conn.close()
+    return dict(rows)
+
+
+def test_job_builds_submits_collects_and_applies(manager, api, llm_cache, processor):
+    llm_cache.put(request_key(llm_cache, 2), '{"title": "Answered live"}')
+    api.polls_to_finish = 2
+    # A dropped connection while polling is retried rather than failing the job
+    api.poll_errors = [requests.exceptions.ConnectionError('connection reset'), http_error(503)]
+
+    job_id = manager.create_job('extraction', COLLECTION, selected_rows=[2, 3, 4])
+    manager._run(job_id)
+
+    job = manager.get_job(job_id)
+    assert job['status'] == BatchJobStatus.COMPLETED.value
+    assert (job['request_count'], job['cached_count'], job['succeeded_count'], job['failed_count']) == (3, 1, 2, 0)
+    assert len(job['batches']) == 1 and job['batches'][0]['collected']
+    assert [request['custom_id'] for request in api.files['file-0']] == ['3-1', '4-2']
+    assert request_statuses(manager, job_id) == {2: 'cached', 3: 'done', 4: 'done'}
+    assert llm_cache.get(request_key(llm_cache, 3)) == '{"title": "Basin"}'
+    assert processor.applied == [[2, 3, 4]]
+    assert job['claimed_by'] is None
+    assert os.listdir(manager.batch_dir) == []
+
+
+def test_failed_requests_are_not_applied(manager, api, processor):
+    api.responses = {'3-1': {'message': 'context length exceeded'}, '4-2': 'not json at all'}
+
+    job_id = manager.create_job('extraction', COLLECTION, selected_rows=[2, 3, 4])
+    manager._run(job_id)
+
+    job = manager.get_job(job_id)
+    assert job['status'] == BatchJobStatus.COMPLETED.value
+    assert (job['succeeded_count'], job['failed_count']) == (1, 2)
+    assert request_statuses(manager, job_id) == {2: 'done', 3: 'failed', 4: 'failed'}
+    assert job['result']['rows_with_failed_requests'] == [3, 4]
+    assert processor.applied == [[2]]
+
+
+def test_responses_that_cannot_be_cached_count_as_failed(manager, llm_cache, processor, monkeypatch):
+    job_id = manager.create_job('extraction', COLLECTION, selected_rows=[2])
+    monkeypatch.setattr(llm_cache, 'put', lambda key, text, usage=None: False)
+    manager._run(job_id)
+
+    job = manager.get_job(job_id)
+    assert (job['succeeded_count'], job['failed_count']) == (0, 1)
+    assert processor.applied == []
+
+
+def test_jobs_are_refused_when_the_llm_cache_is_disabled(manager, llm_cache):
+    llm_cache.enabled = False
+    with pytest.raises(ValueError, match='LLM_CACHE_ENABLED'):
+        manager.create_job('extraction', COLLECTION, selected_rows=[2])
+
+
+def test_cancel_cancels_running_batches(manager, api, processor):
+    job_id = manager.create_job('extraction', COLLECTION, selected_rows=[2, 3])
+    assert manager._claim(job_id)
+    manager._build(manager.get_job(job_id))
+    assert manager.get_job(job_id)['status'] == BatchJobStatus.SUBMITTED.value
+
+    assert manager.cancel_job(job_id)
+    assert api.cancelled == ['batch-0']
+    assert manager.get_job(job_id)['status'] == BatchJobStatus.CANCELLED.value
+
+    # A cancelled job is never picked up again
+    manager._release(job_id)
+    manager._run(job_id)
+    assert processor.applied == []
+    assert manager.resume_job(job_id) == (False, 'Job is cancelled')
+
+
+def test_failed_job_with_submitted_batches_can_be_resumed(manager, api, processor):
+    api.polls_to_finish = 2
+    api.poll_errors = [http_error(404)]
+
+    job_id = manager.create_job('extraction', COLLECTION, selected_rows=[2, 3])
+    manager._run(job_id)
+    job = manager.get_job(job_id)
+    assert job['status'] == BatchJobStatus.FAILED.value
+    assert job['batches'][0]['batch_id'] == 'batch-0'
+
+    resumed, message = manager.resume_job(job_id)
+    assert resumed, message
+    thread = manager._threads.get(job_id)
+    if thread:
+        thread.join(timeout=10)
+
+    assert manager.get_job(job_id)['status'] == BatchJobStatus.COMPLETED.value
+    assert processor.applied == [[2, 3]]
+
+
+def test_resume_is_refused_while_another_runner_holds_the_job(manager):
+    job_id = manager.create_job('extraction', COLLECTION, selected_rows=[2])
+    conn = manager._pool.connect()
+    conn.execute('UPDATE llm_batch_jobs SET claimed_by = ?, heartbeat_at = ? WHERE job_id = ?',
+                 ('other-host:1', time.time(), job_id))
+    conn.commit()
+    conn.close()
+
+    assert manager.resume_job(job_id) == (False, 'Job is being run by another process')
+    assert manager._threads.get(job_id) is None
+
+
+def test_runner_stops_when_its_claim_is_taken_over(manager, api, processor):
+    job_id = manager.create_job('extraction', COLLECTION, selected_rows=[2])
+
+    def take_over():
+        conn = manager._pool.connect()
+        conn.execute('UPDATE llm_batch_jobs SET claimed_by = ? WHERE job_id = ?', ('other-host:1', job_id))
+        conn.commit()
+        conn.close()
+    api.on_finish = take_over
+    manager._run(job_id)
+
+    job = manager.get_job(job_id)
+    assert job['status'] == BatchJobStatus.APPLYING.value
+    assert job['claimed_by'] == 'other-host:1'
+    assert processor.applied == []
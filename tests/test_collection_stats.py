@@ -0,0 +1,204 @@
+"""
+Tests for running collection statistics: the SQLite cache keeps them current
+on every write, and Firestore only increments them once they've been built
+"""
+import threading
+
+import pytest
+
+from core.collection_stats import StatsDelta, summarize
+from core.db_cache import DatabaseCache
+from core.firestore_manager import FirestoreManager, firestore
+
+COLLECTION = 'sinks'
+
+
+def product(title, quality, brand=''):
+    return {'title': title, 'brand_name': brand, 'quality_score': quality}
+
+
+def expected_stats(products):
+    delta = StatsDelta()
+    for item in products.values():
+        delta.add(item, ['title', 'brand_name'])
+    return summarize(delta.total, delta.quality_sum, delta.complete, delta.changed_fields())
+
+
+def stats_subset(stats):
+    fills = {field: stats['field_fill_counts'].get(field, 0) for field in ('title', 'brand_name')}
+    return (stats['total_products'], stats['complete_products'], round(stats['quality_sum'], 3), fills)
+
+
+# ----------------------------------------------------------------------
+# SQLite cache
+# ----------------------------------------------------------------------
+
+@pytest.fixture
+def cache(tmp_path):
+    return DatabaseCache(str(tmp_path / 'cache.db'))
+
+
+def test_sqlite_stats_follow_every_write(cache):
+    products = {2: product('Basin A', 90, 'Acme'), 3: product('Basin B', 40), 4: product('Basin C', 85, 'Acme')}
+    assert cache.save_all_products(COLLECTION, products)
+    assert stats_subset(cache.get_collection_stats(COLLECTION)) == stats_subset(expected_stats(products))
+
+    products[3] = product('Basin B', 95, 'Other')
+    products[5] = product('Basin D', 10)
+    assert cache.upsert_products(COLLECTION, {3: products[3], 5: products[5]}) == 2
+    assert stats_subset(cache.get_collection_stats(COLLECTION)) == stats_subset(expected_stats(products))
+
+    del products[2]
+    assert cache.delete_products(COLLECTION, [2]) == 1
+    stats = cache.get_collection_stats(COLLECTION)
+    assert stats_subset(stats) == stats_subset(expected_stats(products))
+
+    # Incremental maintenance agrees with a full rebuild
+    assert cache.rebuild_collection_stats(COLLECTION)
+    assert stats_subset(cache.get_collection_stats(COLLECTION)) == stats_subset(stats)
+
+
+def test_write_during_first_stats_build_is_not_lost(cache, monkeypatch):
+    products = {2: product('Basin A', 90, 'Acme'), 3: product('Basin B', 40)}
+    assert cache.save_all_products(COLLECTION, products)
+
+    # Hold the first build between reading the rows and storing the totals
+    reading = threading.Event()
+    release = threading.Event()
+    stats_delta = cache._stats_delta
+
+    def slow_stats_delta(table, previous, added):
+        if threading.current_thread().name == 'build':
+            reading.set()
+            release.wait(timeout=5)
+        return stats_delta(table, previous, added)
+    monkeypatch.setattr(cache, '_stats_delta', slow_stats_delta)
+
+    build = threading.Thread(target=cache.get_collection_stats, args=(COLLECTION,), name='build')
+    build.start()
+    assert reading.wait(timeout=5)
+    products[4] = product('Basin C', 85, 'Acme')
+    write = threading.Thread(target=cache.upsert_products, args=(COLLECTION, {4: products[4]}))
+    write.start()
+    write.join(timeout=0.3)
+    release.set()
+    build.join(timeout=5)
+    write.join(timeout=5)
+
+    assert stats_subset(cache.get_collection_stats(COLLECTION)) == stats_subset(expected_stats(products))
+
+
+# ----------------------------------------------------------------------
+# Firestore
+# ----------------------------------------------------------------------
+
+class FakeSnapshot:
+    def __init__(self, data):
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+def _apply(target, data):
+    for key, value in data.items():
+        if isinstance(value, dict):
+            _apply(target.setdefault(key, {}), value)
+        elif isinstance(value, firestore.Increment):
+            target[key] = target.get(key, 0) + value._value
+        elif value is firestore.SERVER_TIMESTAMP:
+            target[key] = 'now'
+        else:
+            target[key] = value
+
+
+class FakeDocument:
+    """Just enough of a Firestore document for the stats document"""
+
+    def __init__(self):
+        self.data = None
+
+    def get(self, field_paths=None):
+        return FakeSnapshot(self.data)
+
+    def set(self, data, merge=False):
+        if self.data is None or merge is False:
+            self.data = {}
+        if isinstance(merge, list):
+            for key in merge:
+                self.data.pop(key, None)
+        _apply(self.data, data)
+
+    def collection(self, name):
+        return self
+
+    def document(self, name):
+        return self
+
+
+class FakeDB:
+    def __init__(self):
+        self.stats_document = FakeDocument()
+
+    def collection(self, name):
+        return self
+
+    def document(self, name):
+        return self.stats_document
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    manager = FirestoreManager()
+    manager.db = FakeDB()
+    manager._stats_built = set()
+    monkeypatch.setattr(manager, '_stats_fields', lambda collection_name: ['title', 'brand_name'])
+    return manager
+
+
+def delta_for(added=(), removed=()):
+    delta = StatsDelta()
+    for item in added:
+        delta.add(item, ['title', 'brand_name'])
+    for item in removed:
+        delta.remove(item, ['title', 'brand_name'])
+    return delta
+
+
+def test_firestore_increments_wait_until_stats_are_built(manager, monkeypatch):
+    products = {2: product('Basin A', 90, 'Acme'), 3: product('Basin B', 40)}
+    monkeypatch.setattr(manager, 'get_all_products', lambda collection_name: dict(products))
+
+    # A product written before the stats document exists must not become the totals
+    products[4] = product('Basin C', 85, 'Acme')
+    manager._update_collection_stats(COLLECTION, delta_for(added=[products[4]]))
+    assert manager.db.stats_document.data is None
+
+    stats = manager.get_collection_stats(COLLECTION)
+    assert stats_subset(stats) == stats_subset(expected_stats(products))
+    assert manager.db.stats_document.data['stats_built'] is True
+
+    # Once built, writes are applied as increments
+    products[5] = product('Basin D', 100, 'Other')
+    manager._update_collection_stats(COLLECTION, delta_for(added=[products[5]]))
+    removed = products.pop(3)
+    manager._update_collection_stats(COLLECTION, delta_for(removed=[removed]))
+    assert stats_subset(manager.get_collection_stats(COLLECTION)) == stats_subset(expected_stats(products))
+
+
+def test_firestore_stats_from_increments_alone_are_rebuilt(manager, monkeypatch):
+    products = {2: product('Basin A', 90, 'Acme'), 3: product('Basin B', 40)}
+    monkeypatch.setattr(manager, 'get_all_products', lambda collection_name: dict(products))
+
+    # Document left by the earlier behaviour: aggregates from one delta, no marker
+    manager.db.stats_document.data = {'total_products': 1, 'quality_sum': 40.0, 'complete_products': 0,
+                                      'field_fill_counts': {'title': 1, 'stale': 7}, 'last_row_number': 3}
+
+    stats = manager.get_collection_stats(COLLECTION)
+    assert stats_subset(stats) == stats_subset(expected_stats(products))
+    assert 'stale' not in manager.db.stats_document.data['field_fill_counts']
+    assert manager.db.stats_document.data['last_row_number'] == 3
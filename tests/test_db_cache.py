@@ -0,0 +1,92 @@
+"""
+Tests for the SQLite product cache: columnar storage and filtered, sorted and
+keyset-paginated queries
+"""
+import pytest
+
+from core.db_cache import DatabaseCache, ProductTable, compute_content_hash
+
+COLLECTION = 'sinks'
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DatabaseCache(str(tmp_path / 'cache.db'))
+
+
+def page_through(cache, limit, **query):
+    """Every row_number in order, following next_cursor from the first page"""
+    seen = []
+    after = None
+    while True:
+        page = cache.query_products(COLLECTION, limit=limit, after=after, **query)
+        seen.extend(page['products'])
+        after = page['next_cursor']
+        if not page['has_next']:
+            assert after is None
+            return seen
+
+
+def test_quality_pages_follow_the_cursor_through_unscored_products(cache):
+    scores = {2: 80, 3: None, 4: 95, 5: 80, 6: None, 7: 0, 8: 55.5, 9: None, 10: 95}
+    products = {row: {'title': f'Basin {row}', 'quality_score': score} for row, score in scores.items()}
+    assert cache.save_all_products(COLLECTION, products)
+
+    expected = [4, 10, 2, 5, 8, 7, 3, 6, 9]
+    for limit in (1, 2, 4, 100):
+        assert page_through(cache, limit, sort_by='quality_score') == expected
+
+    # Offset pages agree with the cursor
+    pages = [cache.query_products(COLLECTION, page=page, limit=4, sort_by='quality_score') for page in (1, 2, 3)]
+    assert [row for page in pages for row in page['products']] == expected
+
+
+def test_sheet_order_cursor_with_search_and_filter(cache):
+    products = {row: {'title': f'{"Basin" if row % 2 else "Tap"} {row}', 'quality_score': row * 10}
+                for row in range(2, 12)}
+    assert cache.save_all_products(COLLECTION, products)
+
+    assert page_through(cache, 2) == list(range(2, 12))
+    assert page_through(cache, 2, search='basin') == [3, 5, 7, 9, 11]
+
+    page = cache.query_products(COLLECTION, limit=2, search='basin', quality_filter='excellent')
+    assert list(page['products']) == [9, 11]
+    assert page['total_count'] == 2 and not page['has_next']
+
+
+def test_products_round_trip_through_the_columnar_layout(cache):
+    table = ProductTable('sinks', ['title', 'price', 'width_mm', 'features'])
+    product = {
+        'title': 'Basin 2',
+        'price': 249.5,
+        'width_mm': 600,
+        'features': ['overflow', 'tap hole'],
+        'in_stock': True,
+        'brand_name': None,
+        'dimensions': {'depth': 450, 'unit': 'mm'}
+    }
+
+    row = table.encode(2, product, source_hash='abc')
+    assert row[:2] == (2, compute_content_hash(product))
+    assert row[3] == 'abc'
+    # Scalars get their own columns; lists, dicts, booleans and None go to the overflow JSON
+    assert row[4:] == ('Basin 2', 249.5, 600, None)
+    assert table.decode(row) == (2, product)
+
+    assert cache.save_all_products(COLLECTION, {2: product, 3: {'title': 'Basin 3'}})
+    assert cache.get_all_products(COLLECTION) == {2: product, 3: {'title': 'Basin 3'}}
+
+
+def test_paginated_search_goes_through_the_search_index(cache):
+    products = {row: {'title': f'{"Vale Basin" if row % 2 else "Tap"} {row}', 'variant_sku': f'VAL-{row:03d}'}
+                for row in range(2, 12)}
+    assert cache.save_all_products(COLLECTION, products)
+    assert cache.save_all_products('taps', {2: {'title': 'Vale Basin Mixer', 'variant_sku': 'VAL-002'}})
+
+    assert page_through(cache, 2, search='vale bas') == [3, 5, 7, 9, 11]
+    # SKUs match with or without their separators, and only within the collection
+    assert page_through(cache, 2, search='val005') == [5]
+    assert page_through(cache, 2, search='VAL-002') == [2]
+
+    page = cache.query_products(COLLECTION, limit=2, search='basin', sort_by='quality_score')
+    assert page['total_count'] == 5 and list(page['products']) == [3, 5]
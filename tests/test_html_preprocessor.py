@@ -0,0 +1,79 @@
+"""
+Tests for the product document sent to AI extraction in place of raw HTML
+"""
+import json
+
+from core.html_preprocessor import HTMLPreprocessor
+
+DESCRIPTION = 'A solid brass basin mixer with a 35mm ceramic disc cartridge and a lifetime warranty. ' * 3
+
+PRODUCT_PAGE = f'''<html><head>
+<title>Vale Basin Mixer | Example Bathrooms</title>
+<meta property="og:title" content="Vale Basin Mixer">
+<script type="application/ld+json">{json.dumps({
+    "@context": "https://schema.org",
+    "@type": "Product",
+    "name": "Vale Basin Mixer",
+    "sku": "VAL-100",
+    "brand": {"@type": "Brand", "name": "Example"},
+    "aggregateRating": {"ratingValue": 4.5},
+    "additionalProperty": [{"@type": "PropertyValue", "name": "Flow rate", "value": 6, "unitText": "L/min"}]
+})}</script>
+<script>window.dataLayer = [];</script>
+</head><body>
+<header><nav><a href="/">Home</a><a href="/taps">Taps</a></nav>
+<select name="currency"><option>AUD</option><option>USD</option></select></header>
+<div class="cookie-consent">We use cookies</div>
+<main>
+  <h1>Vale Basin Mixer</h1>
+  <p>{DESCRIPTION}</p>
+  <table class="specs"><tr><th>Material</th><td>Brass</td></tr><tr><th>Height</th><td>165 mm</td></tr></table>
+  <form action="/cart/add">
+    <label for="finish">Finish</label>
+    <select id="finish" name="options[Finish]">
+      <option value="">Choose an option</option>
+      <option value="chrome">Chrome</option>
+      <option value="black" selected>Matte Black</option>
+    </select>
+    <select name="quantity"><option>1</option><option>2</option></select>
+    <div class="swatches" aria-label="Spout">
+      <button class="swatch" aria-label="150mm spout"></button>
+      <button class="swatch is-selected" aria-pressed="true">200mm spout</button>
+    </div>
+    <fieldset><legend>Handle</legend>
+      <input type="radio" id="pin" name="Handle" value="pin" checked><label for="pin">Pin lever</label>
+      <input type="radio" id="loop" name="Handle" value="loop"><label for="loop">Loop lever</label>
+    </fieldset>
+    <button type="submit" name="add">Add to cart</button>
+  </form>
+  <div class="related-products"><p>You may also like: Vale Shower Rail</p></div>
+</main>
+<footer><p>Copyright Example Bathrooms</p><select><option>English</option><option>French</option></select></footer>
+</body></html>'''
+
+
+def test_product_document_keeps_product_facts_and_drops_page_chrome():
+    document = HTMLPreprocessor().build(PRODUCT_PAGE, 'https://example.com/vale?finish=black')
+    lines = document.text.split('\n')
+
+    assert lines[:2] == ['URL: https://example.com/vale?finish=black', 'Title: Vale Basin Mixer']
+    for line in ('sku: VAL-100', 'brand.name: Example', 'Flow rate: 6 L/min', 'og:title: Vale Basin Mixer',
+                 'Material: Brass', 'Height: 165 mm'):
+        assert line in lines
+
+    assert 'Variant options: Finish: Chrome, Matte Black (selected)' in lines
+    assert 'Variant options: Spout: 150mm spout, 200mm spout (selected)' in lines
+    assert 'Variant options: Handle: Pin lever (selected), Loop lever' in lines
+    assert not any(line.startswith('Variant options') and ('AUD' in line or 'English' in line or '1, 2' in line)
+                   for line in lines)
+
+    for noise in ('ratingValue', 'dataLayer', 'cookies', 'You may also like', 'Copyright', 'Add to cart', 'Taps'):
+        assert noise not in document.text
+    assert DESCRIPTION.strip() in document.text
+    assert document.output_tokens < document.input_tokens
+
+
+def test_pages_without_static_content_fall_back_to_html():
+    preprocessor = HTMLPreprocessor()
+    assert preprocessor.build('<html><body><div id="root"></div><script>render()</script></body></html>') is None
+    assert preprocessor.get_stats()['fallbacks'] == 1
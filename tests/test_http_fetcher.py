@@ -0,0 +1,118 @@
+"""
+Tests for the shared fetch layer: the size-bounded body store and in-flight
+de-duplication
+"""
+import threading
+from pathlib import Path
+
+import pytest
+import requests
+
+import core.http_fetcher as http_fetcher
+from core.http_fetcher import HTTPFetcher
+
+
+def make_response(url, body, headers=None):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = body
+    response.url = url
+    response.headers.update(headers or {})
+    return response
+
+
+class FakeSession:
+    """Serves `pages[url]`, optionally holding every request until `release` is set"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = []
+        self.release = None
+        self.vary_on_accept = False
+
+    def get(self, url, headers=None, timeout=None):
+        headers = dict(headers or {})
+        self.requests.append((url, headers))
+        if self.release:
+            self.release.wait(timeout=5)
+        if self.vary_on_accept:
+            accept = headers.get('Accept', '*/*')
+            return make_response(url, f'{accept} of {url}'.encode(), {'Vary': 'Accept-Encoding, Accept'})
+        return make_response(url, self.pages[url])
+
+    def head(self, url, headers=None, timeout=None, allow_redirects=True):
+        self.requests.append((url, dict(headers or {})))
+        return make_response(url, b'')
+
+
+@pytest.fixture
+def fetcher(tmp_path):
+    fetcher = HTTPFetcher(str(tmp_path / 'fetch'), max_bytes=1000)
+    fetcher._session = FakeSession({f'https://example.com/{n}': bytes([n]) * 300 for n in range(6)})
+    return fetcher
+
+
+def test_store_is_bounded_by_least_recent_use(fetcher, monkeypatch):
+    monkeypatch.setattr(http_fetcher, 'EVICTION_CHECK_INTERVAL', 1)
+    for n in range(3):
+        fetcher.get(f'https://example.com/{n}')
+    # Reading page 0 makes page 1 the least recently used
+    assert fetcher.get('https://example.com/0').from_cache
+    fetcher.get('https://example.com/3')
+
+    stats = fetcher.get_stats()
+    assert stats['evictions'] == 1
+    assert stats['size_bytes'] == 900
+    assert fetcher._load_entry('https://example.com/0')
+    assert fetcher._load_entry('https://example.com/1') is None
+    assert len([path for path in Path(fetcher.body_dir).rglob('*') if path.is_file()]) == 3
+
+
+def test_changed_page_does_not_leave_its_old_body_behind(fetcher):
+    url = 'https://example.com/0'
+    fetcher.get(url)
+    old_hash = fetcher._load_entry(url)['body_hash']
+
+    fetcher._session.pages[url] = b'updated page'
+    fetcher.get(url, max_age=0)
+
+    assert fetcher._read_body(old_hash) is None
+    assert fetcher.get(url).content == b'updated page'
+
+
+def test_stored_body_is_only_served_for_the_accept_it_varies_on(fetcher):
+    url = 'https://example.com/0'
+    assert fetcher.get(url).content == bytes([0]) * 300
+    # Without Vary: Accept the stored body is the same representation for any Accept
+    assert fetcher.get(url, headers={'Accept': 'application/pdf'}).from_cache
+
+    fetcher._session.vary_on_accept = True
+    url = 'https://example.com/1'
+    assert fetcher.get(url, headers={'Accept': 'text/html'}).content == b'text/html of https://example.com/1'
+    assert fetcher.get(url, headers={'accept': 'text/html'}).from_cache
+
+    response = fetcher.get(url, headers={'Accept': 'application/pdf'})
+    assert not response.from_cache
+    assert response.content == b'application/pdf of https://example.com/1'
+    assert fetcher.get(url, headers={'Accept': 'application/pdf'}).from_cache
+    # The text/html copy was replaced by the PDF one
+    assert not fetcher.head(url, headers={'Accept': 'text/html'}).from_cache
+
+
+def test_in_flight_requests_are_shared_only_with_matching_accept_and_range(fetcher):
+    fetcher._session.release = threading.Event()
+    requests_made = [
+        {}, {}, {'Accept': 'application/pdf'}, {'Range': 'bytes=0-99'}, {'range': 'bytes=0-99'}
+    ]
+    threads = [threading.Thread(target=fetcher.get, args=('https://example.com/5',), kwargs={'headers': headers})
+               for headers in requests_made]
+    for thread in threads:
+        thread.start()
+    while len(fetcher._session.requests) < 3 or fetcher.get_stats()['deduplicated'] < 2:
+        threading.Event().wait(0.01)
+    fetcher._session.release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert len(fetcher._session.requests) == 3
+    assert fetcher.get_stats()['deduplicated'] == 2
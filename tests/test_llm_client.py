@@ -0,0 +1,80 @@
+"""
+Tests for the shared OpenAI client: retries and how token estimates are
+settled against the shared quota
+"""
+import json
+
+import pytest
+import requests
+
+from core.llm_client import LLMClient, estimate_tokens
+from core.rate_limiter import SharedTokenBuckets
+
+TOKENS_PER_MINUTE = 100000
+PAYLOAD = {'model': 'gpt-4o-mini', 'messages': [{'role': 'user', 'content': 'Describe this basin. ' * 50}],
+           'max_tokens': 500}
+
+
+def make_response(status_code, body=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(body or {}).encode('utf-8')
+    return response
+
+
+class FakeSession:
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def post(self, url, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def client(tmp_path):
+    limiter = SharedTokenBuckets(str(tmp_path / 'limits.db'), {'requests': 1000, 'tokens': TOKENS_PER_MINUTE})
+    return LLMClient('test-key', limiter, max_retries=3, base_delay=0, max_delay=0)
+
+
+def tokens_available(client):
+    return client.limiter.get_stats()['buckets']['tokens']['available']
+
+
+def test_failed_attempts_give_their_estimate_back(client):
+    client._session = FakeSession([
+        requests.exceptions.ConnectionError('reset'),
+        make_response(500),
+        make_response(200, {'choices': [{'message': {'content': '{}'}}], 'usage': {'total_tokens': 1234}})
+    ])
+
+    response = client.post(PAYLOAD)
+
+    assert response.ok
+    assert client._session.calls == 3
+    # Only the successful attempt is charged, at its real usage
+    assert tokens_available(client) == pytest.approx(TOKENS_PER_MINUTE - 1234, abs=50)
+
+
+def test_error_responses_are_not_charged(client):
+    assert estimate_tokens(PAYLOAD) > 100
+    client._session = FakeSession([make_response(400, {'error': {'message': 'bad request'}})])
+
+    response = client.post(PAYLOAD)
+
+    assert response.status_code == 400
+    assert tokens_available(client) == pytest.approx(TOKENS_PER_MINUTE, abs=50)
+
+
+def test_giving_up_after_retries_refunds_every_attempt(client):
+    client._session = FakeSession([requests.exceptions.Timeout('slow')] * 4)
+
+    with pytest.raises(requests.exceptions.Timeout):
+        client.post(PAYLOAD)
+
+    assert client._session.calls == 4
+    assert tokens_available(client) == pytest.approx(TOKENS_PER_MINUTE, abs=50)
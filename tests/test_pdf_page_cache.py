@@ -0,0 +1,31 @@
+"""
+Tests for the on-disk page image cache size bound
+"""
+import os
+
+from core.pdf_page_cache import PDFPageImageCache
+
+PDF = b'%PDF-1.4 spec sheet'
+
+
+def store_page(cache, page, size, last_used):
+    path = cache._image_path(cache.pdf_hash(PDF), page, 200, 'png')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'\0' * size)
+    os.utime(path, (last_used, last_used))
+    return path
+
+
+def test_least_recently_used_pages_are_evicted(tmp_path):
+    cache = PDFPageImageCache(str(tmp_path / 'pages'), max_bytes=1000)
+    paths = {page: store_page(cache, page, 300, 1000 + page) for page in range(1, 5)}
+
+    # Serving page 1 from disk makes page 2 the oldest
+    assert cache.get_page_image(PDF, page=1)['mime_type'] == 'image/png'
+    assert cache.evict() == 1
+
+    assert not os.path.exists(paths[2])
+    assert all(os.path.exists(paths[page]) for page in (1, 3, 4))
+    assert cache.get_stats()['evictions'] == 1
+    assert cache.evict() == 0
@@ -0,0 +1,96 @@
+"""
+Tests for delta sync from a collection's sheet into the SQLite cache:
+band reads, unchanged-sheet skips, changed/removed rows and queued writes
+"""
+import pytest
+from gspread.utils import a1_to_rowcol, column_letter_to_index
+
+import core.sheets_manager as sheets_manager
+from core.db_cache import DatabaseCache
+from core.sheets_manager import SheetsManager, SheetsWriteQueue
+
+COLLECTION = 'sinks'
+WIDTH = 62
+
+
+def sheet_row(url, sku, title):
+    row = [''] * WIDTH
+    row[0], row[1], row[5] = url, sku, title
+    return row
+
+
+class FakeWorksheet:
+    """Rows 2+ of a sheet as full-width lists; answers values.batchGet for column bands"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.requested_ranges = []
+
+    def batch_get(self, ranges):
+        self.requested_ranges.append(list(ranges))
+        value_ranges = []
+        for cell_range in ranges:
+            start, end = cell_range.split(':')
+            first_row, first_col = a1_to_rowcol(start)
+            last_col = column_letter_to_index(end)
+            value_ranges.append([row[first_col - 1:last_col] for row in self.rows[first_row - 2:]])
+        return value_ranges
+
+
+@pytest.fixture
+def db_cache(tmp_path, monkeypatch):
+    cache = DatabaseCache(str(tmp_path / 'cache.db'))
+    monkeypatch.setattr(sheets_manager, 'get_db_cache', lambda: cache)
+    return cache
+
+
+@pytest.fixture
+def manager(db_cache, monkeypatch):
+    manager = SheetsManager.__new__(SheetsManager)
+    manager.write_queue = SheetsWriteQueue(manager, window_seconds=3600, requests_per_minute=6000, max_retries=0)
+    manager.modified_time = '2026-01-01T00:00:00Z'
+    monkeypatch.setattr(manager, '_get_sheet_modified_time', lambda collection_name: manager.modified_time)
+    monkeypatch.setattr(manager, '_set_quality_scores', lambda collection_name, products: {})
+    return manager
+
+
+def test_only_changed_and_removed_rows_reach_the_cache(manager, db_cache):
+    worksheet = FakeWorksheet([
+        sheet_row('https://example.com/a', 'A-1', 'Basin A'),
+        sheet_row('https://example.com/b', 'B-1', 'Basin B'),
+        sheet_row('https://example.com/c', 'C-1', 'Basin C')
+    ])
+
+    result = manager.sync_collection(COLLECTION, worksheet=worksheet)
+    assert (result['status'], result['changed'], result['removed'], result['total']) == ('synced', 3, 0, 3)
+    # Only the mapped column bands are read, in one batchGet
+    assert len(worksheet.requested_ranges) == 1 and worksheet.requested_ranges[0][0].startswith('A2:')
+
+    # Same Drive modifiedTime: the sheet isn't read at all
+    assert manager.sync_collection(COLLECTION, worksheet=worksheet)['status'] == 'unchanged'
+    assert len(worksheet.requested_ranges) == 1
+
+    manager.modified_time = '2026-01-02T00:00:00Z'
+    worksheet.rows[1][5] = 'Basin B (renamed)'
+    worksheet.rows[2] = [''] * WIDTH
+    result = manager.sync_collection(COLLECTION, worksheet=worksheet)
+
+    assert (result['changed'], result['removed'], result['total']) == (1, 1, 2)
+    products = db_cache.get_all_products(COLLECTION)
+    assert sorted(products) == [2, 3]
+    assert products[3]['title'] == 'Basin B (renamed)'
+
+
+def test_queued_writes_win_over_the_sheet_until_they_land(manager, db_cache):
+    worksheet = FakeWorksheet([sheet_row('https://example.com/a', 'A-1', 'Basin A')])
+    manager.sync_collection(COLLECTION, worksheet=worksheet)
+
+    # An edit queued for row 2 and a new row 3 that has only been queued so far
+    manager.write_queue.enqueue(COLLECTION, 'sheet-1', {(2, 6): 'Basin A (edited)', (3, 1): 'https://example.com/new'})
+    manager.modified_time = '2026-01-02T00:00:00Z'
+    result = manager.sync_collection(COLLECTION, worksheet=worksheet)
+
+    assert result['removed'] == 0
+    assert db_cache.get_all_products(COLLECTION)[2]['title'] == 'Basin A (edited)'
+    # Rows carrying queued values are re-checked on the next sync rather than trusted
+    assert db_cache.get_source_hashes(COLLECTION)[2] is None
@@ -0,0 +1,146 @@
+"""
+Tests for the Google Sheets write-behind queue: coalescing, range merging and
+what happens to queued cells when a flush fails or is refused
+"""
+import pytest
+
+import core.sheets_manager as sheets_manager
+from core.sheets_manager import SheetsWriteQueue, merge_cell_ranges
+
+
+class FakeHTTPError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f'HTTP {status_code}')
+        self.response = type('Response', (), {'status_code': status_code, 'headers': {}})()
+
+
+class FakeSpreadsheet:
+    def __init__(self):
+        self.calls = []
+        self.written = []
+        self.fail_with = None
+        self.on_call = None
+        self.refused_ranges = set()
+
+    def values_batch_update(self, body):
+        self.calls.append(body)
+        if self.on_call:
+            self.on_call()
+        if self.fail_with:
+            raise self.fail_with
+        if any(entry['range'] in self.refused_ranges for entry in body['data']):
+            raise FakeHTTPError(400)
+        self.written.extend((entry['range'], entry['values']) for entry in body['data'])
+
+
+class FakeManager:
+    def __init__(self, spreadsheet):
+        self.spreadsheet = spreadsheet
+
+    def get_spreadsheet(self, collection_name):
+        return self.spreadsheet
+
+
+@pytest.fixture
+def spreadsheet():
+    return FakeSpreadsheet()
+
+
+@pytest.fixture
+def queue(spreadsheet):
+    # A long window keeps the background worker from flushing during the test
+    return SheetsWriteQueue(FakeManager(spreadsheet), window_seconds=3600, requests_per_minute=6000, max_retries=0)
+
+
+def written_values(spreadsheet):
+    return [(entry['range'], entry['values']) for call in spreadsheet.calls for entry in call['data']]
+
+
+def test_merge_cell_ranges_builds_rectangles():
+    cells = {(2, 1): 'a', (2, 2): 'b', (3, 1): 'c', (3, 2): 'd', (5, 4): 'e'}
+    assert merge_cell_ranges(cells) == [(2, 1, [['a', 'b'], ['c', 'd']]), (5, 4, [['e']])]
+
+
+def test_later_value_for_a_cell_replaces_the_earlier_one(queue, spreadsheet):
+    queue.enqueue('sinks', 'sheet-1', {(2, 1): 'old'})
+    queue.enqueue('sinks', 'sheet-1', {(2, 1): 'new'})
+
+    assert queue.flush() is True
+    assert written_values(spreadsheet) == [("'Raw_Data'!A2:A2", [['new']])]
+    assert queue.get_stats()['cells_coalesced'] == 1
+
+
+def test_failed_flush_requeues_cells_instead_of_dropping_them(queue, spreadsheet):
+    spreadsheet.fail_with = FakeHTTPError(503)
+    queue.enqueue('sinks', 'sheet-1', {(2, 1): 'edited', (2, 2): 'also edited'})
+
+    assert queue.flush() is False
+
+    stats = queue.get_stats()
+    assert stats['pending_cells'] == 2
+    assert stats['cells_requeued'] == 2
+    assert stats['failed_flushes'] == 1
+    assert 'sheet-1' in stats['failing_spreadsheets']
+    # Delta sync keeps the queued values over what the sheet still holds
+    assert queue.get_pending_fields('sinks') == {2: {'url': 'edited', 'variant_sku': 'also edited'}}
+
+    spreadsheet.fail_with = None
+    assert queue.flush() is True
+    assert written_values(spreadsheet)[-1] == ("'Raw_Data'!A2:B2", [['edited', 'also edited']])
+    stats = queue.get_stats()
+    assert stats['pending_cells'] == 0
+    assert stats['failing_spreadsheets'] == {}
+
+
+def test_newer_value_queued_during_a_failed_flush_wins(queue, spreadsheet):
+    queue.enqueue('sinks', 'sheet-1', {(2, 1): 'first'})
+
+    def edit_while_flushing():
+        queue.enqueue('sinks', 'sheet-1', {(2, 1): 'second'})
+    spreadsheet.on_call = edit_while_flushing
+    spreadsheet.fail_with = FakeHTTPError(500)
+
+    assert queue.flush() is False
+    assert queue.get_pending_fields('sinks') == {2: {'url': 'second'}}
+
+    spreadsheet.on_call = None
+    spreadsheet.fail_with = None
+    assert queue.flush() is True
+    assert written_values(spreadsheet)[-1] == ("'Raw_Data'!A2:A2", [['second']])
+
+
+def test_cells_for_an_unreachable_spreadsheet_are_kept(queue):
+    queue._manager.spreadsheet = None
+    queue.enqueue('sinks', 'sheet-1', {(3, 1): 'value'})
+
+    assert queue.flush() is False
+    assert queue.get_pending_fields('sinks') == {3: {'url': 'value'}}
+
+
+class FakeDBCache:
+    def __init__(self):
+        self.modified_times = {'sinks': '2026-01-01T00:00:00Z'}
+
+    def set_sheet_modified_time(self, collection_name, modified_time):
+        self.modified_times[collection_name] = modified_time
+        return True
+
+
+def test_refused_range_is_dead_lettered_and_the_rest_written(queue, spreadsheet, monkeypatch):
+    db_cache = FakeDBCache()
+    monkeypatch.setattr(sheets_manager, 'get_db_cache', lambda: db_cache)
+    spreadsheet.refused_ranges = {"'Raw_Data'!A5:A5"}
+    queue.enqueue('sinks', 'sheet-1', {(2, 1): 'a', (3, 3): 'b', (5, 1): 'refused', (7, 2): 'c'})
+
+    assert queue.flush() is False
+
+    assert sorted(spreadsheet.written) == [("'Raw_Data'!A2:A2", [['a']]), ("'Raw_Data'!B7:B7", [['c']]),
+                                           ("'Raw_Data'!C3:C3", [['b']])]
+    stats = queue.get_stats()
+    assert (stats['cells_written'], stats['cells_dead_lettered'], stats['ranges_dead_lettered']) == (3, 1, 1)
+    assert stats['dead_letters'][0]['range'] == "'Raw_Data'!A5:A5"
+    assert stats['dead_letters'][0]['status_code'] == 400
+    # Nothing is retried, and the next delta sync reads the sheet to replace the refused value
+    assert stats['pending_cells'] == 0 and stats['failing_spreadsheets'] == {}
+    assert queue.get_pending_fields('sinks') == {}
+    assert db_cache.modified_times['sinks'] is None